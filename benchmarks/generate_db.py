@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Synthetic large-database generator
+Fills a schema.sql database with production-like volumes of profiles,
+inventory, market listings and history tables for query benchmarking.
+
+Usage: python benchmarks/generate_db.py --path bench.db --scale 1.0
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import Database
+from utils.ledger import split_info
+from classes.character import CharacterClass, Race
+from classes.items import ItemGenerator, ItemType
+
+CHUNK_SIZE = 50000
+
+# Row counts at --scale 1.0
+BASE_COUNTS = {
+    "profiles": 100000,
+    "items_per_player": 20,
+    "market": 50000,
+    "transactions": 2000000,
+    "battle_logs": 500000,
+    "penalties": 1000000,
+    "adventures": 500000,
+    "crate_history": 200000,
+    "divine_blessings": 20000,
+}
+
+ADVENTURE_NAMES = [
+    "Forest Exploration", "Cave Diving", "Monster Hunt", "Treasure Quest",
+    "Dungeon Raid", "Dragon Slaying", "Artifact Search", "Bandit Clearing",
+    "Ancient Ruins", "Crystal Mining", "Beast Taming", "Shadow Realm"
+]
+
+TRANSACTION_SUBJECTS = [
+    ("daily_reward", lambda: {"streak": random.randint(1, 30), "xp": random.randint(50, 300)}),
+    ("adventure_reward", lambda: {"adventure": random.choice(ADVENTURE_NAMES), "difficulty": random.randint(1, 10)}),
+    ("coinflip", lambda: {"choice": "heads", "result": random.choice(["heads", "tails"]), "won": random.random() < 0.5}),
+    ("gambling", lambda: {"won": random.random() < 0.4, "chance": round(random.uniform(20, 60), 1)}),
+    ("item_sale", lambda: {"item": "Rusty Sword", "item_id": random.randint(1, 1000000)}),
+    ("market_fee", lambda: {"item": "Iron Shield", "price": random.randint(100, 50000)}),
+    ("shop_purchase", lambda: {"item": "Steel Axe"}),
+    ("item_transfer", lambda: {"item": "Oak Staff", "item_id": random.randint(1, 1000000)}),
+]
+
+BLESSING_EFFECTS = ["luck", "xp_mult", "gold_mult", "battle_mult", "protection", "adventure_success"]
+CRATE_TYPES = ["common", "uncommon", "rare", "magic", "legendary", "mystery"]
+
+
+def timestamp(days_back: float) -> str:
+    """Random timestamp within the last days_back days"""
+    moment = datetime.now() - timedelta(seconds=random.uniform(0, days_back * 86400))
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def insert_chunked(conn, query: str, rows: Iterator[Tuple], label: str, total: int):
+    """Insert rows in chunked transactions, printing progress"""
+    started = time.perf_counter()
+    chunk = []
+    inserted = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            conn.executemany(query, chunk)
+            conn.commit()
+            inserted += len(chunk)
+            chunk = []
+            print(f"  {label}: {inserted:,}/{total:,}", end="\r", flush=True)
+    if chunk:
+        conn.executemany(query, chunk)
+        conn.commit()
+        inserted += len(chunk)
+    print(f"  {label}: {inserted:,} rows in {time.perf_counter() - started:.1f}s".ljust(60))
+
+
+def profile_rows(count: int) -> Iterator[Tuple]:
+    """Profiles with a long-tailed level distribution"""
+    races = [race.value for race in Race]
+    classes = [char_class.value for char_class in CharacterClass]
+    for index in range(count):
+        xp = min(250000, int(random.paretovariate(1.0) * 500))
+        level = min(50, 1 + int((xp / 100) ** 0.5))
+        yield (
+            100000 + index, f"Player{index}", int(random.paretovariate(1.2) * 200), xp, level,
+            random.choice(classes) if level >= 5 else "Novice", random.choice(races),
+            random.randint(0, level * 20), random.randint(0, level * 20), random.randint(0, level * 40),
+            random.choice(["good", "neutral", "evil"]), random.randint(0, 5), timestamp(365)
+        )
+
+
+def inventory_rows(profiles: int, per_player: int) -> Iterator[Tuple]:
+    """Inventory items with a handful equipped per player"""
+    item_types = list(ItemType)
+    slots = {item_type: ItemGenerator.get_slot_for_type(item_type) for item_type in item_types}
+    hands = {item_type: ItemGenerator.get_hand_for_type(item_type).value for item_type in item_types}
+    for index in range(profiles):
+        owner = 100000 + index
+        count = max(1, int(random.expovariate(1 / per_player)))
+        equipped = random.randint(2, 6)
+        for slot_index in range(count):
+            item_type = random.choice(item_types)
+            total = int(random.triangular(1, 50, 8))
+            damage = total if slots[item_type] == "weapon" else 0
+            armor = total - damage
+            yield (
+                owner, f"{item_type.value} #{slot_index}", total * random.randint(20, 60), item_type.value,
+                damage, armor, random.randint(0, 10), random.randint(0, 5),
+                round(random.uniform(0, 0.1), 2), round(random.uniform(0, 0.1), 2), random.randint(0, 5),
+                slots[item_type], hands[item_type], 1 if slot_index < equipped else 0, timestamp(365)
+            )
+
+
+def generate(path: str, scale: float, seed: int):
+    """Create and fill the database at path"""
+    random.seed(seed)
+    counts = {name: max(1, int(value * scale)) if name != "items_per_player" else value
+              for name, value in BASE_COUNTS.items()}
+    profiles = counts["profiles"]
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    db = Database(path)
+    db.init_database()
+    conn = db.get_connection()
+    # Generation only - trade durability for load speed
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
+
+    print(f"Generating {path} at scale {scale}")
+    started = time.perf_counter()
+
+    insert_chunked(
+        conn,
+        """INSERT INTO profile (user_id, name, money, xp, level, class, race, pvpwins, pvplosses,
+                                completed, alignment, crates_common, created_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        profile_rows(profiles), "profile", profiles
+    )
+
+    insert_chunked(
+        conn,
+        """INSERT INTO inventory (owner, name, value, type, damage, armor, health_bonus, speed_bonus,
+                                  luck_bonus, crit_bonus, magic_bonus, slot_type, hand, equipped, created_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        inventory_rows(profiles, counts["items_per_player"]), "inventory", profiles * counts["items_per_player"]
+    )
+
+    max_item = conn.execute("SELECT MAX(id) FROM inventory").fetchone()[0]
+    listed = random.sample(range(1, max_item + 1), min(counts["market"], max_item))
+    insert_chunked(
+        conn,
+        "INSERT INTO market (item_id, price, listed_at) VALUES (?, ?, ?)",
+        ((item_id, random.randint(50, 100000), timestamp(30)) for item_id in listed),
+        "market", len(listed)
+    )
+    conn.execute(
+        "UPDATE inventory SET equipped = 0 WHERE id IN (SELECT item_id FROM market)"
+    )
+    conn.commit()
+
+    def user() -> int:
+        return 100000 + random.randrange(profiles)
+
+    def transaction_row() -> Tuple:
+        subject, info = random.choice(TRANSACTION_SUBJECTS)
+        incoming = random.random() < 0.6
+        return (None if incoming else user(), user() if incoming else None,
+                random.randint(1, 5000), subject) + split_info(info()) + (timestamp(180),)
+
+    insert_chunked(
+        conn,
+        """INSERT INTO transactions (from_user, to_user, amount, subject, item_id, item, won, details, timestamp)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (transaction_row() for _ in range(counts["transactions"])),
+        "transactions", counts["transactions"]
+    )
+
+    def battle_row() -> Tuple:
+        attacker, defender = user(), user()
+        return (attacker, defender, random.choice([attacker, defender]), random.choice(["pvp", "3v3", "5v5"]),
+                random.randint(0, 500), random.randint(0, 500), random.randint(0, 1000), timestamp(180))
+
+    insert_chunked(
+        conn,
+        """INSERT INTO battle_logs (attacker, defender, winner, battle_type, damage_dealt, damage_taken,
+                                    money_stolen, fought_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        (battle_row() for _ in range(counts["battle_logs"])),
+        "battle_logs", counts["battle_logs"]
+    )
+
+    insert_chunked(
+        conn,
+        "INSERT INTO penalties (user_id, penalty_type, penalty_seconds, applied_at) VALUES (?, ?, ?, ?)",
+        ((user(), random.choice(["chat", "chat", "chat", "nick"]), random.randint(5, 2000), timestamp(180))
+         for _ in range(counts["penalties"])),
+        "penalties", counts["penalties"]
+    )
+
+    def adventure_row() -> Tuple:
+        started_at = datetime.now() - timedelta(seconds=random.uniform(0, 180 * 86400))
+        finish_at = started_at + timedelta(minutes=random.randint(5, 120))
+        status = "active" if finish_at > datetime.now() - timedelta(hours=1) else random.choice(["completed", "completed", "failed"])
+        return (user(), random.choice(ADVENTURE_NAMES), random.randint(1, 10), started_at, finish_at, status)
+
+    insert_chunked(
+        conn,
+        "INSERT INTO adventures (user_id, adventure_name, difficulty, started_at, finish_at, status) VALUES (?, ?, ?, ?, ?, ?)",
+        (adventure_row() for _ in range(counts["adventures"])),
+        "adventures", counts["adventures"]
+    )
+
+    insert_chunked(
+        conn,
+        "INSERT INTO crate_history (user_id, crate_type, item_name, item_stats, opened_at) VALUES (?, ?, ?, ?, ?)",
+        ((user(), random.choice(CRATE_TYPES), "Crate Item", random.randint(1, 50), timestamp(180))
+         for _ in range(counts["crate_history"])),
+        "crate_history", counts["crate_history"]
+    )
+
+    def blessing_row() -> Tuple:
+        expires = datetime.now() + timedelta(hours=random.uniform(-48, 24))
+        return (user(), random.choice(BLESSING_EFFECTS), round(random.uniform(1.1, 1.5), 2), expires, "Blessing")
+
+    insert_chunked(
+        conn,
+        "INSERT INTO divine_blessings (user_id, effect, value, expires_at, blessing_name) VALUES (?, ?, ?, ?, ?)",
+        (blessing_row() for _ in range(counts["divine_blessings"])),
+        "divine_blessings", counts["divine_blessings"]
+    )
+
+    conn.execute("ANALYZE")
+    conn.commit()
+    db.close()
+
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    print(f"Done in {time.perf_counter() - started:.1f}s ({size_mb:.1f} MB)")
+
+
+def main():
+    """Parse arguments and generate the database"""
+    parser = argparse.ArgumentParser(description="Generate a large synthetic DiscordRPG database")
+    parser.add_argument("--path", default="bench.db", help="Output database path (overwritten)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Row count multiplier (1.0 = 100k profiles)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+    generate(args.path, args.scale, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Query benchmark for the Database helpers
+Times the utils.database methods the bot calls against a (generated) database
+and records the EXPLAIN QUERY PLAN of each statement they run, flagging full
+table scans.
+
+Usage:
+    python benchmarks/generate_db.py --path bench.db --scale 0.1
+    python benchmarks/query_bench.py --path bench.db --iterations 200
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classes.items import ItemGenerator
+from utils.database import Database
+
+# Statements the recorder skips: transaction control around the helpers' work
+CONTROL_STATEMENTS = {"BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE"}
+
+# String and number literals, replaced by ? to group statements into templates
+LITERAL = re.compile(r"'(?:[^']|'')*'|x'[0-9a-fA-F]*'|\b\d+(?:\.\d+)?\b")
+
+
+class StatementRecorder:
+    """Captures the statements a helper runs, through the connection's trace callback
+
+    Unlike wrapping Database.execute this also sees statements issued straight
+    on the connection (executemany in batches, reward transactions). The
+    trace reports statements with their parameters filled in; one example
+    is kept per template (literals replaced by ?), which EXPLAIN can run as is.
+    """
+
+    def __init__(self):
+        self.statements: Dict[str, str] = {}
+        self._conn = None
+
+    def _trace(self, statement: str):
+        if statement.startswith("--") or statement.split(None, 1)[0].upper() in CONTROL_STATEMENTS:
+            return  # Trigger sub-statements and transaction control
+        template = " ".join(LITERAL.sub("?", statement).split())
+        self.statements.setdefault(template, statement)
+
+    def install(self, db: Database):
+        self._conn = db.get_connection()
+        self._conn.set_trace_callback(self._trace)
+
+    def uninstall(self):
+        if self._conn:
+            self._conn.set_trace_callback(None)
+            self._conn = None
+
+
+def explain(db: Database, statement: str) -> List[str]:
+    """EXPLAIN QUERY PLAN lines for a statement (parameters already filled in)"""
+    try:
+        rows = db.get_connection().execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+        return [row[3] for row in rows]
+    except sqlite3.Error as e:
+        return [f"ERROR: {e}"]
+
+
+def is_full_scan(plan_line: str) -> bool:
+    """True for plan steps that walk a whole table"""
+    return plan_line.startswith("SCAN") and "USING" not in plan_line
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Fixtures:
+    """Random ids drawn from the benchmark database"""
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.users = [row[0] for row in db.get_connection().execute("SELECT user_id FROM profile")]
+        self.items = [row[0] for row in db.get_connection().execute(
+            "SELECT id FROM inventory WHERE id NOT IN (SELECT item_id FROM market) LIMIT 200000")]
+        self.listings = [row[0] for row in db.get_connection().execute("SELECT item_id FROM market")]
+        self.adventures = [row[0] for row in db.get_connection().execute("SELECT id FROM adventures LIMIT 200000")]
+        self.market_size = len(self.listings)
+        # The autoplay loops only look at online players; a third is a busy evening
+        self.online = random.sample(self.users, max(1, len(self.users) // 3))
+
+    def user(self) -> int:
+        return random.choice(self.users)
+
+    def item(self) -> int:
+        return random.choice(self.items)
+
+    def team(self, size: int) -> List[int]:
+        return random.sample(self.online, min(size, len(self.online)))
+
+    def finished_adventures(self) -> List[tuple]:
+        """complete_adventures() rewards for a tick's worth of active adventures"""
+        rows = self.db.get_connection().execute(
+            "SELECT id, user_id FROM adventures WHERE status = 'active' LIMIT 50"
+        ).fetchall()
+        return [(row[0], row[1], {'xp': 50, 'money': 100, 'completed': 1}, []) for row in rows]
+
+    def listing(self) -> int:
+        # Each listing can only be bought once
+        return self.listings.pop() if self.listings else 0
+
+    def owned_item(self) -> Tuple[int, int]:
+        row = self.db.get_connection().execute(
+            "SELECT id, owner FROM inventory WHERE id = ?", (self.item(),)
+        ).fetchone()
+        return row[0], row[1]
+
+
+def build_cases(db: Database, fx: Fixtures) -> Dict[str, Callable[[], Any]]:
+    """Benchmark cases: name -> zero-argument callable, each a Database method the bot calls"""
+    now = datetime.now
+    week_ago = lambda: (datetime.utcnow() - timedelta(days=7)).strftime("%Y-%m-%d")
+
+    def batch_increments():
+        # One event's worth of coalesced rewards (treasure rain, festival, ...)
+        with db.batch():
+            for user_id in fx.team(200):
+                db.increment(user_id, money=100, xp=25)
+
+    def team_rewards():
+        fighters = fx.team(20)
+        items = [ItemGenerator.generate_random_equipment(user_id, 4, 8) for user_id in fighters[:4]]
+        db.apply_rewards({user_id: {'xp': 100, 'money': 200, 'pvpwins': 1} for user_id in fighters}, items)
+
+    return {
+        # Commands
+        "get_character": lambda: db.get_character(fx.user()),
+        "get_profile_snapshot": lambda: db.get_profile_snapshot(fx.user(), now()),
+        "get_user_items": lambda: db.get_user_items(fx.user()),
+        "get_equipped_slots": lambda: db.get_equipped_slots(fx.user()),
+        "equip_item_to_slot": lambda: db.equip_item_to_slot(fx.item(), fx.user(), "weapon"),
+        "unequip_item_from_slot": lambda: db.unequip_item_from_slot(fx.user(), "weapon"),
+        "increment": lambda: db.increment(fx.user(), money=random.randint(-100, 100), xp=10),
+        "get_active_blessings": lambda: db.get_active_blessings(fx.user(), now()),
+        "get_cooldowns": lambda: db.get_cooldowns(fx.user()),
+        "set_cooldown": lambda: db.set_cooldown(fx.user(), "daily"),
+        "settle_battle": lambda: db.settle_battle(*fx.team(2), fx.online[0], 0),
+        "get_leaderboard[level]": lambda: db.get_leaderboard("level", 10),
+        "get_leaderboard[money]": lambda: db.get_leaderboard("money", 10),
+        "get_leaderboard[pvp]": lambda: db.get_leaderboard("pvp", 10),
+        # Market (the order book warms from list_market_listings, then refreshes single listings)
+        "list_market_listings": lambda: db.list_market_listings(),
+        "get_market_listing": lambda: db.get_market_listing(random.choice(fx.listings or [0])),
+        "list_item_on_market": lambda: db.list_item_on_market(fx.item(), random.randint(100, 10000)),
+        "buy_market_item": lambda: db.buy_market_item(fx.listing(), fx.user()),
+        # Ledger and economy
+        "log_transaction": lambda: db.log_transaction(None, fx.user(), 100, "bench", {"item": "Bench Sword", "won": True}),
+        "get_transactions[user]": lambda: db.get_transactions(fx.user(), limit=10),
+        "get_transactions[subject]": lambda: db.get_transactions(subject="bench", limit=10),
+        "get_transaction_summary": lambda: db.get_transaction_summary(fx.user(), week_ago()),
+        "get_economy_report": lambda: db.get_economy_report(week_ago()),
+        # Autoplay loops, scoped to the online players
+        "list_idle_characters": lambda: db.list_idle_characters(fx.online),
+        "get_finished_adventures": lambda: db.get_finished_adventures(now(), fx.online),
+        "get_battle_stats[10v10]": lambda: db.get_battle_stats(fx.team(20), now()),
+        "get_raid_roster": lambda: db.get_raid_roster(fx.online),
+        "batch[200 increments]": batch_increments,
+        "apply_rewards[10v10]": team_rewards,
+        "complete_adventures": lambda: db.complete_adventures(fx.finished_adventures()),
+        "get_level_ups": lambda: db.get_level_ups(),
+    }
+
+
+def run(path: str, iterations: int, only: List[str], seed: int) -> Dict[str, Dict[str, Any]]:
+    """Benchmark every case against a scratch copy of the database"""
+    random.seed(seed)
+    workdir = tempfile.TemporaryDirectory(prefix="discordrpg-qbench-")
+    scratch = os.path.join(workdir.name, "bench.db")
+    shutil.copyfile(path, scratch)
+
+    db = Database(scratch)
+    db.init_database()  # Older generated files get the current schema, triggers included
+    fx = Fixtures(db)
+    cases = build_cases(db, fx)
+    results = {}
+
+    try:
+        for name, case in cases.items():
+            if only and name not in only:
+                continue
+
+            recorder = StatementRecorder()
+            recorder.install(db)
+            timings = []
+            failures = 0
+            errors = set()
+            try:
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    try:
+                        case()
+                    except sqlite3.Error as e:
+                        failures += 1
+                        errors.add(str(e))
+                    timings.append((time.perf_counter() - started) * 1e6)
+            finally:
+                recorder.uninstall()
+
+            plans = {template: explain(db, statement) for template, statement in recorder.statements.items()}
+            results[name] = {
+                "p50_us": percentile(timings, 50),
+                "p99_us": percentile(timings, 99),
+                "mean_us": sum(timings) / len(timings),
+                "failures": failures,
+                "errors": sorted(errors),
+                "plans": plans,
+                "full_scans": sorted({line for lines in plans.values() for line in lines if is_full_scan(line)}),
+            }
+    finally:
+        db.close()
+        workdir.cleanup()
+
+    return results
+
+
+def report(results: Dict[str, Dict[str, Any]], show_plans: bool):
+    """Print the benchmark table and any full scans or errors"""
+    print(f"{'helper':<28}{'p50 us':>10}{'p99 us':>10}{'mean us':>10}  notes")
+    for name, result in results.items():
+        notes = []
+        if result["full_scans"]:
+            notes.append("FULL SCAN: " + "; ".join(result["full_scans"]))
+        if result["errors"]:
+            notes.append("ERROR: " + "; ".join(result["errors"]))
+        print(f"{name:<28}{result['p50_us']:>10.0f}{result['p99_us']:>10.0f}{result['mean_us']:>10.0f}  {' | '.join(notes)}")
+
+    if show_plans:
+        for name, result in results.items():
+            print(f"\n== {name}")
+            for query, lines in result["plans"].items():
+                print(f"  {query}")
+                for line in lines:
+                    print(f"    -> {line}")
+
+
+def main():
+    """Parse arguments and run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark DiscordRPG database helpers")
+    parser.add_argument("--path", default="bench.db", help="Database to benchmark (not modified)")
+    parser.add_argument("--iterations", type=int, default=200, help="Calls per helper")
+    parser.add_argument("--only", nargs="*", default=[], help="Only run these helpers")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--plans", action="store_true", help="Print the full query plan of every statement")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"Database not found at {args.path} - run benchmarks/generate_db.py first")
+        return
+
+    results = run(args.path, args.iterations, args.only, args.seed)
+    report(results, args.plans)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Headless simulation harness for the autoplay economy
+Drives the AutoPlay, Raids, AI Events and Epic Adventures loops against a
+temporary SQLite database with a fake Discord layer and reports throughput.
+
+Usage: python benchmarks/simulate.py --players 10000 --online 0.3 --ticks 20
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from unittest import mock
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+
+from utils.database import Database, SQLiteRepository
+from utils.outbox import Outbox
+from utils.playback import PlaybackScheduler
+from utils.presence import PresenceTracker
+from utils.rng import RNGService
+from classes.character import Race
+
+GAME_CHANNEL_NAME = "discordrpg"
+
+
+class FakeMessage:
+    """Message returned by FakeChannel.send"""
+
+    def __init__(self, channel: "FakeChannel", content: Optional[str] = None,
+                 embed: Optional[discord.Embed] = None):
+        self.id = next(channel.message_ids)
+        self.channel = channel
+        self.content = content
+        self.embed = embed
+
+    async def edit(self, content: Optional[str] = None, embed: Optional[discord.Embed] = None, **kwargs):
+        self.channel.edits += 1
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embed = embed
+        return self
+
+    async def delete(self, **kwargs):
+        pass
+
+    async def add_reaction(self, emoji):
+        pass
+
+
+class FakeChannel:
+    """Text channel that records outbound traffic instead of sending it"""
+
+    def __init__(self, guild: "FakeGuild", channel_id: int, name: str):
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self.sends = 0
+        self.edits = 0
+        self.message_ids = iter(range(1, 1 << 62))
+
+    async def send(self, content: Optional[str] = None, embed: Optional[discord.Embed] = None, **kwargs):
+        self.sends += 1
+        return FakeMessage(self, content, embed)
+
+
+class FakeMember:
+    """Guild member with a fixed presence status"""
+
+    def __init__(self, guild: "FakeGuild", user_id: int, name: str, status: discord.Status):
+        self.guild = guild
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.nick = None
+        self.bot = False
+        self.status = status
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    @property
+    def mutual_guilds(self) -> List["FakeGuild"]:
+        return [self.guild]
+
+
+class FakeGuild:
+    """Guild holding members and a single game channel"""
+
+    def __init__(self, guild_id: int, name: str):
+        self.id = guild_id
+        self.name = name
+        self._members: Dict[int, FakeMember] = {}
+        self.text_channels: List[FakeChannel] = [FakeChannel(self, guild_id + 1, GAME_CHANNEL_NAME)]
+
+    @property
+    def members(self) -> List[FakeMember]:
+        return list(self._members.values())
+
+    def add_member(self, member: FakeMember):
+        self._members[member.id] = member
+
+    def get_member(self, user_id: int) -> Optional[FakeMember]:
+        return self._members.get(user_id)
+
+    async def create_text_channel(self, name: str, **kwargs) -> FakeChannel:
+        channel = FakeChannel(self, self.id + len(self.text_channels) + 1, name)
+        self.text_channels.append(channel)
+        return channel
+
+
+class FakeBot:
+    """Just enough of DiscordRPGBot for the cogs' game logic"""
+
+    def __init__(self, db: Database, guilds: List[FakeGuild], seed: int = 1):
+        self.db = SQLiteRepository(db)
+        self.rng = RNGService(seed)
+        # Unpaced: rate limiting would only measure the fake clock
+        self.outbox = Outbox(rate=None)
+        self.playback = PlaybackScheduler(self.outbox)
+        self.guilds = guilds
+        self.presence = PresenceTracker()
+        self.presence.seed(guilds)
+        self.prefix = "!"
+        self.primary_color = discord.Color(0xFF6B6B)
+        self.error_color = discord.Color(0xFF0000)
+        self.success_color = discord.Color(0x00FF00)
+        self.cogs: Dict[str, object] = {}
+
+    def add_cog(self, cog):
+        self.cogs[type(cog).__name__] = cog
+        return cog
+
+    def get_cog(self, name: str):
+        return self.cogs.get(name)
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
+
+    def get_user(self, user_id: int) -> Optional[FakeMember]:
+        for guild in self.guilds:
+            member = guild.get_member(user_id)
+            if member:
+                return member
+        return None
+
+    def is_ready(self) -> bool:
+        return True
+
+    async def wait_until_ready(self):
+        pass
+
+
+class QueryCounter:
+    """Counts every statement run on the database connection
+
+    Hooks the connection's trace callback, so statements issued straight on
+    the connection (batch flushes, reward transactions, BEGIN and COMMIT)
+    count as well as those through Database.execute. executemany counts
+    once per row, as SQLite runs the statement once per row. Statements run
+    by triggers belong to the statement that fired them and aren't counted.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._conn = None
+
+    def _trace(self, statement: str):
+        if not statement.startswith("--"):  # "-- TRIGGER name" lines
+            self.count += 1
+
+    def install(self, db: Database):
+        self._conn = db.get_connection()
+        self._conn.set_trace_callback(self._trace)
+
+    def uninstall(self):
+        if self._conn:
+            self._conn.set_trace_callback(None)
+            self._conn = None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def populate(db: Database, guilds: List[FakeGuild], players: int, online_ratio: float):
+    """Create profiles, starter gear and guild members for the simulation"""
+    races = [race.value for race in Race]
+    offline = [discord.Status.offline, discord.Status.idle, discord.Status.dnd]
+    profiles = []
+    items = []
+
+    for index in range(players):
+        user_id = 100000 + index
+        name = f"Player{index}"
+        xp = min(250000, int(random.paretovariate(1.0) * 500))
+        level = min(50, 1 + int((xp / 100) ** 0.5))
+        profiles.append((user_id, name, random.randint(0, 5000), xp, level, random.choice(races)))
+        items.append((user_id, "Starter Sword", 10, "Sword", 3, 0, "left", "weapon"))
+        items.append((user_id, "Starter Shield", 10, "Shield", 0, 3, "right", "shield"))
+
+        status = discord.Status.online if random.random() < online_ratio else random.choice(offline)
+        guilds[index % len(guilds)].add_member(FakeMember(guilds[index % len(guilds)], user_id, name, status))
+
+    db.get_connection().executemany(
+        "INSERT INTO profile (user_id, name, money, xp, level, race) VALUES (?, ?, ?, ?, ?, ?)",
+        profiles
+    )
+    db.get_connection().executemany(
+        """INSERT INTO inventory (owner, name, value, type, damage, armor, hand, slot_type, equipped)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)""",
+        items
+    )
+    db.commit()
+
+
+def fast_forward(db: Database):
+    """Move every active adventure's finish time into the past"""
+    finished = datetime.now() - timedelta(seconds=1)
+    conn = db.get_connection()
+    conn.execute("UPDATE adventures SET finish_at = ? WHERE status = 'active'", (finished,))
+    conn.execute("UPDATE epic_adventures SET finish_at = ? WHERE status = 'active'", (finished,))
+    conn.commit()
+
+
+class ErrorCounter(logging.Handler):
+    """Counts errors logged by the cogs during the run"""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+class Simulation:
+    """Builds the fake bot, loads the cogs and runs workload ticks"""
+
+    WORKLOADS = [
+        "adventure", "battle", "events", "adventure_returns", "level_ups",
+        "raid", "ai_event", "epic_departures", "epic_returns"
+    ]
+
+    def __init__(self, db: Database, guilds: List[FakeGuild], workloads: List[str], seed: int = 1):
+        from cogs.autoplay import AutoPlayCog
+        from cogs.raids import RaidsCog
+        from cogs.ai_events import AIEventsCog
+        from cogs.epic_adventures import EpicAdventuresCog
+        from cogs.religion import ReligionCog
+
+        self.bot = FakeBot(db, guilds, seed)
+        self.autoplay = self.bot.add_cog(AutoPlayCog(self.bot))
+        self.raids = self.bot.add_cog(RaidsCog(self.bot))
+        self.ai_events = self.bot.add_cog(AIEventsCog(self.bot))
+        self.epic = self.bot.add_cog(EpicAdventuresCog(self.bot))
+        self.bot.add_cog(ReligionCog(self.bot))
+
+        # Template events only - never call out to OpenAI from a benchmark
+        self.ai_events.openai_client = None
+        self.ai_events.openai_enabled = True
+
+        self.workloads = workloads
+        self.stats: Dict[str, Dict[str, List[float]]] = {
+            name: {"ms": [], "queries": []} for name in workloads
+        }
+
+    async def setup(self):
+        await self.raids.setup_raid_channel()
+
+    async def run_workload(self, name: str):
+        """Run one iteration of a loop body"""
+        if name == "adventure":
+            await self.autoplay.auto_adventure_loop()
+        elif name == "battle":
+            await self.autoplay.auto_battle_loop()
+        elif name == "events":
+            await self.autoplay.auto_events_loop()
+        elif name == "adventure_returns":
+            await self.autoplay.level_up_check()
+        elif name == "level_ups":
+            await self.autoplay.announce_level_ups()
+        elif name == "raid":
+            await self.raids.auto_raids()
+        elif name == "ai_event":
+            await self.ai_events.ai_event_generator()
+        elif name == "epic_departures":
+            await self.epic.auto_epic_adventures()
+        elif name == "epic_returns":
+            await self.epic.check_epic_completions()
+
+    async def tick(self, counter: QueryCounter):
+        """Run every selected workload once"""
+        for name in self.workloads:
+            queries_before = counter.count
+            started = time.perf_counter()
+            await self.run_workload(name)
+            self.stats[name]["ms"].append((time.perf_counter() - started) * 1000)
+            self.stats[name]["queries"].append(counter.count - queries_before)
+
+
+_real_sleep = asyncio.sleep
+
+
+async def _no_sleep(delay, result=None):
+    """Stand-in for asyncio.sleep that only yields to the loop"""
+    await _real_sleep(0)
+    return result
+
+
+async def run(args) -> Dict:
+    """Run the simulation and collect results"""
+    random.seed(args.seed)
+
+    workdir = tempfile.TemporaryDirectory(prefix="discordrpg-sim-")
+    counter = QueryCounter()
+    errors = ErrorCounter()
+    logging.getLogger("DiscordRPG").addHandler(errors)
+
+    try:
+        db = Database(os.path.join(workdir.name, "discordrpg.db"))
+        db.init_database()
+
+        guilds = [FakeGuild(900000 + index * 1000, f"Guild {index}") for index in range(args.guilds)]
+        setup_started = time.perf_counter()
+        populate(db, guilds, args.players, args.online)
+        setup_seconds = time.perf_counter() - setup_started
+
+        workloads = args.workloads or Simulation.WORKLOADS
+        sim = Simulation(db, guilds, workloads, args.seed)
+        await sim.setup()
+
+        counter.install(db)
+        tick_ms = []
+        tick_queries = []
+        with mock.patch("asyncio.sleep", _no_sleep):
+            for _ in range(args.ticks):
+                queries_before = counter.count
+                started = time.perf_counter()
+                await sim.tick(counter)
+                tick_ms.append((time.perf_counter() - started) * 1000)
+                tick_queries.append(counter.count - queries_before)
+                if args.fast_forward:
+                    fast_forward(db)
+            # Narratives play outside the ticks; flush them so messages are counted
+            await sim.bot.playback.drain()
+            await sim.bot.outbox.drain()
+
+        channels = [channel for guild in guilds for channel in guild.text_channels]
+        return {
+            "players": args.players,
+            "online": sum(1 for guild in guilds for m in guild.members if m.status == discord.Status.online),
+            "setup_seconds": setup_seconds,
+            "tick_ms": tick_ms,
+            "tick_queries": tick_queries,
+            "workloads": sim.stats,
+            "sends": sum(channel.sends for channel in channels),
+            "edits": sum(channel.edits for channel in channels),
+            "errors": errors.count,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+    finally:
+        counter.uninstall()
+        logging.getLogger("DiscordRPG").removeHandler(errors)
+        workdir.cleanup()
+
+
+def report(results: Dict):
+    """Print a summary of the simulation results"""
+    tick_ms = results["tick_ms"]
+    total_seconds = sum(tick_ms) / 1000
+    ticks = len(tick_ms)
+
+    print(f"Players: {results['players']:,} ({results['online']:,} online)")
+    print(f"Setup: {results['setup_seconds']:.2f}s")
+    print(f"Ticks: {ticks} in {total_seconds:.2f}s ({ticks / total_seconds if total_seconds else 0:.2f} ticks/sec)")
+    print(f"Queries/tick: {sum(results['tick_queries']) / max(1, ticks):.1f}")
+    print(f"Tick latency: p50 {percentile(tick_ms, 50):.1f}ms, p99 {percentile(tick_ms, 99):.1f}ms")
+    print(f"Messages: {results['sends']:,} sent, {results['edits']:,} edits")
+    print(f"Errors logged: {results['errors']}")
+    if results["peak_rss_mb"] is not None:
+        print(f"Peak RSS: {results['peak_rss_mb']:.1f} MB")
+
+    print()
+    print(f"{'workload':<20}{'p50 ms':>10}{'p99 ms':>10}{'queries/run':>14}")
+    for name, stats in results["workloads"].items():
+        queries = sum(stats["queries"]) / max(1, len(stats["queries"]))
+        print(f"{name:<20}{percentile(stats['ms'], 50):>10.1f}{percentile(stats['ms'], 99):>10.1f}{queries:>14.1f}")
+
+
+def main():
+    """Parse arguments and run the benchmark"""
+    parser = argparse.ArgumentParser(description="Headless DiscordRPG autoplay benchmark")
+    parser.add_argument("--players", type=int, default=1000, help="Registered players to create")
+    parser.add_argument("--online", type=float, default=0.3, help="Fraction of players with online status")
+    parser.add_argument("--guilds", type=int, default=1, help="Number of fake guilds")
+    parser.add_argument("--ticks", type=int, default=10, help="Workload rounds to run")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--workloads", nargs="*", choices=Simulation.WORKLOADS,
+                        help="Workloads to run each tick (default: all)")
+    parser.add_argument("--fast-forward", action=argparse.BooleanOptionalAction, default=True,
+                        help="Finish active adventures between ticks so completions are exercised")
+    parser.add_argument("--verbose", action="store_true", help="Show cog logging")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger("DiscordRPG").setLevel(logging.ERROR)
+        logging.getLogger("discord").setLevel(logging.ERROR)
+
+    results = asyncio.run(run(args))
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
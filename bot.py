@@ -6,8 +6,9 @@ Implements all major features from the original DiscordRPG
 import asyncio
 import logging
 import os
+import time
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import Dict, List, Optional
 
 import discord
 from discord.ext import commands
@@ -16,7 +17,16 @@ from dotenv import load_dotenv
 # EST timezone
 EST = timezone(timedelta(hours=-5))
 
-from utils.database import Database
+from utils.database import Database, SQLiteRepository
+from utils.metrics import Metrics
+from utils.outbox import Outbox, Priority
+from utils.playback import PlaybackScheduler
+from utils.postgres import PostgresRepository
+from utils.presence import PresenceTracker
+from utils.query_stats import CALLER_SAMPLE_EVERY
+from utils.render_cache import RenderCache
+from utils.repository import Repository
+from utils.rng import RNGService
 
 # Load environment variables
 load_dotenv()
@@ -28,6 +38,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger('DiscordRPG')
 
+# Cogs needed to answer commands - loaded in setup_hook, before the bot connects
+CORE_COGS = [
+    "cogs.perf",  # Performance instrumentation (first, so the lag probe covers startup)
+    "cogs.character",
+    "cogs.help",
+    "cogs.inventory",
+    "cogs.combat", 
+    "cogs.adventure",
+    "cogs.economy",
+    "cogs.daily",
+    "cogs.gambling",
+    "cogs.religion",  # Gods, prayer, and sacrifice
+    "cogs.race",  # Race selection and bonuses
+]
+
+# Background loops and heavy initializers - imported and loaded once the bot is ready
+BACKGROUND_COGS = [
+    "cogs.auto_register",  # Auto-registration and penalties
+    "cogs.epic_adventures",  # Epic and legendary adventures
+    "cogs.autoplay",  # Automatic gameplay system
+    "cogs.raids",  # Automatic raid system
+    "cogs.oracle",  # AI-powered game manual and help system
+    "cogs.ai_events",  # AI-powered dynamic event generation
+    "cogs.backup",  # Database backup system
+]
+
 class DiscordRPGBot(commands.Bot):
     """Main bot class with all DiscordRPG features"""
     
@@ -52,16 +88,40 @@ class DiscordRPGBot(commands.Bot):
         self.token = os.getenv('DISCORD_TOKEN')
         self.prefix = os.getenv('BOT_PREFIX', '!')
         self.db_path = os.getenv('DATABASE_PATH', './discordrpg.db')
+        self.database_url = os.getenv('DATABASE_URL', '')  # postgres:// URL to use PostgreSQL instead
         
         if not self.token:
             logger.error("DISCORD_TOKEN not found in environment variables!")
             raise ValueError("Missing Discord token")
         
         # Database connection
-        self.db: Optional[Database] = None
+        self.db: Optional[Repository] = None
+        
+        # Runtime metrics (loop lag, command and task latency) - see cogs/perf.py
+        self.metrics = Metrics()
+        
+        # Startup stage durations in seconds (see load_cogs and !perf startup)
+        self.started_at = time.perf_counter()
+        self.startup_timings: Dict[str, float] = {}
+        self.cog_load_times: Dict[str, float] = {}
+        self._background_load: Optional[asyncio.Task] = None
+        
+        # Independent random streams per subsystem (shop, autoplay, raids, crates, gambling)
+        rng_seed = os.getenv('RNG_SEED', '')
+        self.rng = RNGService(int(rng_seed) if rng_seed else None)
+        
+        # Paced per-channel queue for unprompted messages (see utils/outbox.py)
+        self.outbox = Outbox(metrics=self.metrics)
+        
+        # Streams resolved battle narratives to their channels (see utils/playback.py)
+        self.playback = PlaybackScheduler(self.outbox)
+        
+        # Online sessions and their history from presence events - only online players progress
+        self.presence = PresenceTracker()
         
         # Cache for various data
         self.prefixes = {}  # Guild-specific prefixes
+        self.render_cache = RenderCache()  # Built !profile/!equipment embeds, keyed by user version
         self.cooldowns = {}  # User cooldowns
         self.adventures = {}  # Active adventures
         
@@ -78,13 +138,7 @@ class DiscordRPGBot(commands.Bot):
         if message.guild.id not in self.prefixes:
             # Load from database
             if self.db:
-                row = self.db.fetchone(
-                    "SELECT prefix FROM server_settings WHERE guild_id = ?",
-                    (message.guild.id,)
-                )
-                # Convert sqlite3.Row to dict to safely access values
-                prefix = self.db.row_to_dict(row)['prefix'] if row else self.prefix
-                self.prefixes[message.guild.id] = prefix
+                self.prefixes[message.guild.id] = await self.db.get_prefix(message.guild.id) or self.prefix
             else:
                 self.prefixes[message.guild.id] = self.prefix
                 
@@ -92,48 +146,68 @@ class DiscordRPGBot(commands.Bot):
     
     async def setup_hook(self):
         """Initialize bot components"""
-        # Connect to SQLite database
-        self.db = Database(self.db_path)
-        self.db.init_database()
-        logger.info(f"Initialized SQLite database at {self.db_path}")
-        
-        # Load cogs
-        await self.load_cogs()
-        
-    async def load_cogs(self):
-        """Load all cog extensions"""
-        # Load all available cogs
-        cog_files = [
-            "cogs.auto_register",  # Auto-registration and penalties
-            "cogs.character",
-            "cogs.help",
-            "cogs.inventory",
-            "cogs.combat", 
-            "cogs.adventure",
-            "cogs.epic_adventures",  # Epic and legendary adventures
-            "cogs.economy",
-            "cogs.daily",
-            "cogs.gambling",
-            "cogs.religion",  # Gods, prayer, and sacrifice
-            "cogs.race",  # Race selection and bonuses
-            "cogs.autoplay",  # Automatic gameplay system
-            "cogs.raids",  # Automatic raid system
-            "cogs.oracle",  # AI-powered game manual and help system
-            "cogs.ai_events",  # AI-powered dynamic event generation
-            "cogs.backup",  # Database backup system
-        ]
+        # Connect to PostgreSQL when DATABASE_URL names it, the SQLite file otherwise
+        stage_started = time.perf_counter()
+        if self.database_url.startswith(('postgres://', 'postgresql://')):
+            self.db = PostgresRepository(self.database_url)
+            await self.db.init_database()
+            logger.info("Initialized PostgreSQL database")
+        else:
+            self.db = SQLiteRepository(Database(self.db_path))
+            await self.db.init_database()
+            logger.info(f"Initialized SQLite database at {self.db_path}")
+        self.presence.db = self.db  # Closed online sessions are saved to presence_days from here on
+        
+        # Optional per-statement query statistics (see !perf db)
+        if os.getenv('DB_INSTRUMENTATION', 'false').lower() in ['true', '1', 'yes', 'on']:
+            slow_ms = float(os.getenv('DB_SLOW_QUERY_MS', '100'))
+            caller_every = int(os.getenv('DB_CALLER_SAMPLE', str(CALLER_SAMPLE_EVERY)))
+            self.db.enable_instrumentation(slow_ms=slow_ms, caller_every=caller_every)
+            logger.info(f"Query instrumentation enabled (slow query threshold {slow_ms:.0f}ms)")
+        self.startup_timings['database'] = time.perf_counter() - stage_started
         
+        # Command cogs now, everything else in the background so commands work right after connecting
+        self.startup_timings['core_cogs'] = await self.load_cogs(CORE_COGS)
+        self._background_load = asyncio.create_task(self.load_background_cogs())
+        
+    async def load_cogs(self, cog_files: List[str]) -> float:
+        """Load cog extensions in order, timing each one. Returns the total seconds"""
+        stage_started = time.perf_counter()
         for cog in cog_files:
+            started = time.perf_counter()
             try:
                 await self.load_extension(cog)
-                logger.info(f"Loaded cog: {cog}")
+                self.cog_load_times[cog] = time.perf_counter() - started
+                logger.info(f"Loaded cog: {cog} ({self.cog_load_times[cog] * 1000:.0f}ms)")
             except Exception as e:
                 logger.error(f"Failed to load cog {cog}: {e}")
+        return time.perf_counter() - stage_started
+        
+    async def load_background_cogs(self):
+        """Load the background cogs once connected, then report startup timings"""
+        await self.wait_until_ready()
+        stage_started = time.perf_counter()
+        for cog in BACKGROUND_COGS:
+            await self.load_cogs([cog])
+            await asyncio.sleep(0)  # Let queued commands run between cogs
+        self.startup_timings['background_cogs'] = time.perf_counter() - stage_started
+        self.startup_timings['total'] = time.perf_counter() - self.started_at
+        
+        logger.info("Startup: " + ", ".join(
+            f"{stage} {seconds:.2f}s" for stage, seconds in self.startup_timings.items()
+        ))
+        self.dispatch('startup_complete')
                 
     async def on_ready(self):
         """Bot is ready"""
         logger.info(f"Logged in as {self.user} (ID: {self.user.id})")
         logger.info(f"Connected to {len(self.guilds)} guilds")
+        if 'ready' not in self.startup_timings:
+            self.startup_timings['ready'] = time.perf_counter() - self.started_at
+            logger.info(f"Ready {self.startup_timings['ready']:.2f}s after start")
+            
+        # The member cache is complete now; presence events keep it current from here
+        self.presence.seed(self.guilds)
         
         # Set status
         await self.change_presence(
@@ -141,18 +215,24 @@ class DiscordRPGBot(commands.Bot):
             status=discord.Status.online
         )
         
+    async def on_presence_update(self, before: discord.Member, after: discord.Member):
+        """Open or close the member's online session"""
+        if before.status != after.status:
+            self.presence.member_update(after)
+            await self.presence.flush_if_due()
+            
+    async def on_member_remove(self, member: discord.Member):
+        """A member who leaves no longer counts as online there"""
+        self.presence.update(member.id, member.guild.id, False)
+        await self.presence.flush_if_due()
+        
     async def on_guild_join(self, guild: discord.Guild):
         """Bot joined a new guild"""
         logger.info(f"Joined guild: {guild.name} (ID: {guild.id})")
         
         # Create server settings
         if self.db:
-            self.db.execute(
-                """INSERT OR IGNORE INTO server_settings (guild_id, prefix) 
-                   VALUES (?, ?)""",
-                (guild.id, self.prefix)
-            )
-            self.db.commit()
+            await self.db.ensure_server_settings(guild.id, self.prefix)
             
     async def process_commands(self, message: discord.Message):
         """Process commands with channel restrictions"""
@@ -163,6 +243,10 @@ class DiscordRPGBot(commands.Bot):
         
         await super().process_commands(message)
 
+    async def on_command(self, ctx: commands.Context):
+        """Command replies go out directly - make queued chatter in the channel yield to them"""
+        self.outbox.reserve(ctx.channel.id)
+        
     async def on_command_error(self, ctx: commands.Context, error: Exception):
         """Handle command errors"""
         if isinstance(error, commands.CommandNotFound):
@@ -181,8 +265,13 @@ class DiscordRPGBot(commands.Bot):
             
     async def close(self):
         """Cleanup on bot shutdown"""
+        if self._background_load and not self._background_load.done():
+            self._background_load.cancel()
+        self.playback.close()
+        self.outbox.close()
+        await self.presence.close()
         if self.db:
-            self.db.close()
+            await self.db.close()
         await super().close()
         
     def run(self):
@@ -197,15 +286,15 @@ class DiscordRPGCog(commands.Cog):
         self.bot = bot
         
     @property
-    def db(self) -> Database:
+    def db(self) -> Repository:
         return self.bot.db
         
-    def has_character(self, user_id: int) -> bool:
+    async def has_character(self, user_id: int) -> bool:
         """Check if user has a character"""
-        char = self.db.get_character(user_id)
+        char = await self.db.get_character(user_id)
         return char is not None
         
-    def get_character_field(self, user_id: int, field: str):
+    async def get_character_field(self, user_id: int, field: str):
         """Get a specific field from character"""
         # Validate field name to prevent SQL injection
         valid_fields = {
@@ -216,11 +305,8 @@ class DiscordRPGCog(commands.Cog):
         if field not in valid_fields:
             return None
             
-        row = self.db.fetchone(
-            f"SELECT {field} FROM profile WHERE user_id = ?",
-            (user_id,)
-        )
-        return self.db.row_to_dict(row)[field] if row else None
+        char = await self.db.get_character(user_id)
+        return char.get(field) if char else None
         
     def embed(self, title: str, description: str = None, 
               color: Optional[discord.Color] = None) -> discord.Embed:
@@ -232,6 +318,11 @@ class DiscordRPGCog(commands.Cog):
             timestamp=datetime.now(EST)
         )
         
+    def announce(self, channel, content: str = None, embed: discord.Embed = None,
+                 priority: Priority = Priority.AMBIENT) -> asyncio.Future:
+        """Queue an unprompted message through the bot's outbox"""
+        return self.bot.outbox.send(channel, content, embed, priority=priority)
+        
     def success_embed(self, description: str) -> discord.Embed:
         """Create a success embed"""
         return self.embed("✅ Success", description, self.bot.success_color)
@@ -245,7 +336,7 @@ def has_character():
     """Check if user has a character"""
     async def predicate(ctx: commands.Context):
         if ctx.bot.db:
-            char = ctx.bot.db.get_character(ctx.author.id)
+            char = await ctx.bot.db.get_character(ctx.author.id)
             if not char:
                 await ctx.send("❌ You need to create a character first! Use `!create`")
                 return False
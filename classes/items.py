@@ -73,7 +73,20 @@ class Item:
         self.crit_bonus = crit_bonus
         self.magic_bonus = magic_bonus
         self.slot_type = slot_type
-        
+
+    @classmethod
+    def from_row(cls, row) -> 'Item':
+        """Build an Item from an inventory row (dict or sqlite3.Row)"""
+        return cls(
+            row['id'], row['owner'], row['name'], ItemType(row['type']),
+            value=row['value'] or 0, damage=row['damage'] or 0, armor=row['armor'] or 0,
+            hand=ItemHand(row['hand']) if row['hand'] else ItemHand.ANY,
+            equipped=bool(row['equipped']),
+            health_bonus=row['health_bonus'] or 0, speed_bonus=row['speed_bonus'] or 0,
+            luck_bonus=row['luck_bonus'] or 0.0, crit_bonus=row['crit_bonus'] or 0.0,
+            magic_bonus=row['magic_bonus'] or 0, slot_type=row['slot_type']
+        )
+
     @property
     def stat_total(self) -> int:
         """Total stats (damage + armor + all bonuses)"""
@@ -265,11 +278,11 @@ class ItemGenerator:
     @staticmethod
     def generate_item(owner_id: int, min_stat: int = 4, max_stat: int = 50, 
                       item_type: Optional[ItemType] = None,
-                      rarity: Optional[ItemRarity] = None) -> Item:
+                      rarity: Optional[ItemRarity] = None, rng=random) -> Item:
         """Generate a random item with stats"""
         # Choose random type if not specified
         if item_type is None:
-            item_type = random.choice(list(ItemType))
+            item_type = rng.choice(list(ItemType))
             
         # Determine stat range based on rarity if specified
         if rarity is not None:
@@ -285,7 +298,7 @@ class ItemGenerator:
             min_stat, max_stat = stat_ranges[rarity]
             
         # Generate total stats (ensure minimum 4 to be better than starter gear)
-        total_stats = random.randint(max(4, min_stat), max_stat)
+        total_stats = rng.randint(max(4, min_stat), max_stat)
         
         # Get stat distribution for this item type
         stat_ratios = ItemGenerator.get_type_stats(item_type)
@@ -319,14 +332,14 @@ class ItemGenerator:
                 magic_bonus = allocated_points
         
         # Generate name
-        name = ItemGenerator.generate_name(item_type, damage, armor, total_stats)
+        name = ItemGenerator.generate_name(item_type, damage, armor, total_stats, rng)
         
         # Determine hand and slot
         hand = ItemGenerator.get_hand_for_type(item_type)
         slot_type = ItemGenerator.get_slot_for_type(item_type)
         
         # Calculate value
-        value = total_stats * random.randint(80, 120)
+        value = total_stats * rng.randint(80, 120)
         
         return Item(
             item_id=0,  # Will be assigned by database
@@ -347,24 +360,24 @@ class ItemGenerator:
         )
     
     @staticmethod
-    def generate_name(item_type: ItemType, damage: int, armor: int, total: int) -> str:
+    def generate_name(item_type: ItemType, damage: int, armor: int, total: int, rng=random) -> str:
         """Generate an appropriate name for an item"""
         # Choose prefix based on stats
         if total >= 40:
-            prefix = random.choice(ItemGenerator.LEGENDARY_PREFIXES)
+            prefix = rng.choice(ItemGenerator.LEGENDARY_PREFIXES)
         elif damage > armor * 2:
-            prefix = random.choice(ItemGenerator.DAMAGE_PREFIXES)
+            prefix = rng.choice(ItemGenerator.DAMAGE_PREFIXES)
         elif armor > damage * 2:
-            prefix = random.choice(ItemGenerator.ARMOR_PREFIXES)
+            prefix = rng.choice(ItemGenerator.ARMOR_PREFIXES)
         else:
-            prefix = random.choice(ItemGenerator.MIXED_PREFIXES)
+            prefix = rng.choice(ItemGenerator.MIXED_PREFIXES)
             
         # Get base name
         base_names = ItemGenerator.BASE_NAMES.get(
             item_type, 
             [item_type.value]
         )
-        base_name = random.choice(base_names)
+        base_name = rng.choice(base_names)
         
         # Add suffix for high-tier items
         if total >= 45:
@@ -372,12 +385,12 @@ class ItemGenerator:
                 "of Power", "of Legends", "of the Gods", "of Eternity",
                 "of Destruction", "of Protection", "of the Ancients"
             ]
-            return f"{prefix} {base_name} {random.choice(suffixes)}"
+            return f"{prefix} {base_name} {rng.choice(suffixes)}"
         else:
             return f"{prefix} {base_name}"
 
     @staticmethod
-    def generate_armor(owner_id: int, slot: str, min_stat: int = 4, max_stat: int = 50) -> Item:
+    def generate_armor(owner_id: int, slot: str, min_stat: int = 4, max_stat: int = 50, rng=random) -> Item:
         """Generate armor for specific slot"""
         armor_types = {
             'head': ItemType.HELMET,
@@ -390,28 +403,28 @@ class ItemGenerator:
         item_type = armor_types.get(slot)
         if not item_type:
             # Fallback to random armor
-            item_type = random.choice(list(armor_types.values()))
+            item_type = rng.choice(list(armor_types.values()))
         
-        return ItemGenerator.generate_item(owner_id, min_stat, max_stat, item_type)
+        return ItemGenerator.generate_item(owner_id, min_stat, max_stat, item_type, rng=rng)
 
     @staticmethod
-    def generate_random_equipment(owner_id: int, min_stat: int = 4, max_stat: int = 50) -> Item:
+    def generate_random_equipment(owner_id: int, min_stat: int = 4, max_stat: int = 50, rng=random) -> Item:
         """Generate random equipment (weapon or armor) based on difficulty"""
         # 60% chance for weapons, 40% chance for armor
-        if random.random() < 0.6:
+        if rng.random() < 0.6:
             # Generate weapon
             weapon_types = [ItemType.SWORD, ItemType.AXE, ItemType.HAMMER, ItemType.MACE, 
                            ItemType.DAGGER, ItemType.KNIFE, ItemType.SPEAR, ItemType.WAND, 
                            ItemType.STAFF, ItemType.BOW, ItemType.CROSSBOW, ItemType.GREATSWORD, 
                            ItemType.HALBERD, ItemType.KATANA, ItemType.SCYTHE, ItemType.SHIELD]
-            item_type = random.choice(weapon_types)
+            item_type = rng.choice(weapon_types)
         else:
             # Generate armor
             armor_types = [ItemType.HELMET, ItemType.CHESTPLATE, ItemType.LEGGINGS, 
                           ItemType.GAUNTLETS, ItemType.BOOTS]
-            item_type = random.choice(armor_types)
+            item_type = rng.choice(armor_types)
         
-        return ItemGenerator.generate_item(owner_id, min_stat, max_stat, item_type)
+        return ItemGenerator.generate_item(owner_id, min_stat, max_stat, item_type, rng=rng)
 
 class CrateSystem:
     """Handles crate opening and rewards"""
@@ -459,38 +472,72 @@ class CrateSystem:
     }
     
     @staticmethod
-    def open_crate(crate_type: str, owner_id: int) -> Tuple[str, Optional[Item], Optional[int]]:
+    def open_crates(crate_type: str, owner_id: int, count: int, rng=random) -> List[Tuple[str, Optional[Item], Optional[int]]]:
+        """Open several crates at once. Returns one (reward_type, item, money) per crate"""
+        if crate_type == "mystery":
+            rarities = CrateSystem.CRATE_CONTENTS["mystery"]["rarities"]
+            crate_rarities = rng.choices(
+                [rarity for rarity, _ in rarities],
+                weights=[weight for _, weight in rarities],
+                k=count
+            )
+        else:
+            crate_rarities = [CrateSystem.crate_rarity(crate_type)] * count
+            
+        rewards = []
+        for crate_rarity, roll in zip(crate_rarities, [rng.random() for _ in range(count)]):
+            contents = CrateSystem.CRATE_CONTENTS[crate_rarity]
+            if roll < contents["money_chance"]:
+                rewards.append(("money", None, rng.randint(*contents["money_range"])))
+            else:
+                item = ItemGenerator.generate_random_equipment(
+                    owner_id,
+                    min_stat=contents["min_stat"],
+                    max_stat=contents["max_stat"],
+                    rng=rng
+                )
+                rewards.append(("item", item, None))
+        return rewards
+        
+    @staticmethod
+    def crate_rarity(crate_type: str) -> ItemRarity:
+        """Rarity of a regular (non-mystery) crate"""
+        crate_map = {
+            "common": ItemRarity.COMMON,
+            "uncommon": ItemRarity.UNCOMMON,
+            "rare": ItemRarity.RARE,
+            "magic": ItemRarity.MAGIC,
+            "legendary": ItemRarity.LEGENDARY
+        }
+        return crate_map.get(crate_type, ItemRarity.COMMON)
+    
+    @staticmethod
+    def open_crate(crate_type: str, owner_id: int, rng=random) -> Tuple[str, Optional[Item], Optional[int]]:
         """Open a crate and get rewards. Returns (reward_type, item, money)"""
         if crate_type == "mystery":
             # Mystery crates have random rarity
             rarities = CrateSystem.CRATE_CONTENTS["mystery"]["rarities"]
             weights = [weight for _, weight in rarities]
             chosen_rarities = [rarity for rarity, _ in rarities]
-            crate_rarity = random.choices(chosen_rarities, weights=weights)[0]
+            crate_rarity = rng.choices(chosen_rarities, weights=weights)[0]
         else:
             # Map crate type to rarity
-            crate_map = {
-                "common": ItemRarity.COMMON,
-                "uncommon": ItemRarity.UNCOMMON,
-                "rare": ItemRarity.RARE,
-                "magic": ItemRarity.MAGIC,
-                "legendary": ItemRarity.LEGENDARY
-            }
-            crate_rarity = crate_map.get(crate_type, ItemRarity.COMMON)
+            crate_rarity = CrateSystem.crate_rarity(crate_type)
             
         contents = CrateSystem.CRATE_CONTENTS[crate_rarity]
         
         # Decide between item or money
-        if random.random() < contents["money_chance"]:
+        if rng.random() < contents["money_chance"]:
             # Money reward
-            money = random.randint(*contents["money_range"])
+            money = rng.randint(*contents["money_range"])
             return ("money", None, money)
         else:
             # Item reward (can be weapon or armor)
             item = ItemGenerator.generate_random_equipment(
                 owner_id,
                 min_stat=contents["min_stat"],
-                max_stat=contents["max_stat"]
+                max_stat=contents["max_stat"],
+                rng=rng
             )
             return ("item", item, None)
 
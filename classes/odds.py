@@ -0,0 +1,152 @@
+"""Battle rolls and their exact win probabilities"""
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+import random
+
+# Quick battle (CombatCog.battle and tournaments): power x uniform roll, sometimes a crit
+DUEL_VARIANCE = (0.8, 1.2)
+CRIT_CHANCE = 0.1
+CRIT_MULT = 1.5
+
+# Auto team battles add randint(-NOISE, NOISE) to each fighter's power before the team roll
+NOISE = 20
+
+# Team roll outcomes are summed over this many buckets of each team's total power
+TEAM_BUCKETS = 32
+
+# Auto team battle formats: team size, roll variance and coordination penalty
+TEAM_BATTLES = {
+    '3v3': {'size': 3, 'variance': (0.85, 1.15), 'coordination': 0.8},
+    '5v5': {'size': 5, 'variance': (0.8, 1.2), 'coordination': 0.75},
+    '10v10': {'size': 10, 'variance': (0.75, 1.25), 'coordination': 0.65},
+}
+
+def duel(power1: float, power2: float, rng: random.Random = random) -> Tuple[bool, float, float]:
+    """Quick battle roll: (first fighter wins, roll1, roll2)"""
+    # Add randomness
+    roll1 = power1 * rng.uniform(*DUEL_VARIANCE)
+    roll2 = power2 * rng.uniform(*DUEL_VARIANCE)
+
+    # Critical hit chance
+    if rng.random() < CRIT_CHANCE:
+        roll1 *= CRIT_MULT
+    if rng.random() < CRIT_CHANCE:
+        roll2 *= CRIT_MULT
+
+    return roll1 > roll2, roll1, roll2
+
+def uniform_win_chance(a_low: float, a_high: float, b_low: float, b_high: float) -> float:
+    """P(X > Y) for independent X ~ U[a_low, a_high] and Y ~ U[b_low, b_high]"""
+    def below(x: float) -> float:
+        # P(Y < x)
+        if b_high <= b_low:
+            return 1.0 if x > b_low else 0.0
+        return min(1.0, max(0.0, (x - b_low) / (b_high - b_low)))
+
+    def area(x: float) -> float:
+        # Integral of P(Y < t) dt from -inf to x
+        if x <= b_low:
+            return 0.0
+        width = b_high - b_low
+        if x >= b_high:
+            return width / 2 + (x - b_high)
+        return (x - b_low) ** 2 / (2 * width)
+
+    if a_high <= a_low:
+        return below(a_low)
+    if b_high <= b_low:
+        return min(1.0, max(0.0, (a_high - b_low) / (a_high - a_low)))
+    return min(1.0, max(0.0, (area(a_high) - area(a_low)) / (a_high - a_low)))
+
+def duel_odds(power1: float, power2: float) -> float:
+    """Chance the first fighter wins duel(), summed over the four crit outcomes"""
+    low, high = DUEL_VARIANCE
+    outcomes = ((1.0, 1 - CRIT_CHANCE), (CRIT_MULT, CRIT_CHANCE))
+    chance = 0.0
+    for mult1, weight1 in outcomes:
+        for mult2, weight2 in outcomes:
+            a, b = power1 * mult1, power2 * mult2
+            chance += weight1 * weight2 * uniform_win_chance(a * low, a * high, b * low, b * high)
+    return min(1.0, max(0.0, chance))
+
+def battle_profile(stats, blessings: bool = True) -> Tuple[int, float]:
+    """(base power, battle multiplier) of an auto battle fighter, from a get_battle_stats row
+
+    The power rolled in battle is int((base + randint(-NOISE, NOISE)) * multiplier).
+    """
+    base_power = stats['level'] * 10 + stats['damage_armor']
+    multiplier = 1.0
+    if blessings and stats['blessing_battle_mult'] is not None:
+        multiplier = max(1.0, stats['blessing_battle_mult'])
+    return base_power, multiplier
+
+@lru_cache(maxsize=32)
+def _noise_sum(fighters: int) -> Tuple[float, ...]:
+    """Distribution of the summed randint(-NOISE, NOISE) of `fighters` fighters, from -fighters * NOISE up"""
+    width = 2 * NOISE + 1
+    dist = [1.0]
+    for _ in range(fighters):
+        # Convolve with the uniform window using running sums
+        prefix = [0.0]
+        for p in dist:
+            prefix.append(prefix[-1] + p)
+        size = len(dist) + width - 1
+        dist = [(prefix[min(i + 1, len(dist))] - prefix[max(0, i - width + 1)]) / width for i in range(size)]
+    return tuple(dist)
+
+def team_power_distribution(fighters: Sequence[Tuple[int, float]],
+                            buckets: int = TEAM_BUCKETS) -> List[Tuple[float, float]]:
+    """(total power, probability) pairs of a team's noisy power sum
+
+    fighters are (base power, battle multiplier) pairs; each fighter counts
+    as int((base + randint(-NOISE, NOISE)) * multiplier), as in
+    AutoPlayCog.calculate_battle_power. The exact distribution is grouped
+    into `buckets` equally likely ranges, each represented by its mean.
+    """
+    plain = [base for base, mult in fighters if mult == 1.0]
+    offset = sum(plain) - len(plain) * NOISE
+    dist: Dict[int, float] = {offset + i: p for i, p in enumerate(_noise_sum(len(plain))) if p > 0}
+    for base, mult in fighters:
+        if mult == 1.0:
+            continue
+        values = [int((base + n) * mult) for n in range(-NOISE, NOISE + 1)]
+        combined: Dict[int, float] = {}
+        for total, p in dist.items():
+            share = p / len(values)
+            for value in values:
+                combined[total + value] = combined.get(total + value, 0.0) + share
+        dist = combined
+
+    grouped = []
+    target = 1.0 / buckets
+    weight = mean = 0.0
+    for value in sorted(dist):
+        p = dist[value]
+        weight += p
+        mean += value * p
+        if weight >= target:
+            grouped.append((mean / weight, weight))
+            weight = mean = 0.0
+    if weight > 0:
+        grouped.append((mean / weight, weight))
+    return grouped
+
+def team_odds(team_a: Sequence[Tuple[int, float]], team_b: Sequence[Tuple[int, float]],
+              variance: Tuple[float, float]) -> float:
+    """Chance team A wins AutoPlayCog.run_team_battle's roll
+
+    Both team totals are scaled by uniform(*variance) and the same
+    coordination factor, which cancels out.
+    """
+    low, high = variance
+    chance = 0.0
+    dist_b = team_power_distribution(team_b)
+    for total_a, p_a in team_power_distribution(team_a):
+        for total_b, p_b in dist_b:
+            chance += p_a * p_b * uniform_win_chance(total_a * low, total_a * high, total_b * low, total_b * high)
+    return min(1.0, max(0.0, chance))
+
+def bet_cap(win_chance: float, balance: int) -> int:
+    """Largest bet allowed on a duel: the whole balance at even odds, shrinking with the underdog's chance"""
+    underdog = min(win_chance, 1.0 - win_chance)
+    return int(balance * min(1.0, 2 * underdog))
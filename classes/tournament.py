@@ -0,0 +1,168 @@
+"""Tournament brackets resolved in memory from a snapshot of entrant powers"""
+from enum import Enum
+from typing import Dict, List, Optional, Set, Tuple
+import math
+import random
+
+from classes.odds import duel
+
+# Every pairing plays, so round robin grows quadratically - keep it to small fields
+ROUND_ROBIN_MAX_ENTRANTS = 64
+
+class TournamentFormat(Enum):
+    """Supported bracket formats"""
+    SINGLE_ELIMINATION = "single"
+    SWISS = "swiss"
+    ROUND_ROBIN = "roundrobin"
+
+    @classmethod
+    def parse(cls, name: str) -> Optional["TournamentFormat"]:
+        """Format from a command argument ('single', 'swiss', 'rr', ...), None if unknown"""
+        aliases = {
+            "single": cls.SINGLE_ELIMINATION, "elimination": cls.SINGLE_ELIMINATION,
+            "knockout": cls.SINGLE_ELIMINATION, "ko": cls.SINGLE_ELIMINATION,
+            "swiss": cls.SWISS,
+            "roundrobin": cls.ROUND_ROBIN, "round-robin": cls.ROUND_ROBIN, "rr": cls.ROUND_ROBIN,
+            "league": cls.ROUND_ROBIN,
+        }
+        return aliases.get(name.lower())
+
+# One played match: (first, second, winner); second is None for a bye
+Match = Tuple[int, Optional[int], int]
+
+class Tournament:
+    """A whole tournament played out from entrant powers taken once up front
+
+    powers maps entrant ID to battle power and its order is the seeding
+    (shuffle it first for a random draw). run() resolves every round
+    without touching the database, filling `rounds` with the matches of
+    each round and `wins`/`losses` per entrant.
+
+    - Single elimination pairs the survivors in order each round; an odd
+      one out advances on a bye.
+    - Swiss plays ceil(log2(n)) rounds, pairing entrants on equal scores
+      who haven't met yet; the lowest-ranked entrant without one gets a bye.
+    - Round robin plays every pairing once (circle method), for up to
+      ROUND_ROBIN_MAX_ENTRANTS entrants.
+
+    Swiss and round robin rank by wins, then Buchholz (the summed wins of
+    everyone faced), then seed.
+    """
+
+    def __init__(self, powers: Dict[int, float], tournament_format: TournamentFormat,
+                 rng: random.Random = random):
+        if len(powers) < 2:
+            raise ValueError("A tournament needs at least 2 entrants")
+        if tournament_format == TournamentFormat.ROUND_ROBIN and len(powers) > ROUND_ROBIN_MAX_ENTRANTS:
+            raise ValueError(f"Round robin is limited to {ROUND_ROBIN_MAX_ENTRANTS} entrants")
+        self.powers = powers
+        self.format = tournament_format
+        self.rng = rng
+        self.seeds = list(powers)
+        self.rounds: List[List[Match]] = []
+        self.wins: Dict[int, int] = {entrant: 0 for entrant in self.seeds}
+        self.losses: Dict[int, int] = {entrant: 0 for entrant in self.seeds}
+        self.opponents: Dict[int, List[int]] = {entrant: [] for entrant in self.seeds}
+        self.champion: Optional[int] = None
+
+    def run(self) -> int:
+        """Play every round, returns the champion"""
+        if self.format == TournamentFormat.SINGLE_ELIMINATION:
+            self._single_elimination()
+        elif self.format == TournamentFormat.SWISS:
+            self._swiss()
+        else:
+            self._round_robin()
+        return self.champion
+
+    def _play(self, first: int, second: int) -> int:
+        first_wins, _, _ = duel(self.powers[first], self.powers[second], self.rng)
+        winner, loser = (first, second) if first_wins else (second, first)
+        self.wins[winner] += 1
+        self.losses[loser] += 1
+        self.opponents[first].append(second)
+        self.opponents[second].append(first)
+        return winner
+
+    def _bye(self, entrant: int) -> Match:
+        self.wins[entrant] += 1
+        return entrant, None, entrant
+
+    def _single_elimination(self):
+        alive = self.seeds
+        while len(alive) > 1:
+            matches = []
+            for i in range(0, len(alive) - 1, 2):
+                matches.append((alive[i], alive[i + 1], self._play(alive[i], alive[i + 1])))
+            if len(alive) % 2:
+                matches.append((alive[-1], None, alive[-1]))  # Advances without a recorded win
+            self.rounds.append(matches)
+            alive = [winner for _, _, winner in matches]
+        self.champion = alive[0]
+
+    def _swiss(self):
+        seed_index = {entrant: index for index, entrant in enumerate(self.seeds)}
+        had_bye: Set[int] = set()
+        for _ in range(math.ceil(math.log2(len(self.seeds)))):
+            ranked = sorted(self.seeds, key=lambda entrant: (-self.wins[entrant], seed_index[entrant]))
+            matches = []
+            if len(ranked) % 2:
+                bye = next((entrant for entrant in reversed(ranked) if entrant not in had_bye), ranked[-1])
+                had_bye.add(bye)
+                ranked.remove(bye)
+                matches.append(self._bye(bye))
+
+            # Pair down the standings, skipping over opponents already met where possible
+            paired: Set[int] = set()
+            for i, first in enumerate(ranked):
+                if first in paired:
+                    continue
+                met = self.opponents[first]
+                second = None
+                for j in range(i + 1, len(ranked)):
+                    candidate = ranked[j]
+                    if candidate in paired:
+                        continue
+                    if second is None:
+                        second = candidate  # A rematch if everyone left was already met
+                    if candidate not in met:
+                        second = candidate
+                        break
+                paired.update((first, second))
+                matches.append((first, second, self._play(first, second)))
+            self.rounds.append(matches)
+        self.champion = self.standings()[0]
+
+    def _round_robin(self):
+        # Circle method: fix the first seat and rotate the rest one step per round
+        seats: List[Optional[int]] = list(self.seeds)
+        if len(seats) % 2:
+            seats.append(None)
+        half = len(seats) // 2
+        for _ in range(len(seats) - 1):
+            matches = []
+            for first, second in zip(seats[:half], reversed(seats[half:])):
+                if first is None or second is None:
+                    resting = first if second is None else second
+                    matches.append((resting, None, resting))  # Sits out, no win
+                else:
+                    matches.append((first, second, self._play(first, second)))
+            self.rounds.append(matches)
+            seats = [seats[0], seats[-1]] + seats[1:-1]
+        self.champion = self.standings()[0]
+
+    def buchholz(self, entrant: int) -> int:
+        return sum(self.wins[opponent] for opponent in self.opponents[entrant])
+
+    def standings(self) -> List[int]:
+        """Entrants best first: the champion, then by wins, Buchholz and seed"""
+        seed_index = {entrant: index for index, entrant in enumerate(self.seeds)}
+        return sorted(self.seeds, key=lambda entrant: (
+            self.champion is not None and entrant != self.champion,
+            -self.wins[entrant], -self.buchholz(entrant), seed_index[entrant]
+        ))
+
+    def upsets(self, matches: List[Match]) -> int:
+        """Matches in a round won by the lower-powered fighter"""
+        return sum(1 for first, second, winner in matches
+                   if second is not None and self.powers[winner] < self.powers[second if winner == first else first])
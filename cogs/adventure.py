@@ -73,7 +73,7 @@ class AdventureCog(DiscordRPGCog):
         )
         return
         # Check if already on adventure
-        active = self.db.get_active_adventure(ctx.author.id)
+        active = await self.db.get_active_adventure(ctx.author.id)
         if active:
             finish_time = datetime.fromisoformat(active['finish_at'].replace('Z', '+00:00'))
             remaining = (finish_time - datetime.now()).total_seconds()
@@ -83,7 +83,7 @@ class AdventureCog(DiscordRPGCog):
                 return
                 
         # Get character data for power calculation
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         char_level = char_data['level']
         
         # Show available adventures if no duration specified
@@ -190,7 +190,7 @@ class AdventureCog(DiscordRPGCog):
         name, min_dur, max_dur, min_reward, max_reward, difficulty = adventure
         
         # Calculate success chance based on character power
-        equipment_bonus = self.calculate_adventure_power(ctx.author.id)
+        equipment_bonus = await self.calculate_adventure_power(ctx.author.id)
         base_chance = 60  # Base 60% success
         level_bonus = max(0, char_level - difficulty) * 5  # +5% per level above difficulty
         equipment_chance = min(20, equipment_bonus // 10)  # Up to +20% from equipment
@@ -198,9 +198,10 @@ class AdventureCog(DiscordRPGCog):
         
         success_chance = min(95, base_chance + level_bonus + equipment_chance + luck_bonus)
         
-        # Start adventure
-        finish_time = datetime.now() + timedelta(minutes=duration)
-        success = self.db.start_adventure(ctx.author.id, name, difficulty, duration * 60)
+        # Start adventure - pending chat/nick penalties extend it
+        penalty = await self.db.get_pending_penalty(ctx.author.id)
+        finish_time = datetime.now() + timedelta(minutes=duration, seconds=penalty)
+        success = await self.db.start_adventure(ctx.author.id, name, difficulty, duration * 60)
         
         if not success:
             await ctx.send("❌ Failed to start adventure!")
@@ -211,6 +212,8 @@ class AdventureCog(DiscordRPGCog):
             f"You embark on: **{name}**"
         )
         embed.add_field(name="⏱️ Duration", value=f"{duration} minutes", inline=True)
+        if penalty:
+            embed.add_field(name="⚖️ Penalty", value=f"+{penalty // 60}m {penalty % 60}s", inline=True)
         embed.add_field(name="🎯 Difficulty", value=f"Level {difficulty}", inline=True) 
         embed.add_field(name="📊 Success Chance", value=f"{success_chance:.1f}%", inline=True)
         embed.add_field(name="💰 Potential Reward", value=f"{min_reward}-{max_reward} gold", inline=True)
@@ -223,7 +226,7 @@ class AdventureCog(DiscordRPGCog):
     @has_character()
     async def status(self, ctx: commands.Context):
         """Check your adventure status"""
-        active = self.db.get_active_adventure(ctx.author.id)
+        active = await self.db.get_active_adventure(ctx.author.id)
         if not active:
             await ctx.send(
                 "❌ **You're not on an adventure!**\n\n"
@@ -269,7 +272,7 @@ class AdventureCog(DiscordRPGCog):
     @has_character()
     async def cancel(self, ctx: commands.Context):
         """Cancel your current adventure"""
-        active = self.db.get_active_adventure(ctx.author.id)
+        active = await self.db.get_active_adventure(ctx.author.id)
         if not active:
             await ctx.send("❌ You're not on an adventure!")
             return
@@ -279,7 +282,7 @@ class AdventureCog(DiscordRPGCog):
             return
             
         # Cancel adventure
-        self.db.complete_adventure(active['id'], False)
+        await self.db.complete_adventure(active['id'], False)
         
         embed = self.embed(
             "🚫 Adventure Cancelled",
@@ -291,7 +294,7 @@ class AdventureCog(DiscordRPGCog):
     @has_character()
     async def complete(self, ctx: commands.Context):
         """Manually complete your adventure (if time is up)"""
-        active = self.db.get_active_adventure(ctx.author.id)
+        active = await self.db.get_active_adventure(ctx.author.id)
         if not active:
             await ctx.send("❌ You're not on an adventure!")
             return
@@ -308,10 +311,10 @@ class AdventureCog(DiscordRPGCog):
         
     async def complete_adventure(self, ctx: commands.Context, adventure_data: dict):
         """Process adventure completion"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         # Calculate success
-        equipment_bonus = self.calculate_adventure_power(ctx.author.id)
+        equipment_bonus = await self.calculate_adventure_power(ctx.author.id)
         base_chance = 60
         level_bonus = max(0, char_data['level'] - adventure_data['difficulty']) * 5
         equipment_chance = min(20, equipment_bonus // 10)
@@ -321,7 +324,7 @@ class AdventureCog(DiscordRPGCog):
         success = random.random() < (success_chance / 100)
         
         # Mark as complete
-        self.db.complete_adventure(adventure_data['id'], success)
+        await self.db.complete_adventure(adventure_data['id'], success)
         
         # Get adventure details
         adventure_info = None
@@ -352,13 +355,13 @@ class AdventureCog(DiscordRPGCog):
             
             # Apply race multipliers
             from cogs.race import RaceCog
-            race_multipliers = RaceCog.get_race_multipliers(ctx.author.id)
+            race_multipliers = await RaceCog.get_race_multipliers(ctx.author.id, self.db)
             
             # Apply divine blessing bonuses
             from cogs.religion import ReligionCog
             religion_cog = self.bot.get_cog('ReligionCog')
             if religion_cog:
-                blessing_bonuses = religion_cog.get_active_blessings(ctx.author.id)
+                blessing_bonuses = await religion_cog.get_active_blessings(ctx.author.id)
                 # Apply blessing multipliers
                 race_multipliers['xp_gain'] *= blessing_bonuses['xp_mult']
                 race_multipliers['gold_find'] *= blessing_bonuses['gold_mult']
@@ -366,24 +369,18 @@ class AdventureCog(DiscordRPGCog):
                 # Check for guaranteed adventure success blessing
                 if blessing_bonuses['adventure_success']:
                     # Consume the blessing (one-time use)
-                    self.db.execute(
-                        "DELETE FROM divine_blessings WHERE user_id = ? AND effect = 'adventure_success'",
-                        (ctx.author.id,)
-                    )
-                    self.db.commit()
+                    await self.db.remove_blessing(ctx.author.id, 'adventure_success')
             
             # Apply final multipliers
             gold_reward = int(gold_reward * race_multipliers['gold_find'])
             xp_reward = int(xp_reward * race_multipliers['xp_gain'])
             
             # Give rewards
-            new_money = char_data['money'] + gold_reward
-            
-            self.db.update_character(
+            await self.db.increment(
                 ctx.author.id, 
-                money=new_money,
-                xp=char_data['xp'] + xp_reward,
-                completed=char_data['completed'] + 1
+                money=gold_reward,
+                xp=xp_reward,
+                completed=1
             )
             
             embed.color = discord.Color.green()
@@ -404,7 +401,7 @@ class AdventureCog(DiscordRPGCog):
                     max_stat=max_stat
                 )
                 
-                item_id = self.db.create_item(
+                item_id = await self.db.create_item(
                     ctx.author.id, item.name, item.type.value,
                     item.value, item.damage, item.armor, item.hand.value
                 )
@@ -424,21 +421,21 @@ class AdventureCog(DiscordRPGCog):
             
             # Small consolation XP
             consolation_xp = random.randint(1, 5)
-            self.db.update_character(ctx.author.id, xp=char_data['xp'] + consolation_xp)
+            await self.db.increment(ctx.author.id, xp=consolation_xp)
             embed.add_field(name="🎗️ Consolation", value=f"{consolation_xp} XP", inline=False)
             
         # Log transaction
         if success:
-            self.db.log_transaction(
+            await self.db.log_transaction(
                 None, ctx.author.id, gold_reward, "adventure_reward",
                 {"adventure": adventure_data['adventure_name'], "difficulty": difficulty}
             )
             
         await ctx.send(embed=embed)
         
-    def calculate_adventure_power(self, user_id: int) -> int:
+    async def calculate_adventure_power(self, user_id: int) -> int:
         """Calculate adventure power from equipment"""
-        items = self.db.get_equipped_items(user_id)
+        items = await self.db.get_equipped_items(user_id)
         return sum(item['damage'] + item['armor'] for item in items)
         
     @commands.command()
@@ -446,14 +443,9 @@ class AdventureCog(DiscordRPGCog):
     async def adventures(self, ctx: commands.Context):
         """View your adventure history"""
         # Get completed adventures
-        history = self.db.fetchall(
-            """SELECT * FROM adventures 
-               WHERE user_id = ? AND status != 'active' 
-               ORDER BY started_at DESC LIMIT 10""",
-            (ctx.author.id,)
-        )
+        history = await self.db.get_adventure_history(ctx.author.id)
         
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         embed = self.embed(
             "📜 Adventure History",
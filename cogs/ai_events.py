@@ -15,6 +15,8 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from bot import DiscordRPGCog, has_character
 from classes.items import ItemGenerator, ItemType, ItemRarity
+from utils.outbox import Priority
+from utils.playback import Script
 
 # Import OpenAI safely
 try:
@@ -80,34 +82,16 @@ class AIEventsCog(DiscordRPGCog):
             self.ai_event_generator.cancel()
             logger.info("🎲 AI Event Generator stopped")
 
-    def is_user_online(self, user: discord.User) -> bool:
-        """Check if user is online (green status) in any guild"""
-        for guild in self.bot.guilds:
-            member = guild.get_member(user.id)
-            if member and member.status == discord.Status.online:
-                return True
-        return False
-
     async def get_online_players(self, min_level: int = 1, max_players: int = 20) -> List[Dict]:
         """Get online players eligible for events"""
         online_players = []
         
-        # Get all character IDs
-        all_chars = self.db.fetchall("SELECT user_id, name, level FROM profile WHERE level >= ?", (min_level,))
+        # Only characters of online users are read
+        online_chars = await self.db.list_characters(min_level, self.bot.presence.online_ids())
         
-        for char in all_chars:
+        for char in online_chars:
             user = self.bot.get_user(char['user_id'])
-            if user and self.is_user_online(user):
-                # Check if not in adventure or epic adventure
-                active_adventure = self.db.fetchone(
-                    "SELECT id FROM adventures WHERE user_id = ? AND status = 'active'",
-                    (char['user_id'],)
-                )
-                active_epic = self.db.fetchone(
-                    "SELECT id FROM epic_adventures WHERE user_id = ? AND status = 'active'",
-                    (char['user_id'],)
-                )
-                
+            if user:
                 # Players can participate in AI events even if on adventures (parallel system)
                 online_players.append({
                     'user_id': char['user_id'],
@@ -309,9 +293,9 @@ Requirements:
         
         return random.choice(fallback_events.get(event_type, fallback_events['treasure']))
 
-    def create_item_in_db(self, item) -> int:
+    async def create_item_in_db(self, item) -> int:
         """Helper to create items with all stats in database"""
-        return self.db.create_item(
+        return await self.db.create_item(
             item.owner_id, item.name, item.type.value,
             item.value, item.damage, item.armor, item.hand.value,
             item.health_bonus, item.speed_bonus, item.luck_bonus,
@@ -336,13 +320,13 @@ Requirements:
             
             # Get race multipliers
             from cogs.race import RaceCog
-            race_multipliers = RaceCog.get_race_multipliers(winner['user_id'])
+            race_multipliers = await RaceCog.get_race_multipliers(winner['user_id'], self.db)
             
             # Get divine blessing bonuses
             from cogs.religion import ReligionCog
             religion_cog = self.bot.get_cog('ReligionCog')
             if religion_cog:
-                blessing_bonuses = religion_cog.get_active_blessings(winner['user_id'])
+                blessing_bonuses = await religion_cog.get_active_blessings(winner['user_id'])
                 race_multipliers['xp_gain'] *= blessing_bonuses['xp_mult']
                 race_multipliers['gold_find'] *= blessing_bonuses['gold_mult']
             
@@ -375,26 +359,16 @@ Requirements:
                     # Only use AI name if it makes sense for the item type
                     if self._name_matches_item_type(ai_name, item_found.type.value):
                         # Update the item name in the database
-                        self.db.execute(
-                            "UPDATE inventory SET name = ? WHERE id = ?",
-                            (ai_name, item_found.id)
-                        )
-                        self.db.commit()
+                        await self.db.rename_item(item_found.id, ai_name)
                         item_found.name = ai_name
                 
-                self.create_item_in_db(item_found)
-            
-            # Update character
-            char_data = self.db.get_character(winner['user_id'])
-            new_xp = char_data['xp'] + final_xp
-            new_gold = char_data['money'] + final_gold
-            new_level = min(50, 1 + int((new_xp / 100) ** 0.5))
+                await self.create_item_in_db(item_found)
             
-            self.db.update_character(
+            # Update character (level-ups are queued and announced by AutoPlayCog)
+            await self.db.increment(
                 winner['user_id'],
-                xp=new_xp,
-                money=new_gold,
-                level=new_level
+                xp=final_xp,
+                money=final_gold
             )
             
             rewards.append({
@@ -402,8 +376,7 @@ Requirements:
                 'name': winner['name'],
                 'xp': final_xp,
                 'gold': final_gold,
-                'item': item_found.name if item_found else None,
-                'leveled_up': new_level > char_data['level']
+                'item': item_found.name if item_found else None
             })
         
         return {
@@ -422,16 +395,13 @@ Requirements:
         # Calculate group power
         group_power = 0
         for participant in participants:
-            char_data = self.db.get_character(participant['user_id'])
+            char_data = await self.db.get_character(participant['user_id'])
             
             # Basic power calculation (simplified from combat.py)
             base_power = char_data['level'] * 5
             
             # Get equipped items for bonus power
-            equipped_items = self.db.fetchall(
-                "SELECT damage, armor, health_bonus, magic_bonus FROM inventory WHERE owner = ? AND equipped = 1",
-                (participant['user_id'],)
-            )
+            equipped_items = await self.db.get_equipped_items(participant['user_id'])
             
             equipment_power = 0
             for item in equipped_items:
@@ -461,12 +431,12 @@ Requirements:
             
             # Apply multipliers (same as treasure event)
             from cogs.race import RaceCog
-            race_multipliers = RaceCog.get_race_multipliers(participant['user_id'])
+            race_multipliers = await RaceCog.get_race_multipliers(participant['user_id'], self.db)
             
             from cogs.religion import ReligionCog
             religion_cog = self.bot.get_cog('ReligionCog')
             if religion_cog:
-                blessing_bonuses = religion_cog.get_active_blessings(participant['user_id'])
+                blessing_bonuses = await religion_cog.get_active_blessings(participant['user_id'])
                 race_multipliers['xp_gain'] *= blessing_bonuses['xp_mult']
                 race_multipliers['gold_find'] *= blessing_bonuses['gold_mult']
             
@@ -505,26 +475,16 @@ Requirements:
                     # Only use AI name if it makes sense for the item type
                     if self._name_matches_item_type(ai_name, item_found.type.value):
                         # Update the item name in the database
-                        self.db.execute(
-                            "UPDATE inventory SET name = ? WHERE id = ?",
-                            (ai_name, item_found.id)
-                        )
-                        self.db.commit()
+                        await self.db.rename_item(item_found.id, ai_name)
                         item_found.name = ai_name
                 
-                self.create_item_in_db(item_found)
+                await self.create_item_in_db(item_found)
             
-            # Update character
-            char_data = self.db.get_character(participant['user_id'])
-            new_xp = char_data['xp'] + final_xp
-            new_gold = char_data['money'] + final_gold
-            new_level = min(50, 1 + int((new_xp / 100) ** 0.5))
-            
-            self.db.update_character(
+            # Update character (level-ups are queued and announced by AutoPlayCog)
+            await self.db.increment(
                 participant['user_id'],
-                xp=new_xp,
-                money=new_gold,
-                level=new_level
+                xp=final_xp,
+                money=final_gold
             )
             
             rewards.append({
@@ -532,8 +492,7 @@ Requirements:
                 'name': participant['name'],
                 'xp': final_xp,
                 'gold': final_gold,
-                'item': item_found.name if item_found else None,
-                'leveled_up': new_level > char_data['level']
+                'item': item_found.name if item_found else None
             })
         
         return {
@@ -593,8 +552,6 @@ Requirements:
             reward_parts = [f"**{winner['xp']:,} XP**", f"**{winner['gold']:,} gold**"]
             if winner['item']:
                 reward_parts.append(f"*{winner['item']}*")
-            if winner['leveled_up']:
-                reward_parts.append("🎉 **LEVEL UP!**")
             
             winner_text.append(f"• **{winner['name']}**: {', '.join(reward_parts)}")
         
@@ -610,7 +567,7 @@ Requirements:
         embed.color = discord.Color.gold()
         embed.set_footer(text=f"AI Event • {len(event_result['participants'])} participants")
         
-        await channel.send(embed=embed)
+        self.announce(channel, embed=embed, priority=Priority.EVENT)
 
     async def _send_boss_embed(self, channel, event_result):
         """Send boss fight embed with progressive updates"""
@@ -647,11 +604,8 @@ Requirements:
         embed.color = discord.Color.red()
         embed.set_footer(text=f"AI Boss Fight • {len(event_result['participants'])} vs 1")
         
-        # Send initial embed
-        message = await channel.send(embed=embed)
-        
-        # Wait and update with result
-        await asyncio.sleep(3)
+        # Send initial embed, then reveal the result a moment later
+        script = Script(channel, Priority.EVENT).send(embed=embed)
         
         # Update with battle result
         if event_result['success']:
@@ -674,8 +628,6 @@ Requirements:
             reward_parts = [f"**{reward['xp']:,} XP**", f"**{reward['gold']:,} gold**"]
             if reward['item']:
                 reward_parts.append(f"*{reward['item']}*")
-            if reward['leveled_up']:
-                reward_parts.append("🎉 **LEVEL UP!**")
             
             rewards_text.append(f"• **{reward['name']}**: {', '.join(reward_parts)}")
         
@@ -688,7 +640,7 @@ Requirements:
             inline=False
         )
         
-        await message.edit(embed=embed)
+        self.bot.playback.play(script.edit(embed, delay=3))
 
     @tasks.loop(minutes=15)  # Fixed 15-minute interval (between existing 10-20 min suggestion)
     async def ai_event_generator(self):
@@ -5,6 +5,8 @@ import math
 from datetime import datetime, timezone, timedelta
 import re
 import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
 
 import sys
 import os
@@ -15,14 +17,32 @@ from bot import DiscordRPGCog
 # EST timezone
 EST = timezone(timedelta(hours=-5))
 
+# Members registered per transaction by auto_register_existing_members
+REGISTRATION_CHUNK_SIZE = 500
+
+# (name, type, value, damage, armor, hand) given to every auto-registered character
+STARTER_ITEMS = [
+    ("Starter Sword", "Sword", 10, 3, 0, "left"),
+    ("Starter Shield", "Shield", 10, 0, 3, "right"),
+]
+
 class AutoRegisterCog(DiscordRPGCog):
     """Automatic registration and penalty system"""
     
+    def __init__(self, bot):
+        super().__init__(bot)
+        self._registration_task: Optional[asyncio.Task] = None
+        
     async def cog_load(self):
         """Register all existing members when cog loads"""
-        # Don't block cog loading - do this in background
-        asyncio.create_task(self.delayed_registration())
-        
+        # Don't block cog loading or on_ready - do this in background
+        self._registration_task = asyncio.create_task(self.delayed_registration())
+            
+    async def cog_unload(self):
+        """Stop background tasks"""
+        if self._registration_task and not self._registration_task.done():
+            self._registration_task.cancel()
+            
     async def delayed_registration(self):
         """Wait for bot to be ready, then register members"""
         try:
@@ -31,116 +51,94 @@ class AutoRegisterCog(DiscordRPGCog):
             await self.auto_register_existing_members()
         except Exception as e:
             print(f"Error in delayed registration: {e}")
+            
+    def start_registration(self, progress=None) -> bool:
+        """Run auto-registration in the background, False if a run is already going"""
+        if self._registration_task and not self._registration_task.done():
+            return False
+        self._registration_task = asyncio.create_task(self.auto_register_existing_members(progress))
+        return True
+        
+    async def find_unregistered_members(self) -> List[Tuple[int, str]]:
+        """(user_id, character name) for every human member without a profile"""
+        existing = await self.db.get_profile_ids()
+        missing: Dict[int, str] = {}
+        for guild in self.bot.guilds:
+            for member in guild.members:
+                if not member.bot and member.id not in existing and member.id not in missing:
+                    missing[member.id] = member.display_name[:32]  # Limit to 32 chars
+        return list(missing.items())
+        
+    async def auto_register_existing_members(self, progress=None) -> int:
+        """Register all existing server members who don't have characters
         
-    async def auto_register_existing_members(self):
-        """Register all existing server members who don't have characters"""
+        Loads the existing profile IDs once, diffs them against the member
+        lists and inserts the rest in chunked transactions, yielding to the
+        event loop between chunks. progress(done, total, registered) is
+        awaited after each chunk.
+        """
+        registered_count = 0
         try:
             print("Starting auto-registration...")
-            registered_count = 0
-            for guild in self.bot.guilds:
-                print(f"Checking guild: {guild.name} ({len(guild.members)} members)")
-                for member in guild.members:
-                    if member.bot:
-                        continue
-                        
-                    try:
-                        # Atomic check and create to prevent race conditions
-                        # Use INSERT OR IGNORE to handle concurrent registrations
-                        existing_char = self.db.fetchone(
-                            "SELECT user_id FROM profile WHERE user_id = ?",
-                            (member.id,)
-                        )
-                        
-                        if not existing_char:
-                            success = await self.create_character_for_member_atomic(member)
-                            if success:
-                                registered_count += 1
-                                print(f"Registered: {member.display_name}")
-                    except Exception as e:
-                        print(f"Error registering {member.name}: {e}")
-                        continue
+            missing = await self.find_unregistered_members()
+            total = len(missing)
+            print(f"Found {total} unregistered members across {len(self.bot.guilds)} guilds")
+            
+            for start in range(0, total, REGISTRATION_CHUNK_SIZE):
+                chunk = missing[start:start + REGISTRATION_CHUNK_SIZE]
+                try:
+                    registered_count += len(await self.db.bulk_create_characters(chunk, datetime.now(EST), STARTER_ITEMS))
+                except Exception as e:
+                    print(f"Error registering members {start}-{start + len(chunk)}: {e}")
+                    
+                done = start + len(chunk)
+                if done == total or done % (REGISTRATION_CHUNK_SIZE * 10) == 0:
+                    print(f"Auto-registration: {done}/{total} checked, {registered_count} registered")
+                if progress:
+                    await progress(done, total, registered_count)
+                await asyncio.sleep(0)
+                
+            if progress and not total:
+                await progress(0, 0, 0)
             print(f"Auto-registration completed! Registered {registered_count} members.")
         except Exception as e:
             print(f"Error in auto_register_existing_members: {e}")
+        return registered_count
             
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def register_all(self, ctx: commands.Context):
         """Manually trigger auto-registration (admin only)"""
-        await ctx.send("🔄 Starting manual auto-registration...")
-        await self.auto_register_existing_members()
+        message = await ctx.send("🔄 Starting manual auto-registration...")
         
-        # Check results
-        total_chars = len(self.db.fetchall("SELECT user_id FROM profile"))
-        await ctx.send(f"✅ Auto-registration complete! Total characters: {total_chars}")
-    
-    async def create_character_for_member_atomic(self, member: discord.Member) -> bool:
-        """Create a character for a member atomically to prevent race conditions"""
-        try:
-            # Use member's display name as character name
-            char_name = member.display_name[:32]  # Limit to 32 chars
-            
-            # Use INSERT OR IGNORE to handle concurrent registrations atomically
-            cursor = self.db.execute(
-                """INSERT OR IGNORE INTO profile 
-                   (user_id, name, level, xp, money, race, class, health, speed, luck, created_at)
-                   VALUES (?, ?, 1, 0, 100, 'Human', 'Novice', 100, 10, 1, ?)""",
-                (member.id, char_name, datetime.now(EST))
-            )
-            
-            # Check if the insert actually happened (rowcount > 0)
-            if cursor.rowcount > 0:
-                # Create starter items
-                self.db.execute(
-                    "INSERT INTO inventory (owner, name, type, value, damage, armor, hand, equipped) VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
-                    (member.id, "Starter Sword", "Sword", 10, 3, 0, "left")
-                )
-                self.db.execute(
-                    "INSERT INTO inventory (owner, name, type, value, damage, armor, hand, equipped) VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
-                    (member.id, "Starter Shield", "Shield", 10, 0, 3, "right")
-                )
-                
-                self.db.commit()
-                return True
-            else:
-                # Character already existed, created by another process
-                return False
+        last_edit = 0.0
+        
+        async def progress(done: int, total: int, registered: int):
+            nonlocal last_edit
+            try:
+                if done == total:
+                    total_chars = await self.db.count_characters()
+                    await message.edit(content=f"✅ Auto-registration complete! Registered {registered} members. "
+                                               f"Total characters: {total_chars}")
+                elif time.monotonic() - last_edit >= 2:  # Stay well clear of edit rate limits
+                    last_edit = time.monotonic()
+                    await message.edit(content=f"🔄 Auto-registration: {done:,}/{total:,} members, "
+                                               f"{registered:,} registered...")
+            except discord.HTTPException:
+                pass
                 
-        except Exception as e:
-            print(f"Error creating character for {member.name}: {e}")
-            return False
-                    
+        if not self.start_registration(progress):
+            await message.edit(content="⏳ Auto-registration is already running.")
+            
     async def create_character_for_member(self, member: discord.Member):
         """Create a character for a member automatically"""
         try:
             # Use member's display name as character name
             char_name = member.display_name[:32]  # Limit to 32 chars
             
-            # Create character with default stats
-            self.db.execute(
-                """INSERT INTO profile (user_id, name, money, xp, level, class, race, 
-                   pvpwins, pvplosses, deaths, kills, completed, luck, created_at, has_character)
-                   VALUES (?, ?, 100, 0, 1, 'Novice', 'Human', 0, 0, 0, 0, 0, 1.0, ?, 1)""",
-                (member.id, char_name, datetime.now(EST))
-            )
-            
-            # Create starter items
-            self.db.execute(
-                "INSERT INTO inventory (owner, name, type, value, damage, armor, hand, equipped) VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
-                (member.id, "Starter Sword", "Sword", 10, 3, 0, "left")
-            )
-            self.db.execute(
-                "INSERT INTO inventory (owner, name, type, value, damage, armor, hand, equipped) VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
-                (member.id, "Starter Shield", "Shield", 10, 0, 3, "right")
-            )
-            
-            # Set character alignment to neutral by default
-            self.db.execute(
-                "UPDATE profile SET alignment = 'neutral' WHERE user_id = ?",
-                (member.id,)
-            )
-            
-            self.db.commit()
+            # Create character with default stats (neutral alignment) and starter items
+            if not await self.db.bulk_create_characters([(member.id, char_name)], datetime.now(EST), STARTER_ITEMS):
+                return  # Already registered
             
             # Find game channel to announce
             game_channel = None
@@ -164,7 +162,7 @@ class AutoRegisterCog(DiscordRPGCog):
     @commands.command(aliases=["optout", "delete", "quit"])
     async def removeme(self, ctx: commands.Context):
         """Remove your character from DiscordRPG"""
-        char = self.db.get_character(ctx.author.id)
+        char = await self.db.get_character(ctx.author.id)
         if not char:
             await ctx.send("❌ You don't have a character to remove!")
             return
@@ -179,11 +177,12 @@ class AutoRegisterCog(DiscordRPGCog):
             return
             
         # Delete character and all related data
-        self.db.execute("DELETE FROM profile WHERE user_id = ?", (ctx.author.id,))
-        self.db.execute("DELETE FROM inventory WHERE owner = ?", (ctx.author.id,))
-        self.db.execute("DELETE FROM adventures WHERE user_id = ?", (ctx.author.id,))
-        self.db.execute("DELETE FROM market WHERE owner = ?", (ctx.author.id,))
-        self.db.commit()
+        await self.db.delete_character(ctx.author.id)
+        
+        # Their listings went with the inventory rows (ON DELETE CASCADE)
+        economy = self.bot.get_cog('EconomyCog')
+        if economy:
+            await economy.market.warm()
         
         embed = self.success_embed(
             f"Character **{char['name']}** has been deleted.\\n"
@@ -203,16 +202,12 @@ class AutoRegisterCog(DiscordRPGCog):
             await ctx.send("❌ Alignment must be: good, neutral, or evil")
             return
             
-        char = self.db.get_character(ctx.author.id)
+        char = await self.db.get_character(ctx.author.id)
         if not char:
             await ctx.send("❌ You need a character first!")
             return
             
-        self.db.execute(
-            "UPDATE profile SET alignment = ? WHERE user_id = ?",
-            (alignment.lower(), ctx.author.id)
-        )
-        self.db.commit()
+        await self.db.set_alignment(ctx.author.id, alignment.lower())
         
         effects = {
             'good': "+10% battle power, 1/12 daily blessing chance, 1/50 crit chance",
@@ -251,7 +246,7 @@ class AutoRegisterCog(DiscordRPGCog):
             return
             
         # Get character
-        char = self.db.get_character(message.author.id)
+        char = await self.db.get_character(message.author.id)
         if not char:
             return
             
@@ -259,13 +254,8 @@ class AutoRegisterCog(DiscordRPGCog):
         msg_length = len(message.content)
         penalty_seconds = int(msg_length * math.pow(1.14, char['level']))
         
-        # Apply penalty to next level time
-        self.db.execute(
-            """INSERT INTO penalties (user_id, penalty_type, penalty_seconds, applied_at)
-               VALUES (?, 'chat', ?, ?)""",
-            (message.author.id, penalty_seconds, datetime.now(EST))
-        )
-        self.db.commit()
+        # Add to the pending balance applied to the next adventure
+        await self.db.add_penalty(message.author.id, penalty_seconds)
         
         # Don't announce every penalty (would be spammy)
         # Only announce significant penalties (over 60 seconds)
@@ -281,19 +271,14 @@ class AutoRegisterCog(DiscordRPGCog):
         if before.nick == after.nick or after.bot:
             return
             
-        char = self.db.get_character(after.id)
+        char = await self.db.get_character(after.id)
         if not char:
             return
             
         # Nick change penalty: 30 * (1.14 ^ level)
         penalty_seconds = int(30 * math.pow(1.14, char['level']))
         
-        self.db.execute(
-            """INSERT INTO penalties (user_id, penalty_type, penalty_seconds, applied_at)
-               VALUES (?, 'nick', ?, ?)""",
-            (after.id, penalty_seconds, datetime.now(EST))
-        )
-        self.db.commit()
+        await self.db.add_penalty(after.id, penalty_seconds)
         
         # Find game channel
         for channel in after.guild.text_channels:
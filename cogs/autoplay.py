@@ -1,10 +1,9 @@
 """Automatic gameplay system - runs adventures, battles, and events"""
 import discord
 from discord.ext import commands, tasks
-import random
 import asyncio
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 
 import sys
@@ -13,63 +12,127 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from bot import DiscordRPGCog
 from classes.items import ItemGenerator, ItemRarity
+from classes.odds import NOISE, TEAM_BATTLES
+from utils.database import MAX_PENALTY_PER_ADVENTURE, level_for_xp
+from utils.outbox import Priority
+from utils.playback import Script
 
 logger = logging.getLogger('DiscordRPG.AutoPlay')
 
+# Channel names the game posts in (the first match per guild)
+GAME_CHANNEL_NAMES = ['discordrpg', 'rpg', 'game', 'bot']
+
+# Level-up lines shown per announcement before the rest are counted
+LEVEL_UP_LINES = 25
+
+# Team battle narrative per format (the rules are classes.odds.TEAM_BATTLES)
+TEAM_BATTLE_SCRIPTS = {
+    '3v3': {
+        'title': "⚔️ 3v3 Team Battle!", 'description': "Two teams clash in tactical combat!",
+        'teams': ("⚔️ Team Alpha", "🛡️ Team Beta"), 'shown': None, 'more': "",
+        'preparing': "Preparing for combat...", 'color': discord.Color.orange(),
+        'intro_delay': 2, 'beats': 2,
+        'events': [
+            "⚔️ The teams circle each other, planning their tactical approach!",
+            "🛡️ Warriors coordinate their attacks in perfect formation!",
+            "✨ Spells and steel clash as the teams engage in fierce combat!",
+            "💥 The battlefield rings with the sounds of tactical warfare!"
+        ],
+        'victory_title': "🏆 3v3 Victory!", 'victory': "**Team {side}** wins the battle!",
+        'winners': "🏆 Winners", 'losers': "💪 Participants",
+    },
+    '5v5': {
+        'title': "⚔️ EPIC 5v5 BATTLE!", 'description': "Two mighty armies clash in legendary combat!",
+        'teams': ("⚔️ Army Alpha", "🛡️ Army Beta"), 'shown': 3, 'more': "more",
+        'preparing': "Armies assembling for war...", 'color': discord.Color.purple(),
+        'intro_delay': 3, 'beats': 3,
+        'events': [
+            "⚔️ The armies charge across the battlefield with thunderous war cries!",
+            "🛡️ Shield walls collide as warriors clash in fierce melee!",
+            "✨ Magical energies surge as mages unleash devastating spells!",
+            "🏹 Archers rain arrows while cavalry charges the flanks!",
+            "💥 The ground trembles under the weight of epic combat!"
+        ],
+        'victory_title': "🏆 LEGENDARY VICTORY!", 'victory': "**Army {side}** achieves glorious victory!",
+        'winners': "👑 Victorious Army", 'losers': "⚔️ Brave Warriors",
+    },
+    '10v10': {
+        'title': "⚔️ MASSIVE 10v10 BATTLEFIELD!", 'description': "Two enormous armies clash in the ultimate battle!",
+        'teams': ("⚔️ Legion Alpha", "🛡️ Legion Beta"), 'shown': 4, 'more': "more warriors",
+        'preparing': "Legions marshalling for ultimate war...", 'color': discord.Color.dark_purple(),
+        'intro_delay': 4, 'beats': 4,
+        'events': [
+            "💥 The battlefield erupts as 20 warriors clash in ultimate warfare!",
+            "⚔️ Legions charge with earth-shaking roars across the massive arena!",
+            "🔥 The sky darkens with arrows, spells, and weapons of war!",
+            "🌩️ Thunder crashes as legendary warriors unleash their full power!",
+            "⚡ The very ground splits under the fury of this epic confrontation!",
+            "🛡️ Heroes and villains alike fight with everything they possess!"
+        ],
+        'victory_title': "🏆 ULTIMATE CONQUEST!", 'victory': "**Legion {side}** dominates the battlefield!",
+        'winners': "👑 Conquering Legion", 'losers': "⚔️ Valiant Warriors",
+    },
+}
+
 class AutoPlayCog(DiscordRPGCog):
     """Automatic gameplay for all registered characters"""
     
     def __init__(self, bot):
         super().__init__(bot)
         self.game_channel = None  # Will be set to main game channel
+        self.guild_channels: Dict[int, discord.TextChannel] = {}  # guild_id -> game channel, for level-ups
         self.initial_trigger_done = False  # Track if we've done the initial quick trigger
+        self._start_task: Optional[asyncio.Task] = None
+        
+    @property
+    def rng(self):
+        """Autoplay's random stream (see utils/rng.py)"""
+        return self.bot.rng.stream('autoplay')
         
-    def create_item_in_db(self, item) -> int:
+    async def create_item_in_db(self, item) -> int:
         """Helper to create items with all stats in database"""
-        return self.db.create_item(
+        return await self.db.create_item(
             item.owner_id, item.name, item.type.value,
             item.value, item.damage, item.armor, item.hand.value,
             item.health_bonus, item.speed_bonus, item.luck_bonus,
             item.crit_bonus, item.magic_bonus, item.slot_type
         )
         
-    def is_user_online(self, user: discord.User) -> bool:
-        """Check if user is online (green status) in any guild"""
-        for guild in self.bot.guilds:
-            member = guild.get_member(user.id)
-            if member and member.status == discord.Status.online:
-                return True
-        return False
-        
     async def cog_load(self):
-        """Start automatic game loops when cog loads"""
-        logger.info("AutoPlay cog loading - waiting for bot to be ready...")
-        await asyncio.sleep(5)  # Wait for bot to be ready
+        """Start automatic game loops once the bot is ready, without blocking startup"""
+        logger.info("AutoPlay cog loading - loops start when the bot is ready")
+        self._start_task = asyncio.create_task(self.start_loops())
+        
+    async def start_loops(self):
+        """Wait for the gateway, then start every AutoPlay loop"""
+        await self.bot.wait_until_ready()
         logger.info("Starting AutoPlay loops...")
         
         # Start adventure loop with initial random interval (7-21 minutes) - 30% increase in frequency
-        initial_adventure_interval = random.randint(7, 21) * 60
+        initial_adventure_interval = self.rng.randint(7, 21) * 60
         self.auto_adventure_loop.change_interval(seconds=initial_adventure_interval)
         self.auto_adventure_loop.start()
         
         # Start battle loop with initial random interval (1-5 minutes)
-        initial_battle_interval = random.randint(1, 5) * 60
+        initial_battle_interval = self.rng.randint(1, 5) * 60
         self.auto_battle_loop.change_interval(seconds=initial_battle_interval)
         self.auto_battle_loop.start()
         self.auto_events_loop.start()
         self.level_up_check.start()
         self.initial_activity_check.start()
-        self.level_fix_loop.start()
+        self.announce_level_ups.start()
         logger.info("All AutoPlay loops started successfully!")
         
     def cog_unload(self):
         """Stop loops when cog unloads"""
+        if self._start_task and not self._start_task.done():
+            self._start_task.cancel()
         self.auto_adventure_loop.cancel()
         self.auto_battle_loop.cancel() 
         self.auto_events_loop.cancel()
         self.level_up_check.cancel()
         self.initial_activity_check.cancel()
-        self.level_fix_loop.cancel()
+        self.announce_level_ups.cancel()
         
     async def get_game_channel(self):
         """Get or create the main game channel"""
@@ -83,7 +146,7 @@ class AutoPlayCog(DiscordRPGCog):
         # Look for existing game channel
         for guild in self.bot.guilds:
             for channel in guild.text_channels:
-                if channel.name.lower() in ['discordrpg', 'rpg', 'game', 'bot']:
+                if channel.name.lower() in GAME_CHANNEL_NAMES:
                     self.game_channel = channel
                     return channel
                     
@@ -93,7 +156,8 @@ class AutoPlayCog(DiscordRPGCog):
                     'discordrpg',
                     topic='🎮 Automatic DiscordRPG gameplay happens here!'
                 )
-                await self.game_channel.send(
+                self.announce(
+                    self.game_channel,
                     "🎮 **DiscordRPG Auto-Game Started!**\n"
                     "Use `!create` to join the automatic adventure!"
                 )
@@ -113,25 +177,15 @@ class AutoPlayCog(DiscordRPGCog):
             if not channel:
                 return
                 
-            # Get all characters not currently on adventures AND are online
-            available_chars = []
-            all_chars = self.db.fetchall(
-                """SELECT user_id, name, level FROM profile 
-                   WHERE user_id NOT IN (SELECT user_id FROM adventures WHERE status = 'active')"""
-            )
-            
-            # Filter for online users only
-            for char in all_chars:
-                user = self.bot.get_user(char['user_id'])
-                if user and self.is_user_online(user):
-                    available_chars.append(char)
+            # Online characters not currently on adventures (the query only visits online players)
+            available_chars = await self.db.list_idle_characters(self.bot.presence.online_ids())
             
             if not available_chars:
                 return
                 
             # Send 10-20 random characters on adventures
-            num_adventures = min(random.randint(10, 20), len(available_chars))
-            selected = random.sample(available_chars, num_adventures)
+            num_adventures = min(self.rng.randint(10, 20), len(available_chars))
+            selected = self.rng.sample(available_chars, num_adventures)
             
             if selected:
                 # If multiple adventures starting, use single embed; otherwise individual messages
@@ -143,14 +197,15 @@ class AutoPlayCog(DiscordRPGCog):
                     )
                     
                     adventure_list = []
+                    departures = []
                     for char in selected:
                         # Choose adventure duration based on level (higher level = longer adventures)
                         if char['level'] < 10:
-                            duration = random.randint(5, 10)
+                            duration = self.rng.randint(5, 10)
                         elif char['level'] < 20:
-                            duration = random.randint(20, 30)
+                            duration = self.rng.randint(20, 30)
                         else:
-                            duration = random.randint(60, 120)
+                            duration = self.rng.randint(60, 120)
                             
                         # Start adventure with error handling
                         adventure_types = [
@@ -159,23 +214,20 @@ class AutoPlayCog(DiscordRPGCog):
                             "Ancient Ruins", "Crystal Mining", "Beast Taming", "Shadow Realm"
                         ]
                         
-                        adventure_type = random.choice(adventure_types)
+                        adventure_type = self.rng.choice(adventure_types)
+                        penalty = min(char['pending_penalty'] or 0, MAX_PENALTY_PER_ADVENTURE)
                         start_time = datetime.now()  # Use local time instead of UTC
-                        end_time = start_time + timedelta(minutes=duration)
+                        end_time = start_time + timedelta(minutes=duration, seconds=penalty)
                         
-                        try:
-                            self.db.execute(
-                                """INSERT INTO adventures (user_id, adventure_name, difficulty, started_at, finish_at, status)
-                                   VALUES (?, ?, ?, ?, ?, ?)""",
-                                (char['user_id'], adventure_type, 1, start_time, end_time, 'active')
-                            )
-                            # Add to list for embed only if insert succeeded
-                            adventure_list.append(f"• **{char['name']}** → {adventure_type} ({duration}m)")
-                        except Exception as e:
-                            logger.error(f"Failed to create adventure for {char['name']}: {e}")
-                            continue
+                        departures.append((char['user_id'], adventure_type, 1, start_time, end_time, penalty))
+                        penalty_note = f" +{penalty // 60}m penalty" if penalty >= 60 else ""
+                        adventure_list.append(f"• **{char['name']}** → {adventure_type} ({duration}m{penalty_note})")
                     
-                    self.db.commit()
+                    try:
+                        await self.db.start_adventures(departures)
+                    except Exception as e:
+                        logger.error(f"Failed to start {len(departures)} adventures: {e}")
+                        return
                     
                     # Update embed with all departures at once
                     adventure_embed.add_field(
@@ -189,16 +241,16 @@ class AutoPlayCog(DiscordRPGCog):
                         inline=False
                     )
                     
-                    await channel.send(embed=adventure_embed)
+                    self.announce(channel, embed=adventure_embed)
                 else:
                     # Single adventure - use individual message
                     char = selected[0]
                     if char['level'] < 10:
-                        duration = random.randint(5, 10)
+                        duration = self.rng.randint(5, 10)
                     elif char['level'] < 20:
-                        duration = random.randint(20, 30)
+                        duration = self.rng.randint(20, 30)
                     else:
-                        duration = random.randint(60, 120)
+                        duration = self.rng.randint(60, 120)
                         
                     adventure_types = [
                         "Forest Exploration", "Cave Diving", "Monster Hunt", "Treasure Quest",
@@ -206,21 +258,19 @@ class AutoPlayCog(DiscordRPGCog):
                         "Ancient Ruins", "Crystal Mining", "Beast Taming", "Shadow Realm"
                     ]
                     
-                    adventure_type = random.choice(adventure_types)
+                    adventure_type = self.rng.choice(adventure_types)
+                    penalty = min(char['pending_penalty'] or 0, MAX_PENALTY_PER_ADVENTURE)
                     start_time = datetime.now()
-                    end_time = start_time + timedelta(minutes=duration)
+                    end_time = start_time + timedelta(minutes=duration, seconds=penalty)
                     
                     try:
-                        self.db.execute(
-                            """INSERT INTO adventures (user_id, adventure_name, difficulty, started_at, finish_at, status)
-                               VALUES (?, ?, ?, ?, ?, ?)""",
-                            (char['user_id'], adventure_type, 1, start_time, end_time, 'active')
-                        )
-                        self.db.commit()
+                        await self.db.start_adventures([(char['user_id'], adventure_type, 1, start_time, end_time, penalty)])
                         
-                        await channel.send(
+                        penalty_note = f" + {penalty // 60} minute penalty" if penalty >= 60 else ""
+                        self.announce(
+                            channel,
                             f"🗺️ **{char['name']}** has automatically started a **{adventure_type}** "
-                            f"adventure! (Duration: {duration} minutes)"
+                            f"adventure! (Duration: {duration} minutes{penalty_note})"
                         )
                     except Exception as e:
                         logger.error(f"Failed to create single adventure for {char['name']}: {e}")
@@ -229,7 +279,7 @@ class AutoPlayCog(DiscordRPGCog):
             logger.error(f"Error in auto_adventure_loop: {e}")
             
         # Set next random interval between 7-21 minutes (30% increase in frequency)
-        next_interval = random.randint(7, 21) * 60  # Convert to seconds
+        next_interval = self.rng.randint(7, 21) * 60  # Convert to seconds
         self.auto_adventure_loop.change_interval(seconds=next_interval)
             
     @tasks.loop()  # Dynamic interval
@@ -241,20 +291,7 @@ class AutoPlayCog(DiscordRPGCog):
                 return
                 
             # Get characters available for battle (online, not in adventure, similar levels)
-            available_chars = []
-            all_chars = self.db.fetchall(
-                """SELECT user_id, name, level FROM profile 
-                   WHERE user_id NOT IN (SELECT user_id FROM adventures WHERE status = 'active')
-                   ORDER BY level"""
-            )
-            
-            # Filter for online users only
-            for char in all_chars:
-                user = self.bot.get_user(char['user_id'])
-                if user and self.is_user_online(user):
-                    available_chars.append(char)
-                    
-            chars = available_chars
+            chars = await self.db.list_idle_characters(self.bot.presence.online_ids())
             
             if len(chars) < 2:
                 return
@@ -262,13 +299,13 @@ class AutoPlayCog(DiscordRPGCog):
             # Determine battle type based on available players (more balanced distribution)
             if len(chars) >= 20:
                 # More balanced: 25% for 10v10, 25% for 5v5, 30% for 3v3, 20% for 1v1
-                battle_type = random.choices(['10v10', '5v5', '3v3', '1v1'], weights=[25, 25, 30, 20])[0]
+                battle_type = self.rng.choices(['10v10', '5v5', '3v3', '1v1'], weights=[25, 25, 30, 20])[0]
             elif len(chars) >= 10:
                 # More balanced: 35% for 5v5, 40% for 3v3, 25% for 1v1
-                battle_type = random.choices(['5v5', '3v3', '1v1'], weights=[35, 40, 25])[0]
+                battle_type = self.rng.choices(['5v5', '3v3', '1v1'], weights=[35, 40, 25])[0]
             elif len(chars) >= 6:
                 # Slightly favor variety: 55% chance for 3v3, 45% for 1v1
-                battle_type = random.choices(['3v3', '1v1'], weights=[55, 45])[0]
+                battle_type = self.rng.choices(['3v3', '1v1'], weights=[55, 45])[0]
             else:
                 # Only 1v1 possible
                 battle_type = '1v1'
@@ -276,29 +313,25 @@ class AutoPlayCog(DiscordRPGCog):
             # Execute the appropriate battle type
             if battle_type == '1v1':
                 await self.run_1v1_battle(chars, channel)
-            elif battle_type == '3v3':
-                await self.run_3v3_battle(chars, channel)
-            elif battle_type == '5v5':
-                await self.run_5v5_battle(chars, channel)
-            elif battle_type == '10v10':
-                await self.run_10v10_battle(chars, channel)
+            else:
+                await self.run_team_battle(chars, channel, battle_type)
             
         except Exception as e:
             logger.error(f"Error in auto_battle_loop: {e}")
             
         # Set next random interval between 2-8 minutes (adjusted for group battles)
-        next_interval = random.randint(2, 8) * 60  # Convert to seconds
+        next_interval = self.rng.randint(2, 8) * 60  # Convert to seconds
         self.auto_battle_loop.change_interval(seconds=next_interval)
             
     async def simulate_battle(self, char1: Dict, char2: Dict) -> Dict:
         """Simulate a battle between two characters"""
         # Get character stats
-        char1_data = self.db.get_character(char1['user_id'])
-        char2_data = self.db.get_character(char2['user_id'])
+        char1_data = await self.db.get_character(char1['user_id'])
+        char2_data = await self.db.get_character(char2['user_id'])
         
         # Calculate combat power (level + equipment + armor bonuses + some randomness)
-        char1_items = self.db.get_equipped_items(char1['user_id'])
-        char2_items = self.db.get_equipped_items(char2['user_id'])
+        char1_items = await self.db.get_equipped_items(char1['user_id'])
+        char2_items = await self.db.get_equipped_items(char2['user_id'])
         
         # Calculate equipment power including armor bonuses
         char1_equipment = sum(item['damage'] + item['armor'] for item in char1_items)
@@ -307,7 +340,7 @@ class AutoPlayCog(DiscordRPGCog):
             int(item.get('luck_bonus', 0) * 100) + int(item.get('crit_bonus', 0) * 100) + 
             item.get('magic_bonus', 0) for item in char1_items
         )
-        char1_power = char1['level'] * 10 + char1_equipment + char1_armor_bonuses + random.randint(-20, 20)
+        char1_power = char1['level'] * 10 + char1_equipment + char1_armor_bonuses + self.rng.randint(-NOISE, NOISE)
         
         char2_equipment = sum(item['damage'] + item['armor'] for item in char2_items)
         char2_armor_bonuses = sum(
@@ -315,7 +348,7 @@ class AutoPlayCog(DiscordRPGCog):
             int(item.get('luck_bonus', 0) * 100) + int(item.get('crit_bonus', 0) * 100) + 
             item.get('magic_bonus', 0) for item in char2_items
         )
-        char2_power = char2['level'] * 10 + char2_equipment + char2_armor_bonuses + random.randint(-20, 20)
+        char2_power = char2['level'] * 10 + char2_equipment + char2_armor_bonuses + self.rng.randint(-NOISE, NOISE)
         
         if char1_power >= char2_power:
             return {'winner': char1, 'loser': char2, 'power_diff': char1_power - char2_power}
@@ -323,7 +356,7 @@ class AutoPlayCog(DiscordRPGCog):
             return {'winner': char2, 'loser': char1, 'power_diff': char2_power - char1_power}
     
     async def run_1v1_battle(self, chars, channel):
-        """Run a 1v1 auto battle with the original format"""
+        """Resolve a 1v1 auto battle and queue its result for playback"""
         # Group by similar levels (within 5 levels)
         level_groups = {}
         for char in chars:
@@ -337,28 +370,28 @@ class AutoPlayCog(DiscordRPGCog):
         if not valid_groups:
             return
             
-        group = random.choice(valid_groups)
-        fighter1, fighter2 = random.sample(group, 2)
+        group = self.rng.choice(valid_groups)
+        fighter1, fighter2 = self.rng.sample(group, 2)
         
         # Simulate battle
         result = await self.simulate_battle(fighter1, fighter2)
         
         # Award XP and gold with race bonuses (original format)
-        base_winner_xp = random.randint(50, 150)
-        base_loser_xp = random.randint(10, 50)
-        base_winner_gold = random.randint(100, 300)
+        base_winner_xp = self.rng.randint(50, 150)
+        base_loser_xp = self.rng.randint(10, 50)
+        base_winner_gold = self.rng.randint(100, 300)
         
         # Get race multipliers
         from cogs.race import RaceCog
-        winner_multipliers = RaceCog.get_race_multipliers(result['winner']['user_id'])
-        loser_multipliers = RaceCog.get_race_multipliers(result['loser']['user_id'])
+        winner_multipliers = await RaceCog.get_race_multipliers(result['winner']['user_id'], self.db)
+        loser_multipliers = await RaceCog.get_race_multipliers(result['loser']['user_id'], self.db)
         
         # Get divine blessing bonuses
         from cogs.religion import ReligionCog
         religion_cog = self.bot.get_cog('ReligionCog')
         if religion_cog:
-            winner_blessings = religion_cog.get_active_blessings(result['winner']['user_id'])
-            loser_blessings = religion_cog.get_active_blessings(result['loser']['user_id'])
+            winner_blessings = await religion_cog.get_active_blessings(result['winner']['user_id'])
+            loser_blessings = await religion_cog.get_active_blessings(result['loser']['user_id'])
             # Apply blessing multipliers
             winner_multipliers['xp_gain'] *= winner_blessings['xp_mult']
             winner_multipliers['gold_find'] *= winner_blessings['gold_mult']
@@ -369,46 +402,40 @@ class AutoPlayCog(DiscordRPGCog):
         loser_xp = int(base_loser_xp * loser_multipliers['xp_gain'])
         winner_gold = int(base_winner_gold * winner_multipliers['gold_find'])
         
-        winner_char = self.db.get_character(result['winner']['user_id'])
-        loser_char = self.db.get_character(result['loser']['user_id'])
-        
-        self.db.update_character(
-            result['winner']['user_id'],
-            xp=winner_char['xp'] + winner_xp,
-            money=winner_char['money'] + winner_gold,
-            pvpwins=winner_char['pvpwins'] + 1
-        )
-        
-        self.db.update_character(
-            result['loser']['user_id'],
-            xp=loser_char['xp'] + loser_xp,
-            pvplosses=loser_char['pvplosses'] + 1
-        )
+        deltas = {
+            result['winner']['user_id']: {'xp': winner_xp, 'money': winner_gold, 'pvpwins': 1},
+            result['loser']['user_id']: {'xp': loser_xp, 'pvplosses': 1},
+        }
+        items = []
         
         # Chance for item reward - winners and losers
         winner_item_text = ""
         loser_item_text = ""
         
         # Winner item chance (30%) - can now get armor!
-        if random.random() < 0.3:
+        if self.rng.random() < 0.3:
             item = ItemGenerator.generate_random_equipment(
                 result['winner']['user_id'],
                 max(4, result['winner']['level'] + 2),
-                result['winner']['level'] + 8
+                result['winner']['level'] + 8,
+                rng=self.rng
             )
-            self.create_item_in_db(item)
+            items.append(item)
             winner_item_text = f"\n🎁 Found: **{item.name}**"
             
         # Loser item chance (5% - much smaller chance)
-        if random.random() < 0.05:
+        if self.rng.random() < 0.05:
             item = ItemGenerator.generate_random_equipment(
                 result['loser']['user_id'],
                 max(3, result['loser']['level']),
-                result['loser']['level'] + 4
+                result['loser']['level'] + 4,
+                rng=self.rng
             )
-            self.create_item_in_db(item)
+            items.append(item)
             loser_item_text = f"\n🎁 Found: **{item.name}**"
             
+        await self.db.apply_rewards(deltas, items)
+            
         # Create embed for clean display
         embed = self.embed(
             "⚔️ Auto Battle!",
@@ -426,357 +453,120 @@ class AutoPlayCog(DiscordRPGCog):
         )
         embed.color = discord.Color.blue()
         
-        await channel.send(embed=embed)
+        self.bot.playback.play(Script(channel).send(embed=embed))
     
-    async def run_3v3_battle(self, chars, channel):
-        """Run a 3v3 team battle with dynamic embed updates"""
-        # Select 6 players for 3v3
-        fighters = random.sample(chars, 6)
-        team_a = fighters[:3]
-        team_b = fighters[3:6]
-        
-        team_a_names = [f['name'] for f in team_a]
-        team_b_names = [f['name'] for f in team_b]
-        
-        # Create initial embed
-        battle_embed = self.embed(
-            "⚔️ 3v3 Team Battle!",
-            "Two teams clash in tactical combat!"
-        )
-        battle_embed.add_field(
-            name="⚔️ Team Alpha",
-            value=', '.join(team_a_names),
-            inline=True
-        )
-        battle_embed.add_field(
-            name="🛡️ Team Beta", 
-            value=', '.join(team_b_names),
-            inline=True
-        )
-        battle_embed.add_field(
-            name="📊 Battle Status",
-            value="🔄 **Preparing for combat...**",
-            inline=False
-        )
-        battle_embed.color = discord.Color.orange()
-        
-        # Send initial embed and get message object for editing
-        battle_message = await channel.send(embed=battle_embed)
-        
-        await asyncio.sleep(2)
-        
-        # Team combat narrative with embed updates
-        team_events = [
-            "⚔️ The teams circle each other, planning their tactical approach!",
-            "🛡️ Warriors coordinate their attacks in perfect formation!",
-            "✨ Spells and steel clash as the teams engage in fierce combat!",
-            "💥 The battlefield rings with the sounds of tactical warfare!"
-        ]
-        
-        # Update embed with combat progression
-        for i, event in enumerate(random.sample(team_events, 2)):
-            battle_embed.set_field_at(
-                2,  # Battle Status field
-                name="📊 Battle Status", 
-                value=f"⚡ **{event}**",
-                inline=False
-            )
-            await battle_message.edit(embed=battle_embed)
-            await asyncio.sleep(2)
+    async def run_team_battle(self, chars, channel, battle_type: str):
+        """Resolve a 3v3, 5v5 or 10v10 team battle and queue its narrative
+        
+        Powers, rolls and rewards are settled and committed in one transaction
+        before anything is shown; the embed updates are played back afterwards
+        by bot.playback at presentation pace.
+        """
+        config = {**TEAM_BATTLES[battle_type], **TEAM_BATTLE_SCRIPTS[battle_type]}
+        size = config['size']
+        fighters = self.rng.sample(chars, size * 2)
+        team_a = fighters[:size]
+        team_b = fighters[size:]
         
         # Calculate team powers and determine winner
-        team_a_power = sum(self.calculate_battle_power(f) for f in team_a)
-        team_b_power = sum(self.calculate_battle_power(f) for f in team_b)
+        team_a_power = sum([await self.calculate_battle_power(f) for f in team_a])
+        team_b_power = sum([await self.calculate_battle_power(f) for f in team_b])
         
-        # Team coordination affects power
-        team_a_roll = team_a_power * random.uniform(0.85, 1.15) * 0.8
-        team_b_roll = team_b_power * random.uniform(0.85, 1.15) * 0.8
+        # Larger battles are more chaotic and coordinate worse
+        low, high = config['variance']
+        team_a_roll = team_a_power * self.rng.uniform(low, high) * config['coordination']
+        team_b_roll = team_b_power * self.rng.uniform(low, high) * config['coordination']
         
-        winning_team = team_a if team_a_roll > team_b_roll else team_b
-        losing_team = team_b if team_a_roll > team_b_roll else team_a
+        a_wins = team_a_roll > team_b_roll
+        winning_team = team_a if a_wins else team_b
+        losing_team = team_b if a_wins else team_a
         
-        # Apply rewards to all participants
+        # Settle every participant's rewards in one transaction
+        deltas: Dict[int, Dict[str, int]] = {}
+        items = []
         winner_rewards = []
         loser_rewards = []
         
         for member in winning_team:
-            winner_xp, winner_gold, item_text = await self.apply_team_rewards(member, "3v3", True)
+            winner_xp, winner_gold, item_text = await self.team_rewards(member, battle_type, True, deltas, items)
             winner_rewards.append(f"**{member['name']}**: +{winner_xp} XP, +{winner_gold} gold{item_text}")
             
         for member in losing_team:
-            loser_xp, _, item_text = await self.apply_team_rewards(member, "3v3", False)
+            loser_xp, _, item_text = await self.team_rewards(member, battle_type, False, deltas, items)
             loser_rewards.append(f"**{member['name']}**: +{loser_xp} XP{item_text}")
-        
-        # Update embed with final results
-        battle_embed.title = "🏆 3v3 Victory!"
-        battle_embed.description = f"**Team {'Alpha' if winning_team == team_a else 'Beta'}** wins the battle!"
-        battle_embed.color = discord.Color.gold()
-        
-        # Replace battle status with winner info
-        battle_embed.set_field_at(
-            2,
-            name="🏆 Winners",
-            value="\n".join(winner_rewards),
-            inline=False
-        )
-        
-        # Add participants field
-        battle_embed.add_field(
-            name="💪 Participants", 
-            value="\n".join(loser_rewards),
-            inline=False
-        )
-        
-        # Final update to show results
-        await battle_message.edit(embed=battle_embed)
-    
-    async def run_5v5_battle(self, chars, channel):
-        """Run a 5v5 epic battle"""
-        # Select 10 players for 5v5
-        fighters = random.sample(chars, 10)
-        team_a = fighters[:5]
-        team_b = fighters[5:10]
-        
-        team_a_names = [f['name'] for f in team_a]
-        team_b_names = [f['name'] for f in team_b]
-        
-        # Create initial embed for 5v5 battle
-        battle_embed = self.embed(
-            "⚔️ EPIC 5v5 BATTLE!",
-            "Two mighty armies clash in legendary combat!"
-        )
-        battle_embed.add_field(
-            name="⚔️ Army Alpha",
-            value=f"{', '.join(team_a_names[:3])} +{len(team_a)-3} more",
-            inline=True
-        )
-        battle_embed.add_field(
-            name="🛡️ Army Beta", 
-            value=f"{', '.join(team_b_names[:3])} +{len(team_b)-3} more",
-            inline=True
-        )
-        battle_embed.add_field(
-            name="📊 Battle Status",
-            value="🔄 **Armies assembling for war...**",
-            inline=False
-        )
-        battle_embed.color = discord.Color.purple()
-        
-        # Send initial embed and get message object for editing
-        battle_message = await channel.send(embed=battle_embed)
-        
-        await asyncio.sleep(3)
-        
-        # Dynamic combat narrative with embed updates
-        combat_events = [
-            "⚔️ The armies charge across the battlefield with thunderous war cries!",
-            "🛡️ Shield walls collide as warriors clash in fierce melee!",
-            "✨ Magical energies surge as mages unleash devastating spells!",
-            "🏹 Archers rain arrows while cavalry charges the flanks!",
-            "💥 The ground trembles under the weight of epic combat!"
-        ]
-        
-        # Update embed with combat progression
-        for i, event in enumerate(random.sample(combat_events, 3)):
-            battle_embed.set_field_at(
-                2,  # Battle Status field
-                name="📊 Battle Status", 
-                value=f"⚡ **{event}**",
-                inline=False
-            )
-            await battle_message.edit(embed=battle_embed)
-            await asyncio.sleep(2)
-        
-        # Calculate army powers
-        team_a_power = sum(self.calculate_battle_power(f) for f in team_a)
-        team_b_power = sum(self.calculate_battle_power(f) for f in team_b)
-        
-        # Larger coordination penalty for 5v5
-        team_a_roll = team_a_power * random.uniform(0.8, 1.2) * 0.75
-        team_b_roll = team_b_power * random.uniform(0.8, 1.2) * 0.75
-        
-        winning_team = team_a if team_a_roll > team_b_roll else team_b
-        losing_team = team_b if team_a_roll > team_b_roll else team_a
-        
-        # Apply rewards to all participants
-        winner_rewards = []
-        loser_rewards = []
-        
-        for member in winning_team:
-            winner_xp, winner_gold, item_text = await self.apply_team_rewards(member, "5v5", True)
-            winner_rewards.append(f"**{member['name']}**: +{winner_xp} XP, +{winner_gold} gold{item_text}")
             
-        for member in losing_team:
-            loser_xp, _, item_text = await self.apply_team_rewards(member, "5v5", False)
-            loser_rewards.append(f"**{member['name']}**: +{loser_xp} XP{item_text}")
-        
-        # Update embed with final results
-        battle_embed.title = "🏆 LEGENDARY VICTORY!"
-        battle_embed.description = f"**Army {'Alpha' if winning_team == team_a else 'Beta'}** achieves glorious victory!"
+        await self.db.apply_rewards(deltas, items)
+        
+        # Narrative script: intro, combat beats, then the result
+        team_names = []
+        for team in (team_a, team_b):
+            names = [f['name'] for f in team]
+            shown = config['shown']
+            team_names.append(', '.join(names) if shown is None
+                              else f"{', '.join(names[:shown])} +{len(names) - shown} {config['more']}".rstrip())
+        
+        battle_embed = self.embed(config['title'], config['description'])
+        battle_embed.add_field(name=config['teams'][0], value=team_names[0], inline=True)
+        battle_embed.add_field(name=config['teams'][1], value=team_names[1], inline=True)
+        battle_embed.add_field(name="📊 Battle Status", value=f"🔄 **{config['preparing']}**", inline=False)
+        battle_embed.color = config['color']
+        
+        script = Script(channel).send(embed=battle_embed)
+        delay = config['intro_delay']
+        for event in self.rng.sample(config['events'], config['beats']):
+            battle_embed.set_field_at(2, name="📊 Battle Status", value=f"⚡ **{event}**", inline=False)
+            script.edit(battle_embed, delay=delay)
+            delay = 2
+        
+        battle_embed.title = config['victory_title']
+        battle_embed.description = config['victory'].format(side='Alpha' if a_wins else 'Beta')
         battle_embed.color = discord.Color.gold()
+        battle_embed.set_field_at(2, name=config['winners'], value="\n".join(winner_rewards), inline=False)
+        battle_embed.add_field(name=config['losers'], value="\n".join(loser_rewards), inline=False)
+        script.edit(battle_embed, delay=delay)
         
-        # Replace battle status with winner info
-        battle_embed.set_field_at(
-            2,
-            name="👑 Victorious Army",
-            value="\n".join(winner_rewards),
-            inline=False
-        )
-        
-        # Add participants field
-        battle_embed.add_field(
-            name="⚔️ Brave Warriors", 
-            value="\n".join(loser_rewards),
-            inline=False
-        )
-        
-        # Final update to show results
-        await battle_message.edit(embed=battle_embed)
+        self.bot.playback.play(script)
     
-    async def run_10v10_battle(self, chars, channel):
-        """Run a 10v10 massive battlefield"""
-        # Select 20 players for 10v10
-        fighters = random.sample(chars, 20)
-        team_a = fighters[:10]
-        team_b = fighters[10:20]
-        
-        team_a_names = [f['name'] for f in team_a]
-        team_b_names = [f['name'] for f in team_b]
-        
-        # Create initial embed for 10v10 battle
-        battle_embed = self.embed(
-            "⚔️ MASSIVE 10v10 BATTLEFIELD!",
-            "Two enormous armies clash in the ultimate battle!"
-        )
-        battle_embed.add_field(
-            name="⚔️ Legion Alpha",
-            value=f"{', '.join(team_a_names[:4])} +{len(team_a)-4} more warriors",
-            inline=True
-        )
-        battle_embed.add_field(
-            name="🛡️ Legion Beta", 
-            value=f"{', '.join(team_b_names[:4])} +{len(team_b)-4} more warriors",
-            inline=True
-        )
-        battle_embed.add_field(
-            name="📊 Battle Status",
-            value="🔄 **Legions marshalling for ultimate war...**",
-            inline=False
-        )
-        battle_embed.color = discord.Color.dark_purple()
-        
-        # Send initial embed and get message object for editing
-        battle_message = await channel.send(embed=battle_embed)
-        
-        await asyncio.sleep(4)
-        
-        # Epic combat narrative for massive battles with embed updates
-        massive_combat_events = [
-            "💥 The battlefield erupts as 20 warriors clash in ultimate warfare!",
-            "⚔️ Legions charge with earth-shaking roars across the massive arena!",
-            "🔥 The sky darkens with arrows, spells, and weapons of war!",
-            "🌩️ Thunder crashes as legendary warriors unleash their full power!",
-            "⚡ The very ground splits under the fury of this epic confrontation!",
-            "🛡️ Heroes and villains alike fight with everything they possess!"
-        ]
-        
-        # Update embed with combat progression
-        for i, event in enumerate(random.sample(massive_combat_events, 4)):
-            battle_embed.set_field_at(
-                2,  # Battle Status field
-                name="📊 Battle Status", 
-                value=f"⚡ **{event}**",
-                inline=False
-            )
-            await battle_message.edit(embed=battle_embed)
-            await asyncio.sleep(2)
-        
-        # Calculate legion powers
-        team_a_power = sum(self.calculate_battle_power(f) for f in team_a)
-        team_b_power = sum(self.calculate_battle_power(f) for f in team_b)
-        
-        # Massive coordination penalty for 10v10
-        team_a_roll = team_a_power * random.uniform(0.75, 1.25) * 0.65
-        team_b_roll = team_b_power * random.uniform(0.75, 1.25) * 0.65
-        
-        winning_team = team_a if team_a_roll > team_b_roll else team_b
-        losing_team = team_b if team_a_roll > team_b_roll else team_a
-        
-        # Apply rewards to all participants
-        winner_rewards = []
-        loser_rewards = []
-        
-        for member in winning_team:
-            winner_xp, winner_gold, item_text = await self.apply_team_rewards(member, "10v10", True)
-            winner_rewards.append(f"**{member['name']}**: +{winner_xp} XP, +{winner_gold} gold{item_text}")
-            
-        for member in losing_team:
-            loser_xp, _, item_text = await self.apply_team_rewards(member, "10v10", False)
-            loser_rewards.append(f"**{member['name']}**: +{loser_xp} XP{item_text}")
-        
-        # Update embed with final results
-        battle_embed.title = "🏆 ULTIMATE CONQUEST!"
-        battle_embed.description = f"**Legion {'Alpha' if winning_team == team_a else 'Beta'}** dominates the battlefield!"
-        battle_embed.color = discord.Color.gold()
-        
-        # Replace battle status with winner info
-        battle_embed.set_field_at(
-            2,
-            name="👑 Conquering Legion",
-            value="\n".join(winner_rewards),
-            inline=False
-        )
-        
-        # Add participants field
-        battle_embed.add_field(
-            name="⚔️ Valiant Warriors", 
-            value="\n".join(loser_rewards),
-            inline=False
-        )
-        
-        # Final update to show results
-        await battle_message.edit(embed=battle_embed)
-    
-    def calculate_battle_power(self, char):
+    async def calculate_battle_power(self, char):
         """Calculate battle power for a character"""
-        char_items = self.db.get_equipped_items(char['user_id'])
-        base_power = char['level'] * 10 + sum(item['damage'] + item['armor'] for item in char_items) + random.randint(-20, 20)
+        char_items = await self.db.get_equipped_items(char['user_id'])
+        base_power = char['level'] * 10 + sum(item['damage'] + item['armor'] for item in char_items) + self.rng.randint(-NOISE, NOISE)
         
         # Apply divine blessing bonuses
         from cogs.religion import ReligionCog
         religion_cog = self.bot.get_cog('ReligionCog')
         if religion_cog:
-            blessing_bonuses = religion_cog.get_active_blessings(char['user_id'])
+            blessing_bonuses = await religion_cog.get_active_blessings(char['user_id'])
             battle_multiplier = blessing_bonuses.get('battle_mult', 1.0)
             base_power = int(base_power * battle_multiplier)
         
         return base_power
     
-    async def apply_team_rewards(self, member, battle_type, is_winner):
-        """Apply team battle rewards and return formatted values"""
+    async def team_rewards(self, member, battle_type, is_winner, deltas, items):
+        """Roll one member's team battle rewards into deltas/items, returns display values"""
         # Base rewards by battle type
         if battle_type == "3v3":
-            base_winner_xp = random.randint(80, 180)
-            base_loser_xp = random.randint(20, 60)
-            base_winner_gold = random.randint(150, 400)
+            base_winner_xp = self.rng.randint(80, 180)
+            base_loser_xp = self.rng.randint(20, 60)
+            base_winner_gold = self.rng.randint(150, 400)
         elif battle_type == "5v5":
-            base_winner_xp = random.randint(120, 250)
-            base_loser_xp = random.randint(30, 80)
-            base_winner_gold = random.randint(200, 500)
+            base_winner_xp = self.rng.randint(120, 250)
+            base_loser_xp = self.rng.randint(30, 80)
+            base_winner_gold = self.rng.randint(200, 500)
         elif battle_type == "10v10":
-            base_winner_xp = random.randint(180, 350)
-            base_loser_xp = random.randint(45, 120)
-            base_winner_gold = random.randint(300, 700)
+            base_winner_xp = self.rng.randint(180, 350)
+            base_loser_xp = self.rng.randint(45, 120)
+            base_winner_gold = self.rng.randint(300, 700)
         
         # Get race multipliers
         from cogs.race import RaceCog
-        multipliers = RaceCog.get_race_multipliers(member['user_id'])
+        multipliers = await RaceCog.get_race_multipliers(member['user_id'], self.db)
         
         # Get divine blessing bonuses
         from cogs.religion import ReligionCog
         religion_cog = self.bot.get_cog('ReligionCog')
         if religion_cog:
-            blessing_bonuses = religion_cog.get_active_blessings(member['user_id'])
+            blessing_bonuses = await religion_cog.get_active_blessings(member['user_id'])
             # Apply blessing multipliers
             multipliers['xp_gain'] *= blessing_bonuses['xp_mult']
             multipliers['gold_find'] *= blessing_bonuses['gold_mult']
@@ -784,47 +574,34 @@ class AutoPlayCog(DiscordRPGCog):
         if is_winner:
             xp_reward = int(base_winner_xp * multipliers['xp_gain'])
             gold_reward = int(base_winner_gold * multipliers['gold_find'])
+            deltas[member['user_id']] = {'xp': xp_reward, 'money': gold_reward, 'pvpwins': 1}
         else:
             xp_reward = int(base_loser_xp * multipliers['xp_gain'])
             gold_reward = 0
-        
-        # Update character
-        char_data = self.db.get_character(member['user_id'])
-        
-        if is_winner:
-            self.db.update_character(
-                member['user_id'],
-                xp=char_data['xp'] + xp_reward,
-                money=char_data['money'] + gold_reward,
-                pvpwins=char_data['pvpwins'] + 1
-            )
-        else:
-            self.db.update_character(
-                member['user_id'],
-                xp=char_data['xp'] + xp_reward,
-                pvplosses=char_data['pvplosses'] + 1
-            )
+            deltas[member['user_id']] = {'xp': xp_reward, 'pvplosses': 1}
         
         # Item chances - winners and losers
         item_text = ""
-        if is_winner and random.random() < 0.25:  # 25% chance for winners
+        if is_winner and self.rng.random() < 0.25:  # 25% chance for winners
             item = ItemGenerator.generate_random_equipment(
                 member['user_id'],
                 max(4, member['level'] + 2),
-                member['level'] + 8
+                member['level'] + 8,
+                rng=self.rng
             )
-            self.create_item_in_db(item)
+            items.append(item)
             item_text = f"\n🎁 Found: **{item.name}**"
-        elif not is_winner and random.random() < 0.05:  # 5% chance for losers (much lower)
+        elif not is_winner and self.rng.random() < 0.05:  # 5% chance for losers (much lower)
             item = ItemGenerator.generate_random_equipment(
                 member['user_id'],
                 max(3, member['level']),
-                member['level'] + 4
+                member['level'] + 4,
+                rng=self.rng
             )
-            self.create_item_in_db(item)
+            items.append(item)
             item_text = f"\n🎁 Found: **{item.name}**"
         
-        return xp_reward, gold_reward if is_winner else 0, item_text
+        return xp_reward, gold_reward, item_text
             
     @tasks.loop(minutes=22.5)  # 50% increase in frequency (was 45 minutes)
     async def auto_events_loop(self):
@@ -836,18 +613,12 @@ class AutoPlayCog(DiscordRPGCog):
                 return
                 
             # Only affect online players
-            all_chars = self.db.fetchall("SELECT user_id, name, level, money FROM profile")
-            chars = []
-            for char in all_chars:
-                user = self.bot.get_user(char['user_id'])
-                if user and self.is_user_online(user):
-                    chars.append(char)
-                    
+            chars = await self.db.list_characters(user_ids=self.bot.presence.online_ids())
             if not chars:
-                logger.info(f"No online players for events (total chars: {len(all_chars)})")
+                logger.info(f"No online players for events ({len(self.bot.presence)} users online)")
                 return
                 
-            event_type = random.choice([
+            event_type = self.rng.choice([
                 'treasure_rain', 'monster_invasion', 'lucky_day', 'merchant_visit',
                 'blessing', 'cursed_fog', 'festival', 'dragon_attack'
             ])
@@ -856,23 +627,25 @@ class AutoPlayCog(DiscordRPGCog):
             
             if event_type == 'treasure_rain':
                 # Everyone gets bonus gold
-                bonus = random.randint(100, 500)
-                for char in chars:
-                    self.db.update_character(char['user_id'], money=char['money'] + bonus)
+                bonus = self.rng.randint(100, 500)
+                async with self.db.batch():
+                    for char in chars:
+                        await self.db.increment(char['user_id'], money=bonus)
                     
-                await channel.send(
+                self.announce(
+                    channel,
                     f"💰 **Treasure Rain!** All adventurers found {bonus} gold scattered by the wind!"
                 )
                 
             elif event_type == 'monster_invasion':
                 # Random characters get into automatic battles
                 if len(chars) >= 2:
-                    defenders = random.sample(chars, min(random.randint(2, 4), len(chars)))
-                    xp_bonus = random.randint(30, 100)
+                    defenders = self.rng.sample(chars, min(self.rng.randint(2, 4), len(chars)))
+                    xp_bonus = self.rng.randint(30, 100)
                     
-                    for char in defenders:
-                        char_data = self.db.get_character(char['user_id'])
-                        self.db.update_character(char['user_id'], xp=char_data['xp'] + xp_bonus)
+                    async with self.db.batch():
+                        for char in defenders:
+                            await self.db.increment(char['user_id'], xp=xp_bonus)
                     
                     # Create embed for monster invasion
                     invasion_embed = self.embed(
@@ -894,31 +667,34 @@ class AutoPlayCog(DiscordRPGCog):
                     )
                     
                     invasion_embed.color = discord.Color.purple()
-                    await channel.send(embed=invasion_embed)
+                    self.announce(channel, embed=invasion_embed)
                     
             elif event_type == 'lucky_day':
                 # Random character gets a rare item (could be armor!)
-                lucky_char = random.choice(chars)
+                lucky_char = self.rng.choice(chars)
                 item = ItemGenerator.generate_random_equipment(
                     lucky_char['user_id'], 
                     max(5, lucky_char['level'] + 3),  # Minimum 5 stats for lucky items
-                    lucky_char['level'] + 12
+                    lucky_char['level'] + 12,
+                    rng=self.rng
                 )
                 
-                self.create_item_in_db(item)
+                await self.create_item_in_db(item)
                 
-                await channel.send(
+                self.announce(
+                    channel,
                     f"🍀 **Lucky Day!** **{lucky_char['name']}** found a rare **{item.name}**!"
                 )
                 
             elif event_type == 'merchant_visit':
                 # Traveling merchant offers deals
-                discount = random.randint(20, 50)  # 20-50% discount
-                gold_bonus = random.randint(50, 200) 
-                selected_players = random.sample(chars, min(random.randint(3, 8), len(chars)))
+                discount = self.rng.randint(20, 50)  # 20-50% discount
+                gold_bonus = self.rng.randint(50, 200) 
+                selected_players = self.rng.sample(chars, min(self.rng.randint(3, 8), len(chars)))
                 
-                for char in selected_players:
-                    self.db.update_character(char['user_id'], money=char['money'] + gold_bonus)
+                async with self.db.batch():
+                    for char in selected_players:
+                        await self.db.increment(char['user_id'], money=gold_bonus)
                 
                 # Create embed for merchant visit
                 merchant_embed = self.embed(
@@ -940,30 +716,31 @@ class AutoPlayCog(DiscordRPGCog):
                 )
                 
                 merchant_embed.color = discord.Color.gold()
-                await channel.send(embed=merchant_embed)
+                self.announce(channel, embed=merchant_embed)
                 
             elif event_type == 'blessing':
                 # Divine blessing affects all players
-                xp_bonus = random.randint(25, 75)
-                for char in chars:
-                    char_data = self.db.get_character(char['user_id'])
-                    self.db.update_character(char['user_id'], xp=char_data['xp'] + xp_bonus)
+                xp_bonus = self.rng.randint(25, 75)
+                async with self.db.batch():
+                    for char in chars:
+                        await self.db.increment(char['user_id'], xp=xp_bonus)
                     
-                await channel.send(
+                self.announce(
+                    channel,
                     f"✨ **Divine Blessing!** The gods smile upon all adventurers! Everyone gains {xp_bonus} XP!"
                 )
                 
             elif event_type == 'cursed_fog':
                 # Cursed fog - some lose gold, some gain XP for surviving
                 if len(chars) >= 3:
-                    affected = random.sample(chars, min(random.randint(2, 6), len(chars)))
-                    survivors = random.sample(affected, max(1, len(affected) // 2))
+                    affected = self.rng.sample(chars, min(self.rng.randint(2, 6), len(chars)))
+                    survivors = self.rng.sample(affected, max(1, len(affected) // 2))
                     
                     # Survivors gain XP
-                    xp_bonus = random.randint(40, 120)
-                    for survivor in survivors:
-                        char_data = self.db.get_character(survivor['user_id'])
-                        self.db.update_character(survivor['user_id'], xp=char_data['xp'] + xp_bonus)
+                    xp_bonus = self.rng.randint(40, 120)
+                    async with self.db.batch():
+                        for survivor in survivors:
+                            await self.db.increment(survivor['user_id'], xp=xp_bonus)
                     
                     # Create embed for cursed fog
                     fog_embed = self.embed(
@@ -985,49 +762,49 @@ class AutoPlayCog(DiscordRPGCog):
                     )
                     
                     fog_embed.color = discord.Color.dark_gray()
-                    await channel.send(embed=fog_embed)
+                    self.announce(channel, embed=fog_embed)
                     
             elif event_type == 'festival':
                 # Festival - everyone gets moderate rewards
-                gold_bonus = random.randint(150, 400)
-                xp_bonus = random.randint(20, 60)
+                gold_bonus = self.rng.randint(150, 400)
+                xp_bonus = self.rng.randint(20, 60)
                 
-                for char in chars:
-                    char_data = self.db.get_character(char['user_id'])
-                    self.db.update_character(char['user_id'], 
-                                           money=char['money'] + gold_bonus,
-                                           xp=char_data['xp'] + xp_bonus)
+                async with self.db.batch():
+                    for char in chars:
+                        await self.db.increment(char['user_id'], money=gold_bonus, xp=xp_bonus)
                 
-                await channel.send(
+                self.announce(
+                    channel,
                     f"🎪 **Grand Festival!** All adventurers celebrate! Everyone gains {gold_bonus} gold and {xp_bonus} XP!"
                 )
                 
             elif event_type == 'dragon_attack':
                 # Dragon attack - high risk, high reward
                 if len(chars) >= 4:
-                    brave_heroes = random.sample(chars, min(random.randint(3, 8), len(chars)))
+                    brave_heroes = self.rng.sample(chars, min(self.rng.randint(3, 8), len(chars)))
                     
                     # High XP and gold for facing the dragon
-                    xp_reward = random.randint(80, 200)
-                    gold_reward = random.randint(300, 800)
+                    xp_reward = self.rng.randint(80, 200)
+                    gold_reward = self.rng.randint(300, 800)
                     
-                    # Chance for rare items
+                    # Chance for rare items; every hero's gold, XP and loot commit together
+                    deltas = {}
+                    loot = []
                     for hero in brave_heroes:
-                        char_data = self.db.get_character(hero['user_id'])
-                        self.db.update_character(hero['user_id'], 
-                                               money=hero['money'] + gold_reward,
-                                               xp=char_data['xp'] + xp_reward)
+                        deltas[hero['user_id']] = {'money': gold_reward, 'xp': xp_reward}
                         
                         # 30% chance for dragon-themed rare item (could be armor!)
-                        if random.random() < 0.3:
+                        if self.rng.random() < 0.3:
                             item = ItemGenerator.generate_random_equipment(
                                 hero['user_id'],
                                 max(6, hero['level'] + 4),  # High quality dragon loot
-                                hero['level'] + 15
+                                hero['level'] + 15,
+                                rng=self.rng
                             )
                             item.name = f"Dragon {item.name}"  # Dragon prefix
                             item.value *= 2  # Double value for dragon loot
-                            self.create_item_in_db(item)
+                            loot.append(item)
+                    await self.db.apply_rewards(deltas, loot)
                     
                     # Create embed showing all participants
                     dragon_embed = self.embed(
@@ -1056,202 +833,110 @@ class AutoPlayCog(DiscordRPGCog):
                     )
                     
                     dragon_embed.color = discord.Color.red()
-                    await channel.send(embed=dragon_embed)
+                    self.announce(channel, embed=dragon_embed)
         
         except Exception as e:
             logger.error(f"Error in auto_events_loop: {e}")
             
     @tasks.loop(minutes=10)  # Check for completed adventures every 10 minutes
     async def level_up_check(self):
-        """Check for completed adventures and level ups"""
+        """Settle finished adventures (level-ups are announced by announce_level_ups)"""
         try:
             channel = await self.get_game_channel()
             if not channel:
                 return
                 
-            # Check completed adventures
-            completed = self.db.fetchall(
-                """SELECT a.*, p.name FROM adventures a
-                   JOIN profile p ON a.user_id = p.user_id  
-                   WHERE a.status = 'active' AND a.finish_at <= ?""",
-                (datetime.now(),)  # Use local time instead of UTC
+            # Finished adventures settle only while their adventurer is online
+            online_completed = await self.db.get_finished_adventures(
+                datetime.now(),  # Local time, like started_at
+                self.bot.presence.online_ids()
             )
             
-            # Filter for online users only
-            online_completed = []
-            for adventure in completed:
-                user = self.bot.get_user(adventure['user_id'])
-                if user and self.is_user_online(user):
-                    online_completed.append(adventure)
-            
-            if online_completed:
-                # If multiple completions, use single embed; otherwise individual embeds
-                if len(online_completed) > 1:
-                    # Create single dynamic embed for multiple completions
-                    completion_embed = self.embed(
-                        "🏁 Adventure Returns!",
-                        "Heroes return from their quests..."
-                    )
-                    
-                    completion_list = []
-                    level_ups = []
-                    
-                    for adventure in online_completed:
-                        # Calculate rewards with race bonuses
-                        base_xp = random.randint(25, 75)
-                        base_gold = random.randint(50, 200)
-                        
-                        # Get race multipliers
-                        from cogs.race import RaceCog
-                        race_multipliers = RaceCog.get_race_multipliers(adventure['user_id'])
-                        
-                        # Apply race bonuses
-                        final_xp = int(base_xp * race_multipliers['xp_gain'])
-                        final_gold = int(base_gold * race_multipliers['gold_find'])
-                        
-                        char_data = self.db.get_character(adventure['user_id'])
-                        new_xp = char_data['xp'] + final_xp
-                        new_gold = char_data['money'] + final_gold
-                        
-                        # Check for level up
-                        old_level = char_data['level']
-                        new_level = min(50, 1 + int((new_xp / 100) ** 0.5))
-                        
-                        self.db.update_character(
-                            adventure['user_id'],
-                            xp=new_xp,
-                            money=new_gold,
-                            level=new_level,
-                            completed=char_data['completed'] + 1
-                        )
-                        
-                        # Mark adventure as completed
-                        self.db.execute(
-                            "UPDATE adventures SET status = 'completed' WHERE user_id = ? AND finish_at = ?",
-                            (adventure['user_id'], adventure['finish_at'])
-                        )
-                        
-                        # Check for item reward (could be armor!)
-                        item_bonus = ""
-                        if random.random() < 0.4:  # 40% chance
-                            item = ItemGenerator.generate_random_equipment(
-                                adventure['user_id'],
-                                max(4, new_level + 1),  # Minimum 4 stats, level-appropriate
-                                new_level + 6
-                            )
-                            self.create_item_in_db(item)
-                            item_bonus = f" + **{item.name}**"
-                        
-                        # Add to completion list
-                        completion_text = f"• **{adventure['name']}** → {final_xp} XP, {final_gold} gold{item_bonus}"
-                        completion_list.append(completion_text)
-                        
-                        # Track level ups
-                        if new_level > old_level:
-                            level_ups.append(f"🎉 **{adventure['name']}** → Level {new_level}!")
-                    
-                    self.db.commit()
-                    
-                    # Send single embed with all completions
-                    completion_embed.add_field(
-                        name=f"📋 {len(online_completed)} Adventures Completed",
-                        value="\n".join(completion_list),
-                        inline=False
-                    )
-                    
-                    if level_ups:
-                        completion_embed.add_field(
-                            name="🌟 Level Ups!",
-                            value="\n".join(level_ups),
-                            inline=False
-                        )
-                    
-                    completion_embed.add_field(
-                        name="⏱️ Status",
-                        value="All adventurers have returned successfully!",
-                        inline=False
-                    )
-                    
-                    completion_embed.color = discord.Color.green()
-                    await channel.send(embed=completion_embed)
-                else:
-                    # Single completion - use individual embed
-                    adventure = online_completed[0]
-                    
-                    # Calculate rewards with race bonuses
-                    base_xp = random.randint(25, 75)
-                    base_gold = random.randint(50, 200)
-                    
-                    # Get race multipliers
-                    from cogs.race import RaceCog
-                    race_multipliers = RaceCog.get_race_multipliers(adventure['user_id'])
-                    
-                    # Apply race bonuses
-                    final_xp = int(base_xp * race_multipliers['xp_gain'])
-                    final_gold = int(base_gold * race_multipliers['gold_find'])
-                    
-                    char_data = self.db.get_character(adventure['user_id'])
-                    new_xp = char_data['xp'] + final_xp
-                    new_gold = char_data['money'] + final_gold
-                    
-                    # Check for level up
-                    old_level = char_data['level']
-                    new_level = min(50, 1 + int((new_xp / 100) ** 0.5))
-                    
-                    self.db.update_character(
+            if not online_completed:
+                return
+                
+            # Roll every return's rewards, then settle them all in one transaction
+            from cogs.race import RaceCog
+            returns = []
+            for adventure in online_completed:
+                # Calculate rewards with race bonuses
+                base_xp = self.rng.randint(25, 75)
+                base_gold = self.rng.randint(50, 200)
+                race_multipliers = await RaceCog.get_race_multipliers(adventure['user_id'], self.db)
+                final_xp = int(base_xp * race_multipliers['xp_gain'])
+                final_gold = int(base_gold * race_multipliers['gold_find'])
+                new_level = level_for_xp(adventure['xp'] + final_xp)
+                
+                # Check for item reward (could be armor!)
+                item = None
+                if self.rng.random() < 0.4:  # 40% chance
+                    item = ItemGenerator.generate_random_equipment(
                         adventure['user_id'],
-                        xp=new_xp,
-                        money=new_gold,
-                        level=new_level,
-                        completed=char_data['completed'] + 1
-                    )
-                    
-                    # Mark adventure as completed
-                    self.db.execute(
-                        "UPDATE adventures SET status = 'completed' WHERE user_id = ? AND finish_at = ?",
-                        (adventure['user_id'], adventure['finish_at'])
-                    )
-                    
-                    # Check for item reward (could be armor!)
-                    item_text = ""
-                    if random.random() < 0.4:  # 40% chance
-                        item = ItemGenerator.generate_random_equipment(
-                            adventure['user_id'],
-                            max(4, new_level + 1),  # Minimum 4 stats, level-appropriate
-                            new_level + 6
-                        )
-                        self.create_item_in_db(item)
-                        item_text = f"\n🎁 Found: **{item.name}**"
-                    
-                    self.db.commit()
-                    
-                    # Create individual completion embed
-                    completion_embed = self.embed(
-                        f"✅ Adventure Complete!",
-                        f"**{adventure['name']}** completed their **{adventure['adventure_name']}**!"
+                        max(4, new_level + 1),  # Minimum 4 stats, level-appropriate
+                        new_level + 6,
+                        rng=self.rng
                     )
+                returns.append((adventure, final_xp, final_gold, item))
+                
+            completed = await self.db.complete_adventures([
+                (adventure['id'], adventure['user_id'],
+                 {'xp': final_xp, 'money': final_gold, 'completed': 1}, [item] if item else [])
+                for adventure, final_xp, final_gold, item in returns
+            ])
+            # Adventures settled elsewhere in the meantime (e.g. !adventure complete) aren't paid twice
+            returns = [entry for entry in returns if entry[0]['id'] in completed]
+            
+            # If multiple completions, use single embed; otherwise individual embeds
+            if len(returns) > 1:
+                # Create single dynamic embed for multiple completions
+                completion_embed = self.embed(
+                    "🏁 Adventure Returns!",
+                    "Heroes return from their quests..."
+                )
+                
+                completion_list = []
+                for adventure, final_xp, final_gold, item in returns:
+                    item_bonus = f" + **{item.name}**" if item else ""
+                    completion_list.append(f"• **{adventure['name']}** → {final_xp} XP, {final_gold} gold{item_bonus}")
+                
+                # Send single embed with all completions
+                completion_embed.add_field(
+                    name=f"📋 {len(returns)} Adventures Completed",
+                    value="\n".join(completion_list),
+                    inline=False
+                )
+                
+                completion_embed.add_field(
+                    name="⏱️ Status",
+                    value="All adventurers have returned successfully!",
+                    inline=False
+                )
+                
+                completion_embed.color = discord.Color.green()
+                self.announce(channel, embed=completion_embed, priority=Priority.EVENT)
+            elif returns:
+                # Single completion - use individual embed
+                adventure, final_xp, final_gold, item = returns[0]
+                
+                completion_embed = self.embed(
+                    f"✅ Adventure Complete!",
+                    f"**{adventure['name']}** completed their **{adventure['adventure_name']}**!"
+                )
+                completion_embed.add_field(
+                    name="💰 Rewards",
+                    value=f"{final_xp} XP, {final_gold} gold",
+                    inline=True
+                )
+                
+                if item:
                     completion_embed.add_field(
-                        name="💰 Rewards",
-                        value=f"{final_xp} XP, {final_gold} gold",
-                        inline=True
+                        name="🎁 Bonus Item",
+                        value=item.name,
+                        inline=False
                     )
                     
-                    if new_level > old_level:
-                        completion_embed.add_field(
-                            name="🎉 Level Up!",
-                            value=f"Now level {new_level}!",
-                            inline=True
-                        )
-                    
-                    if item_text:
-                        completion_embed.add_field(
-                            name="🎁 Bonus Item",
-                            value=item_text.replace("\n🎁 Found: **", "").replace("**", ""),
-                            inline=False
-                        )
-                        
-                    completion_embed.color = discord.Color.green()
-                    await channel.send(embed=completion_embed)
+                completion_embed.color = discord.Color.green()
+                self.announce(channel, embed=completion_embed, priority=Priority.EVENT)
                 
         except Exception as e:
             logger.error(f"Error in level_up_check: {e}")
@@ -1268,17 +953,17 @@ class AutoPlayCog(DiscordRPGCog):
                 return
                 
             # Check if we have 2+ characters and this is early in the game
-            char_count = len(self.db.fetchall("SELECT user_id FROM profile"))
-            completed_adventures = len(self.db.fetchall("SELECT id FROM adventures WHERE status = 'completed'"))
+            char_count = await self.db.count_characters()
+            completed_adventures = await self.db.count_adventures('completed')
             
             # Trigger if we have 2+ chars and less than 3 completed adventures (early game)
             if char_count >= 2 and completed_adventures < 3:
                 self.initial_trigger_done = True
                 
                 # Wait 30-60 seconds, then trigger first activities
-                await asyncio.sleep(random.randint(30, 60))
+                await asyncio.sleep(self.rng.randint(30, 60))
                 
-                await channel.send("🎮 **Auto-Game Starting!** The adventure begins...")
+                self.announce(channel, "🎮 **Auto-Game Starting!** The adventure begins...")
                 
                 # Trigger first adventure
                 await self.auto_adventure_loop()
@@ -1292,7 +977,7 @@ class AutoPlayCog(DiscordRPGCog):
                 # Trigger welcome event
                 await self.auto_events_loop()
                 
-                await channel.send("🤖 **Auto-play is now active!** The game will continue automatically.")
+                self.announce(channel, "🤖 **Auto-play is now active!** The game will continue automatically.")
                 
         except Exception as e:
             logger.error(f"Error in initial_activity_check: {e}")
@@ -1324,8 +1009,8 @@ class AutoPlayCog(DiscordRPGCog):
             )
             
             # Count active characters and adventures
-            total_chars = len(self.db.fetchall("SELECT user_id FROM profile"))
-            active_adventures = len(self.db.fetchall("SELECT user_id FROM adventures WHERE status = 'active'"))
+            total_chars = await self.db.count_characters()
+            active_adventures = await self.db.count_adventures('active')
             
             embed.add_field(
                 name="Statistics", 
@@ -1358,37 +1043,68 @@ class AutoPlayCog(DiscordRPGCog):
         else:
             await ctx.send("❌ Use: `!autoplay status/start/stop`")
 
-    @tasks.loop(minutes=5)  # Check every 5 minutes
-    async def level_fix_loop(self):
-        """Fix any level mismatches based on XP"""
+    @tasks.loop(seconds=30)
+    async def announce_level_ups(self):
+        """Drain the level-up queue and post one summary per game channel
+        
+        The profile triggers queue a level-up whenever any write pushes xp
+        past a threshold, so rewards, commands and batches all end up here.
+        Rows leave the queue only once their announcements are queued, so a
+        failure or restart in between announces them on a later run instead
+        of losing them.
+        """
         try:
-            # Get all characters
-            all_chars = self.db.fetchall("SELECT user_id, name, xp, level FROM profile")
-            
-            fixed_count = 0
-            for char in all_chars:
-                # Calculate what level they should be
-                correct_level = min(50, 1 + int((char['xp'] / 100) ** 0.5))
+            events = await self.db.get_level_ups()
+            if not events:
+                return
+                
+            # One line per character, from their first old level to their latest
+            climbs: Dict[int, List] = {}
+            for event in events:
+                climb = climbs.setdefault(event['user_id'], [event['name'], event['old_level'], event['new_level']])
+                climb[2] = max(climb[2], event['new_level'])
                 
-                # If level is wrong, fix it
-                if char['level'] != correct_level:
-                    self.db.update_character(char['user_id'], level=correct_level)
-                    fixed_count += 1
+            lines: Dict[int, Tuple[discord.abc.Messageable, List[str]]] = {}
+            for user_id, (name, old_level, new_level) in climbs.items():
+                gained = new_level - old_level
+                line = f"🎉 **{name}** → Level {new_level}!" + (f" (+{gained})" if gained > 1 else "")
+                for channel in await self.level_up_channels(user_id):
+                    lines.setdefault(channel.id, (channel, []))[1].append(line)
                     
-                    # Announce level fix if it's an increase
-                    if correct_level > char['level']:
-                        channel = await self.get_game_channel()
-                        if channel:
-                            await channel.send(
-                                f"🔧 **Level Correction!** {char['name']} is now level {correct_level} "
-                                f"(was {char['level']}, has {char['xp']} XP)"
-                            )
-            
-            if fixed_count > 0:
-                logger.info(f"Fixed levels for {fixed_count} characters")
+            for channel, channel_lines in lines.values():
+                shown = channel_lines[:LEVEL_UP_LINES]
+                if len(channel_lines) > LEVEL_UP_LINES:
+                    shown.append(f"*...and {len(channel_lines) - LEVEL_UP_LINES} more!*")
+                embed = self.embed("🌟 Level Ups!", "\n".join(shown))
+                embed.color = discord.Color.gold()
+                self.announce(channel, embed=embed, priority=Priority.EVENT)
+                
+            await self.db.clear_level_ups(events[-1]['id'])
                 
         except Exception as e:
-            logger.error(f"Error in level_fix_loop: {e}")
+            logger.error(f"Error in announce_level_ups: {e}")
+            
+    async def level_up_channels(self, user_id: int) -> List[discord.abc.Messageable]:
+        """Game channels of the guilds the user is online in (or shares with the bot)"""
+        guild_ids = self.bot.presence.online_guilds(user_id)
+        if not guild_ids:
+            user = self.bot.get_user(user_id)
+            guild_ids = {guild.id for guild in user.mutual_guilds} if user else set()
+        channels = [channel for channel in map(self.guild_channel, guild_ids) if channel]
+        if not channels:
+            channel = await self.get_game_channel()
+            channels = [channel] if channel else []
+        return channels
+        
+    def guild_channel(self, guild_id: int) -> Optional[discord.TextChannel]:
+        """The guild's game channel, None if it has none"""
+        channel = self.guild_channels.get(guild_id)
+        if channel is None:
+            guild = self.bot.get_guild(guild_id)
+            channel = next((c for c in guild.text_channels if c.name.lower() in GAME_CHANNEL_NAMES), None) if guild else None
+            if channel:
+                self.guild_channels[guild_id] = channel
+        return channel
 
 async def setup(bot):
     await bot.add_cog(AutoPlayCog(bot))
\ No newline at end of file
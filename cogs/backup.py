@@ -9,15 +9,21 @@ from datetime import datetime, timedelta
 from typing import Optional
 import asyncio
 import logging
+import time
 
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from bot import DiscordRPGCog
+from utils.database import HISTORY_TABLES, SQLiteRepository
 
 # Set up logging
 logger = logging.getLogger('DiscordRPG.backup')
 
+# Days history rows stay in the main database before moving to the monthly archive
+# files; ARCHIVE_AFTER_DAYS sets the default, the retired penalties ledger only keeps a week
+HISTORY_HOT_DAYS = {'penalties': 7}
+
 class BackupCog(DiscordRPGCog):
     """Database backup and management commands"""
     
@@ -33,14 +39,22 @@ class BackupCog(DiscordRPGCog):
         self.max_backups = 30  # Keep 30 days of backups
         self.max_hourly_backups = 24  # Keep 24 hourly backups
         
+        # History archival settings
+        archive_after = int(os.getenv('ARCHIVE_AFTER_DAYS', '30') or 30)
+        self.history_ages = {table: HISTORY_HOT_DAYS.get(table, archive_after) for table in HISTORY_TABLES}
+        
     async def cog_load(self):
         """Start backup tasks when cog loads"""
-        if not self.daily_backup.is_running():
-            self.daily_backup.start()
-        if not self.hourly_backup.is_running():
-            self.hourly_backup.start()
-        if not self.cleanup_old_backups.is_running():
-            self.cleanup_old_backups.start()
+        # File backups copy the SQLite file; a PostgreSQL server is backed up with pg_dump
+        if isinstance(self.db, SQLiteRepository):
+            if not self.daily_backup.is_running():
+                self.daily_backup.start()
+            if not self.hourly_backup.is_running():
+                self.hourly_backup.start()
+            if not self.cleanup_old_backups.is_running():
+                self.cleanup_old_backups.start()
+        if not self.archive_history.is_running():
+            self.archive_history.start()
     
     async def cog_unload(self):
         """Stop backup tasks when cog unloads"""
@@ -50,6 +64,8 @@ class BackupCog(DiscordRPGCog):
             self.hourly_backup.stop()
         if self.cleanup_old_backups.is_running():
             self.cleanup_old_backups.stop()
+        if self.archive_history.is_running():
+            self.archive_history.stop()
     
     def create_backup(self, backup_type: str = "manual") -> tuple[bool, str]:
         """Create a database backup
@@ -61,6 +77,8 @@ class BackupCog(DiscordRPGCog):
             tuple: (success: bool, message: str)
         """
         try:
+            if not isinstance(self.db, SQLiteRepository):
+                return False, "File backups cover the SQLite database only - back PostgreSQL up with pg_dump"
             if not os.path.exists(self.db_path):
                 return False, "Database file not found"
             
@@ -268,6 +286,16 @@ class BackupCog(DiscordRPGCog):
         except Exception as e:
             logger.error(f"Backup cleanup task error: {e}")
     
+    @tasks.loop(hours=24)
+    async def archive_history(self):
+        """Move old history rows to the monthly archive files"""
+        try:
+            moved = await self.db.archive_history(self.history_ages)
+            if moved:
+                logger.info("Archived history: " + ", ".join(f"{count} {table}" for table, count in moved.items()))
+        except Exception as e:
+            logger.error(f"History archival task error: {e}")
+    
     @daily_backup.before_loop
     async def before_daily_backup(self):
         """Wait for bot to be ready before starting daily backup"""
@@ -296,6 +324,13 @@ class BackupCog(DiscordRPGCog):
         # Start cleanup after 30 minutes
         await asyncio.sleep(1800)
     
+    @archive_history.before_loop
+    async def before_archive(self):
+        """Wait for bot to be ready before archiving"""
+        await self.bot.wait_until_ready()
+        # Start archiving after an hour, away from the startup rush
+        await asyncio.sleep(3600)
+    
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def backup(self, ctx: commands.Context):
@@ -446,6 +481,7 @@ class BackupCog(DiscordRPGCog):
         status_text.append(f"Daily backup: {'✅ Running' if self.daily_backup.is_running() else '❌ Stopped'}")
         status_text.append(f"Hourly backup: {'✅ Running' if self.hourly_backup.is_running() else '❌ Stopped'}")
         status_text.append(f"Auto cleanup: {'✅ Running' if self.cleanup_old_backups.is_running() else '❌ Stopped'}")
+        status_text.append(f"History archival: {'✅ Running' if self.archive_history.is_running() else '❌ Stopped'}")
         
         embed.add_field(
             name="🔧 Task Status",
@@ -468,5 +504,70 @@ class BackupCog(DiscordRPGCog):
         embed.color = discord.Color.blue()
         await ctx.send(embed=embed)
 
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def archive(self, ctx: commands.Context, action: Optional[str] = None):
+        """Show archived history, move old rows now with `!archive run`, or
+        `!archive compact` to let archiving shrink an older database file (Admin only)"""
+        if action == "run":
+            moved = await self.db.archive_history(self.history_ages)
+            embed = self.embed(
+                "🗄️ History Archived",
+                "\n".join(f"**{table}:** {count:,} rows" for table, count in moved.items()) or "Nothing old enough to move."
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        if action == "compact":
+            await ctx.send("🗜️ Rewriting the database file - writes wait until it finishes...")
+            started = time.perf_counter()
+            size_before = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+            if not await self.db.enable_incremental_vacuum():
+                await ctx.send("ℹ️ Incremental vacuum is already enabled - `!archive run` frees space as it goes.")
+                return
+            size_after = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+            await ctx.send(embed=self.embed(
+                "🗜️ Database Compacted",
+                f"Incremental vacuum enabled in {time.perf_counter() - started:.1f}s\n"
+                f"**Size:** {size_before / (1024 * 1024):.1f}MB → {size_after / (1024 * 1024):.1f}MB"
+            ))
+            return
+        
+        totals = {}
+        for row in await self.db.get_history_rollups():
+            months, entries = totals.get(row['table_name'], (set(), 0))
+            months.add(row['month'])
+            totals[row['table_name']] = (months, entries + row['entries'])
+        
+        embed = self.embed("🗄️ History Archive", "Rows moved out of the main database, per table")
+        embed.add_field(
+            name="📦 Archived",
+            value="\n".join(f"**{table}:** {entries:,} rows in {len(months)} months ({min(months)} to {max(months)})"
+                            for table, (months, entries) in sorted(totals.items())) or "Nothing archived yet.",
+            inline=False
+        )
+        embed.add_field(
+            name="⏳ Kept in the main database",
+            value="\n".join(f"**{table}:** {days} days" for table, days in self.history_ages.items()),
+            inline=True
+        )
+        if self.db.archive_dir and os.path.isdir(self.db.archive_dir):
+            files = [os.path.join(self.db.archive_dir, name) for name in os.listdir(self.db.archive_dir)]
+            embed.add_field(
+                name="💾 Files",
+                value=f"**{len(files)}** files, {sum(os.path.getsize(f) for f in files) / (1024 * 1024):.1f}MB\n"
+                      f"**Location:** `{os.path.basename(self.db.archive_dir)}/`",
+                inline=True
+            )
+        if not await self.db.incremental_vacuum_enabled():
+            embed.add_field(
+                name="🗜️ Free Space",
+                value="Archived rows leave free pages inside the file. Run `!archive compact` once "
+                      "(a full rewrite that pauses writes) so later runs can shrink it.",
+                inline=False
+            )
+        embed.set_footer(text="Use !archive run to archive now")
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(BackupCog(bot))
\ No newline at end of file
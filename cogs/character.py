@@ -4,6 +4,7 @@ from discord.ext import commands
 from typing import Optional
 import random
 import asyncio
+import time
 from datetime import datetime
 
 import sys
@@ -22,7 +23,7 @@ class CharacterCog(DiscordRPGCog):
     async def create(self, ctx: commands.Context, *, name: str = None):
         """Create a new character and start playing DiscordRPG"""
         # Check if user already has character
-        if self.db.get_character(ctx.author.id):
+        if await self.db.get_character(ctx.author.id):
             await ctx.send("❌ You already have a character! Use `!profile` to view it.")
             return
             
@@ -50,7 +51,7 @@ class CharacterCog(DiscordRPGCog):
             return
             
         # Create character
-        success = self.db.create_character(ctx.author.id, name)
+        success = await self.db.create_character(ctx.author.id, name)
         if not success:
             await ctx.send("❌ Failed to create character. Please try again.")
             return
@@ -63,13 +64,13 @@ class CharacterCog(DiscordRPGCog):
             item_type=ItemType.SWORD
         )
         sword.name = "Starter Sword"
-        sword_id = self.db.create_item(
+        sword_id = await self.db.create_item(
             ctx.author.id, sword.name, sword.type.value,
             sword.value, sword.damage, sword.armor, sword.hand.value,
             sword.health_bonus, sword.speed_bonus, sword.luck_bonus,
             sword.crit_bonus, sword.magic_bonus, sword.slot_type
         )
-        self.db.equip_item(sword_id, ctx.author.id)
+        await self.db.equip_item(sword_id, ctx.author.id)
         
         shield = ItemGenerator.generate_item(
             ctx.author.id,
@@ -78,13 +79,13 @@ class CharacterCog(DiscordRPGCog):
             item_type=ItemType.SHIELD
         )
         shield.name = "Starter Shield"
-        shield_id = self.db.create_item(
+        shield_id = await self.db.create_item(
             ctx.author.id, shield.name, shield.type.value,
             shield.value, shield.damage, shield.armor, shield.hand.value,
             shield.health_bonus, shield.speed_bonus, shield.luck_bonus,
             shield.crit_bonus, shield.magic_bonus, shield.slot_type
         )
-        self.db.equip_item(shield_id, ctx.author.id)
+        await self.db.equip_item(shield_id, ctx.author.id)
         
         # Send success message
         embed = self.embed(
@@ -104,29 +105,40 @@ class CharacterCog(DiscordRPGCog):
         """View your character profile"""
         user = user or ctx.author
         
-        # Get character data
-        char_data = self.db.get_character(user.id)
-        if not char_data:
-            if user == ctx.author:
-                await ctx.send("❌ You don't have a character! Use `!create` to make one.")
-            else:
-                await ctx.send(f"❌ {user.name} doesn't have a character!")
-            return
+        # Rebuilt only after a write to the user's profile, gear or blessings
+        version = self.db.version(user.id)
+        embed = self.bot.render_cache.get('profile', user.id, version)
+        if embed is None:
+            now = datetime.now()
+            char_data = await self.db.get_profile_snapshot(user.id, now)
+            if not char_data:
+                if user == ctx.author:
+                    await ctx.send("❌ You don't have a character! Use `!create` to make one.")
+                else:
+                    await ctx.send(f"❌ {user.name} doesn't have a character!")
+                return
+                
+            embed = self.build_profile_embed(char_data, now)
+            # Blessing countdowns are shown in minutes
+            self.bot.render_cache.put('profile', user.id, version, embed,
+                                      ttl=60 if char_data['blessings'] else None)
             
-        # Get equipped items
-        items = self.db.get_equipped_items(user.id)
-        total_damage = sum(item['damage'] for item in items)
-        total_armor = sum(item['armor'] for item in items)
-        
-        # Calculate armor bonuses
-        total_health_bonus = sum(item.get('health_bonus', 0) for item in items)
-        total_speed_bonus = sum(item.get('speed_bonus', 0) for item in items)
-        total_luck_bonus = sum(item.get('luck_bonus', 0.0) for item in items)
-        total_crit_bonus = sum(item.get('crit_bonus', 0.0) for item in items)
-        total_magic_bonus = sum(item.get('magic_bonus', 0) for item in items)
+        embed.set_thumbnail(url=user.display_avatar.url)
+        await ctx.send(embed=embed)
+        
+    def build_profile_embed(self, char_data: dict, now: datetime) -> discord.Embed:
+        """Profile embed (without the avatar thumbnail) from a Database.get_profile_snapshot() row"""
+        # Equipped item totals come from the snapshot's aggregate
+        total_damage = char_data['total_damage']
+        total_armor = char_data['total_armor']
+        total_health_bonus = char_data['total_health_bonus']
+        total_speed_bonus = char_data['total_speed_bonus']
+        total_luck_bonus = char_data['total_luck_bonus']
+        total_crit_bonus = char_data['total_crit_bonus']
+        total_magic_bonus = char_data['total_magic_bonus']
         
         # Create character object for calculations
-        char = Character(user.id, char_data['name'])
+        char = Character(char_data['user_id'], char_data['name'])
         char.level = char_data['level']
         char.char_class = CharacterClass(char_data['class'])
         char.race = Race(char_data['race'])
@@ -136,7 +148,6 @@ class CharacterCog(DiscordRPGCog):
         
         # Build profile embed
         embed = self.embed(f"{char_data['name']}'s Profile")
-        embed.set_thumbnail(url=user.display_avatar.url)
         
         # Basic info
         embed.add_field(
@@ -204,10 +215,8 @@ class CharacterCog(DiscordRPGCog):
         social_info = []
         if char_data['marriage']:
             social_info.append(f"💑 Married")
-        if char_data['guild']:
-            guild = self.db.get_guild(char_data['guild'])
-            if guild:
-                social_info.append(f"🏰 Guild: {guild['name']}")
+        if char_data['guild_name']:
+            social_info.append(f"🏰 Guild: {char_data['guild_name']}")
         if char_data['god']:
             social_info.append(f"🙏 Following: {char_data['god']}")
             
@@ -219,27 +228,18 @@ class CharacterCog(DiscordRPGCog):
             )
             
         # Active divine blessings
-        from cogs.religion import ReligionCog
-        religion_cog = self.bot.get_cog('ReligionCog')
-        if religion_cog:
-            blessing_bonuses = religion_cog.get_active_blessings(user.id)
-            active_blessings = self.db.fetchall(
-                "SELECT * FROM divine_blessings WHERE user_id = ? AND expires_at > ?",
-                (user.id, datetime.now())
-            )
+        if char_data['blessings']:
+            blessing_text = []
+            for blessing in char_data['blessings'][:3]:  # Show max 3 blessings
+                time_left = datetime.fromisoformat(blessing['expires_at']) - now
+                minutes_left = max(0, int(time_left.total_seconds() // 60))
+                blessing_text.append(f"✨ {blessing['blessing_name']} ({minutes_left}m)")
             
-            if active_blessings:
-                blessing_text = []
-                for blessing in active_blessings[:3]:  # Show max 3 blessings
-                    time_left = datetime.fromisoformat(blessing['expires_at']) - datetime.now()
-                    minutes_left = max(0, int(time_left.total_seconds() // 60))
-                    blessing_text.append(f"✨ {blessing['blessing_name']} ({minutes_left}m)")
-                
-                embed.add_field(
-                    name="🙏 Divine Blessings",
-                    value="\n".join(blessing_text) if blessing_text else "None active",
-                    inline=True
-                )
+            embed.add_field(
+                name="🙏 Divine Blessings",
+                value="\n".join(blessing_text),
+                inline=True
+            )
             
         # Progress
         embed.add_field(
@@ -258,15 +258,13 @@ class CharacterCog(DiscordRPGCog):
             )
             
         embed.color = discord.Color(char_data['colour'] or 0x000000)
-        # Remove broken image - just use avatar thumbnail
-            
-        await ctx.send(embed=embed)
+        return embed
         
     @commands.command()
     @has_character()
     async def evolve(self, ctx: commands.Context):
         """Evolve your class (available at levels 5, 10, 15, 20, 25, 30)"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         char = Character(ctx.author.id, char_data['name'])
         char.level = char_data['level']
@@ -347,7 +345,7 @@ class CharacterCog(DiscordRPGCog):
         old_class_name = char.char_class.value
         
         # Update class
-        self.db.update_character(ctx.author.id, **{"class": new_class.value})
+        await self.db.update_character(ctx.author.id, **{"class": new_class.value})
         
         # Add debug logging
         import logging
@@ -365,7 +363,7 @@ class CharacterCog(DiscordRPGCog):
     @has_character()
     async def changerace(self, ctx: commands.Context):
         """Change your race (costs 1 reset point)"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         if char_data['reset_points'] <= 0:
             await ctx.send("❌ You don't have any reset points left!")
@@ -400,7 +398,7 @@ class CharacterCog(DiscordRPGCog):
             return
             
         # Update race and deduct reset point
-        self.db.update_character(
+        await self.db.update_character(
             ctx.author.id, 
             race=new_race.value,
             reset_points=char_data['reset_points'] - 1
@@ -424,14 +422,14 @@ class CharacterCog(DiscordRPGCog):
             await ctx.send("❌ Description must be 200 characters or less!")
             return
             
-        self.db.update_character(ctx.author.id, description=desc)
+        await self.db.update_character(ctx.author.id, description=desc)
         await ctx.send("✅ Character description updated!")
         
     @commands.command(aliases=["classstats", "classinfo"])
     @has_character()
     async def classbonuses(self, ctx: commands.Context, *, class_name: str = None):
         """View your current class bonuses or bonuses for a specific class"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         if class_name:
             # Try to find the class by name
@@ -621,7 +619,7 @@ class CharacterCog(DiscordRPGCog):
             await ctx.send("❌ Please provide a valid image URL!")
             return
             
-        self.db.update_character(ctx.author.id, background=url)
+        await self.db.update_character(ctx.author.id, background=url)
         await ctx.send("✅ Profile background updated!")
         
     @commands.command()
@@ -644,7 +642,7 @@ class CharacterCog(DiscordRPGCog):
             await ctx.send("❌ Invalid color code! Use hex format like #FF6B6B")
             return
             
-        self.db.update_character(ctx.author.id, colour=color_int)
+        await self.db.update_character(ctx.author.id, colour=color_int)
         
         embed = discord.Embed(
             title="✅ Color Updated",
@@ -656,56 +654,90 @@ class CharacterCog(DiscordRPGCog):
     @commands.command()
     async def online(self, ctx: commands.Context):
         """Show online players and their status"""
-        all_chars = self.db.fetchall("SELECT user_id, name, level FROM profile ORDER BY level DESC")
-        
-        online_players = []
-        offline_players = []
-        
-        for char in all_chars:
-            user = self.bot.get_user(char['user_id'])
-            if user:
-                # Check status in all guilds
-                is_online = False
-                for guild in self.bot.guilds:
-                    member = guild.get_member(user.id)
-                    if member:
-                        if member.status == discord.Status.online:
-                            is_online = True
-                            online_players.append((char, "🟢 Online"))
-                        elif member.status == discord.Status.idle:
-                            offline_players.append((char, "🟡 Idle (No Progress)"))
-                        elif member.status == discord.Status.dnd:
-                            offline_players.append((char, "🔴 DND (No Progress)"))
-                        else:
-                            offline_players.append((char, "⚫ Offline (No Progress)"))
-                        break
-                        
+        presence = self.bot.presence
+        online_chars = await self.db.list_characters(user_ids=presence.online_ids())
+        inactive_count = await self.db.count_characters() - len(online_chars)
+        
         embed = self.embed("👥 Player Status", "Only **ONLINE** (🟢) players progress!")
         
-        # Online players
-        if online_players:
+        # Online players, with how long their current session has run
+        if online_chars:
+            now = time.time()
             online_text = []
-            for char, status in online_players[:10]:  # Show max 10
-                online_text.append(f"{status} **{char['name']}** (Lv.{char['level']})")
+            for char in online_chars[:10]:  # Show max 10
+                session = format_hours(now - presence.online_since(char['user_id']))
+                online_text.append(f"🟢 Online **{char['name']}** (Lv.{char['level']}) · {session}")
             embed.add_field(
-                name=f"🎮 Active Players ({len(online_players)})",
+                name=f"🎮 Active Players ({len(online_chars)})",
                 value="\n".join(online_text),
                 inline=False
             )
             
-        # Offline/inactive
-        if offline_players:
+        # Offline/inactive - only the shown players' statuses are looked up
+        if inactive_count > 0:
             offline_text = []
-            for char, status in offline_players[:10]:  # Show max 10
-                offline_text.append(f"{status} {char['name']} (Lv.{char['level']})")
-            embed.add_field(
-                name=f"💤 Inactive Players ({len(offline_players)})",
-                value="\n".join(offline_text),
-                inline=False
-            )
+            for char in await self.db.list_characters():
+                if len(offline_text) >= 10:  # Show max 10
+                    break
+                if presence.is_online(char['user_id']):
+                    continue
+                status = self.member_status(char['user_id'])
+                if status is None:
+                    continue
+                if status == discord.Status.idle:
+                    label = "🟡 Idle (No Progress)"
+                elif status == discord.Status.dnd:
+                    label = "🔴 DND (No Progress)"
+                else:
+                    label = "⚫ Offline (No Progress)"
+                offline_text.append(f"{label} {char['name']} (Lv.{char['level']})")
+            if offline_text:
+                embed.add_field(
+                    name=f"💤 Inactive Players ({inactive_count})",
+                    value="\n".join(offline_text),
+                    inline=False
+                )
             
         embed.set_footer(text="Set your status to Online to participate!")
         await ctx.send(embed=embed)
+        
+    def member_status(self, user_id: int) -> Optional[discord.Status]:
+        """The user's status in the first guild that has them cached"""
+        for guild in self.bot.guilds:
+            member = guild.get_member(user_id)
+            if member:
+                return member.status
+        return None
+        
+    @commands.command(aliases=["onlinetime"])
+    async def playtime(self, ctx: commands.Context, user: Optional[discord.User] = None):
+        """Hours spent online (and progressing) today and over the last week"""
+        user = user or ctx.author
+        presence = self.bot.presence
+        now = time.time()
+        day_start = now - now % 86400  # UTC midnight
+        
+        today = await presence.online_seconds(user.id, day_start, now)
+        week = await presence.online_seconds(user.id, now - 7 * 86400, now)
+        
+        embed = self.embed(f"⏱️ {user.display_name}'s Playtime")
+        embed.add_field(name="Today (UTC)", value=format_hours(today), inline=True)
+        embed.add_field(name="Last 7 Days", value=format_hours(week), inline=True)
+        if presence.is_online(user.id):
+            embed.add_field(
+                name="Current Session",
+                value=f"🟢 {format_hours(now - presence.online_since(user.id))}",
+                inline=True
+            )
+        else:
+            embed.add_field(name="Current Session", value="⚫ Not online", inline=True)
+        await ctx.send(embed=embed)
+        
+
+def format_hours(seconds: float) -> str:
+    """Duration as '2h 05m'"""
+    minutes = int(seconds // 60)
+    return f"{minutes // 60}h {minutes % 60:02d}m"
 
 async def setup(bot):
     await bot.add_cog(CharacterCog(bot))
\ No newline at end of file
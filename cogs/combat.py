@@ -4,7 +4,7 @@ from discord.ext import commands, tasks
 import random
 import asyncio
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterable
 
 import sys
 import os
@@ -12,6 +12,17 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from bot import DiscordRPGCog, has_character
 from classes.character import Character, CharacterClass, Race
+from classes.odds import TEAM_BATTLES, battle_profile, bet_cap, duel, duel_odds, team_odds
+from classes.tournament import Tournament, TournamentFormat, ROUND_ROBIN_MAX_ENTRANTS
+
+FORMAT_NAMES = {
+    TournamentFormat.SINGLE_ELIMINATION: "Single Elimination",
+    TournamentFormat.SWISS: "Swiss",
+    TournamentFormat.ROUND_ROBIN: "Round Robin",
+}
+
+# Rounds with more matches than this are summarised instead of listed
+DETAILED_MATCHES = 4
 
 class CombatCog(DiscordRPGCog):
     """Combat and battle commands"""
@@ -29,18 +40,27 @@ class CombatCog(DiscordRPGCog):
             return
             
         # Check if opponent has character
-        opponent_data = self.db.get_character(opponent.id)
+        opponent_data = await self.db.get_character(opponent.id)
         if not opponent_data:
             await ctx.send("❌ Your opponent doesn't have a character!")
             return
             
-        attacker_data = self.db.get_character(ctx.author.id)
+        attacker_data = await self.db.get_character(ctx.author.id)
+        
+        powers = await self.battle_powers([ctx.author.id, opponent.id])
+        win_chance = duel_odds(powers[ctx.author.id], powers[opponent.id])
         
         # Check betting
         if bet > 0:
             if bet > attacker_data['money'] or bet > opponent_data['money']:
                 await ctx.send("❌ One of you doesn't have enough money for this bet!")
                 return
+            # Lopsided matchups can't be farmed for gold
+            max_bet = bet_cap(win_chance, min(attacker_data['money'], opponent_data['money']))
+            if bet > max_bet:
+                await ctx.send(f"❌ Bet too high for this matchup! With odds of {win_chance:.0%} - {1 - win_chance:.0%} "
+                               f"the most you can bet is {max_bet:,} gold. See `!odds {opponent.display_name}`.")
+                return
                 
         # Send challenge
         embed = self.embed(
@@ -49,6 +69,11 @@ class CombatCog(DiscordRPGCog):
         )
         if bet > 0:
             embed.add_field(name="💰 Bet", value=f"{bet:,} gold", inline=True)
+        embed.add_field(
+            name="🎲 Odds",
+            value=f"{ctx.author.display_name}: {win_chance:.0%}\n{opponent.display_name}: {1 - win_chance:.0%}",
+            inline=True
+        )
         embed.add_field(name="React", value="✅ to accept, ❌ to decline", inline=False)
         
         challenge_msg = await ctx.send(embed=embed)
@@ -71,41 +96,33 @@ class CombatCog(DiscordRPGCog):
             
         await challenge_msg.delete()
         
-        # Calculate battle stats
-        attacker_stats = self.calculate_battle_power(ctx.author.id)
-        defender_stats = self.calculate_battle_power(opponent.id)
-        
+        # Calculate battle stats (again - gear may have changed while the challenge was open)
+        powers = await self.battle_powers([ctx.author.id, opponent.id])
+        if len(powers) < 2:
+            await ctx.send("❌ Battle cancelled - a fighter no longer has a character!")
+            return
+        attacker_stats = powers[ctx.author.id]
+        defender_stats = powers[opponent.id]
+
+        # Balances and the cap may have moved while the challenge was open
+        if bet > 0:
+            balance = min([(await self.db.get_character(user_id))['money'] for user_id in powers])
+            win_chance = duel_odds(attacker_stats, defender_stats)
+            if bet > bet_cap(win_chance, balance):
+                await ctx.send("❌ Battle cancelled - the bet no longer fits both fighters' gold and odds!")
+                return
+
         # Battle simulation
         winner, battle_log = self.simulate_battle(
             (ctx.author, attacker_stats),
             (opponent, defender_stats)
         )
-        
-        # Apply results
-        if bet > 0:
-            if winner == ctx.author:
-                self.db.update_character(ctx.author.id, money=attacker_data['money'] + bet)
-                self.db.update_character(opponent.id, money=opponent_data['money'] - bet)
-            else:
-                self.db.update_character(ctx.author.id, money=attacker_data['money'] - bet) 
-                self.db.update_character(opponent.id, money=opponent_data['money'] + bet)
-                
-        # Update PvP stats
-        if winner == ctx.author:
-            self.db.update_character(ctx.author.id, pvpwins=attacker_data['pvpwins'] + 1)
-            self.db.update_character(opponent.id, pvplosses=opponent_data['pvplosses'] + 1)
-        else:
-            self.db.update_character(ctx.author.id, pvplosses=attacker_data['pvplosses'] + 1)
-            self.db.update_character(opponent.id, pvpwins=opponent_data['pvpwins'] + 1)
-            
-        # Log battle
-        self.db.execute(
-            """INSERT INTO battle_logs (attacker, defender, winner, battle_type, money_stolen) 
-               VALUES (?, ?, ?, ?, ?)""",
-            (ctx.author.id, opponent.id, winner.id, "pvp", bet)
-        )
-        self.db.commit()
-        
+
+        # Move the bet, update PvP stats and log the battle in one transaction
+        if not await self.db.settle_battle(ctx.author.id, opponent.id, winner.id, bet):
+            await ctx.send("❌ Battle cancelled - the loser can no longer cover the bet!")
+            return
+
         # Send results
         embed = self.embed(
             f"⚔️ Battle Results",
@@ -142,7 +159,7 @@ class CombatCog(DiscordRPGCog):
             await ctx.send("❌ Cannot battle bots or yourself!")
             return
             
-        opponent_data = self.db.get_character(opponent.id)
+        opponent_data = await self.db.get_character(opponent.id)
         if not opponent_data:
             await ctx.send("❌ Your opponent doesn't have a character!")
             return
@@ -175,8 +192,8 @@ class CombatCog(DiscordRPGCog):
         await challenge_msg.delete()
         
         # Initialize battle
-        attacker_power = self.calculate_battle_power(ctx.author.id)
-        defender_power = self.calculate_battle_power(opponent.id)
+        attacker_power = await self.calculate_battle_power(ctx.author.id)
+        defender_power = await self.calculate_battle_power(opponent.id)
         
         attacker_hp = 100
         defender_hp = 100
@@ -275,11 +292,8 @@ class CombatCog(DiscordRPGCog):
         loser = opponent if winner == ctx.author else ctx.author
         
         # Update stats
-        winner_data = self.db.get_character(winner.id)
-        loser_data = self.db.get_character(loser.id)
-        
-        self.db.update_character(winner.id, pvpwins=winner_data['pvpwins'] + 1)
-        self.db.update_character(loser.id, pvplosses=loser_data['pvplosses'] + 1)
+        await self.db.increment(winner.id, pvpwins=1)
+        await self.db.increment(loser.id, pvplosses=1)
         
         # Final results
         embed = self.embed(
@@ -297,9 +311,14 @@ class CombatCog(DiscordRPGCog):
         
     @commands.command()
     @has_character()
-    async def tournament(self, ctx: commands.Context, prize: int = 1000):
-        """Start a tournament (minimum 4 players)"""
-        char_data = self.db.get_character(ctx.author.id)
+    async def tournament(self, ctx: commands.Context, prize: int = 1000, tournament_format: str = "single"):
+        """Start a tournament (minimum 4 players) - single, swiss or roundrobin"""
+        fmt = TournamentFormat.parse(tournament_format)
+        if fmt is None:
+            await ctx.send("❌ Unknown format! Choose `single`, `swiss` or `roundrobin`.")
+            return
+            
+        char_data = await self.db.get_character(ctx.author.id)
         
         if prize > char_data['money']:
             await ctx.send("❌ You don't have enough money to host this tournament!")
@@ -314,6 +333,7 @@ class CombatCog(DiscordRPGCog):
             "🏆 Tournament Starting!",
             f"**Prize Pool: {prize:,} gold**\n\nHosted by {ctx.author.mention}"
         )
+        embed.add_field(name="📐 Format", value=FORMAT_NAMES[fmt], inline=True)
         embed.add_field(
             name="📋 How to Join",
             value="React with 🏆 to join!\nMinimum 4 players needed.\nSignup closes in 2 minutes.",
@@ -328,122 +348,213 @@ class CombatCog(DiscordRPGCog):
         
         # Get participants
         signup_msg = await ctx.channel.fetch_message(signup_msg.id)
-        participants = []
+        users: Dict[int, discord.abc.User] = {}
         
         for reaction in signup_msg.reactions:
             if str(reaction.emoji) == "🏆":
                 async for user in reaction.users():
-                    if not user.bot and self.db.get_character(user.id):
-                        participants.append(user)
+                    if not user.bot:
+                        users[user.id] = user
                         
-        if len(participants) < 4:
+        # Every entrant's power is taken once, up front; the bracket never touches the database
+        powers = await self.battle_powers(users)
+        if len(powers) < 4:
             await ctx.send("❌ Not enough participants! Need at least 4 players.")
             return
+        if fmt == TournamentFormat.ROUND_ROBIN and len(powers) > ROUND_ROBIN_MAX_ENTRANTS:
+            await ctx.send(f"❌ Round robin is limited to {ROUND_ROBIN_MAX_ENTRANTS} players - "
+                           f"{len(powers)} signed up. Try `swiss` instead!")
+            return
             
-        # Deduct prize from host
-        self.db.update_character(ctx.author.id, money=char_data['money'] - prize)
-        
-        # Tournament bracket
-        random.shuffle(participants)
-        round_num = 1
-        
-        await ctx.send(f"🏆 Tournament begins with {len(participants)} participants!")
+        rng = self.bot.rng.stream('tournaments', ctx.guild.id if ctx.guild else None)
+        seeds = list(powers)
+        rng.shuffle(seeds)
         
-        while len(participants) > 1:
-            await ctx.send(f"\n**🥊 ROUND {round_num}**")
-            next_round = []
-            
-            for i in range(0, len(participants), 2):
-                if i + 1 < len(participants):
-                    p1, p2 = participants[i], participants[i + 1]
-                    
-                    # Quick battle
-                    p1_power = self.calculate_battle_power(p1.id)
-                    p2_power = self.calculate_battle_power(p2.id)
-                    
-                    winner, _ = self.simulate_battle((p1, p1_power), (p2, p2_power))
-                    next_round.append(winner)
-                    
-                    await ctx.send(f"⚔️ {p1.mention} vs {p2.mention} → **{winner.mention}** wins!")
-                    await asyncio.sleep(2)
-                else:
-                    # Bye
-                    next_round.append(participants[i])
-                    await ctx.send(f"🏃 {participants[i].mention} advances (bye)")
-                    
-            participants = next_round
-            round_num += 1
+        # Deduct prize from host
+        tournament_id = await self.db.create_tournament(ctx.author.id, prize, seeds)
+        if tournament_id is None:
+            await ctx.send("❌ You no longer have enough money to host this tournament!")
+            return
             
-        # Tournament winner
-        champion = participants[0]
-        champion_data = self.db.get_character(champion.id)
+        bracket = Tournament({user_id: powers[user_id] for user_id in seeds}, fmt, rng)
+        champion_id = bracket.run()
         
         # Award prize
-        self.db.update_character(champion.id, money=champion_data['money'] + prize)
+        await self.db.finish_tournament(tournament_id, champion_id, prize)
         
+        names = {user_id: users[user_id].display_name for user_id in seeds}
+        await ctx.send(embed=self.tournament_summary(bracket, names, users[champion_id], prize))
+        
+    def tournament_summary(self, bracket: Tournament, names: Dict[int, str],
+                           champion: discord.abc.User, prize: int) -> discord.Embed:
+        """Round-by-round results of a finished tournament in one embed
+        
+        Rounds of up to DETAILED_MATCHES matches list every result; bigger ones
+        are summed up as match and upset counts.
+        """
         embed = self.embed(
             "🏆 TOURNAMENT CHAMPION!",
-            f"**{champion.mention}** wins the tournament!"
+            f"**{champion.mention}** wins the {FORMAT_NAMES[bracket.format].lower()} tournament "
+            f"of {len(bracket.seeds)} players!"
         )
         embed.add_field(name="💰 Prize", value=f"{prize:,} gold", inline=True)
         embed.add_field(name="🎖️ Glory", value="Tournament Victor!", inline=True)
         
-        await ctx.send(embed=embed)
-        
-    def calculate_battle_power(self, user_id: int) -> int:
-        """Calculate total battle power for a user"""
-        char_data = self.db.get_character(user_id)
-        items = self.db.get_equipped_items(user_id)
-        
-        # Base stats from character
-        base_power = char_data['level'] * 5
-        
-        # Equipment bonuses (including new armor stats)
-        equipment_power = sum(item['damage'] + item['armor'] for item in items)
-        
-        # Add armor bonuses to combat power
-        health_bonus = sum(item.get('health_bonus', 0) for item in items)
-        speed_bonus = sum(item.get('speed_bonus', 0) for item in items) 
-        luck_bonus = sum(item.get('luck_bonus', 0.0) for item in items)
-        crit_bonus = sum(item.get('crit_bonus', 0.0) for item in items)
-        magic_bonus = sum(item.get('magic_bonus', 0) for item in items)
+        if bracket.format == TournamentFormat.ROUND_ROBIN:
+            played = [match for matches in bracket.rounds for match in matches if match[1] is not None]
+            embed.add_field(
+                name="📅 Schedule",
+                value=f"{len(bracket.rounds)} rounds · {len(played)} matches · {bracket.upsets(played)} upsets",
+                inline=False
+            )
+        else:
+            for number, matches in enumerate(bracket.rounds, 1):
+                embed.add_field(
+                    name=f"🥊 {self.round_name(bracket, number)}",
+                    value=self.round_results(bracket, matches, names),
+                    inline=False
+                )
+                
+        if bracket.format != TournamentFormat.SINGLE_ELIMINATION:
+            lines = [
+                f"{place}. **{names[user_id]}** {bracket.wins[user_id]}-{bracket.losses[user_id]}"
+                for place, user_id in enumerate(bracket.standings()[:8], 1)
+            ]
+            embed.add_field(name="📊 Standings", value="\n".join(lines), inline=False)
+            
+        return embed
+        
+    @staticmethod
+    def round_name(bracket: Tournament, number: int) -> str:
+        if bracket.format == TournamentFormat.SINGLE_ELIMINATION:
+            remaining = len(bracket.rounds) - number
+            if remaining < 3:
+                return ("Final", "Semifinals", "Quarterfinals")[remaining]
+        return f"Round {number}"
+        
+    @staticmethod
+    def round_results(bracket: Tournament, matches: List[tuple], names: Dict[int, str]) -> str:
+        played = [match for match in matches if match[1] is not None]
+        byes = len(matches) - len(played)
+        if len(played) > DETAILED_MATCHES:
+            text = f"{len(played)} matches · {bracket.upsets(played)} upsets"
+            return text + (f" · {byes} byes" if byes else "")
+            
+        lines = []
+        for first, second, winner in matches:
+            if second is None:
+                lines.append(f"🏃 {names[first]} advances (bye)")
+            else:
+                loser = second if winner == first else first
+                lines.append(f"⚔️ **{names[winner]}** def. {names[loser]}")
+        return "\n".join(lines)
+        
+    @commands.command(aliases=["chances"])
+    async def odds(self, ctx: commands.Context, *, matchup: str):
+        """Win chances of a duel or team battle
+        
+        `!odds @user` - you against them in a `!battle`
+        `!odds @a vs @b` - any two players
+        `!odds @a @b @c vs @d @e @f` - a 3v3, 5v5 or 10v10 auto battle
+        """
+        tokens = matchup.split()
+        separators = [i for i, token in enumerate(tokens) if token.lower() == "vs"]
+        if len(separators) > 1:
+            await ctx.send("❌ Use `vs` once, between the two sides!")
+            return
         
-        # Add armor bonuses to total power
-        equipment_power += health_bonus + speed_bonus + int(luck_bonus * 100) + int(crit_bonus * 100) + magic_bonus
+        converter = commands.UserConverter()
+        sides: List[List[discord.abc.User]] = [[], []]
+        try:
+            if separators:
+                split = separators[0]
+                sides[0] = [await converter.convert(ctx, token) for token in tokens[:split]]
+                sides[1] = [await converter.convert(ctx, token) for token in tokens[split + 1:]]
+            else:
+                sides[0] = [ctx.author]
+                sides[1] = [await converter.convert(ctx, token) for token in tokens]
+        except commands.BadArgument as e:
+            await ctx.send(f"❌ {e}")
+            return
+            
+        size = len(sides[0])
+        battle_type = f"{size}v{size}"
+        if size != len(sides[1]) or (size != 1 and battle_type not in TEAM_BATTLES):
+            await ctx.send(f"❌ Sides must be 1v1 or {', '.join(TEAM_BATTLES)}!")
+            return
+        user_ids = [user.id for side in sides for user in side]
+        if len(set(user_ids)) != len(user_ids):
+            await ctx.send("❌ Every fighter can only appear once!")
+            return
+            
+        stats = {row['user_id']: row for row in await self.db.get_battle_stats(user_ids, datetime.now())}
+        missing = [user.display_name for side in sides for user in side if user.id not in stats]
+        if missing:
+            await ctx.send(f"❌ No character: {', '.join(missing)}")
+            return
         
-        # Class bonuses (simplified)
-        class_bonus = char_data['level'] * 2
+        if size == 1:
+            (first,), (second,) = sides
+            powers = await self.battle_powers(user_ids)
+            win_chance = duel_odds(powers[first.id], powers[second.id])
+            embed = self.embed("🎲 Battle Odds", f"**{first.display_name}** vs **{second.display_name}**")
+            embed.add_field(name=first.display_name,
+                            value=f"**{win_chance:.1%}**\n{powers[first.id]:,} power", inline=True)
+            embed.add_field(name=second.display_name,
+                            value=f"**{1 - win_chance:.1%}**\n{powers[second.id]:,} power", inline=True)
+            balance = min(stats[first.id]['money'], stats[second.id]['money'])
+            embed.add_field(name="💰 Max Bet", value=f"{bet_cap(win_chance, balance):,} gold", inline=True)
+        else:
+            blessings = self.bot.get_cog('ReligionCog') is not None
+            teams = [[battle_profile(stats[user.id], blessings) for user in side] for side in sides]
+            win_chance = team_odds(teams[0], teams[1], TEAM_BATTLES[battle_type]['variance'])
+            embed = self.embed("🎲 Battle Odds", f"**{battle_type}** auto battle")
+            for side, team, chance in zip(sides, teams, (win_chance, 1 - win_chance)):
+                embed.add_field(
+                    name=f"{chance:.1%}",
+                    value="\n".join(user.display_name for user in side) + f"\n*~{sum(int(base * mult) for base, mult in team):,} power*",
+                    inline=True
+                )
+        
+        embed.set_footer(text="Exact chances for the current gear, levels and blessings")
+        await ctx.send(embed=embed)
         
-        # Luck factor (with divine blessings)
-        luck_modifier = char_data['luck']
+    async def battle_powers(self, user_ids: Iterable[int]) -> Dict[int, int]:
+        """Battle power of every given user with a character, from one query
         
-        # Apply divine blessing bonuses
-        from cogs.religion import ReligionCog
-        religion_cog = self.bot.get_cog('ReligionCog')
-        battle_multiplier = 1.0
-        if religion_cog:
-            blessing_bonuses = religion_cog.get_active_blessings(user_id)
-            luck_modifier += blessing_bonuses.get('luck', 0)  # Add luck blessing
-            battle_multiplier = blessing_bonuses.get('battle_mult', 1.0)  # Apply valor blessing
+        Level, equipment, luck and divine blessings all count.
+        """
+        religion_loaded = self.bot.get_cog('ReligionCog') is not None
+        powers = {}
+        for row in await self.db.get_battle_stats(user_ids, datetime.now()):
+            # Base stats from character
+            base_power = row['level'] * 5
+            
+            # Class bonuses (simplified)
+            class_bonus = row['level'] * 2
+            
+            # Luck factor (with divine blessings)
+            luck_modifier = row['luck']
+            battle_multiplier = 1.0
+            if religion_loaded:
+                # As ReligionCog.get_active_blessings() totals them: luck starts from 1.0
+                luck_modifier += 1.0 + row['blessing_luck']
+                battle_multiplier = max(1.0, row['blessing_battle_mult'] or 1.0)  # Valor blessing
+                
+            total = int((base_power + row['equipment_power'] + class_bonus) * luck_modifier * battle_multiplier)
+            powers[row['user_id']] = max(1, total)
+        return powers
         
-        total = int((base_power + equipment_power + class_bonus) * luck_modifier * battle_multiplier)
-        return max(1, total)
+    async def calculate_battle_power(self, user_id: int) -> int:
+        """Calculate total battle power for a user"""
+        return (await self.battle_powers([user_id])).get(user_id, 1)
         
     def simulate_battle(self, fighter1: tuple, fighter2: tuple) -> tuple:
         """Simulate a quick battle between two fighters"""
         (user1, power1), (user2, power2) = fighter1, fighter2
         
-        # Add randomness
-        roll1 = power1 * random.uniform(0.8, 1.2)
-        roll2 = power2 * random.uniform(0.8, 1.2)
-        
-        # Critical hit chance
-        if random.random() < 0.1:  # 10% crit
-            roll1 *= 1.5
-        if random.random() < 0.1:
-            roll2 *= 1.5
-            
-        winner = user1 if roll1 > roll2 else user2
+        first_wins, roll1, roll2 = duel(power1, power2)
+        winner = user1 if first_wins else user2
         
         battle_log = f"⚔️ {user1.display_name} ({int(roll1)}) vs {user2.display_name} ({int(roll2)})"
         
@@ -465,7 +576,7 @@ class CombatCog(DiscordRPGCog):
         
         embed.add_field(
             name="👤 Manual Battles Available",
-            value="• `!battle @user` - Challenge specific players\n• `!battle @user 1000` - Battle with gold wager\n• `!tournament [prize]` - Multi-player tournaments",
+            value="• `!battle @user` - Challenge specific players\n• `!battle @user 1000` - Battle with gold wager\n• `!tournament [prize] [format]` - Multi-player tournaments",
             inline=False
         )
         
@@ -493,7 +604,7 @@ class CombatCog(DiscordRPGCog):
         
         embed.add_field(
             name="👤 Manual Battles", 
-            value="• `!battle @user` - Challenge specific players\n• `!battle @user 5000` - Battle with gold wager\n• `!tournament [prize]` - Multi-player tournaments",
+            value="• `!battle @user` - Challenge specific players\n• `!battle @user 5000` - Battle with gold wager\n• `!tournament [prize] [format]` - Multi-player tournaments",
             inline=False
         )
         
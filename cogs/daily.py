@@ -19,7 +19,7 @@ class DailyCog(DiscordRPGCog):
     @commands.cooldown(1, 86400, commands.BucketType.user)  # Once per day
     async def daily(self, ctx: commands.Context):
         """Claim your daily reward"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         # Check last daily claim and prevent race conditions
         last_date = char_data['last_date']
@@ -48,21 +48,9 @@ class DailyCog(DiscordRPGCog):
         
         # Double-check and update atomically to prevent race condition
         try:
-            updated_rows = self.db.execute(
-                """UPDATE profile SET 
-                   money = money + ?, 
-                   xp = xp + ?, 
-                   last_date = ?,
-                   streak = ?
-                   WHERE user_id = ? AND (last_date != ? OR last_date IS NULL)""",
-                (gold_reward, xp_reward, today, new_streak, ctx.author.id, today)
-            )
-            
-            if updated_rows == 0:
+            if not await self.db.claim_daily(ctx.author.id, today, new_streak, gold_reward, xp_reward):
                 await ctx.send("❌ You've already claimed your daily reward today!")
                 return
-                
-            self.db.commit()
             
         except Exception as e:
             await ctx.send("❌ An error occurred while processing your daily reward. Please try again.")
@@ -77,8 +65,9 @@ class DailyCog(DiscordRPGCog):
         embed.add_field(name="⭐ XP", value=f"+{xp_reward}", inline=True)
         embed.add_field(name="🔥 Streak", value=f"{new_streak} days", inline=True)
         
-        # Bonus rewards based on streak
+        # Bonus rewards based on streak, applied as one atomic update
         bonuses = []
+        bonus_deltas = {}
         
         # Crate rewards (every 3 days)
         if display_streak >= 3 and display_streak % 3 == 0:
@@ -92,30 +81,29 @@ class DailyCog(DiscordRPGCog):
                 crate_type = "rare"
                 crate_field = "crates_rare"
                 
-            current_crates = char_data[crate_field]
-            self.db.update_character(ctx.author.id, **{crate_field: current_crates + 1})
+            bonus_deltas[crate_field] = 1
             bonuses.append(f"🎁 1x {crate_type.title()} Crate")
             
         # Lucky coin (every 7 days)
         if display_streak >= 7 and display_streak % 7 == 0:
             luck_bonus = 0.1
-            new_luck = char_data['luck'] + luck_bonus
-            self.db.update_character(ctx.author.id, luck=new_luck)
+            bonus_deltas['luck'] = luck_bonus
             bonuses.append(f"🍀 +{luck_bonus} Luck")
             
         # Perfect week bonus (day 7)
         if display_streak == 7:
             bonus_gold = 1000
-            self.db.update_character(ctx.author.id, money=char_data['money'] + gold_reward + bonus_gold)
+            bonus_deltas['money'] = bonus_gold
             bonuses.append(f"💎 Week Bonus: +{bonus_gold:,} gold")
             
         # Perfect 10-day streak
         if display_streak == 10:
             # Magic crate
-            magic_crates = char_data['crates_magic']
-            self.db.update_character(ctx.author.id, crates_magic=magic_crates + 1)
+            bonus_deltas['crates_magic'] = bonus_deltas.get('crates_magic', 0) + 1
             bonuses.append("✨ 1x Magic Crate")
             
+        await self.db.increment(ctx.author.id, **bonus_deltas)
+            
         if bonuses:
             embed.add_field(
                 name="🎉 Streak Bonuses",
@@ -151,7 +139,7 @@ class DailyCog(DiscordRPGCog):
             )
             
         # Log transaction
-        self.db.log_transaction(
+        await self.db.log_transaction(
             None, ctx.author.id, gold_reward, "daily_reward",
             {"streak": new_streak, "xp": xp_reward}
         )
@@ -164,7 +152,7 @@ class DailyCog(DiscordRPGCog):
     @has_character()
     async def streak(self, ctx: commands.Context):
         """View your current daily streak"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         last_date = char_data['last_date']
         today = datetime.now().strftime('%Y-%m-%d')
@@ -274,7 +262,7 @@ class DailyCog(DiscordRPGCog):
             return
             
         # Get leaderboard data
-        leaders = self.db.get_leaderboard(category.lower(), 10)
+        leaders = await self.db.get_leaderboard(category.lower(), 10)
         
         if not leaders:
             await ctx.send("❌ No leaderboard data available!")
@@ -316,14 +304,14 @@ class DailyCog(DiscordRPGCog):
         
         # Show user's rank if not in top 10
         user_rank = None
-        all_leaders = self.db.get_leaderboard(category.lower(), 100)
+        all_leaders = await self.db.get_leaderboard(category.lower(), 100)
         for i, player in enumerate(all_leaders, 1):
             if player['user_id'] == ctx.author.id:
                 user_rank = i
                 break
                 
         if user_rank and user_rank > 10:
-            char_data = self.db.get_character(ctx.author.id)
+            char_data = await self.db.get_character(ctx.author.id)
             if category == "level":
                 user_value = f"Level {char_data['level']}"
             elif category == "money":
@@ -3,44 +3,66 @@ import discord
 from discord.ext import commands
 import math
 import asyncio
-import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from bot import DiscordRPGCog, has_character
-from classes.items import ItemGenerator, ItemRarity
+from classes.items import Item, ItemGenerator, ItemRarity
+from utils.market import MarketEngine
 
 class EconomyCog(DiscordRPGCog):
     """Economy and trading commands"""
     
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.market = MarketEngine(self.db)
+        self._shop_day: Optional[str] = None
+        self._shop_items: List[Tuple[Item, int]] = []
+        self._warm_task: Optional[asyncio.Task] = None
+        
+    async def cog_load(self):
+        """Warm the market order book in the background once the bot is ready"""
+        self._warm_task = asyncio.create_task(self.warm_market())
+        
+    async def cog_unload(self):
+        if self._warm_task and not self._warm_task.done():
+            self._warm_task.cancel()
+            
+    async def warm_market(self):
+        await self.bot.wait_until_ready()
+        await self.market.ensure_warm()
+        
+    async def cog_before_invoke(self, ctx: commands.Context):
+        """Market commands read the order book, which needs one load after startup"""
+        await self.market.ensure_warm()
+        
     async def get_market_embed(self, page: int = 1):
         """Generate market embed for given page"""
         items_per_page = 10
-        offset = (page - 1) * items_per_page
-        items = self.db.get_market_items(100, offset)  # Get more items to calculate total pages
-        
-        if not items:
+        await self.market.ensure_warm()  # Also reached from pagination buttons
+        if not self.market:
             embed = self.embed("🏪 Global Market", "No items for sale!")
             return embed
             
         # Calculate total pages
-        total_items = len(self.db.get_market_items(1000, 0))  # Get total count
-        total_pages = math.ceil(total_items / items_per_page)
+        total_pages = math.ceil(len(self.market) / items_per_page)
         page = max(1, min(page, total_pages))
         
-        # Get items for this page
-        start_idx = (page - 1) * items_per_page
-        end_idx = start_idx + items_per_page
-        page_items = items[start_idx:end_idx] if start_idx < len(items) else []
-        
         embed = self.embed(
             f"🏪 Global Market (Page {page}/{total_pages})",
             "Use `!buy <item_id>` to purchase items"
         )
+        self.add_listing_fields(embed, self.market.browse(items_per_page, (page - 1) * items_per_page))
+        return embed
         
-        for item in page_items:
+    def add_listing_fields(self, embed: discord.Embed, listings):
+        """Add one field per market listing"""
+        for listing in listings:
+            item = listing.as_dict()
             stats = self.format_item_stats(item)
             try:
                 owner = self.bot.get_user(item['owner'])
@@ -57,8 +79,6 @@ class EconomyCog(DiscordRPGCog):
                 value=f"`{item['type']}{slot_info}` • {stats} • Seller: {owner_name}",
                 inline=False
             )
-            
-        return embed
     
     def format_item_stats(self, item) -> str:
         """Format item stats including all bonuses"""
@@ -95,14 +115,12 @@ class EconomyCog(DiscordRPGCog):
     @has_character()
     async def market(self, ctx: commands.Context, page: int = 1):
         """Browse the global marketplace"""
-        # Get total count to check if pagination is needed
-        all_items = self.db.get_market_items(1000, 0)
         embed = await self.get_market_embed(page)
         
         # Check if pagination is needed
-        if len(all_items) > 10:
+        if len(self.market) > 10:
             items_per_page = 10
-            total_pages = math.ceil(len(all_items) / items_per_page)
+            total_pages = math.ceil(len(self.market) / items_per_page)
             
             # Import PaginationView from inventory.py
             from cogs.inventory import PaginationView
@@ -115,6 +133,30 @@ class EconomyCog(DiscordRPGCog):
         else:
             # No pagination needed
             await ctx.send(embed=embed)
+            
+    @commands.command()
+    @has_character()
+    async def cheapest(self, ctx: commands.Context, item_type: str = None, rarity: str = None):
+        """Show the cheapest listings for an item type and/or rarity"""
+        rarities = [r.value for r in ItemRarity]
+        if item_type and item_type.lower() in rarities and rarity is None:
+            item_type, rarity = None, item_type
+        if rarity and rarity.lower() not in rarities:
+            await ctx.send(f"❌ Unknown rarity! Use one of: {', '.join(rarities)}")
+            return
+            
+        listings = self.market.cheapest(item_type, rarity, limit=10)
+        wanted = " ".join(part.title() for part in (rarity, item_type) if part) or "items"
+        if not listings:
+            await ctx.send(embed=self.embed("🏪 Cheapest Listings", f"No {wanted} for sale!"))
+            return
+            
+        embed = self.embed(
+            f"🏪 Cheapest {wanted}",
+            "Use `!buy <item_id>` to purchase items"
+        )
+        self.add_listing_fields(embed, listings)
+        await ctx.send(embed=embed)
         
     @commands.command()
     @has_character()
@@ -129,7 +171,7 @@ class EconomyCog(DiscordRPGCog):
             return
             
         # Check item ownership
-        item = self.db.get_item_by_id(item_id)
+        item = await self.db.get_item_by_id(item_id)
         if not item or item['owner'] != ctx.author.id:
             await ctx.send("❌ Item not found or you don't own it!")
             return
@@ -139,17 +181,13 @@ class EconomyCog(DiscordRPGCog):
             return
             
         # Check if already on market
-        existing = self.db.fetchone(
-            "SELECT * FROM market WHERE item_id = ?",
-            (item_id,)
-        )
-        if existing:
+        if self.market.get(item_id):
             await ctx.send("❌ Item is already on the market!")
             return
             
         # Calculate market tax (5%)
         tax = int(price * 0.05)
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         if char_data['money'] < tax:
             await ctx.send(f"❌ You need {tax:,} gold to pay the listing fee!")
@@ -162,14 +200,11 @@ class EconomyCog(DiscordRPGCog):
             await ctx.send("Listing cancelled.")
             return
             
-        # List item
-        success = self.db.list_item_on_market(item_id, price)
-        if success:
-            # Deduct listing fee
-            self.db.update_character(ctx.author.id, money=char_data['money'] - tax)
-            
+        # List item and deduct the listing fee in one transaction
+        listing = await self.market.offer(ctx.author.id, item_id, price, fee=tax)
+        if listing:
             # Log transaction
-            self.db.log_transaction(
+            await self.db.log_transaction(
                 ctx.author.id, None, tax, "market_fee",
                 {"item": item['name'], "price": price}
             )
@@ -180,29 +215,24 @@ class EconomyCog(DiscordRPGCog):
             )
             await ctx.send(embed=embed)
         else:
-            await ctx.send("❌ Failed to list item!")
+            await ctx.send("❌ Failed to list item! Check you still own it and can pay the fee.")
             
     @commands.command()
     @has_character() 
     async def buy(self, ctx: commands.Context, item_id: int):
         """Buy an item from the market"""
         # Get market item
-        market_item = self.db.fetchone(
-            """SELECT m.*, i.* FROM market m
-               JOIN inventory i ON m.item_id = i.id
-               WHERE i.id = ?""",
-            (item_id,)
-        )
-        
-        if not market_item:
+        listing = self.market.get(item_id)
+        if not listing:
             await ctx.send("❌ Item not found on market!")
             return
+        market_item = listing.as_dict()
             
         if market_item['owner'] == ctx.author.id:
             await ctx.send("❌ Cannot buy your own item!")
             return
             
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         price = market_item['price']
         
         if char_data['money'] < price:
@@ -216,10 +246,10 @@ class EconomyCog(DiscordRPGCog):
             await ctx.send("Purchase cancelled.")
             return
             
-        # Process purchase
-        success = self.db.buy_market_item(item_id, ctx.author.id)
+        # Process purchase - never pay more than the price that was confirmed
+        sale = await self.market.buy(ctx.author.id, item_id, max_price=price)
         
-        if success:
+        if sale:
             embed = self.success_embed(
                 f"Purchased **{market_item['name']}** for **{price:,}** gold!"
             )
@@ -233,7 +263,7 @@ class EconomyCog(DiscordRPGCog):
             await ctx.send(embed=embed)
             
             # Notify seller
-            seller = ctx.bot.get_user(market_item['owner'])
+            seller = ctx.bot.get_user(sale['seller_id'])
             if seller:
                 try:
                     seller_embed = self.embed(
@@ -245,79 +275,68 @@ class EconomyCog(DiscordRPGCog):
                 except discord.Forbidden:
                     pass
         else:
-            await ctx.send("❌ Failed to purchase item! It may have been sold already.")
+            await ctx.send("❌ Failed to purchase item! It may have been sold already or you can't afford it.")
             
     @commands.command()
     @has_character()
     async def withdraw(self, ctx: commands.Context, item_id: int):
         """Remove your item from the market"""
-        # Check if item is on market and owned by user
-        market_item = self.db.fetchone(
-            """SELECT m.*, i.* FROM market m
-               JOIN inventory i ON m.item_id = i.id
-               WHERE i.id = ? AND i.owner = ?""",
-            (item_id, ctx.author.id)
-        )
-        
-        if not market_item:
+        # Remove from market if it's listed and owned by the user
+        listing = await self.market.withdraw(ctx.author.id, item_id)
+        if not listing:
             await ctx.send("❌ Item not found on market or not owned by you!")
             return
             
-        # Remove from market
-        self.db.execute("DELETE FROM market WHERE item_id = ?", (item_id,))
-        self.db.commit()
-        
         embed = self.success_embed(
-            f"Removed **{market_item['name']}** from the market."
+            f"Removed **{listing.item['name']}** from the market."
         )
         await ctx.send(embed=embed)
         
-    @commands.command()
-    @has_character()
-    async def shop(self, ctx: commands.Context):
-        """Visit the item shop"""
-        embed = self.embed("🏪 Item Shop", "Welcome to the shop!")
-        
-        # Daily shop items (generated daily)
-        import hashlib
-        today = ctx.bot.user.created_at.strftime('%Y%m%d')  # Use bot creation date as seed
-        seed = int(hashlib.md5(today.encode()).hexdigest()[:8], 16)
-        random.seed(seed)
+    def daily_shop(self) -> List[Tuple[Item, int]]:
+        """Today's shop stock, generated once per UTC day from the shop stream"""
+        today = self.bot.rng.today()
+        if self._shop_day != today:
+            self._shop_items = self.generate_shop(self.bot.rng.daily('shop', today))
+            self._shop_day = today
+        return self._shop_items
+        
+    @staticmethod
+    def generate_shop(rng) -> List[Tuple[Item, int]]:
+        """Roll the three daily shop items and their prices"""
+        rarity_weights = [(ItemRarity.COMMON, 50), (ItemRarity.UNCOMMON, 30),
+                         (ItemRarity.RARE, 15), (ItemRarity.MAGIC, 5)]
+        stat_ranges = {
+            ItemRarity.COMMON: (1, 9),
+            ItemRarity.UNCOMMON: (10, 19),
+            ItemRarity.RARE: (20, 29),
+            ItemRarity.MAGIC: (30, 39),
+        }
+        rarity_mult = {
+            ItemRarity.COMMON: 1.0,
+            ItemRarity.UNCOMMON: 1.5,
+            ItemRarity.RARE: 2.5,
+            ItemRarity.MAGIC: 4.0
+        }
         
         shop_items = []
-        for i in range(3):  # 3 daily items
-            rarity_weights = [(ItemRarity.COMMON, 50), (ItemRarity.UNCOMMON, 30), 
-                             (ItemRarity.RARE, 15), (ItemRarity.MAGIC, 5)]
-            
-            rarity = random.choices([r[0] for r in rarity_weights], 
-                                   weights=[r[1] for r in rarity_weights])[0]
-            
-            stat_ranges = {
-                ItemRarity.COMMON: (1, 9),
-                ItemRarity.UNCOMMON: (10, 19),
-                ItemRarity.RARE: (20, 29),
-                ItemRarity.MAGIC: (30, 39),
-            }
-            
+        for _ in range(3):  # 3 daily items
+            rarity = rng.choices([r[0] for r in rarity_weights], 
+                                 weights=[r[1] for r in rarity_weights])[0]
             min_stat, max_stat = stat_ranges[rarity]
-            item = ItemGenerator.generate_item(0, min_stat, max_stat)
+            item = ItemGenerator.generate_item(0, min_stat, max_stat, rng=rng)
             
             # Price based on stats and rarity
             base_price = (item.damage + item.armor) * 100
-            rarity_mult = {
-                ItemRarity.COMMON: 1.0,
-                ItemRarity.UNCOMMON: 1.5,
-                ItemRarity.RARE: 2.5,
-                ItemRarity.MAGIC: 4.0
-            }
-            price = int(base_price * rarity_mult[rarity])
-            
-            shop_items.append((item, price, i))
-            
-        # Reset random seed
-        random.seed()
+            shop_items.append((item, int(base_price * rarity_mult[rarity])))
+        return shop_items
+        
+    @commands.command()
+    @has_character()
+    async def shop(self, ctx: commands.Context):
+        """Visit the item shop"""
+        embed = self.embed("🏪 Item Shop", "Welcome to the shop!")
         
-        for item, price, idx in shop_items:
+        for idx, (item, price) in enumerate(self.daily_shop()):
             # Create a dict-like representation for format_item_stats
             item_dict = {
                 'damage': item.damage,
@@ -355,45 +374,8 @@ class EconomyCog(DiscordRPGCog):
             await ctx.send("❌ Invalid item number! Use 0, 1, or 2.")
             return
             
-        # Regenerate daily shop (same logic as shop command)
-        import hashlib
-        today = ctx.bot.user.created_at.strftime('%Y%m%d')
-        seed = int(hashlib.md5(today.encode()).hexdigest()[:8], 16)
-        random.seed(seed)
-        
-        shop_items = []
-        for i in range(3):
-            rarity_weights = [(ItemRarity.COMMON, 50), (ItemRarity.UNCOMMON, 30),
-                             (ItemRarity.RARE, 15), (ItemRarity.MAGIC, 5)]
-            
-            rarity = random.choices([r[0] for r in rarity_weights],
-                                   weights=[r[1] for r in rarity_weights])[0]
-            
-            stat_ranges = {
-                ItemRarity.COMMON: (1, 9),
-                ItemRarity.UNCOMMON: (10, 19), 
-                ItemRarity.RARE: (20, 29),
-                ItemRarity.MAGIC: (30, 39),
-            }
-            
-            min_stat, max_stat = stat_ranges[rarity]
-            item = ItemGenerator.generate_item(ctx.author.id, min_stat, max_stat)
-            
-            base_price = (item.damage + item.armor) * 100
-            rarity_mult = {
-                ItemRarity.COMMON: 1.0,
-                ItemRarity.UNCOMMON: 1.5,
-                ItemRarity.RARE: 2.5,
-                ItemRarity.MAGIC: 4.0
-            }
-            price = int(base_price * rarity_mult[rarity])
-            
-            shop_items.append((item, price))
-            
-        random.seed()
-        
-        item, price = shop_items[item_number]
-        char_data = self.db.get_character(ctx.author.id)
+        item, price = self.daily_shop()[item_number]
+        char_data = await self.db.get_character(ctx.author.id)
         
         if char_data['money'] < price:
             await ctx.send(f"❌ You need {price:,} gold but only have {char_data['money']:,}!")
@@ -404,17 +386,17 @@ class EconomyCog(DiscordRPGCog):
             return
             
         # Create item and deduct money
-        item_id = self.db.create_item(
+        item_id = await self.db.create_item(
             ctx.author.id, item.name, item.type.value,
             item.value, item.damage, item.armor, item.hand.value,
             item.health_bonus, item.speed_bonus, item.luck_bonus, 
             item.crit_bonus, item.magic_bonus, item.slot_type
         )
         
-        self.db.update_character(ctx.author.id, money=char_data['money'] - price)
+        await self.db.increment(ctx.author.id, money=-price)
         
         # Log transaction
-        self.db.log_transaction(
+        await self.db.log_transaction(
             ctx.author.id, None, price, "shop_purchase",
             {"item": item.name}
         )
@@ -452,14 +434,14 @@ class EconomyCog(DiscordRPGCog):
             return
             
         # Check if both users have characters
-        other_char = self.db.get_character(user.id)
+        other_char = await self.db.get_character(user.id)
         if not other_char:
             await ctx.send("❌ The other user doesn't have a character!")
             return
             
         # Check item ownership
-        my_item_data = self.db.get_item_by_id(my_item)
-        their_item_data = self.db.get_item_by_id(their_item)
+        my_item_data = await self.db.get_item_by_id(my_item)
+        their_item_data = await self.db.get_item_by_id(their_item)
         
         if not my_item_data or my_item_data['owner'] != ctx.author.id:
             await ctx.send("❌ You don't own the item you're offering!")
@@ -513,13 +495,15 @@ class EconomyCog(DiscordRPGCog):
             
         await trade_msg.delete()
         
-        # Execute trade
-        self.db.execute("UPDATE inventory SET owner = ? WHERE id = ?", (user.id, my_item))
-        self.db.execute("UPDATE inventory SET owner = ? WHERE id = ?", (ctx.author.id, their_item))
-        self.db.commit()
+        # Execute trade (both items must still belong to their traders)
+        if not await self.db.swap_items(my_item, ctx.author.id, their_item, user.id):
+            await ctx.send(embed=self.error_embed("Trade failed - one of the items changed hands."))
+            return
+        await self.market.refresh(my_item)
+        await self.market.refresh(their_item)
         
         # Log transactions
-        self.db.log_transaction(
+        await self.db.log_transaction(
             ctx.author.id, user.id, 0, "item_trade",
             {"given": my_item_data['name'], "received": their_item_data['name']}
         )
@@ -530,5 +514,93 @@ class EconomyCog(DiscordRPGCog):
         )
         await ctx.send(embed=embed)
 
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def economy(self, ctx: commands.Context, days: int = 7):
+        """Money supply, gold flow and item rarity overview (admin only)"""
+        days = max(1, min(days, 90))
+        since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        report = await self.db.get_economy_report(since)
+        totals = report['totals']
+        
+        supply = totals.get('money_supply', 0)
+        characters = totals.get('characters', 0)
+        embed = self.embed(
+            "📈 Economy",
+            f"**{supply:,}** gold held by **{characters:,}** characters"
+            + (f" ({supply // characters:,} each on average)" if characters else "")
+        )
+        
+        flow = report['money_flow']
+        created = sum(row['created'] for row in flow)
+        destroyed = sum(row['destroyed'] for row in flow)
+        lines = [f"`{row['day']}` +{row['created']:,} / -{row['destroyed']:,}" for row in flow[-7:]]
+        embed.add_field(
+            name=f"🪙 Gold Flow ({days}d)",
+            value=f"Created **{created:,}** • Destroyed **{destroyed:,}** • Net **{created - destroyed:+,}**"
+                  + ("\n" + "\n".join(lines) if lines else "\nNo changes recorded yet."),
+            inline=False
+        )
+        
+        subjects = report['subjects'][:10]
+        embed.add_field(
+            name=f"🧾 Transactions ({days}d)",
+            value="\n".join(f"**{row['subject'] or 'other'}**: {row['transactions']:,} • {row['amount']:,} gold"
+                            for row in subjects) or "None logged.",
+            inline=False
+        )
+        
+        rarity = report['rarity']
+        items = totals.get('items', 0)
+        embed.add_field(
+            name=f"🎒 Items • {items:,} worth {totals.get('item_value', 0):,} gold",
+            value="\n".join(f"{tier.value.title()}: {rarity.get(tier.value, 0):,}"
+                            + (f" ({rarity.get(tier.value, 0) / items:.1%})" if items else "")
+                            for tier in ItemRarity),
+            inline=True
+        )
+        embed.add_field(
+            name="🏪 Market",
+            value=f"{totals.get('market_listings', 0):,} listings\n{totals.get('market_value', 0):,} gold asked",
+            inline=True
+        )
+        
+        await ctx.send(embed=embed)
+
+    async def ledger_embed(self, user: discord.abc.User, subject: Optional[str] = None) -> discord.Embed:
+        """A user's 30-day gold summary per subject and their latest ledger entries"""
+        since = (datetime.now(timezone.utc) - timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
+        summary = await self.db.get_transaction_summary(user.id, since)
+        entries = await self.db.get_transactions(user.id, subject, limit=10)
+        
+        embed = self.embed(f"🧾 Ledger • {user.display_name}", f"Subject: **{subject}**" if subject else "")
+        embed.add_field(
+            name="📊 Last 30 Days",
+            value="\n".join(f"**{row['subject'] or 'other'}**: +{row['received']:,} / -{row['spent']:,} ({row['entries']:,})"
+                            for row in summary[:10]) or "No transactions.",
+            inline=False
+        )
+        
+        lines = []
+        for entry in entries:
+            incoming = entry['to_user'] == user.id
+            details = ", ".join(f"{key}: {value}" for key, value in entry['info'].items())
+            lines.append(f"`{entry['timestamp'][:16]}` {'+' if incoming else '-'}{entry['amount']:,} "
+                         f"**{entry['subject']}**" + (f" ({details})" if details else ""))
+        embed.add_field(name="🕐 Recent", value="\n".join(lines)[:1024] or "Nothing logged yet.", inline=False)
+        return embed
+        
+    @commands.command()
+    @has_character()
+    async def ledger(self, ctx: commands.Context, subject: str = None):
+        """Your recent gold movements, optionally for one subject (e.g. coinflip, item_sale)"""
+        await ctx.send(embed=await self.ledger_embed(ctx.author, subject))
+        
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def audit(self, ctx: commands.Context, user: discord.User, subject: str = None):
+        """Another player's ledger (admin only)"""
+        await ctx.send(embed=await self.ledger_embed(user, subject))
+
 async def setup(bot):
     await bot.add_cog(EconomyCog(bot))
\ No newline at end of file
@@ -13,6 +13,7 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from bot import DiscordRPGCog, has_character
 from classes.items import ItemGenerator, ItemRarity
+from utils.outbox import Priority
 
 logger = logging.getLogger('DiscordRPG.EpicAdventures')
 
@@ -134,9 +135,9 @@ class EpicAdventuresCog(DiscordRPGCog):
         if self.auto_epic_adventures.is_running():
             self.auto_epic_adventures.cancel()
     
-    def create_item_in_db(self, item) -> int:
+    async def create_item_in_db(self, item) -> int:
         """Helper to create items with all stats in database"""
-        return self.db.create_item(
+        return await self.db.create_item(
             item.owner_id, item.name, item.type.value,
             item.value, item.damage, item.armor, item.hand.value,
             item.health_bonus, item.speed_bonus, item.luck_bonus,
@@ -149,14 +150,11 @@ class EpicAdventuresCog(DiscordRPGCog):
     async def epicstatus(self, ctx: commands.Context):
         """Check your epic/legendary adventure status"""
         # Check active epic adventure
-        active = self.db.fetchone(
-            "SELECT * FROM epic_adventures WHERE user_id = ? AND status = 'active'",
-            (ctx.author.id,)
-        )
+        active = await self.db.get_active_epic_adventure(ctx.author.id)
         
         if not active:
             # Show readiness status instead
-            char_data = self.db.get_character(ctx.author.id)
+            char_data = await self.db.get_character(ctx.author.id)
             
             embed = self.embed(
                 "📊 Epic Adventure Status",
@@ -188,10 +186,7 @@ class EpicAdventuresCog(DiscordRPGCog):
                 )
                 
             # Show recent completion count
-            recent_count = len(self.db.fetchall(
-                "SELECT id FROM epic_adventures WHERE user_id = ? AND status = 'completed' AND started_at > datetime('now', '-7 days')",
-                (ctx.author.id,)
-            ))
+            recent_count = await self.db.count_recent_epic_adventures(ctx.author.id, days=7)
             
             embed.add_field(
                 name="📈 Recent Activity",
@@ -258,15 +253,11 @@ class EpicAdventuresCog(DiscordRPGCog):
                 return
             
             # Get completed adventures
-            completed = self.db.fetchall(
-                """SELECT * FROM epic_adventures 
-                   WHERE status = 'active' AND finish_at <= ?""",
-                (datetime.now(),)
-            )
+            completed = await self.db.get_finished_epic_adventures(datetime.now())
             
             for adventure in completed:
                 # Get character data
-                char = self.db.get_profile(adventure['user_id'])
+                char = await self.db.get_profile(adventure['user_id'])
                 if not char:
                     continue
                 
@@ -288,13 +279,13 @@ class EpicAdventuresCog(DiscordRPGCog):
                 if success:
                     # Calculate rewards with multipliers
                     from cogs.race import RaceCog
-                    race_multipliers = RaceCog.get_race_multipliers(char.user_id)
+                    race_multipliers = await RaceCog.get_race_multipliers(char.user_id, self.db)
                     
                     # Get divine blessing bonuses
                     from cogs.religion import ReligionCog
                     religion_cog = self.bot.get_cog('ReligionCog')
                     if religion_cog:
-                        blessing_bonuses = religion_cog.get_active_blessings(char.user_id)
+                        blessing_bonuses = await religion_cog.get_active_blessings(char.user_id)
                         # Apply blessing multipliers
                         race_multipliers['xp_gain'] *= blessing_bonuses['xp_mult']
                         race_multipliers['gold_find'] *= blessing_bonuses['gold_mult']
@@ -306,17 +297,11 @@ class EpicAdventuresCog(DiscordRPGCog):
                     final_xp = int(adventure['base_xp_reward'] * xp_variance * race_multipliers['xp_gain'])
                     final_gold = int(adventure['base_gold_reward'] * gold_variance * race_multipliers['gold_find'])
                     
-                    # Update character
-                    new_xp = char.xp + final_xp
-                    new_gold = char.money + final_gold
-                    new_level = min(50, 1 + int((new_xp / 100) ** 0.5))
-                    
-                    # Update character stats
-                    self.db.update_character(
+                    # Update character (level-ups are queued and announced by AutoPlayCog)
+                    await self.db.increment(
                         char.user_id,
-                        xp=new_xp,
-                        money=new_gold,
-                        level=new_level
+                        xp=final_xp,
+                        money=final_gold
                     )
                     
                     # Generate epic/legendary items
@@ -338,7 +323,7 @@ class EpicAdventuresCog(DiscordRPGCog):
                             item.name = f"Legendary {item.name}"
                             item.value = int(item.value * 2)
                         
-                        self.create_item_in_db(item)
+                        await self.create_item_in_db(item)
                         items_found.append(item.name)
                     
                     # Success embed
@@ -362,27 +347,20 @@ class EpicAdventuresCog(DiscordRPGCog):
                         inline=True
                     )
                     
-                    if new_level > char.level:
-                        embed.add_field(
-                            name="🎉 Level Up!",
-                            value=f"Now level {new_level}!",
-                            inline=False
-                        )
-                    
                     embed.color = discord.Color.green()
                     
                 else:
                     # Failed adventure - smaller rewards
                     from cogs.race import RaceCog
-                    race_multipliers = RaceCog.get_race_multipliers(char.user_id)
+                    race_multipliers = await RaceCog.get_race_multipliers(char.user_id, self.db)
                     
                     final_xp = int(adventure['base_xp_reward'] * 0.2 * race_multipliers['xp_gain'])
                     final_gold = int(adventure['base_gold_reward'] * 0.1 * race_multipliers['gold_find'])
                     
-                    self.db.update_character(
+                    await self.db.increment(
                         char.user_id,
-                        xp=char.xp + final_xp,
-                        money=char.money + final_gold
+                        xp=final_xp,
+                        money=final_gold
                     )
                     
                     # Failure embed
@@ -403,14 +381,10 @@ class EpicAdventuresCog(DiscordRPGCog):
                     embed.color = discord.Color.red()
                 
                 # Mark as completed
-                self.db.execute(
-                    "UPDATE epic_adventures SET status = 'completed' WHERE id = ?",
-                    (adventure['id'],)
-                )
-                self.db.commit()
+                await self.db.complete_epic_adventure(adventure['id'])
                 
                 # Send result
-                await channel.send(embed=embed)
+                self.announce(channel, embed=embed, priority=Priority.EVENT)
                     
         except Exception as e:
             logger.error(f"Error checking epic adventure completions: {e}")
@@ -433,28 +407,7 @@ class EpicAdventuresCog(DiscordRPGCog):
                 return
             
             # Get eligible online players not on epic adventures
-            all_high_level = self.db.fetchall(
-                """SELECT user_id, name, level FROM profile 
-                   WHERE level >= 10 
-                   AND user_id NOT IN (
-                       SELECT user_id FROM epic_adventures WHERE status = 'active'
-                   )"""
-            )
-            
-            if not all_high_level:
-                return
-            
-            # Filter for online users
-            online_eligible = []
-            for char in all_high_level:
-                user = self.bot.get_user(char['user_id'])
-                if user:
-                    # Check if online in any guild
-                    for guild in self.bot.guilds:
-                        member = guild.get_member(user.id)
-                        if member and member.status == discord.Status.online:
-                            online_eligible.append(char)
-                            break
+            online_eligible = await self.db.list_epic_candidates(min_level=10, user_ids=self.bot.presence.online_ids())
             
             if not online_eligible:
                 return
@@ -497,26 +450,19 @@ class EpicAdventuresCog(DiscordRPGCog):
                 # Insert into database with proper duplicate checking
                 try:
                     # Double-check for active adventures (since we removed the DB constraint)
-                    existing_active = self.db.fetchone(
-                        "SELECT id FROM epic_adventures WHERE user_id = ? AND status = 'active'",
-                        (char['user_id'],)
-                    )
+                    existing_active = await self.db.get_active_epic_adventure(char['user_id'])
                     
                     if existing_active:
                         logger.info(f"Skipped epic adventure for {char['name']} - already has active adventure (id: {existing_active['id']})")
                         continue
                     
                     # Insert new adventure
-                    self.db.execute(
-                        """INSERT INTO epic_adventures 
-                           (user_id, adventure_type, adventure_name, difficulty, started_at, finish_at, 
-                            base_xp_reward, base_gold_reward, item_quality_min, item_quality_max, status)
-                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'active')""",
-                        (char['user_id'], adventure_type, adventure_name, 
-                         3 if adventure_type == 'legendary' else 2,
-                         start_time, end_time,
-                         adventure_data['base_xp'], adventure_data['base_gold'],
-                         adventure_data['item_quality'][0], adventure_data['item_quality'][1])
+                    await self.db.start_epic_adventure(
+                        char['user_id'], adventure_type, adventure_name,
+                        3 if adventure_type == 'legendary' else 2,
+                        start_time, end_time,
+                        adventure_data['base_xp'], adventure_data['base_gold'],
+                        adventure_data['item_quality'][0], adventure_data['item_quality'][1]
                     )
                         
                 except Exception as e:
@@ -530,8 +476,6 @@ class EpicAdventuresCog(DiscordRPGCog):
                     'duration': duration_hours
                 })
             
-            self.db.commit()
-            
             if embeds_sent:
                 # Send combined notification
                 embed = self.embed(
@@ -559,7 +503,7 @@ class EpicAdventuresCog(DiscordRPGCog):
                 )
                 
                 embed.color = discord.Color.purple()
-                await channel.send(embed=embed)
+                self.announce(channel, embed=embed)
                 
         except Exception as e:
             logger.error(f"Error in auto epic adventures: {e}")
@@ -1,7 +1,6 @@
 """Gambling and casino games"""
 import discord
 from discord.ext import commands
-import random
 import asyncio
 
 import sys
@@ -13,12 +12,21 @@ from bot import DiscordRPGCog, has_character
 class GamblingCog(DiscordRPGCog):
     """Casino games and gambling"""
     
+    @property
+    def rng(self):
+        """Gambling's random stream (see utils/rng.py)"""
+        return self.bot.rng.stream('gambling')
+        
+    async def settle(self, user_id: int, money_change: int, **deltas) -> int:
+        """Apply a bet result as an atomic delta and return the new balance"""
+        return (await self.db.increment(user_id, money=money_change, **deltas))['money']
+        
     @commands.command(aliases=["cf", "flip"])
     @has_character()
     @commands.cooldown(1, 30, commands.BucketType.user)
     async def coinflip(self, ctx: commands.Context, amount: int, choice: str):
         """Flip a coin (heads/tails or h/t)"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         if amount <= 0:
             await ctx.send("❌ Bet amount must be positive!")
@@ -43,24 +51,24 @@ class GamblingCog(DiscordRPGCog):
             return
             
         # Flip coin
-        result = random.choice(['heads', 'tails'])
+        result = self.rng.choice(['heads', 'tails'])
         won = result == player_choice
         
         # Update money
         if won:
             winnings = amount
-            new_money = char_data['money'] + winnings
+            money_change = winnings
             result_text = f"**You win {winnings:,} gold!**"
             color = discord.Color.green()
         else:
-            new_money = char_data['money'] - amount
+            money_change = -amount
             result_text = f"**You lose {amount:,} gold!**"
             color = discord.Color.red()
             
-        self.db.update_character(ctx.author.id, money=new_money)
+        new_money = await self.settle(ctx.author.id, money_change)
         
         # Log transaction
-        self.db.log_transaction(
+        await self.db.log_transaction(
             ctx.author.id if not won else None,
             None if not won else ctx.author.id,
             amount,
@@ -85,7 +93,7 @@ class GamblingCog(DiscordRPGCog):
     @commands.cooldown(1, 45, commands.BucketType.user)
     async def slots(self, ctx: commands.Context, amount: int):
         """Play the slot machine"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         if amount <= 0:
             await ctx.send("❌ Bet amount must be positive!")
@@ -104,9 +112,9 @@ class GamblingCog(DiscordRPGCog):
         weights = [30, 25, 20, 15, 8, 2]  # Higher numbers = more common
         
         # Spin reels
-        reel1 = random.choices(symbols, weights=weights)[0]
-        reel2 = random.choices(symbols, weights=weights)[0]  
-        reel3 = random.choices(symbols, weights=weights)[0]
+        reel1 = self.rng.choices(symbols, weights=weights)[0]
+        reel2 = self.rng.choices(symbols, weights=weights)[0]  
+        reel3 = self.rng.choices(symbols, weights=weights)[0]
         
         result = [reel1, reel2, reel3]
         
@@ -131,15 +139,15 @@ class GamblingCog(DiscordRPGCog):
         # Apply winnings/losses
         if multiplier > 0:
             winnings = amount * multiplier
-            new_money = char_data['money'] + winnings - amount  # Subtract original bet
+            money_change = winnings - amount  # Subtract original bet
             result_text = f"**You win {winnings:,} gold!** ({multiplier}x multiplier)"
             color = discord.Color.green()
         else:
-            new_money = char_data['money'] - amount
+            money_change = -amount
             result_text = f"**You lose {amount:,} gold!**"
             color = discord.Color.red()
             
-        self.db.update_character(ctx.author.id, money=new_money)
+        new_money = await self.settle(ctx.author.id, money_change)
         
         # Create spinning animation
         embed = self.embed("🎰 Slot Machine", "Spinning...")
@@ -173,7 +181,7 @@ class GamblingCog(DiscordRPGCog):
     @commands.cooldown(1, 60, commands.BucketType.user)
     async def blackjack(self, ctx: commands.Context, amount: int):
         """Play blackjack against the house"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         if amount <= 0:
             await ctx.send("❌ Bet amount must be positive!")
@@ -196,7 +204,7 @@ class GamblingCog(DiscordRPGCog):
             for value in values:
                 deck.append(f"{value}{suit}")
         
-        random.shuffle(deck)
+        self.rng.shuffle(deck)
         
         # Deal initial cards
         player_hand = [deck.pop(), deck.pop()]
@@ -244,8 +252,7 @@ class GamblingCog(DiscordRPGCog):
         elif player_bj:
             # Player blackjack wins
             winnings = int(amount * 1.5)
-            new_money = char_data['money'] + winnings
-            self.db.update_character(ctx.author.id, money=new_money)
+            new_money = await self.settle(ctx.author.id, winnings)
             
             embed = self.embed("🃏 Blackjack!", f"You win {winnings:,} gold!")
             embed.color = discord.Color.gold()
@@ -255,8 +262,7 @@ class GamblingCog(DiscordRPGCog):
             return
         elif dealer_bj:
             # Dealer blackjack
-            new_money = char_data['money'] - amount
-            self.db.update_character(ctx.author.id, money=new_money)
+            new_money = await self.settle(ctx.author.id, -amount)
             
             embed = self.embed("🃏 Dealer Blackjack", f"You lose {amount:,} gold!")
             embed.color = discord.Color.red()
@@ -298,8 +304,7 @@ class GamblingCog(DiscordRPGCog):
         
         # Check for bust
         if player_value > 21:
-            new_money = char_data['money'] - amount
-            self.db.update_character(ctx.author.id, money=new_money)
+            new_money = await self.settle(ctx.author.id, -amount)
             
             embed = self.embed("🃏 Bust!", f"You lose {amount:,} gold!")
             embed.color = discord.Color.red()
@@ -317,27 +322,27 @@ class GamblingCog(DiscordRPGCog):
         if dealer_value > 21:
             # Dealer bust
             winnings = amount
-            new_money = char_data['money'] + winnings
+            money_change = winnings
             result = f"Dealer busts! You win {winnings:,} gold!"
             color = discord.Color.green()
         elif player_value > dealer_value:
             # Player wins
             winnings = amount
-            new_money = char_data['money'] + winnings
+            money_change = winnings
             result = f"You win {winnings:,} gold!"
             color = discord.Color.green()
         elif dealer_value > player_value:
             # Dealer wins
-            new_money = char_data['money'] - amount
+            money_change = -amount
             result = f"Dealer wins! You lose {amount:,} gold!"
             color = discord.Color.red()
         else:
             # Push
-            new_money = char_data['money']
+            money_change = 0
             result = "Push! No money exchanged."
             color = discord.Color.blue()
             
-        self.db.update_character(ctx.author.id, money=new_money)
+        new_money = await self.settle(ctx.author.id, money_change)
         
         embed = discord.Embed(title="🃏 Blackjack Results", description=result, color=color)
         embed.add_field(name="Your Hand", value=format_hand(player_hand), inline=False)
@@ -351,7 +356,7 @@ class GamblingCog(DiscordRPGCog):
     @commands.cooldown(1, 20, commands.BucketType.user)
     async def diceroll(self, ctx: commands.Context, amount: int):
         """Roll dice - win if you roll higher than the house"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         if amount <= 0:
             await ctx.send("❌ Bet amount must be positive!")
@@ -366,8 +371,8 @@ class GamblingCog(DiscordRPGCog):
             return
             
         # Roll dice
-        player_roll = random.randint(1, 100)
-        house_roll = random.randint(1, 100)
+        player_roll = self.rng.randint(1, 100)
+        house_roll = self.rng.randint(1, 100)
         
         # Determine result
         if player_roll > house_roll:
@@ -383,21 +388,21 @@ class GamblingCog(DiscordRPGCog):
                 multiplier = 1.0
                 
             winnings = int(amount * multiplier)
-            new_money = char_data['money'] + winnings
+            money_change = winnings
             result = f"**You win {winnings:,} gold!** ({multiplier}x)"
             color = discord.Color.green()
         elif house_roll > player_roll:
             # Lose
-            new_money = char_data['money'] - amount
+            money_change = -amount
             result = f"**You lose {amount:,} gold!**"
             color = discord.Color.red()
         else:
             # Tie
-            new_money = char_data['money']
+            money_change = 0
             result = "**It's a tie! No money lost.**"
             color = discord.Color.blue()
             
-        self.db.update_character(ctx.author.id, money=new_money)
+        new_money = await self.settle(ctx.author.id, money_change)
         
         embed = discord.Embed(
             title="🎲 Dice Roll",
@@ -423,7 +428,7 @@ class GamblingCog(DiscordRPGCog):
     @commands.cooldown(1, 60, commands.BucketType.user)
     async def gamble(self, ctx: commands.Context, amount: int):
         """Simple high-risk gambling - 40% chance to double your money"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         if amount <= 0:
             await ctx.send("❌ Bet amount must be positive!")
@@ -444,35 +449,31 @@ class GamblingCog(DiscordRPGCog):
         luck_modifier = (char_data['luck'] - 1.0) * 5  # ±5% per 0.1 luck
         final_chance = max(5, min(80, win_chance + luck_modifier))  # Cap between 5-80%
         
-        won = random.randint(1, 100) <= final_chance
+        won = self.rng.randint(1, 100) <= final_chance
         
         if won:
             # Win double
             winnings = amount * 2
-            new_money = char_data['money'] + winnings
+            money_change = winnings
             result_text = f"🎉 **JACKPOT!** You win {winnings:,} gold!"
             color = discord.Color.gold()
             
             # Small XP bonus for big wins
             if amount >= 5000:
-                xp_bonus = random.randint(10, 25)
-                self.db.update_character(
-                    ctx.author.id,
-                    money=new_money,
-                    xp=char_data['xp'] + xp_bonus
-                )
+                xp_bonus = self.rng.randint(10, 25)
+                new_money = await self.settle(ctx.author.id, money_change, xp=xp_bonus)
                 result_text += f"\n✨ Bonus: +{xp_bonus} XP!"
             else:
-                self.db.update_character(ctx.author.id, money=new_money)
+                new_money = await self.settle(ctx.author.id, money_change)
         else:
             # Lose everything
-            new_money = char_data['money'] - amount
+            money_change = -amount
             result_text = f"💸 **You lose {amount:,} gold!**"
             color = discord.Color.red()
-            self.db.update_character(ctx.author.id, money=new_money)
+            new_money = await self.settle(ctx.author.id, money_change)
             
         # Log transaction
-        self.db.log_transaction(
+        await self.db.log_transaction(
             ctx.author.id if not won else None,
             None if not won else ctx.author.id,
             amount,
@@ -65,7 +65,7 @@ class HelpCog(DiscordRPGCog):
             "`!equip <id>` - Equip an item",
             "`!sell <id>` - Sell item to merchant",
             "`!give <user> <id>` - Give item to player",
-            "`!crate <type>` - Open a crate"
+            "`!open <type> [count|all]` - Open crates"
         ]
         embed.add_field(
             name="⚔️ **Equipment**",
@@ -76,6 +76,7 @@ class HelpCog(DiscordRPGCog):
         # Economy & Trading
         economy_commands = [
             "`!market` - Browse marketplace",
+            "`!cheapest [type] [rarity]` - Cheapest listings",
             "`!buy <id>` - Purchase item",
             "`!offer <id> <price>` - List item for sale", 
             "`!daily` - Daily login rewards"
@@ -117,10 +118,12 @@ class HelpCog(DiscordRPGCog):
         # Combat & PvP
         combat_commands = [
             "`!battle <@user> [bet]` - Challenge player (with optional gold bet)",
+            "`!odds <@user>` - Win chances (also `@a @b @c vs @d @e @f`)",
             "`!battles` - Battle system guide",
             "`!battlestatus` - Check battle system",
-            "`!tournament <prize>` - Host tournament",
-            "`!online` - See online players"
+            "`!tournament <prize> [single|swiss|roundrobin]` - Host tournament",
+            "`!online` - See online players",
+            "`!playtime [@user]` - Hours online today and this week"
         ]
         embed.add_field(
             name="⚔️ **Combat**",
@@ -3,6 +3,7 @@ import discord
 from discord.ext import commands
 from typing import Optional
 import math
+from datetime import datetime
 
 import sys
 import os
@@ -72,18 +73,32 @@ class PaginationView(discord.ui.View):
 
 from classes.items import ItemGenerator, ItemType, ItemRarity, CrateSystem
 
+# Most crates a single !open can roll
+MAX_CRATES_PER_OPEN = 1000
+
+RARITY_COLORS = {
+    "Common": 0x808080,
+    "Uncommon": 0x32CD32, 
+    "Rare": 0x0000FF,
+    "Magic": 0x9932CC,
+    "Legendary": 0xFF4500,
+    "Mythic": 0xFF6347,
+    "Divine": 0xFFD700
+}
+RARITY_ORDER = list(RARITY_COLORS)
+
 class InventoryCog(DiscordRPGCog):
     """Inventory, equipment, and item commands"""
     
     async def get_inventory_embed(self, user_id: int, page: int = 1):
         """Generate inventory embed for given page"""
-        items = self.db.get_user_items(user_id)
+        items = await self.db.get_user_items(user_id)
         
         if not items:
             embed = self.embed("📦 Inventory", "Your inventory is empty!")
             
             # Check for crates even if inventory is empty
-            char_data = self.db.get_character(user_id)
+            char_data = await self.db.get_character(user_id)
             crate_info = []
             if char_data['crates_common'] > 0:
                 crate_info.append(f"📦 Common: {char_data['crates_common']}")
@@ -171,7 +186,7 @@ class InventoryCog(DiscordRPGCog):
             )
             
         # Add crate information
-        char_data = self.db.get_character(user_id)
+        char_data = await self.db.get_character(user_id)
         crate_info = []
         if char_data['crates_common'] > 0:
             crate_info.append(f"📦 Common: {char_data['crates_common']}")
@@ -199,7 +214,7 @@ class InventoryCog(DiscordRPGCog):
     @has_character()
     async def inventory(self, ctx: commands.Context, page: int = 1):
         """View your inventory"""
-        items = self.db.get_user_items(ctx.author.id)
+        items = await self.db.get_user_items(ctx.author.id)
         embed = await self.get_inventory_embed(ctx.author.id, page)
         
         # Check if pagination is needed
@@ -217,62 +232,70 @@ class InventoryCog(DiscordRPGCog):
             await ctx.send(embed=embed)
         
     @commands.command(aliases=["equipped"])
-    @has_character()
     async def equipment(self, ctx: commands.Context):
         """View your equipped items"""
-        items = self.db.get_equipped_items(ctx.author.id)
-        
-        embed = self.embed("⚔️ Equipment", "Your currently equipped items:")
-        
-        if not items:
-            embed.description = "No items equipped. Use `!equip <item_id>` to equip items."
-        else:
-            total_damage = sum(item['damage'] for item in items)
-            total_armor = sum(item['armor'] for item in items)
-            
-            # Calculate armor bonuses
-            total_health_bonus = sum(item.get('health_bonus', 0) for item in items)
-            total_speed_bonus = sum(item.get('speed_bonus', 0) for item in items)
-            total_luck_bonus = sum(item.get('luck_bonus', 0.0) for item in items)
-            total_crit_bonus = sum(item.get('crit_bonus', 0.0) for item in items)
-            total_magic_bonus = sum(item.get('magic_bonus', 0) for item in items)
-            total_value = sum(item['value'] for item in items)
-            
-            equipment_text = []
-            for item in items:
-                stats = f"{item['damage']}⚔️ {item['armor']}🛡️"
-                equipment_text.append(f"**{item['name']}** - `{item['type']}` ({stats})")
+        # Cached until the next write to this user's gear (a hit needs no has_character() query)
+        version = self.db.version(ctx.author.id)
+        embed = self.bot.render_cache.get('equipment', ctx.author.id, version)
+        if embed is None:
+            snapshot = await self.db.get_profile_snapshot(ctx.author.id, datetime.now())
+            if not snapshot:
+                await ctx.send("❌ You need to create a character first! Use `!create`")
+                return
+            items = snapshot['items']
+            
+            embed = self.embed("⚔️ Equipment", "Your currently equipped items:")
+        
+            if not items:
+                embed.description = "No items equipped. Use `!equip <item_id>` to equip items."
+            else:
+                # Totals come from the snapshot's aggregate
+                total_damage = snapshot['total_damage']
+                total_armor = snapshot['total_armor']
+                total_health_bonus = snapshot['total_health_bonus']
+                total_speed_bonus = snapshot['total_speed_bonus']
+                total_luck_bonus = snapshot['total_luck_bonus']
+                total_crit_bonus = snapshot['total_crit_bonus']
+                total_magic_bonus = snapshot['total_magic_bonus']
+                total_value = snapshot['total_value']
+            
+                equipment_text = []
+                for item in items:
+                    stats = f"{item['damage']}⚔️ {item['armor']}🛡️"
+                    equipment_text.append(f"**{item['name']}** - `{item['type']}` ({stats})")
                 
-            embed.add_field(
-                name="📋 Equipped Items",
-                value="\n".join(equipment_text),
-                inline=False
-            )
+                embed.add_field(
+                    name="📋 Equipped Items",
+                    value="\n".join(equipment_text),
+                    inline=False
+                )
             
-            embed.add_field(name="⚔️ Total Damage", value=total_damage, inline=True)
-            embed.add_field(name="🛡️ Total Armor", value=total_armor, inline=True)
-            embed.add_field(name="💰 Total Value", value=f"{total_value:,}", inline=True)
-            
-            # Show armor bonuses if any
-            if any([total_health_bonus, total_speed_bonus, total_luck_bonus, total_crit_bonus, total_magic_bonus]):
-                bonus_stats = []
-                if total_health_bonus > 0:
-                    bonus_stats.append(f"❤️ Health: +{total_health_bonus}")
-                if total_speed_bonus > 0:
-                    bonus_stats.append(f"💨 Speed: +{total_speed_bonus}")
-                if total_luck_bonus > 0:
-                    bonus_stats.append(f"🍀 Luck: +{total_luck_bonus:.3f}")
-                if total_crit_bonus > 0:
-                    bonus_stats.append(f"💥 Crit: +{total_crit_bonus:.1%}")
-                if total_magic_bonus > 0:
-                    bonus_stats.append(f"✨ Magic: +{total_magic_bonus}")
+                embed.add_field(name="⚔️ Total Damage", value=total_damage, inline=True)
+                embed.add_field(name="🛡️ Total Armor", value=total_armor, inline=True)
+                embed.add_field(name="💰 Total Value", value=f"{total_value:,}", inline=True)
+            
+                # Show armor bonuses if any
+                if any([total_health_bonus, total_speed_bonus, total_luck_bonus, total_crit_bonus, total_magic_bonus]):
+                    bonus_stats = []
+                    if total_health_bonus > 0:
+                        bonus_stats.append(f"❤️ Health: +{total_health_bonus}")
+                    if total_speed_bonus > 0:
+                        bonus_stats.append(f"💨 Speed: +{total_speed_bonus}")
+                    if total_luck_bonus > 0:
+                        bonus_stats.append(f"🍀 Luck: +{total_luck_bonus:.3f}")
+                    if total_crit_bonus > 0:
+                        bonus_stats.append(f"💥 Crit: +{total_crit_bonus:.1%}")
+                    if total_magic_bonus > 0:
+                        bonus_stats.append(f"✨ Magic: +{total_magic_bonus}")
                 
-                if bonus_stats:
-                    embed.add_field(
-                        name="🛡️ Armor Bonuses",
-                        value="\n".join(bonus_stats),
-                        inline=False
-                    )
+                    if bonus_stats:
+                        embed.add_field(
+                            name="🛡️ Armor Bonuses",
+                            value="\n".join(bonus_stats),
+                            inline=False
+                        )
+            
+            self.bot.render_cache.put('equipment', ctx.author.id, version, embed)
             
         await ctx.send(embed=embed)
         
@@ -281,7 +304,7 @@ class InventoryCog(DiscordRPGCog):
     async def equip(self, ctx: commands.Context, item_id: int):
         """Equip an item by ID"""
         # Get the item
-        item = self.db.get_item_by_id(item_id)
+        item = await self.db.get_item_by_id(item_id)
         if not item or item['owner'] != ctx.author.id:
             await ctx.send("❌ Item not found or you don't own it!")
             return
@@ -291,7 +314,7 @@ class InventoryCog(DiscordRPGCog):
             return
             
         # Check equipment conflicts
-        equipped_items = self.db.get_equipped_items(ctx.author.id)
+        equipped_items = await self.db.get_equipped_items(ctx.author.id)
         
         # Simple equipment logic
         hand = item['hand']
@@ -331,10 +354,10 @@ class InventoryCog(DiscordRPGCog):
                     
         # Unequip conflicting items
         for conflict in conflicts:
-            self.db.unequip_item(conflict['id'], ctx.author.id)
+            await self.db.unequip_item(conflict['id'], ctx.author.id)
             
         # Equip the new item
-        success = self.db.equip_item(item_id, ctx.author.id)
+        success = await self.db.equip_item(item_id, ctx.author.id)
         
         if success:
             embed = self.success_embed(f"Equipped **{item['name']}**!")
@@ -353,7 +376,7 @@ class InventoryCog(DiscordRPGCog):
     @has_character()
     async def remove(self, ctx: commands.Context, item_id: int):
         """Unequip an item by ID"""
-        item = self.db.get_item_by_id(item_id)
+        item = await self.db.get_item_by_id(item_id)
         if not item or item['owner'] != ctx.author.id:
             await ctx.send("❌ Item not found or you don't own it!")
             return
@@ -362,7 +385,7 @@ class InventoryCog(DiscordRPGCog):
             await ctx.send("❌ This item is not equipped!")
             return
             
-        success = self.db.unequip_item(item_id, ctx.author.id)
+        success = await self.db.unequip_item(item_id, ctx.author.id)
         
         if success:
             embed = self.success_embed(f"Unequipped **{item['name']}**!")
@@ -374,7 +397,7 @@ class InventoryCog(DiscordRPGCog):
     @has_character()
     async def item(self, ctx: commands.Context, item_id: int):
         """View detailed information about an item"""
-        item = self.db.get_item_by_id(item_id)
+        item = await self.db.get_item_by_id(item_id)
         if not item:
             await ctx.send("❌ Item not found!")
             return
@@ -450,11 +473,17 @@ class InventoryCog(DiscordRPGCog):
             
         await ctx.send(embed=embed)
         
+    async def refresh_market(self, item_id: int):
+        """Keep the market order book in step after an item changes hands"""
+        economy = self.bot.get_cog('EconomyCog')
+        if economy:
+            await economy.market.refresh(item_id)
+            
     @commands.command()
     @has_character()
     async def sell(self, ctx: commands.Context, item_id: int):
         """Sell an item to the merchant"""
-        item = self.db.get_item_by_id(item_id)
+        item = await self.db.get_item_by_id(item_id)
         if not item or item['owner'] != ctx.author.id:
             await ctx.send("❌ Item not found or you don't own it!")
             return
@@ -470,14 +499,13 @@ class InventoryCog(DiscordRPGCog):
             await ctx.send("Sale cancelled.")
             return
             
-        # Remove item and give gold
-        self.db.delete_item(item_id)
-        char_data = self.db.get_character(ctx.author.id)
-        new_money = char_data['money'] + sell_price
-        self.db.update_character(ctx.author.id, money=new_money)
+        # Remove item and give gold (a market listing goes with it)
+        await self.db.delete_item(item_id)
+        await self.refresh_market(item_id)
+        new_money = (await self.db.increment(ctx.author.id, money=sell_price))['money']
         
         # Log transaction
-        self.db.log_transaction(
+        await self.db.log_transaction(
             ctx.author.id, None, sell_price, "item_sale",
             {"item": item['name'], "item_id": item_id}
         )
@@ -497,12 +525,12 @@ class InventoryCog(DiscordRPGCog):
             return
             
         # Check if recipient has character
-        recipient_data = self.db.get_character(user.id)
+        recipient_data = await self.db.get_character(user.id)
         if not recipient_data:
             await ctx.send("❌ The recipient doesn't have a character!")
             return
             
-        item = self.db.get_item_by_id(item_id)
+        item = await self.db.get_item_by_id(item_id)
         if not item or item['owner'] != ctx.author.id:
             await ctx.send("❌ Item not found or you don't own it!")
             return
@@ -516,14 +544,11 @@ class InventoryCog(DiscordRPGCog):
             return
             
         # Transfer ownership
-        self.db.execute(
-            "UPDATE inventory SET owner = ? WHERE id = ?",
-            (user.id, item_id)
-        )
-        self.db.commit()
+        await self.db.transfer_item(item_id, user.id)
+        await self.refresh_market(item_id)
         
         # Log transaction
-        self.db.log_transaction(
+        await self.db.log_transaction(
             ctx.author.id, user.id, 0, "item_transfer",
             {"item": item['name'], "item_id": item_id}
         )
@@ -546,9 +571,9 @@ class InventoryCog(DiscordRPGCog):
             
     @commands.command(aliases=["open"])
     @has_character()
-    async def crate(self, ctx: commands.Context, crate_type: str):
-        """Open a crate (common, uncommon, rare, magic, legendary, mystery)"""
-        char_data = self.db.get_character(ctx.author.id)
+    async def crate(self, ctx: commands.Context, crate_type: str, amount: str = "1"):
+        """Open crates (common, uncommon, rare, magic, legendary, mystery) - `!open <type> [count|all]`"""
+        char_data = await self.db.get_character(ctx.author.id)
         
         crate_map = {
             "common": ("crates_common", "Common Crate"),
@@ -559,71 +584,95 @@ class InventoryCog(DiscordRPGCog):
             "mystery": ("crates_mystery", "Mystery Crate")
         }
         
-        if crate_type.lower() not in crate_map:
+        crate_type = crate_type.lower()
+        if crate_type not in crate_map:
             await ctx.send("❌ Invalid crate type! Options: common, uncommon, rare, magic, legendary, mystery")
             return
             
-        crate_field, crate_name = crate_map[crate_type.lower()]
+        crate_field, crate_name = crate_map[crate_type]
         crate_count = char_data[crate_field]
         
         if crate_count <= 0:
             await ctx.send(f"❌ You don't have any {crate_name}s!")
             return
             
-        # Open crate
-        reward_type, item, money = CrateSystem.open_crate(crate_type.lower(), ctx.author.id)
-        
-        # Deduct crate
-        self.db.update_character(ctx.author.id, **{crate_field: crate_count - 1})
+        if amount.lower() == "all":
+            count = min(crate_count, MAX_CRATES_PER_OPEN)
+        elif amount.isdigit() and int(amount) > 0:
+            count = int(amount)
+        else:
+            await ctx.send("❌ Amount must be a positive number or `all`!")
+            return
+            
+        if count > crate_count:
+            await ctx.send(f"❌ You only have {crate_count} {crate_name}s!")
+            return
+        if count > MAX_CRATES_PER_OPEN:
+            await ctx.send(f"❌ You can open at most {MAX_CRATES_PER_OPEN} crates at once!")
+            return
+            
+        # Roll every crate, then apply all rewards in one transaction
+        rewards = CrateSystem.open_crates(crate_type, ctx.author.id, count, rng=self.bot.rng.stream('crates'))
+        if not await self.db.open_crates(ctx.author.id, crate_type, rewards):
+            await ctx.send(f"❌ You don't have enough {crate_name}s!")
+            return
+            
+        if count == 1:
+            embed = self.single_crate_embed(crate_name, rewards[0])
+        else:
+            embed = self.crate_summary_embed(crate_name, rewards)
+            
+        embed.set_footer(text=f"Remaining {crate_name}s: {crate_count - count}")
+        await ctx.send(embed=embed)
         
+    def single_crate_embed(self, crate_name: str, reward: tuple) -> discord.Embed:
+        """Embed for a single opened crate"""
+        reward_type, item, money = reward
         embed = self.embed(f"📦 {crate_name} Opened!")
         
         if reward_type == "money":
-            # Give money
-            new_money = char_data['money'] + money
-            self.db.update_character(ctx.author.id, money=new_money)
-            
             embed.add_field(name="💰 Money Reward", value=f"{money:,} gold", inline=False)
             embed.color = discord.Color.gold()
-            
-        else:  # item
-            # Create item in database
-            item_id = self.db.create_item(
-                ctx.author.id, item.name, item.type.value,
-                item.value, item.damage, item.armor, item.hand.value,
-                item.health_bonus, item.speed_bonus, item.luck_bonus,
-                item.crit_bonus, item.magic_bonus, item.slot_type
-            )
-            
-            total_stats = item.damage + item.armor
-            rarity_colors = {
-                "Common": 0x808080,
-                "Uncommon": 0x32CD32, 
-                "Rare": 0x0000FF,
-                "Magic": 0x9932CC,
-                "Legendary": 0xFF4500,
-                "Mythic": 0xFF6347,
-                "Divine": 0xFFD700
-            }
-            
+        else:
             embed.add_field(
                 name="⚔️ Item Reward", 
                 value=f"**{item.name}**\n`{item.type.value}` • {item.damage}⚔️ {item.armor}🛡️",
                 inline=False
             )
-            embed.color = discord.Color(rarity_colors.get(item.rarity.value.title(), 0x808080))
-            
-        # Log crate history
-        self.db.execute(
-            "INSERT INTO crate_history (user_id, crate_type, item_name, item_stats) VALUES (?, ?, ?, ?)",
-            (ctx.author.id, crate_type, 
-             item.name if item else "Gold", 
-             item.stat_total if item else money)
-        )
-        self.db.commit()
+            embed.color = discord.Color(RARITY_COLORS.get(item.rarity.value.title(), 0x808080))
+        return embed
         
-        embed.set_footer(text=f"Remaining {crate_name}s: {crate_count - 1}")
-        await ctx.send(embed=embed)
+    def crate_summary_embed(self, crate_name: str, rewards: list) -> discord.Embed:
+        """Summary embed for many opened crates"""
+        items = [item for _, item, _ in rewards if item is not None]
+        gold = sum(money or 0 for _, _, money in rewards)
+        embed = self.embed(f"📦 {len(rewards)} {crate_name}s Opened!")
+        
+        embed.add_field(name="💰 Gold", value=f"{gold:,} gold", inline=True)
+        embed.add_field(name="⚔️ Items", value=f"{len(items)}", inline=True)
+        
+        if items:
+            by_rarity = {}
+            for item in items:
+                by_rarity[item.rarity.value.title()] = by_rarity.get(item.rarity.value.title(), 0) + 1
+            embed.add_field(
+                name="✨ Rarities",
+                value="\n".join(f"{rarity}: {count}" for rarity, count in
+                                sorted(by_rarity.items(), key=lambda entry: -RARITY_ORDER.index(entry[0]))),
+                inline=True
+            )
+            
+            best = sorted(items, key=lambda item: item.stat_total, reverse=True)[:5]
+            embed.add_field(
+                name="🏆 Best Finds",
+                value="\n".join(f"**{item.name}** `{item.type.value}` • {item.damage}⚔️ {item.armor}🛡️"
+                                for item in best),
+                inline=False
+            )
+            embed.color = discord.Color(RARITY_COLORS.get(best[0].rarity.value.title(), 0x808080))
+        else:
+            embed.color = discord.Color.gold()
+        return embed
 
 async def setup(bot):
     await bot.add_cog(InventoryCog(bot))
\ No newline at end of file
@@ -62,10 +62,6 @@ class OracleCog(DiscordRPGCog):
             print("⚠️ No OpenAI API key found in environment")
             self.openai_client = None
     
-    async def cog_load(self):
-        """Load game documentation when cog loads"""
-        await self._compile_game_documentation()
-        
     async def _compile_game_documentation(self):
         """Extract and compile comprehensive game documentation"""
         self.game_knowledge = {
@@ -223,18 +219,18 @@ class OracleCog(DiscordRPGCog):
         }
         return systems
     
-    def _get_user_context(self, user_id: int) -> Dict[str, Any]:
+    async def _get_user_context(self, user_id: int) -> Dict[str, Any]:
         """Get current user context for personalized responses"""
         try:
-            char_data = self.db.get_character(user_id)
+            char_data = await self.db.get_character(user_id)
             if not char_data:
                 return {"status": "no_character"}
                 
             # Get equipped items
-            equipped = self.db.get_equipped_items(user_id)
+            equipped = await self.db.get_equipped_items(user_id)
             
             # Get active adventure
-            active_adventure = self.db.get_active_adventure(user_id)
+            active_adventure = await self.db.get_active_adventure(user_id)
             
             context = {
                 "status": "active_player",
@@ -264,6 +260,10 @@ class OracleCog(DiscordRPGCog):
             if self._is_calmbot_question(question):
                 return await self._generate_calmbot_roast(question, user_context)
             
+            # Compiled on first use, once every cog's commands are registered
+            if not self.game_knowledge:
+                await self._compile_game_documentation()
+                
             # Create comprehensive context for the AI
             full_context = {
                 "player": user_context,
@@ -414,7 +414,7 @@ Remember: Be creatively savage while staying completely in mystical character!""
         """Consult the Oracle about game mechanics and systems"""
         
         # Get user context
-        user_context = self._get_user_context(ctx.author.id)
+        user_context = await self._get_user_context(ctx.author.id)
         
         # Show typing indicator
         async with ctx.typing():
@@ -0,0 +1,295 @@
+"""Performance instrumentation commands"""
+import discord
+from discord.ext import commands, tasks
+import os
+import time
+import logging
+from datetime import datetime
+from typing import Optional
+
+from aiohttp import web
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from bot import DiscordRPGCog
+from utils.query_stats import CALLER_SAMPLE_EVERY
+
+logger = logging.getLogger('DiscordRPG.Perf')
+
+class PerfCog(DiscordRPGCog):
+    """Runtime performance statistics (admin only)"""
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.metrics = bot.metrics
+        self.metrics_file = os.getenv('METRICS_FILE', '')
+        self.metrics_port = int(os.getenv('METRICS_PORT', '0') or 0)
+        self.metrics_host = os.getenv('METRICS_HOST', '127.0.0.1')
+        self._runner: Optional[web.AppRunner] = None
+
+    async def cog_load(self):
+        """Start the lag probe, time background loops and start exporters"""
+        self.metrics.start_lag_probe()
+        self.instrument_cogs()
+        if self.metrics_file and not self.export_metrics.is_running():
+            self.export_metrics.start()
+        if self.metrics_port:
+            await self._start_http()
+
+    async def cog_unload(self):
+        """Stop the lag probe and exporters"""
+        self.metrics.stop_lag_probe()
+        if self.export_metrics.is_running():
+            self.export_metrics.cancel()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def instrument_cogs(self) -> int:
+        """Time the tasks.loop iterations of every loaded cog"""
+        wrapped = sum(self.metrics.instrument_cog(cog) for cog in self.bot.cogs.values())
+        if wrapped:
+            logger.info(f"Timing {wrapped} background loops")
+        return wrapped
+
+    def render_metrics(self) -> str:
+        """Prometheus exposition of bot and database metrics"""
+        return self.metrics.prometheus(self.db.query_stats if self.db else None)
+
+    async def _start_http(self):
+        """Serve /metrics over HTTP"""
+        async def handle(request):
+            return web.Response(text=self.render_metrics(), content_type="text/plain")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.metrics_host, self.metrics_port).start()
+            logger.info(f"Serving metrics on http://{self.metrics_host}:{self.metrics_port}/metrics")
+        except OSError as e:
+            logger.error(f"Failed to start metrics endpoint: {e}")
+            await self._runner.cleanup()
+            self._runner = None
+
+    @tasks.loop(seconds=15)
+    async def export_metrics(self):
+        """Write the Prometheus text file"""
+        try:
+            self.metrics.write_textfile(self.metrics_file, self.db.query_stats if self.db else None)
+        except OSError as e:
+            logger.error(f"Failed to write metrics file {self.metrics_file}: {e}")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Pick up loops on cogs loaded after this one"""
+        self.instrument_cogs()
+
+    @commands.Cog.listener()
+    async def on_startup_complete(self):
+        """Pick up loops on the background cogs"""
+        self.instrument_cogs()
+
+    @commands.Cog.listener()
+    async def on_command(self, ctx: commands.Context):
+        ctx.perf_started = time.perf_counter()
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx: commands.Context):
+        started = getattr(ctx, 'perf_started', None)
+        if started is not None and ctx.command:
+            self.metrics.observe_command(ctx.command.qualified_name, time.perf_counter() - started)
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx: commands.Context, error: Exception):
+        started = getattr(ctx, 'perf_started', None)
+        if started is not None and ctx.command:
+            self.metrics.observe_command(ctx.command.qualified_name, time.perf_counter() - started, failed=True)
+
+    def _shorten(self, text: str, limit: int = 180) -> str:
+        """Trim long SQL for embed fields"""
+        return text if len(text) <= limit else text[:limit - 3] + "..."
+
+    async def _db_top(self, ctx: commands.Context, key: str = "total_ms"):
+        """Show the most expensive statement templates"""
+        stats = self.db.query_stats
+        totals = stats.totals()
+        embed = self.embed(
+            "🗄️ Database Statistics",
+            f"**{totals['calls']:,}** statements across **{totals['templates']}** templates "
+            f"in {totals['uptime_seconds'] / 60:.0f} min\n"
+            f"Total time: **{totals['total_ms'] / 1000:.2f}s** • "
+            f"Slow queries (≥{stats.slow_ms:.0f}ms): **{totals['slow_queries']}**"
+        )
+
+        for entry in stats.top(key, limit=8):
+            callers = ", ".join(f"{name} ({count})" for name, count in entry.callers.most_common(2))
+            embed.add_field(
+                name=f"{entry.calls:,} calls • {entry.total_ms:.0f}ms total",
+                value=f"```sql\n{self._shorten(entry.template)}\n```"
+                      f"avg {entry.avg_ms:.2f}ms • p99 {entry.p99_ms:.2f}ms • max {entry.max_ms:.1f}ms • "
+                      f"{entry.rows:,} rows\n{callers}",
+                inline=False
+            )
+
+        if not stats.templates:
+            embed.add_field(name="No data yet", value="No statements recorded since instrumentation started.")
+        await ctx.send(embed=embed)
+
+    async def _db_slow(self, ctx: commands.Context):
+        """Show the most recent slow queries with their plans"""
+        stats = self.db.query_stats
+        embed = self.embed(
+            "🐢 Slow Queries",
+            f"Last {min(len(stats.slow_queries), 6)} of {len(stats.slow_queries)} statements "
+            f"slower than {stats.slow_ms:.0f}ms"
+        )
+
+        for entry in list(stats.slow_queries)[-6:][::-1]:
+            when = datetime.fromtimestamp(entry['at']).strftime("%H:%M:%S")
+            plan = "\n".join(entry['plan'][:4])
+            embed.add_field(
+                name=f"{entry['ms']:.0f}ms at {when} • {entry['caller']}",
+                value=f"```sql\n{self._shorten(entry['template'], 300)}\n```"
+                      f"```\n{self._shorten(plan, 300)}\n```",
+                inline=False
+            )
+
+        if not stats.slow_queries:
+            embed.add_field(name="All clear", value="No slow queries recorded.")
+        await ctx.send(embed=embed)
+
+    async def _loop_lag(self, ctx: commands.Context):
+        """Show event-loop lag"""
+        lag = self.metrics.loop_lag
+        embed = self.embed(
+            "⏱️ Event Loop Lag",
+            f"Probe every {self.metrics.lag_interval}s • {lag.count:,} samples"
+        )
+        embed.add_field(
+            name="Lag",
+            value=f"avg {lag.avg * 1000:.1f}ms • p50 {lag.percentile(50) * 1000:.1f}ms • "
+                  f"p99 {lag.percentile(99) * 1000:.1f}ms • max {lag.max * 1000:.0f}ms",
+            inline=False
+        )
+        embed.add_field(name="Gateway Latency", value=f"{self.bot.latency * 1000:.0f}ms", inline=False)
+        await ctx.send(embed=embed)
+
+    async def _startup(self, ctx: commands.Context):
+        """Show how long each startup stage and cog took"""
+        timings = getattr(self.bot, 'startup_timings', {})
+        embed = self.embed(
+            "🚀 Startup",
+            "\n".join(f"**{stage.replace('_', ' ').title()}**: {seconds:.2f}s" for stage, seconds in timings.items())
+            or "No startup timings recorded."
+        )
+        slowest = sorted(getattr(self.bot, 'cog_load_times', {}).items(), key=lambda item: item[1], reverse=True)[:10]
+        if slowest:
+            embed.add_field(
+                name="Slowest Cogs",
+                value="\n".join(f"`{cog}` {seconds * 1000:.0f}ms" for cog, seconds in slowest),
+                inline=False
+            )
+        await ctx.send(embed=embed)
+
+    async def _outbox(self, ctx: commands.Context):
+        """Show outbound queue depth, coalescing and send latency"""
+        latency = self.metrics.outbound_latency
+        requests, messages = self.metrics.outbound_requests, self.metrics.outbound_messages
+        embed = self.embed(
+            "📤 Outbound Messages",
+            f"{requests:,} requests sent as {messages:,} messages"
+            + (f" ({requests / messages:.1f} per message)" if messages else "")
+            + f" • {self.metrics.outbound_dropped:,} dropped"
+        )
+        embed.add_field(
+            name="Send Latency",
+            value=f"avg {latency.avg * 1000:.0f}ms • p50 {latency.percentile(50) * 1000:.0f}ms • "
+                  f"p99 {latency.percentile(99) * 1000:.0f}ms • max {latency.max * 1000:.0f}ms",
+            inline=False
+        )
+        busiest = sorted(self.bot.outbox.channels.values(), key=lambda queue: len(queue.heap), reverse=True)[:5]
+        embed.add_field(
+            name=f"Queued • {self.bot.outbox.depth:,}",
+            value="\n".join(f"<#{queue.channel.id}> {len(queue.heap)}" for queue in busiest if queue.heap)
+            or "All channels caught up.",
+            inline=False
+        )
+        await ctx.send(embed=embed)
+
+    async def _histograms(self, ctx: commands.Context, title: str, histograms: dict, errors: dict):
+        """Show the slowest commands or background loops"""
+        embed = self.embed(title)
+        ranked = sorted(histograms.items(), key=lambda item: item[1].sum, reverse=True)[:10]
+        for name, histogram in ranked:
+            embed.add_field(
+                name=f"{name} • {histogram.count:,} runs",
+                value=f"total {histogram.sum:.1f}s • avg {histogram.avg * 1000:.0f}ms • "
+                      f"p99 {histogram.percentile(99) * 1000:.0f}ms • max {histogram.max * 1000:.0f}ms"
+                      + (f" • ❌ {errors[name]}" if errors.get(name) else ""),
+                inline=False
+            )
+        if not ranked:
+            embed.description = "Nothing recorded yet."
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def perf(self, ctx: commands.Context, section: str = "loop", action: str = "top"):
+        """Show performance statistics (admin only)"""
+        section = section.lower()
+        action = action.lower()
+
+        if section == "loop":
+            await self._loop_lag(ctx)
+        elif section == "commands":
+            await self._histograms(ctx, "⌨️ Command Latency", self.metrics.commands, self.metrics.command_errors)
+        elif section == "tasks":
+            await self._histograms(ctx, "🔁 Background Loops", self.metrics.tasks, self.metrics.task_errors)
+        elif section == "startup":
+            await self._startup(ctx)
+        elif section == "outbox":
+            await self._outbox(ctx)
+        elif section == "reset":
+            self.metrics.reset()
+            await ctx.send("✅ Runtime metrics reset.")
+        elif section == "db":
+            await self._perf_db(ctx, action)
+        else:
+            await ctx.send("❌ Use: `!perf loop/commands/tasks/startup/outbox/reset` or "
+                           "`!perf db [top/avg/p99/calls/slow/on/off/reset]`")
+
+    async def _perf_db(self, ctx: commands.Context, action: str):
+        """Database statistics actions"""
+        if action == "on":
+            slow_ms = float(os.getenv('DB_SLOW_QUERY_MS', '100'))
+            caller_every = int(os.getenv('DB_CALLER_SAMPLE', str(CALLER_SAMPLE_EVERY)))
+            self.db.enable_instrumentation(slow_ms=slow_ms, caller_every=caller_every)
+            logger.info(f"Query instrumentation enabled by {ctx.author}")
+            await ctx.send(f"✅ Query instrumentation enabled (slow query threshold {slow_ms:.0f}ms)")
+            return
+
+        if self.db.query_stats is None:
+            await ctx.send("❌ Query instrumentation is off. Enable it with `!perf db on` "
+                           "or `DB_INSTRUMENTATION=true`.")
+            return
+
+        if action == "off":
+            self.db.disable_instrumentation()
+            logger.info(f"Query instrumentation disabled by {ctx.author}")
+            await ctx.send("⏹️ Query instrumentation disabled.")
+        elif action == "reset":
+            self.db.query_stats.reset()
+            await ctx.send("✅ Query statistics reset.")
+        elif action == "slow":
+            await self._db_slow(ctx)
+        elif action in ["top", "avg", "p99", "calls", "rows"]:
+            key = {"top": "total_ms", "avg": "avg_ms", "p99": "p99_ms"}.get(action, action)
+            await self._db_top(ctx, key)
+        else:
+            await ctx.send("❌ Use: `!perf db [top/avg/p99/calls/slow/on/off/reset]`")
+
+async def setup(bot):
+    await bot.add_cog(PerfCog(bot))
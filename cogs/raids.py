@@ -1,10 +1,10 @@
 """Auto-raid system - periodic group raids with bosses"""
 import discord
 from discord.ext import commands, tasks
-import random
 import asyncio
+import random
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 import sys
 import os
@@ -13,6 +13,8 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from bot import DiscordRPGCog, has_character
 from classes.character import Character, CharacterClass, Race
 from classes.items import ItemGenerator, ItemType
+from utils.outbox import Priority
+from utils.playback import Script
 
 class RaidBoss:
     """Raid boss with stats and mechanics"""
@@ -34,12 +36,12 @@ class RaidBoss:
         self.special_ability = special_ability
 
 class RaidsCog(DiscordRPGCog):
-    """Auto-raid system with periodic boss battles"""
+    """Auto-raid system with periodic boss battles, one raid per guild"""
     
     def __init__(self, bot):
         super().__init__(bot)
-        self.active_raid = None
-        self.raid_channel = None
+        self.raid_channels: Dict[int, discord.TextChannel] = {}  # guild_id -> raid channel
+        self.active_raids: Dict[int, Dict] = {}  # guild_id -> raid whose narrative is playing, for !raidstatus
         
         # Define raid bosses
         self.raid_bosses = [
@@ -55,6 +57,10 @@ class RaidsCog(DiscordRPGCog):
             RaidBoss("Undead Colossus", 38, 28000, 1100, 1000, 32, 40, 1200, 5500, "Bone Crush")
         ]
         
+    def rng_for(self, guild_id: Optional[int]) -> random.Random:
+        """Raid random stream for a guild (see utils/rng.py)"""
+        return self.bot.rng.stream('raids', guild_id)
+        
     async def cog_load(self):
         """Start the raid loop when cog loads"""
         await self.setup_raid_channel()
@@ -67,28 +73,39 @@ class RaidsCog(DiscordRPGCog):
             self.auto_raids.stop()
     
     async def setup_raid_channel(self):
-        """Find or create the raid channel"""
+        """Find the raid channel of every guild"""
         for guild in self.bot.guilds:
             # Look for existing discordrpg channel
             for channel in guild.text_channels:
                 if channel.name.lower() in ['discordrpg', 'rpg', 'game', 'bot']:
-                    self.raid_channel = channel
-                    return
+                    self.raid_channels[guild.id] = channel
+                    break
                     
     @tasks.loop(minutes=35)  # Final frequency: 30% increase then 10% decrease from original 45 minutes
     async def auto_raids(self):
-        """Automatically start raids periodically"""
+        """Automatically start a raid in every guild with enough online players"""
         try:
-            if self.active_raid:
-                return  # Don't start new raid if one is active
-                
-            # Get all online characters
-            online_players = await self.get_online_players()
-            if len(online_players) < 10:  # Need minimum players
+            await self.setup_raid_channel()
+            
+            # A player online in several guilds joins at most one raid per round
+            taken = set()
+            raids = []
+            for guild_id, players in (await self.get_online_players()).items():
+                if guild_id in self.active_raids:
+                    continue  # The last raid is still playing out there
+                available = [p for p in players if p['user_id'] not in taken]
+                if len(available) < 10:  # Need minimum players
+                    continue
+                raid = self.create_raid(guild_id, available)
+                taken.update(r['user_id'] for r in raid['raiders'])
+                raids.append(raid)
+            if not raids:
                 return
-                
-            # Start a raid
-            await self.start_raid(online_players)
+            
+            # Every roster in one query, then each raid settles in its own transaction
+            roster = {row['user_id']: row for row in await self.db.get_raid_roster(taken)}
+            for raid in raids:
+                await self.start_raid(raid, roster)
             
         except Exception as e:
             print(f"Auto-raid error: {e}")
@@ -98,46 +115,42 @@ class RaidsCog(DiscordRPGCog):
         """Wait for bot to be ready"""
         await self.bot.wait_until_ready()
         # Random initial delay of 5-15 minutes
-        delay = random.randint(300, 900)
+        delay = self.rng_for(None).randint(300, 900)
         await asyncio.sleep(delay)
     
-    async def get_online_players(self) -> List[Dict]:
-        """Get all online players with characters"""
-        all_chars = self.db.fetchall("SELECT user_id, name, level FROM profile ORDER BY level DESC")
-        online_players = []
-        
-        for char in all_chars:
-            user = self.bot.get_user(char['user_id'])
-            if user:
-                # Check if user is online in any guild
-                for guild in self.bot.guilds:
-                    member = guild.get_member(user.id)
-                    if member and member.status == discord.Status.online:
-                        online_players.append(char)
-                        break
-                        
-        return online_players
+    async def get_online_players(self) -> Dict[int, List[Dict]]:
+        """Online players with characters, per guild with a raid channel"""
+        presence = self.bot.presence
+        players = {guild_id: [] for guild_id in self.raid_channels}
+        for row in await self.db.list_characters(user_ids=presence.online_ids()):
+            for guild_id in presence.online_guilds(row['user_id']) & players.keys():
+                players[guild_id].append(row)
+        return players
     
-    async def start_raid(self, available_players: List[Dict]):
-        """Start a new raid with selected players"""
-        if not self.raid_channel:
-            await self.setup_raid_channel()
-            if not self.raid_channel:
-                return
-                
+    def create_raid(self, guild_id: int, available_players: List[Dict]) -> Dict:
+        """Pick a boss and raiders for a guild's raid"""
+        rng = self.rng_for(guild_id)
+        
         # Select random boss
-        boss = random.choice(self.raid_bosses)
+        boss = rng.choice(self.raid_bosses)
         
         # Select raid participants (20-40 players)
-        num_raiders = min(len(available_players), random.randint(boss.min_players, boss.max_players))
-        raiders = random.sample(available_players, num_raiders)
+        num_raiders = min(len(available_players), rng.randint(boss.min_players, boss.max_players))
+        raiders = rng.sample(available_players, num_raiders)
         
-        self.active_raid = {
+        return {
+            'guild_id': guild_id,
+            'channel': self.raid_channels[guild_id],
             'boss': boss,
             'raiders': raiders,
             'start_time': datetime.now(),
             'boss_hp': boss.hp
         }
+    
+    async def start_raid(self, raid: Dict, roster: Dict[int, Any]):
+        """Announce and settle a raid, then play it in its guild's channel"""
+        boss = raid['boss']
+        raiders = raid['raiders']
         
         # Announce raid start
         embed = self.embed(
@@ -161,47 +174,44 @@ class RaidsCog(DiscordRPGCog):
         embed.set_footer(text="The raid will commence automatically! Stay online to participate.")
         embed.color = discord.Color.red()
         
-        await self.raid_channel.send(embed=embed)
+        # The raid is settled right away; the channel sees it unfold at its own pace
+        script = Script(raid['channel'], Priority.EVENT).send(embed=embed)
+        await self.run_raid_battle(raid, roster, script)
+        
+        self.active_raids[raid['guild_id']] = raid
+        self.bot.playback.play(script).add_done_callback(lambda _: self.raid_shown(raid))
         
-        # Wait a moment for drama, then start the battle
-        await asyncio.sleep(10)
-        await self.run_raid_battle()
+    def raid_shown(self, raid: Dict):
+        """Playback finished - the raid no longer shows in !raidstatus"""
+        if self.active_raids.get(raid['guild_id']) is raid:
+            del self.active_raids[raid['guild_id']]
     
-    async def run_raid_battle(self):
-        """Run the actual raid battle mechanics"""
-        raid = self.active_raid
+    async def run_raid_battle(self, raid: Dict, roster: Dict[int, Any], script: Script):
+        """Resolve the raid, commit its rewards and append the battle narrative to script
+        
+        roster maps user_id to get_raid_roster() rows covering the raiders.
+        """
         boss = raid['boss']
         raiders = raid['raiders']
+        rng = self.rng_for(raid['guild_id'])
         
         # Calculate total raid power
         total_raid_power = 0
         raider_stats = []
         
-        for raider_data in raiders:
-            # Get full character data and stats
-            char_data = self.db.get_character(raider_data['user_id'])
-            char = Character(raider_data['user_id'], raider_data['name'])
+        for raider in raiders:
+            char_data = roster.get(raider['user_id'])
+            if char_data is None:
+                continue  # Deleted since the raid was picked
+            char = Character(char_data['user_id'], char_data['name'])
             char.level = char_data['level']
             char.char_class = CharacterClass(char_data['class'])
             char.race = Race(char_data['race'])
             char.luck = char_data['luck']
             char.raid_stats = char_data['raidstats']
             
-            # Get equipped items for power calculation
-            items = self.db.get_equipped_items(raider_data['user_id'])
-            total_damage = sum(item['damage'] for item in items)
-            total_armor = sum(item['armor'] for item in items)
-            
-            # Add new armor bonuses to raid power
-            health_bonus = sum(item.get('health_bonus', 0) for item in items)
-            speed_bonus = sum(item.get('speed_bonus', 0) for item in items)
-            luck_bonus = sum(item.get('luck_bonus', 0.0) for item in items)
-            crit_bonus = sum(item.get('crit_bonus', 0.0) for item in items)
-            magic_bonus = sum(item.get('magic_bonus', 0) for item in items)
-            
             stats = char.total_stats
-            equipment_power = total_damage + total_armor + health_bonus + speed_bonus + int(luck_bonus * 100) + int(crit_bonus * 100) + magic_bonus
-            raider_power = (stats['attack'] + stats['defense'] + equipment_power) * stats.get('raid_mult', 1.0)
+            raider_power = (stats['attack'] + stats['defense'] + char_data['equipment_power']) * stats.get('raid_mult', 1.0)
             total_raid_power += raider_power
             
             raider_stats.append({
@@ -209,6 +219,8 @@ class RaidsCog(DiscordRPGCog):
                 'power': raider_power,
                 'stats': stats
             })
+        if not raider_stats:
+            return
         
         # Raid battle calculation
         # Boss scales with number of raiders but raiders have advantage in numbers
@@ -221,18 +233,22 @@ class RaidsCog(DiscordRPGCog):
         raid_success_chance += luck_bonus
         
         # Determine outcome
-        success = random.randint(1, 100) <= raid_success_chance
+        success = rng.randint(1, 100) <= raid_success_chance
         
-        # Battle narrative
-        await asyncio.sleep(3)
+        # Settle rewards before anything is shown
+        deltas: Dict[int, Dict[str, int]] = {}
+        items = []
+        if success:
+            result_embeds = self.handle_raid_victory(raider_stats, boss, deltas, items, rng)
+        else:
+            result_embeds = self.handle_raid_defeat(raider_stats, boss, deltas, rng)
+        await self.db.apply_rewards(deltas, items)
         
-        # Combat updates
-        await self.raid_channel.send(f"⚔️ **The raid begins!** {len(raiders)} warriors charge into battle against the {boss.name}!")
-        await asyncio.sleep(3)
+        # Battle narrative - a pause for drama after the announcement, then combat updates
+        script.send(f"⚔️ **The raid begins!** {len(raiders)} warriors charge into battle against the {boss.name}!", delay=13)
         
         if boss.special_ability:
-            await self.raid_channel.send(f"💥 **{boss.name} uses {boss.special_ability}!** The ground trembles with dark power...")
-            await asyncio.sleep(3)
+            script.send(f"💥 **{boss.name} uses {boss.special_ability}!** The ground trembles with dark power...", delay=3)
         
         # Random combat events
         combat_events = [
@@ -243,21 +259,20 @@ class RaidsCog(DiscordRPGCog):
             f"💪 The strongest warriors hold the front line!"
         ]
         
+        delay = 3
         for i in range(3):
-            await self.raid_channel.send(random.choice(combat_events))
-            await asyncio.sleep(2)
+            script.send(rng.choice(combat_events), delay=delay)
+            delay = 2
         
         # Battle outcome
-        if success:
-            await self.handle_raid_victory(raider_stats, boss)
-        else:
-            await self.handle_raid_defeat(raider_stats, boss)
-        
-        # Clear active raid
-        self.active_raid = None
+        for embed in result_embeds:
+            script.send(embed=embed, delay=delay)
+            delay = 0
     
-    async def handle_raid_victory(self, raider_stats: List[Dict], boss: RaidBoss):
-        """Handle successful raid completion"""
+    def handle_raid_victory(self, raider_stats: List[Dict], boss: RaidBoss,
+                            deltas: Dict[int, Dict[str, int]], items: List,
+                            rng: random.Random) -> List[discord.Embed]:
+        """Roll victory rewards into deltas/items, returns the result embeds"""
         embed = self.embed(
             f"🏆 RAID VICTORY!",
             f"**The {boss.name} has been defeated!**\n\nThe combined might of {len(raider_stats)} heroes has triumphed over this legendary foe!"
@@ -284,8 +299,8 @@ class RaidsCog(DiscordRPGCog):
                 mvp_name = char_data['name']
             
             # Base rewards
-            xp_reward = boss.xp_reward + random.randint(50, 150)
-            gold_reward = boss.gold_reward + random.randint(200, 800)
+            xp_reward = boss.xp_reward + rng.randint(50, 150)
+            gold_reward = boss.gold_reward + rng.randint(200, 800)
             
             # Bonus for higher level bosses
             level_bonus = boss.level * 10
@@ -298,14 +313,7 @@ class RaidsCog(DiscordRPGCog):
                 gold_reward = int(gold_reward * raider['stats']['raid_mult'])
             
             # Update character
-            new_money = char_data['money'] + gold_reward
-            new_xp = char_data['xp'] + xp_reward
-            new_raid_stats = char_data['raidstats'] + 1
-            
-            self.db.update_character(user_id, 
-                                   money=new_money, 
-                                   xp=new_xp, 
-                                   raidstats=new_raid_stats)
+            deltas[user_id] = {'money': gold_reward, 'xp': xp_reward, 'raidstats': 1}
             
             total_xp_given += xp_reward
             total_gold_given += gold_reward
@@ -319,20 +327,18 @@ class RaidsCog(DiscordRPGCog):
             }
             
             # 30% chance for special loot per player
-            if random.randint(1, 100) <= 30:
+            if rng.randint(1, 100) <= 30:
                 # Generate high-quality raid item
                 item = ItemGenerator.generate_item(
                     user_id,
                     min_stat=max(8, boss.level - 5),
                     max_stat=boss.level + 10,
-                    item_type=random.choice(list(ItemType))
+                    item_type=rng.choice(list(ItemType)),
+                    rng=rng
                 )
                 item.name = f"{boss.name}'s {item.name}"
-                
-                self.db.create_item(
-                    user_id, item.name, item.type.value,
-                    item.value * 2, item.damage, item.armor, item.hand.value
-                )
+                item.value *= 2
+                items.append(item)
                 items_awarded += 1
                 player_reward['item'] = item.name
             
@@ -357,8 +363,6 @@ class RaidsCog(DiscordRPGCog):
         
         embed.set_footer(text=f"All participants have been rewarded! Next raid in ~35 minutes.")
         
-        await self.raid_channel.send(embed=embed)
-        
         # Send individual rewards in a follow-up embed
         rewards_embed = self.embed(
             "🎁 Individual Raid Rewards",
@@ -405,10 +409,12 @@ class RaidsCog(DiscordRPGCog):
                 inline=False
             )
         
-        await self.raid_channel.send(embed=rewards_embed)
+        return [embed, rewards_embed]
     
-    async def handle_raid_defeat(self, raider_stats: List[Dict], boss: RaidBoss):
-        """Handle failed raid attempt"""
+    def handle_raid_defeat(self, raider_stats: List[Dict], boss: RaidBoss,
+                           deltas: Dict[int, Dict[str, int]],
+                           rng: random.Random) -> List[discord.Embed]:
+        """Roll consolation rewards into deltas, returns the result embeds"""
         embed = self.embed(
             f"💀 RAID FAILED",
             f"**The {boss.name} has proven too powerful!**\n\nDespite the valiant efforts of {len(raider_stats)} heroes, the boss remains victorious..."
@@ -424,14 +430,11 @@ class RaidsCog(DiscordRPGCog):
             user_id = char_data['user_id']
             
             # Consolation rewards (much smaller)
-            xp_reward = boss.xp_reward // 3 + random.randint(25, 75)
-            gold_reward = boss.gold_reward // 4 + random.randint(100, 300)
+            xp_reward = boss.xp_reward // 3 + rng.randint(25, 75)
+            gold_reward = boss.gold_reward // 4 + rng.randint(100, 300)
             
             # Update character (no raid stats increase on defeat)
-            new_money = char_data['money'] + gold_reward
-            new_xp = char_data['xp'] + xp_reward
-            
-            self.db.update_character(user_id, money=new_money, xp=new_xp)
+            deltas[user_id] = {'money': gold_reward, 'xp': xp_reward}
             
             total_xp_given += xp_reward
             total_gold_given += gold_reward
@@ -454,13 +457,14 @@ class RaidsCog(DiscordRPGCog):
         
         embed.set_footer(text=f"Better luck next time! Next raid in ~35 minutes.")
         
-        await self.raid_channel.send(embed=embed)
+        return [embed]
     
     @commands.command()
     @has_character()
     async def raidstatus(self, ctx: commands.Context):
         """Check current raid status"""
-        if not self.active_raid:
+        raid = self.active_raids.get(ctx.guild.id) if ctx.guild else None
+        if not raid:
             # Show when next raid might occur
             embed = self.embed(
                 "🏰 No Active Raids",
@@ -472,7 +476,6 @@ class RaidsCog(DiscordRPGCog):
                 inline=False
             )
         else:
-            raid = self.active_raid
             boss = raid['boss']
             embed = self.embed(
                 f"🔥 ACTIVE RAID: {boss.name}",
@@ -518,7 +521,7 @@ class RaidsCog(DiscordRPGCog):
         )
         
         # Show some example bosses
-        boss_examples = random.sample(self.raid_bosses, 3)
+        boss_examples = self.rng_for(ctx.guild.id if ctx.guild else None).sample(self.raid_bosses, 3)
         boss_list = "\n".join([f"**{b.name}** (Lv.{b.level})" for b in boss_examples])
         embed.add_field(
             name="👹 Example Bosses",
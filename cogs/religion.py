@@ -1,7 +1,8 @@
 """Religion system - gods, prayer, and sacrifice"""
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import random
+import logging
 from datetime import datetime, timedelta
 
 import sys
@@ -10,6 +11,8 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from bot import DiscordRPGCog, has_character
 
+logger = logging.getLogger('DiscordRPG.Religion')
+
 class ReligionCog(DiscordRPGCog):
     """Religion and deity commands"""
     
@@ -52,6 +55,25 @@ class ReligionCog(DiscordRPGCog):
         }
     }
     
+    async def cog_load(self):
+        """Start the expired blessing cleanup"""
+        if not self.prune_blessings.is_running():
+            self.prune_blessings.start()
+            
+    async def cog_unload(self):
+        if self.prune_blessings.is_running():
+            self.prune_blessings.cancel()
+            
+    @tasks.loop(hours=1)
+    async def prune_blessings(self):
+        """Delete expired blessings (reads already skip them, this only keeps the table small)"""
+        try:
+            removed = await self.db.prune_blessings(datetime.now())
+            if removed:
+                logger.info(f"Pruned {removed} expired blessings")
+        except Exception as e:
+            logger.error(f"Blessing cleanup error: {e}")
+    
     @commands.command()
     @has_character()
     async def gods(self, ctx: commands.Context):
@@ -79,7 +101,7 @@ class ReligionCog(DiscordRPGCog):
     @has_character()
     async def choose(self, ctx: commands.Context, god: str):
         """Choose a god to follow (permanent choice!)"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         # Check if already has a god
         if char_data['god']:
@@ -104,7 +126,7 @@ class ReligionCog(DiscordRPGCog):
             
         # Set god and apply luck multiplier
         new_luck = char_data['luck'] * god_info['luck_multiplier']
-        self.db.update_character(
+        await self.db.update_character(
             ctx.author.id,
             god=god_info['name'],
             luck=new_luck
@@ -126,7 +148,7 @@ class ReligionCog(DiscordRPGCog):
     @commands.cooldown(1, 14400, commands.BucketType.user)  # 4 hour cooldown
     async def pray(self, ctx: commands.Context):
         """Pray to your god for favor (4 hour cooldown)"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         # Check if has a god
         if not char_data['god']:
@@ -145,7 +167,7 @@ class ReligionCog(DiscordRPGCog):
         
         # Apply race bonus
         from cogs.race import RaceCog
-        race_multipliers = RaceCog.get_race_multipliers(ctx.author.id)
+        race_multipliers = await RaceCog.get_race_multipliers(ctx.author.id, self.db)
         race_favor_bonus = int((base_favor + level_bonus) * race_multipliers.get('favor_gain', 1.0))
         
         # Random event chance (5%)
@@ -160,10 +182,8 @@ class ReligionCog(DiscordRPGCog):
             event_text = f"\n🌟 **Divine Intervention!** {god_info['name']} grants massive favor!"
             
         total_favor = race_favor_bonus
-        new_favor = char_data['favor'] + total_favor
-        
         # Update favor
-        self.db.update_character(ctx.author.id, favor=new_favor)
+        new_favor = (await self.db.increment(ctx.author.id, favor=total_favor))['favor']
         
         # Prayer messages based on god
         prayers = {
@@ -214,7 +234,7 @@ class ReligionCog(DiscordRPGCog):
     @commands.cooldown(1, 43200, commands.BucketType.user)  # 12 hour cooldown
     async def sacrifice(self, ctx: commands.Context, amount: int):
         """Sacrifice gold to your god for favor (12 hour cooldown)"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         # Check if has a god
         if not char_data['god']:
@@ -240,7 +260,7 @@ class ReligionCog(DiscordRPGCog):
         
         # Apply race bonus
         from cogs.race import RaceCog
-        race_multipliers = RaceCog.get_race_multipliers(ctx.author.id)
+        race_multipliers = await RaceCog.get_race_multipliers(ctx.author.id, self.db)
         race_favor_bonus = multiplied_favor * race_multipliers.get('favor_gain', 1.0)
         final_favor = int(max(1, race_favor_bonus))  # Minimum 1 favor
         
@@ -253,8 +273,7 @@ class ReligionCog(DiscordRPGCog):
             if random.random() < 0.2:  # 20% chance
                 # Luck blessing
                 luck_bonus = 0.05
-                new_luck = char_data['luck'] + luck_bonus
-                self.db.update_character(ctx.author.id, luck=new_luck)
+                await self.db.increment(ctx.author.id, luck=luck_bonus)
                 event_text = f"🍀 **Divine Blessing!** +{luck_bonus} luck!"
                 bonus_reward = "luck"
         
@@ -266,13 +285,11 @@ class ReligionCog(DiscordRPGCog):
                 event_text = f"💫 **{god_info['name']} is greatly pleased!** Double favor!"
                 
         # Update character
-        new_money = char_data['money'] - amount
-        new_favor = char_data['favor'] + final_favor
-        self.db.update_character(
+        new_favor = (await self.db.increment(
             ctx.author.id,
-            money=new_money,
-            favor=new_favor
-        )
+            money=-amount,
+            favor=final_favor
+        ))['favor']
         
         # Sacrifice messages based on god
         sacrifices = {
@@ -311,7 +328,7 @@ class ReligionCog(DiscordRPGCog):
     @has_character()
     async def bless(self, ctx: commands.Context, blessing_type: str = None):
         """Purchase divine blessings with accumulated favor"""
-        char_data = self.db.get_character(ctx.author.id)
+        char_data = await self.db.get_character(ctx.author.id)
         
         # Check if has a god
         if not char_data['god']:
@@ -392,10 +409,7 @@ class ReligionCog(DiscordRPGCog):
             )
             
             # Show active blessings if any
-            active_blessings = self.db.fetchall(
-                "SELECT * FROM divine_blessings WHERE user_id = ? AND expires_at > ?",
-                (ctx.author.id, datetime.now())
-            )
+            active_blessings = await self.db.get_active_blessings(ctx.author.id, datetime.now())
             
             if active_blessings:
                 active_text = "\n".join([
@@ -420,10 +434,7 @@ class ReligionCog(DiscordRPGCog):
             return
         
         # Check if blessing already active
-        existing = self.db.fetchone(
-            "SELECT * FROM divine_blessings WHERE user_id = ? AND effect = ? AND expires_at > ?",
-            (ctx.author.id, blessing['effect'], datetime.now())
-        )
+        existing = await self.db.get_active_blessing(ctx.author.id, blessing['effect'], datetime.now())
         
         if existing:
             await ctx.send(f"❌ You already have an active {blessing['name']}!")
@@ -431,18 +442,11 @@ class ReligionCog(DiscordRPGCog):
         
         # Purchase blessing
         expires_at = datetime.now() + timedelta(seconds=blessing['duration'])
-        new_favor = char_data['favor'] - blessing['cost']
-        
         # Update favor
-        self.db.update_character(ctx.author.id, favor=new_favor)
+        new_favor = (await self.db.increment(ctx.author.id, favor=-blessing['cost']))['favor']
         
         # Add blessing to database
-        self.db.execute(
-            """INSERT INTO divine_blessings (user_id, effect, value, expires_at, blessing_name)
-               VALUES (?, ?, ?, ?, ?)""",
-            (ctx.author.id, blessing['effect'], blessing['value'], expires_at, blessing['name'])
-        )
-        self.db.commit()
+        await self.db.add_blessing(ctx.author.id, blessing['effect'], blessing['value'], expires_at, blessing['name'])
         
         # Get god info for themed response
         god_key = char_data['god'].lower()
@@ -476,20 +480,9 @@ class ReligionCog(DiscordRPGCog):
         embed.set_footer(text="Blessing effects apply automatically to all activities")
         await ctx.send(embed=embed)
     
-    def get_active_blessings(self, user_id: int) -> dict:
-        """Get all active blessings for a user"""
-        current_time = datetime.now()
-        blessings = self.db.fetchall(
-            "SELECT * FROM divine_blessings WHERE user_id = ? AND expires_at > ?",
-            (user_id, current_time)
-        )
-        
-        # Clean up expired blessings
-        self.db.execute(
-            "DELETE FROM divine_blessings WHERE user_id = ? AND expires_at <= ?",
-            (user_id, current_time)
-        )
-        self.db.commit()
+    async def get_active_blessings(self, user_id: int) -> dict:
+        """Get all active blessings for a user (one read; expired rows are skipped, not deleted)"""
+        blessings = await self.db.get_active_blessings(user_id, datetime.now())
         
         # Convert to multipliers dict
         active = {
@@ -1,5 +1,9 @@
 -- SQLite Database Schema for Full IdleRPG
 
+-- Lets Database.archive_history hand freed pages back with incremental_vacuum
+-- (only takes effect on a new file; older ones are converted on first archive)
+PRAGMA auto_vacuum = INCREMENTAL;
+
 -- Users/Profile table
 CREATE TABLE IF NOT EXISTS profile (
     user_id INTEGER PRIMARY KEY,
@@ -42,6 +46,7 @@ CREATE TABLE IF NOT EXISTS profile (
     last_adventure TEXT,
     adventure_alert INTEGER DEFAULT 1,
     alignment TEXT DEFAULT 'neutral',
+    pending_penalty INTEGER DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -63,7 +68,18 @@ CREATE TABLE IF NOT EXISTS inventory (
     upgrade_level INTEGER DEFAULT 0,
     hand TEXT CHECK(hand IN ('left', 'right', 'both', 'any')),
     equipped INTEGER DEFAULT 0,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Item.stat_total and Item.rarity, computed on read
+    stat_total INTEGER GENERATED ALWAYS AS (
+        COALESCE(damage, 0) + COALESCE(armor, 0) + COALESCE(health_bonus, 0) + COALESCE(speed_bonus, 0)
+        + CAST(COALESCE(luck_bonus, 0.0) * 100 AS INTEGER) + CAST(COALESCE(crit_bonus, 0.0) * 100 AS INTEGER)
+        + COALESCE(magic_bonus, 0)
+    ) VIRTUAL,
+    rarity TEXT GENERATED ALWAYS AS (
+        CASE WHEN stat_total >= 50 THEN 'divine' WHEN stat_total >= 45 THEN 'mythic'
+             WHEN stat_total >= 40 THEN 'legendary' WHEN stat_total >= 30 THEN 'magic'
+             WHEN stat_total >= 20 THEN 'rare' WHEN stat_total >= 10 THEN 'uncommon' ELSE 'common' END
+    ) VIRTUAL
 );
 
 -- Guilds table
@@ -238,7 +254,10 @@ CREATE TABLE IF NOT EXISTS transactions (
     to_user INTEGER,
     amount INTEGER,
     subject TEXT,
-    info TEXT, -- JSON data
+    item_id INTEGER,                  -- Common info fields get their own columns (utils/ledger.py)
+    item TEXT,
+    won INTEGER,
+    details BLOB,                     -- The remaining info fields, packed by utils.ledger.pack_details
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -297,7 +316,8 @@ CREATE TABLE IF NOT EXISTS event_participation (
     participated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Penalties table for tracking IdleRPG penalties
+-- Penalties ledger from before the running balance (profile.pending_penalty);
+-- no longer written, the remaining rows are archived after a week
 CREATE TABLE IF NOT EXISTS penalties (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER REFERENCES profile(user_id) ON DELETE CASCADE,
@@ -333,14 +353,177 @@ CREATE TABLE IF NOT EXISTS epic_adventures (
     status TEXT DEFAULT 'active'
 );
 
+-- Online history: one row per user per UTC day (see utils/presence.py)
+CREATE TABLE IF NOT EXISTS presence_days (
+    user_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,             -- Days since the Unix epoch
+    intervals BLOB NOT NULL,          -- Little-endian uint32 (start, end) second offsets into the day
+    online_seconds INTEGER NOT NULL,  -- Daily rollup of the intervals
+    PRIMARY KEY (user_id, day)
+) WITHOUT ROWID;
+
+-- Per-month rollups of history rows moved out to archive files (see Database.archive_history)
+CREATE TABLE IF NOT EXISTS history_rollups (
+    table_name TEXT NOT NULL,
+    month TEXT NOT NULL,              -- 'YYYY-MM', also names the archive file holding the rows
+    kind TEXT NOT NULL,               -- subject, battle_type, crate_type, penalty_type, event_type or status
+    entries INTEGER NOT NULL,
+    amount INTEGER NOT NULL,          -- Summed amount, money_stolen, item_stats, penalty_seconds, difficulty or gold
+    PRIMARY KEY (table_name, month, kind)
+) WITHOUT ROWID;
+
+-- Economy aggregates, kept current by the triggers below so !economy never scans
+CREATE TABLE IF NOT EXISTS economy_totals (
+    metric TEXT PRIMARY KEY,          -- money_supply, characters, items, item_value, market_listings, market_value
+    value INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS economy_rarity (
+    rarity TEXT PRIMARY KEY,          -- inventory.rarity
+    items INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS money_supply_daily (
+    day TEXT PRIMARY KEY,             -- UTC date
+    created INTEGER NOT NULL DEFAULT 0,
+    destroyed INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS transactions_daily (
+    day TEXT NOT NULL,                -- UTC date
+    subject TEXT NOT NULL,
+    transactions INTEGER NOT NULL DEFAULT 0,
+    amount INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, subject)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS economy_profile_insert AFTER INSERT ON profile
+BEGIN
+    INSERT INTO economy_totals (metric, value) VALUES ('money_supply', COALESCE(NEW.money, 0)), ('characters', 1)
+        ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+    INSERT INTO money_supply_daily (day, created) VALUES (date('now'), COALESCE(NEW.money, 0))
+        ON CONFLICT(day) DO UPDATE SET created = created + excluded.created;
+END;
+
+CREATE TRIGGER IF NOT EXISTS economy_profile_money AFTER UPDATE OF money ON profile
+WHEN NEW.money IS NOT OLD.money
+BEGIN
+    INSERT INTO economy_totals (metric, value) VALUES ('money_supply', COALESCE(NEW.money, 0) - COALESCE(OLD.money, 0))
+        ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+    INSERT INTO money_supply_daily (day, created, destroyed)
+        VALUES (date('now'), MAX(COALESCE(NEW.money, 0) - COALESCE(OLD.money, 0), 0),
+                MAX(COALESCE(OLD.money, 0) - COALESCE(NEW.money, 0), 0))
+        ON CONFLICT(day) DO UPDATE SET created = created + excluded.created,
+                                       destroyed = destroyed + excluded.destroyed;
+END;
+
+CREATE TRIGGER IF NOT EXISTS economy_profile_delete AFTER DELETE ON profile
+BEGIN
+    INSERT INTO economy_totals (metric, value) VALUES ('money_supply', -COALESCE(OLD.money, 0)), ('characters', -1)
+        ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+    INSERT INTO money_supply_daily (day, destroyed) VALUES (date('now'), COALESCE(OLD.money, 0))
+        ON CONFLICT(day) DO UPDATE SET destroyed = destroyed + excluded.destroyed;
+END;
+
+CREATE TRIGGER IF NOT EXISTS economy_inventory_insert AFTER INSERT ON inventory
+BEGIN
+    INSERT INTO economy_totals (metric, value) VALUES ('items', 1), ('item_value', COALESCE(NEW.value, 0))
+        ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+    INSERT INTO economy_rarity (rarity, items) VALUES (NEW.rarity, 1)
+        ON CONFLICT(rarity) DO UPDATE SET items = items + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS economy_inventory_update
+AFTER UPDATE OF damage, armor, health_bonus, speed_bonus, luck_bonus, crit_bonus, magic_bonus, value ON inventory
+BEGIN
+    INSERT INTO economy_totals (metric, value) VALUES ('item_value', COALESCE(NEW.value, 0) - COALESCE(OLD.value, 0))
+        ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+    UPDATE economy_rarity SET items = items - 1 WHERE rarity = OLD.rarity;
+    INSERT INTO economy_rarity (rarity, items) VALUES (NEW.rarity, 1)
+        ON CONFLICT(rarity) DO UPDATE SET items = items + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS economy_inventory_delete AFTER DELETE ON inventory
+BEGIN
+    INSERT INTO economy_totals (metric, value) VALUES ('items', -1), ('item_value', -COALESCE(OLD.value, 0))
+        ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+    UPDATE economy_rarity SET items = items - 1 WHERE rarity = OLD.rarity;
+END;
+
+CREATE TRIGGER IF NOT EXISTS economy_market_insert AFTER INSERT ON market
+BEGIN
+    INSERT INTO economy_totals (metric, value) VALUES ('market_listings', 1), ('market_value', NEW.price)
+        ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS economy_market_price AFTER UPDATE OF price ON market
+BEGIN
+    INSERT INTO economy_totals (metric, value) VALUES ('market_value', NEW.price - OLD.price)
+        ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS economy_market_delete AFTER DELETE ON market
+BEGIN
+    INSERT INTO economy_totals (metric, value) VALUES ('market_listings', -1), ('market_value', -OLD.price)
+        ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS economy_transactions_insert AFTER INSERT ON transactions
+BEGIN
+    INSERT INTO transactions_daily (day, subject, transactions, amount)
+        VALUES (date(COALESCE(NEW.timestamp, 'now')), COALESCE(NEW.subject, ''), 1, COALESCE(NEW.amount, 0))
+        ON CONFLICT(day, subject) DO UPDATE SET transactions = transactions + 1,
+                                                amount = amount + excluded.amount;
+END;
+
+-- Level progression: level always follows xp (Database.level_for_xp mirrors this table)
+CREATE TABLE IF NOT EXISTS level_thresholds (
+    xp INTEGER PRIMARY KEY,           -- Least XP for the level: 100 * (level - 1)^2
+    level INTEGER NOT NULL
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO level_thresholds (xp, level)
+WITH RECURSIVE levels(level) AS (SELECT 1 UNION ALL SELECT level + 1 FROM levels WHERE level < 50)
+SELECT 100 * (level - 1) * (level - 1), level FROM levels;
+
+-- Level-ups waiting to be announced, filled by profile_level_update and drained by AutoPlayCog
+CREATE TABLE IF NOT EXISTS level_ups (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES profile(user_id) ON DELETE CASCADE,
+    old_level INTEGER NOT NULL,
+    new_level INTEGER NOT NULL,
+    reached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER IF NOT EXISTS profile_level_insert AFTER INSERT ON profile
+WHEN NEW.level IS NOT (SELECT level FROM level_thresholds WHERE xp <= MAX(0, COALESCE(NEW.xp, 0)) ORDER BY xp DESC LIMIT 1)
+BEGIN
+    UPDATE profile SET level = (SELECT level FROM level_thresholds WHERE xp <= MAX(0, COALESCE(NEW.xp, 0)) ORDER BY xp DESC LIMIT 1)
+        WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS profile_level_update AFTER UPDATE OF xp, level ON profile
+WHEN NEW.level IS NOT (SELECT level FROM level_thresholds WHERE xp <= MAX(0, COALESCE(NEW.xp, 0)) ORDER BY xp DESC LIMIT 1)
+BEGIN
+    UPDATE profile SET level = (SELECT level FROM level_thresholds WHERE xp <= MAX(0, COALESCE(NEW.xp, 0)) ORDER BY xp DESC LIMIT 1)
+        WHERE user_id = NEW.user_id;
+    INSERT INTO level_ups (user_id, old_level, new_level)
+        SELECT user_id, OLD.level, level FROM profile WHERE user_id = NEW.user_id AND level > OLD.level;
+END;
+
 -- Indices for performance
 CREATE INDEX IF NOT EXISTS idx_inventory_owner ON inventory(owner);
 CREATE INDEX IF NOT EXISTS idx_inventory_equipped ON inventory(owner, equipped);
 CREATE INDEX IF NOT EXISTS idx_market_price ON market(price);
+CREATE INDEX IF NOT EXISTS idx_market_item ON market(item_id);
 CREATE INDEX IF NOT EXISTS idx_adventures_user ON adventures(user_id, status);
 CREATE INDEX IF NOT EXISTS idx_epic_adventures_user ON epic_adventures(user_id, status);
 CREATE INDEX IF NOT EXISTS idx_battle_logs_users ON battle_logs(attacker, defender);
-CREATE INDEX IF NOT EXISTS idx_transactions_users ON transactions(from_user, to_user);
+-- Per-user and per-subject ledger history; the user indexes cover the per-subject summaries
+CREATE INDEX IF NOT EXISTS idx_transactions_from ON transactions(from_user, timestamp, subject, amount);
+CREATE INDEX IF NOT EXISTS idx_transactions_to ON transactions(to_user, timestamp, subject, amount);
+CREATE INDEX IF NOT EXISTS idx_transactions_subject ON transactions(subject, timestamp);
 CREATE INDEX IF NOT EXISTS idx_cooldowns_user ON cooldowns(user_id);
 CREATE INDEX IF NOT EXISTS idx_penalties_user ON penalties(user_id);
-CREATE INDEX IF NOT EXISTS idx_divine_blessings_user ON divine_blessings(user_id, expires_at);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_divine_blessings_user ON divine_blessings(user_id, expires_at);
+CREATE INDEX IF NOT EXISTS idx_presence_days_day ON presence_days(day);
\ No newline at end of file
@@ -0,0 +1,597 @@
+-- PostgreSQL Database Schema for Full IdleRPG (see utils/postgres.py)
+--
+-- Mirrors schema.sql table for table, so both backends return the same rows:
+-- timestamps are the same UTC 'YYYY-MM-DD HH:MM:SS' text, flags stay 0/1
+-- integers, and the triggers keep levels and the economy aggregates current
+-- exactly as the SQLite ones do. Every statement is idempotent; the file is
+-- applied on each start. Needs PostgreSQL 14 or newer (CREATE OR REPLACE TRIGGER).
+
+-- Text timestamp in the format SQLite's CURRENT_TIMESTAMP produces
+CREATE OR REPLACE FUNCTION rpg_utc_now() RETURNS TEXT AS $$
+    SELECT to_char(timezone('UTC', now()), 'YYYY-MM-DD HH24:MI:SS')
+$$ LANGUAGE sql STABLE;
+
+-- Item stat total; trunc() drops the fraction like SQLite's CAST AS INTEGER
+CREATE OR REPLACE FUNCTION rpg_stat_total(damage BIGINT, armor BIGINT, health_bonus BIGINT, speed_bonus BIGINT,
+                                          luck_bonus DOUBLE PRECISION, crit_bonus DOUBLE PRECISION,
+                                          magic_bonus BIGINT) RETURNS BIGINT AS $$
+    SELECT COALESCE(damage, 0) + COALESCE(armor, 0) + COALESCE(health_bonus, 0) + COALESCE(speed_bonus, 0)
+           + trunc(COALESCE(luck_bonus, 0.0) * 100)::BIGINT + trunc(COALESCE(crit_bonus, 0.0) * 100)::BIGINT
+           + COALESCE(magic_bonus, 0)
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION rpg_rarity(stat_total BIGINT) RETURNS TEXT AS $$
+    SELECT CASE WHEN stat_total >= 50 THEN 'divine' WHEN stat_total >= 45 THEN 'mythic'
+                WHEN stat_total >= 40 THEN 'legendary' WHEN stat_total >= 30 THEN 'magic'
+                WHEN stat_total >= 20 THEN 'rare' WHEN stat_total >= 10 THEN 'uncommon' ELSE 'common' END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Users/Profile table
+CREATE TABLE IF NOT EXISTS profile (
+    user_id BIGINT PRIMARY KEY,
+    name TEXT NOT NULL,
+    money BIGINT DEFAULT 0,
+    xp BIGINT DEFAULT 0,
+    level BIGINT DEFAULT 1,
+    class TEXT DEFAULT 'Novice',
+    race TEXT DEFAULT 'Human',
+    health BIGINT DEFAULT 100,
+    speed BIGINT DEFAULT 10,
+    pvpwins BIGINT DEFAULT 0,
+    pvplosses BIGINT DEFAULT 0,
+    deaths BIGINT DEFAULT 0,
+    kills BIGINT DEFAULT 0,
+    completed BIGINT DEFAULT 0,
+    god TEXT,
+    favor BIGINT DEFAULT 0,
+    luck DOUBLE PRECISION DEFAULT 1.0,
+    marriage BIGINT,
+    guild BIGINT,
+    background TEXT DEFAULT 'https://i.imgur.com/default.png',
+    description TEXT,
+    colour BIGINT DEFAULT 0,
+    donations BIGINT DEFAULT 0,
+    raidstats BIGINT DEFAULT 0,
+    atkmultiply DOUBLE PRECISION DEFAULT 1.0,
+    defmultiply DOUBLE PRECISION DEFAULT 1.0,
+    crates_common BIGINT DEFAULT 0,
+    crates_uncommon BIGINT DEFAULT 0,
+    crates_rare BIGINT DEFAULT 0,
+    crates_magic BIGINT DEFAULT 0,
+    crates_legendary BIGINT DEFAULT 0,
+    crates_mystery BIGINT DEFAULT 0,
+    last_date TEXT,
+    streak BIGINT DEFAULT 0,
+    vote_ban BIGINT DEFAULT 0,
+    has_character BIGINT DEFAULT 1,
+    reset_points BIGINT DEFAULT 2,
+    last_adventure TEXT,
+    adventure_alert BIGINT DEFAULT 1,
+    alignment TEXT DEFAULT 'neutral',
+    pending_penalty BIGINT DEFAULT 0,
+    created_at TEXT DEFAULT rpg_utc_now()
+);
+
+-- Items/Inventory table
+CREATE TABLE IF NOT EXISTS inventory (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    owner BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value BIGINT DEFAULT 0,
+    type TEXT NOT NULL CHECK(type IN ('Sword', 'Shield', 'Axe', 'Bow', 'Spear', 'Wand', 'Dagger', 'Knife', 'Hammer', 'Staff', 'Mace', 'Crossbow', 'Greatsword', 'Halberd', 'Katana', 'Scythe', 'Helmet', 'Chestplate', 'Leggings', 'Gauntlets', 'Boots')),
+    damage BIGINT DEFAULT 0,
+    armor BIGINT DEFAULT 0,
+    health_bonus BIGINT DEFAULT 0,
+    speed_bonus BIGINT DEFAULT 0,
+    luck_bonus DOUBLE PRECISION DEFAULT 0.0,
+    crit_bonus DOUBLE PRECISION DEFAULT 0.0,
+    magic_bonus BIGINT DEFAULT 0,
+    slot_type TEXT,
+    upgrade_level BIGINT DEFAULT 0,
+    hand TEXT CHECK(hand IN ('left', 'right', 'both', 'any')),
+    equipped BIGINT DEFAULT 0,
+    created_at TEXT DEFAULT rpg_utc_now(),
+    -- Item.stat_total and Item.rarity (generated columns can't read each other)
+    stat_total BIGINT GENERATED ALWAYS AS (
+        rpg_stat_total(damage, armor, health_bonus, speed_bonus, luck_bonus, crit_bonus, magic_bonus)
+    ) STORED,
+    rarity TEXT GENERATED ALWAYS AS (
+        rpg_rarity(rpg_stat_total(damage, armor, health_bonus, speed_bonus, luck_bonus, crit_bonus, magic_bonus))
+    ) STORED
+);
+
+-- Guilds table
+CREATE TABLE IF NOT EXISTS guild (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    icon TEXT,
+    owner BIGINT REFERENCES profile(user_id),
+    balance BIGINT DEFAULT 0,
+    memberlimit BIGINT DEFAULT 50,
+    wins BIGINT DEFAULT 0,
+    loses BIGINT DEFAULT 0,
+    level BIGINT DEFAULT 1,
+    xp BIGINT DEFAULT 0,
+    privacy BIGINT DEFAULT 1,
+    color BIGINT,
+    upgrade BIGINT DEFAULT 0,
+    alliance BIGINT,
+    created_at TEXT DEFAULT rpg_utc_now()
+);
+
+-- Guild members
+CREATE TABLE IF NOT EXISTS guild_members (
+    guild_id BIGINT REFERENCES guild(id) ON DELETE CASCADE,
+    user_id BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    rank TEXT DEFAULT 'Member',
+    joined_at TEXT DEFAULT rpg_utc_now(),
+    PRIMARY KEY (guild_id, user_id)
+);
+
+-- Alliances table
+CREATE TABLE IF NOT EXISTS alliance (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    icon TEXT,
+    owner BIGINT REFERENCES guild(id),
+    created_at TEXT DEFAULT rpg_utc_now()
+);
+
+-- Cities table
+CREATE TABLE IF NOT EXISTS cities (
+    name TEXT PRIMARY KEY,
+    owner BIGINT REFERENCES alliance(id),
+    level BIGINT DEFAULT 1,
+    buildings_thief BIGINT DEFAULT 0,
+    buildings_raid BIGINT DEFAULT 0,
+    buildings_trade BIGINT DEFAULT 0,
+    buildings_adventure BIGINT DEFAULT 0
+);
+
+-- Market/Trading
+CREATE TABLE IF NOT EXISTS market (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    item_id BIGINT REFERENCES inventory(id) ON DELETE CASCADE,
+    price BIGINT NOT NULL,
+    listed_at TEXT DEFAULT rpg_utc_now()
+);
+
+-- Trading offers
+CREATE TABLE IF NOT EXISTS trade_offers (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    from_user BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    to_user BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    item_id BIGINT REFERENCES inventory(id) ON DELETE CASCADE,
+    price BIGINT,
+    created_at TEXT DEFAULT rpg_utc_now(),
+    status TEXT DEFAULT 'pending'
+);
+
+-- Marriages
+CREATE TABLE IF NOT EXISTS marriages (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user1 BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    user2 BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    married_at TEXT DEFAULT rpg_utc_now(),
+    lovescore BIGINT DEFAULT 0,
+    UNIQUE(user1, user2)
+);
+
+-- Children
+CREATE TABLE IF NOT EXISTS children (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    parent1 BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    parent2 BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    age BIGINT DEFAULT 0,
+    gender TEXT,
+    born_at TEXT DEFAULT rpg_utc_now()
+);
+
+-- Adventures/Quests
+CREATE TABLE IF NOT EXISTS adventures (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    adventure_name TEXT,
+    difficulty BIGINT,
+    started_at TEXT DEFAULT rpg_utc_now(),
+    finish_at TEXT,
+    status TEXT DEFAULT 'active'
+);
+
+-- Tournament data
+CREATE TABLE IF NOT EXISTS tournaments (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    created_by BIGINT REFERENCES profile(user_id),
+    prize_money BIGINT DEFAULT 0,
+    participants TEXT, -- JSON array
+    winner BIGINT,
+    started_at TEXT DEFAULT rpg_utc_now(),
+    ended_at TEXT,
+    status TEXT DEFAULT 'pending'
+);
+
+-- Battle logs
+CREATE TABLE IF NOT EXISTS battle_logs (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    attacker BIGINT REFERENCES profile(user_id),
+    defender BIGINT REFERENCES profile(user_id),
+    winner BIGINT,
+    battle_type TEXT,
+    damage_dealt BIGINT,
+    damage_taken BIGINT,
+    money_stolen BIGINT,
+    fought_at TEXT DEFAULT rpg_utc_now()
+);
+
+-- Raid bosses
+CREATE TABLE IF NOT EXISTS raid_bosses (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    name TEXT NOT NULL,
+    hp BIGINT NOT NULL,
+    max_hp BIGINT NOT NULL,
+    attack BIGINT NOT NULL,
+    defense BIGINT NOT NULL,
+    active BIGINT DEFAULT 1,
+    participants TEXT, -- JSON array
+    created_at TEXT DEFAULT rpg_utc_now()
+);
+
+-- Pet data (for Rangers)
+CREATE TABLE IF NOT EXISTS pets (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    owner BIGINT REFERENCES profile(user_id) ON DELETE CASCADE UNIQUE,
+    name TEXT NOT NULL,
+    hunger BIGINT DEFAULT 100,
+    thirst BIGINT DEFAULT 100,
+    love BIGINT DEFAULT 0,
+    joy BIGINT DEFAULT 100,
+    last_fed TEXT DEFAULT rpg_utc_now(),
+    last_watered TEXT DEFAULT rpg_utc_now(),
+    last_played TEXT DEFAULT rpg_utc_now()
+);
+
+-- Cooldowns
+CREATE TABLE IF NOT EXISTS cooldowns (
+    user_id BIGINT PRIMARY KEY REFERENCES profile(user_id) ON DELETE CASCADE,
+    daily TEXT,
+    vote TEXT,
+    adventure TEXT,
+    pray TEXT,
+    sacrifice TEXT,
+    steal TEXT,
+    hunt TEXT
+);
+
+-- Transaction logs
+CREATE TABLE IF NOT EXISTS transactions (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    from_user BIGINT,
+    to_user BIGINT,
+    amount BIGINT,
+    subject TEXT,
+    item_id BIGINT,                   -- Common info fields get their own columns (utils/ledger.py)
+    item TEXT,
+    won BIGINT,
+    details BYTEA,                    -- The remaining info fields, packed by utils.ledger.pack_details
+    timestamp TEXT DEFAULT rpg_utc_now()
+);
+
+-- Server settings
+CREATE TABLE IF NOT EXISTS server_settings (
+    guild_id BIGINT PRIMARY KEY,
+    prefix TEXT DEFAULT '!',
+    language TEXT DEFAULT 'en_US',
+    currency_emoji TEXT,
+    welcome_channel BIGINT,
+    game_channel BIGINT
+);
+
+-- User settings
+CREATE TABLE IF NOT EXISTS user_settings (
+    user_id BIGINT PRIMARY KEY REFERENCES profile(user_id) ON DELETE CASCADE,
+    language TEXT DEFAULT 'en_US',
+    notifications BIGINT DEFAULT 1,
+    dm_notifications BIGINT DEFAULT 0,
+    mention_notifications BIGINT DEFAULT 1
+);
+
+-- Gods
+CREATE TABLE IF NOT EXISTS gods (
+    name TEXT PRIMARY KEY,
+    description TEXT,
+    luck_bonus DOUBLE PRECISION DEFAULT 1.0,
+    sacrifice_multiplier DOUBLE PRECISION DEFAULT 1.0,
+    top_followers TEXT -- JSON array
+);
+
+-- Insert default gods
+INSERT INTO gods (name, description, luck_bonus, sacrifice_multiplier) VALUES
+    ('Chaos', 'God of randomness and disorder', 1.2, 0.8),
+    ('Order', 'God of structure and planning', 0.9, 1.1),
+    ('War', 'God of combat and conflict', 1.0, 1.0),
+    ('Nature', 'God of life and growth', 1.1, 0.9),
+    ('Death', 'God of endings and rebirth', 0.8, 1.3)
+    ON CONFLICT DO NOTHING;
+
+-- Crate history
+CREATE TABLE IF NOT EXISTS crate_history (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    crate_type TEXT,
+    item_name TEXT,
+    item_stats BIGINT,
+    opened_at TEXT DEFAULT rpg_utc_now()
+);
+
+-- Event participation
+CREATE TABLE IF NOT EXISTS event_participation (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    event_type TEXT,
+    event_data TEXT, -- JSON
+    participated_at TEXT DEFAULT rpg_utc_now()
+);
+
+-- Penalties ledger from before the running balance (profile.pending_penalty);
+-- kept so both schemas have the same tables, never written
+CREATE TABLE IF NOT EXISTS penalties (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    penalty_type TEXT NOT NULL,
+    penalty_seconds BIGINT NOT NULL,
+    applied_at TEXT DEFAULT rpg_utc_now()
+);
+
+-- Divine blessings table for temporary player buffs
+CREATE TABLE IF NOT EXISTS divine_blessings (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    effect TEXT NOT NULL,
+    value DOUBLE PRECISION NOT NULL,
+    expires_at TEXT NOT NULL,
+    blessing_name TEXT NOT NULL,
+    purchased_at TEXT DEFAULT rpg_utc_now()
+);
+
+-- Epic/Legendary Adventures table
+CREATE TABLE IF NOT EXISTS epic_adventures (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT REFERENCES profile(user_id) ON DELETE CASCADE,
+    adventure_type TEXT,
+    adventure_name TEXT,
+    difficulty BIGINT,
+    started_at TEXT,
+    finish_at TEXT,
+    base_xp_reward BIGINT,
+    base_gold_reward BIGINT,
+    item_quality_min BIGINT,
+    item_quality_max BIGINT,
+    status TEXT DEFAULT 'active'
+);
+
+-- Online history: one row per user per UTC day (see utils/presence.py)
+CREATE TABLE IF NOT EXISTS presence_days (
+    user_id BIGINT NOT NULL,
+    day BIGINT NOT NULL,              -- Days since the Unix epoch
+    intervals BYTEA NOT NULL,         -- Little-endian uint32 (start, end) second offsets into the day
+    online_seconds BIGINT NOT NULL,   -- Daily rollup of the intervals
+    PRIMARY KEY (user_id, day)
+);
+
+-- Per-month rollups of history rows moved to the *_archive tables (see PostgresRepository.archive_history)
+CREATE TABLE IF NOT EXISTS history_rollups (
+    table_name TEXT NOT NULL,
+    month TEXT NOT NULL,              -- 'YYYY-MM'
+    kind TEXT NOT NULL,               -- subject, battle_type, crate_type, penalty_type, event_type or status
+    entries BIGINT NOT NULL,
+    amount BIGINT NOT NULL,           -- Summed amount, money_stolen, item_stats, penalty_seconds, difficulty or gold
+    PRIMARY KEY (table_name, month, kind)
+);
+
+-- Archived history: where SQLite moves old rows to monthly files, PostgreSQL keeps
+-- them in plain copies of the hot tables, so the hot tables and their indexes stay small
+CREATE TABLE IF NOT EXISTS transactions_archive (LIKE transactions);
+CREATE TABLE IF NOT EXISTS battle_logs_archive (LIKE battle_logs);
+CREATE TABLE IF NOT EXISTS crate_history_archive (LIKE crate_history);
+CREATE TABLE IF NOT EXISTS penalties_archive (LIKE penalties);
+CREATE TABLE IF NOT EXISTS event_participation_archive (LIKE event_participation);
+CREATE TABLE IF NOT EXISTS adventures_archive (LIKE adventures);
+CREATE TABLE IF NOT EXISTS epic_adventures_archive (LIKE epic_adventures);
+
+-- Economy aggregates, kept current by the triggers below so !economy never scans
+CREATE TABLE IF NOT EXISTS economy_totals (
+    metric TEXT PRIMARY KEY,          -- money_supply, characters, items, item_value, market_listings, market_value
+    value BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS economy_rarity (
+    rarity TEXT PRIMARY KEY,          -- inventory.rarity
+    items BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS money_supply_daily (
+    day TEXT PRIMARY KEY,             -- UTC date
+    created BIGINT NOT NULL DEFAULT 0,
+    destroyed BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS transactions_daily (
+    day TEXT NOT NULL,                -- UTC date
+    subject TEXT NOT NULL,
+    transactions BIGINT NOT NULL DEFAULT 0,
+    amount BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, subject)
+);
+
+CREATE OR REPLACE FUNCTION rpg_add_totals(metrics TEXT[], deltas BIGINT[]) RETURNS void AS $$
+    INSERT INTO economy_totals (metric, value) SELECT * FROM unnest(metrics, deltas)
+        ON CONFLICT (metric) DO UPDATE SET value = economy_totals.value + excluded.value
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION rpg_move_rarity(old_rarity TEXT, new_rarity TEXT) RETURNS void AS $$
+    UPDATE economy_rarity SET items = items - 1 WHERE rarity = old_rarity;
+    INSERT INTO economy_rarity (rarity, items) SELECT new_rarity, 1 WHERE new_rarity IS NOT NULL
+        ON CONFLICT (rarity) DO UPDATE SET items = economy_rarity.items + 1;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION rpg_economy_profile() RETURNS trigger AS $$
+DECLARE
+    delta BIGINT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        delta := COALESCE(NEW.money, 0);
+        PERFORM rpg_add_totals(ARRAY['money_supply', 'characters'], ARRAY[delta, 1]);
+    ELSIF TG_OP = 'DELETE' THEN
+        delta := -COALESCE(OLD.money, 0);
+        PERFORM rpg_add_totals(ARRAY['money_supply', 'characters'], ARRAY[delta, -1]);
+    ELSE
+        delta := COALESCE(NEW.money, 0) - COALESCE(OLD.money, 0);
+        PERFORM rpg_add_totals(ARRAY['money_supply'], ARRAY[delta]);
+    END IF;
+    INSERT INTO money_supply_daily (day, created, destroyed)
+        VALUES (left(rpg_utc_now(), 10), GREATEST(delta, 0), GREATEST(-delta, 0))
+        ON CONFLICT (day) DO UPDATE SET created = money_supply_daily.created + excluded.created,
+                                        destroyed = money_supply_daily.destroyed + excluded.destroyed;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER economy_profile_insert AFTER INSERT ON profile
+    FOR EACH ROW EXECUTE FUNCTION rpg_economy_profile();
+
+CREATE OR REPLACE TRIGGER economy_profile_money AFTER UPDATE OF money ON profile
+    FOR EACH ROW WHEN (NEW.money IS DISTINCT FROM OLD.money) EXECUTE FUNCTION rpg_economy_profile();
+
+CREATE OR REPLACE TRIGGER economy_profile_delete AFTER DELETE ON profile
+    FOR EACH ROW EXECUTE FUNCTION rpg_economy_profile();
+
+CREATE OR REPLACE FUNCTION rpg_economy_inventory() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM rpg_add_totals(ARRAY['items', 'item_value'], ARRAY[1, COALESCE(NEW.value, 0)]);
+        PERFORM rpg_move_rarity(NULL, NEW.rarity);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM rpg_add_totals(ARRAY['items', 'item_value'], ARRAY[-1, -COALESCE(OLD.value, 0)]);
+        PERFORM rpg_move_rarity(OLD.rarity, NULL);
+    ELSE
+        PERFORM rpg_add_totals(ARRAY['item_value'], ARRAY[COALESCE(NEW.value, 0) - COALESCE(OLD.value, 0)]);
+        PERFORM rpg_move_rarity(OLD.rarity, NEW.rarity);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER economy_inventory_insert AFTER INSERT ON inventory
+    FOR EACH ROW EXECUTE FUNCTION rpg_economy_inventory();
+
+CREATE OR REPLACE TRIGGER economy_inventory_update
+    AFTER UPDATE OF damage, armor, health_bonus, speed_bonus, luck_bonus, crit_bonus, magic_bonus, value ON inventory
+    FOR EACH ROW EXECUTE FUNCTION rpg_economy_inventory();
+
+CREATE OR REPLACE TRIGGER economy_inventory_delete AFTER DELETE ON inventory
+    FOR EACH ROW EXECUTE FUNCTION rpg_economy_inventory();
+
+CREATE OR REPLACE FUNCTION rpg_economy_market() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM rpg_add_totals(ARRAY['market_listings', 'market_value'], ARRAY[1, NEW.price]);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM rpg_add_totals(ARRAY['market_listings', 'market_value'], ARRAY[-1, -OLD.price]);
+    ELSE
+        PERFORM rpg_add_totals(ARRAY['market_value'], ARRAY[NEW.price - OLD.price]);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER economy_market_insert AFTER INSERT ON market
+    FOR EACH ROW EXECUTE FUNCTION rpg_economy_market();
+
+CREATE OR REPLACE TRIGGER economy_market_price AFTER UPDATE OF price ON market
+    FOR EACH ROW EXECUTE FUNCTION rpg_economy_market();
+
+CREATE OR REPLACE TRIGGER economy_market_delete AFTER DELETE ON market
+    FOR EACH ROW EXECUTE FUNCTION rpg_economy_market();
+
+CREATE OR REPLACE FUNCTION rpg_economy_transactions() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO transactions_daily (day, subject, transactions, amount)
+        VALUES (left(COALESCE(NEW.timestamp, rpg_utc_now()), 10), COALESCE(NEW.subject, ''), 1, COALESCE(NEW.amount, 0))
+        ON CONFLICT (day, subject) DO UPDATE SET transactions = transactions_daily.transactions + 1,
+                                                 amount = transactions_daily.amount + excluded.amount;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER economy_transactions_insert AFTER INSERT ON transactions
+    FOR EACH ROW EXECUTE FUNCTION rpg_economy_transactions();
+
+-- Level progression: level always follows xp (Database.level_for_xp mirrors this table)
+CREATE TABLE IF NOT EXISTS level_thresholds (
+    xp BIGINT PRIMARY KEY,            -- Least XP for the level: 100 * (level - 1)^2
+    level BIGINT NOT NULL
+);
+
+INSERT INTO level_thresholds (xp, level)
+SELECT 100 * (level - 1) * (level - 1), level FROM generate_series(1, 50) AS level
+ON CONFLICT DO NOTHING;
+
+-- Level-ups waiting to be announced, filled by rpg_profile_level and drained by AutoPlayCog
+CREATE TABLE IF NOT EXISTS level_ups (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES profile(user_id) ON DELETE CASCADE,
+    old_level BIGINT NOT NULL,
+    new_level BIGINT NOT NULL,
+    reached_at TEXT DEFAULT rpg_utc_now()
+);
+
+-- A BEFORE trigger corrects the row as it is written (SQLite needs a second UPDATE),
+-- so RETURNING already sees the level here
+CREATE OR REPLACE FUNCTION rpg_profile_level() RETURNS trigger AS $$
+DECLARE
+    reached BIGINT;
+BEGIN
+    SELECT level INTO reached FROM level_thresholds
+        WHERE xp <= GREATEST(0, COALESCE(NEW.xp, 0)) ORDER BY xp DESC LIMIT 1;
+    IF NEW.level IS DISTINCT FROM reached THEN
+        IF TG_OP = 'UPDATE' AND reached > OLD.level THEN
+            INSERT INTO level_ups (user_id, old_level, new_level) VALUES (NEW.user_id, OLD.level, reached);
+        END IF;
+        NEW.level := reached;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER profile_level_insert BEFORE INSERT ON profile
+    FOR EACH ROW EXECUTE FUNCTION rpg_profile_level();
+
+CREATE OR REPLACE TRIGGER profile_level_update BEFORE UPDATE OF xp, level ON profile
+    FOR EACH ROW EXECUTE FUNCTION rpg_profile_level();
+
+-- Indices for performance
+CREATE INDEX IF NOT EXISTS idx_inventory_owner ON inventory(owner);
+CREATE INDEX IF NOT EXISTS idx_inventory_equipped ON inventory(owner, equipped);
+CREATE INDEX IF NOT EXISTS idx_market_price ON market(price);
+CREATE INDEX IF NOT EXISTS idx_market_item ON market(item_id);
+CREATE INDEX IF NOT EXISTS idx_adventures_user ON adventures(user_id, status);
+CREATE INDEX IF NOT EXISTS idx_epic_adventures_user ON epic_adventures(user_id, status);
+CREATE INDEX IF NOT EXISTS idx_battle_logs_users ON battle_logs(attacker, defender);
+-- Per-user and per-subject ledger history; the user indexes cover the per-subject summaries
+CREATE INDEX IF NOT EXISTS idx_transactions_from ON transactions(from_user, timestamp, subject, amount);
+CREATE INDEX IF NOT EXISTS idx_transactions_to ON transactions(to_user, timestamp, subject, amount);
+CREATE INDEX IF NOT EXISTS idx_transactions_subject ON transactions(subject, timestamp);
+CREATE INDEX IF NOT EXISTS idx_penalties_user ON penalties(user_id);
+CREATE INDEX IF NOT EXISTS idx_divine_blessings_user ON divine_blessings(user_id, expires_at);
+CREATE INDEX IF NOT EXISTS idx_presence_days_day ON presence_days(day);
+-- Archived rows are looked up per user, like SQLite's archive files
+CREATE INDEX IF NOT EXISTS idx_transactions_archive_users ON transactions_archive(from_user, to_user);
+CREATE INDEX IF NOT EXISTS idx_battle_logs_archive_users ON battle_logs_archive(attacker, defender);
+CREATE INDEX IF NOT EXISTS idx_crate_history_archive_users ON crate_history_archive(user_id);
+CREATE INDEX IF NOT EXISTS idx_penalties_archive_users ON penalties_archive(user_id);
+CREATE INDEX IF NOT EXISTS idx_event_participation_archive_users ON event_participation_archive(user_id);
+CREATE INDEX IF NOT EXISTS idx_adventures_archive_users ON adventures_archive(user_id);
+CREATE INDEX IF NOT EXISTS idx_epic_adventures_archive_users ON epic_adventures_archive(user_id);
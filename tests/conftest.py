@@ -0,0 +1,38 @@
+"""Shared fixtures: an in-memory Database on the current schema, and the Repository on it"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.database import Database, SQLiteRepository
+
+SCHEMA_PATH = os.path.join(ROOT, "schema.sql")
+FIXTURES = os.path.join(ROOT, "tests", "fixtures")
+
+
+@pytest.fixture
+def db():
+    database = Database(":memory:")
+    database.init_database()
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def repo(db):
+    """The async Repository the cogs use, on the same in-memory database"""
+    return SQLiteRepository(db)
+
+
+@pytest.fixture
+def make_character(db):
+    """Create a character and return its user_id"""
+    def make(user_id: int, name: str = None, **columns):
+        db.create_character(user_id, name or f"Player{user_id}")
+        if columns:
+            db.update_profile(user_id, **columns)
+        return user_id
+    return make
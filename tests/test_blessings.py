@@ -0,0 +1,36 @@
+"""Blessings: reads skip expired rows, and a scheduled job deletes them"""
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from cogs.religion import ReligionCog
+
+
+def test_reading_blessings_is_a_single_select(db, repo, make_character):
+    make_character(1)
+    now = datetime.now()
+    db.add_blessing(1, "xp_mult", 1.5, now + timedelta(hours=1), "Wisdom")
+    db.add_blessing(1, "luck", 0.2, now + timedelta(hours=1), "Fortune")
+    db.add_blessing(1, "gold_mult", 3.0, now - timedelta(minutes=1), "Expired")
+    religion = ReligionCog(SimpleNamespace(db=repo))
+
+    stats = db.enable_instrumentation()
+    active = asyncio.run(religion.get_active_blessings(1))
+
+    assert (active['xp_mult'], active['gold_mult'], active['luck']) == (1.5, 1.0, 1.2)
+    assert [template.template.split()[0] for template in stats.templates.values()] == ["SELECT"]
+    assert db.fetchone("SELECT COUNT(*) FROM divine_blessings")[0] == 3  # Nothing deleted
+
+
+def test_prune_removes_only_expired_blessings(db, make_character):
+    make_character(1)
+    make_character(2)
+    now = datetime.now()
+    db.add_blessing(1, "xp_mult", 1.5, now + timedelta(hours=1), "Wisdom")
+    db.add_blessing(1, "luck", 0.2, now - timedelta(hours=1), "Fortune")
+    db.add_blessing(2, "battle_mult", 1.2, now - timedelta(seconds=1), "Fury")
+
+    assert db.prune_blessings(now) == 2
+    assert [row['effect'] for row in db.fetchall("SELECT effect FROM divine_blessings")] == ["xp_mult"]
+    assert [row['effect'] for row in db.get_active_blessings(1, now)] == ["xp_mult"]
+    assert db.prune_blessings(now) == 0
@@ -0,0 +1,105 @@
+"""Economy aggregates: the trigger-maintained counters always match a full scan"""
+from datetime import datetime, timezone
+
+
+def scanned_totals(db) -> dict:
+    """What economy_totals would hold if it were rebuilt from the base tables"""
+    row = db.get_connection().execute("""
+        SELECT (SELECT COALESCE(SUM(money), 0) FROM profile) AS money_supply,
+               (SELECT COUNT(*) FROM profile) AS characters,
+               (SELECT COUNT(*) FROM inventory) AS items,
+               (SELECT COALESCE(SUM(value), 0) FROM inventory) AS item_value,
+               (SELECT COUNT(*) FROM market) AS market_listings,
+               (SELECT COALESCE(SUM(price), 0) FROM market) AS market_value
+    """).fetchone()
+    return {metric: value for metric, value in dict(row).items() if value}
+
+
+def scanned_rarity(db) -> dict:
+    rows = db.get_connection().execute("SELECT rarity, COUNT(*) FROM inventory GROUP BY rarity")
+    return {rarity: items for rarity, items in rows}
+
+
+def report(db) -> dict:
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    economy = db.get_economy_report(today)
+    # Untouched metrics have no row yet, and emptied ones stay behind at zero
+    economy['totals'] = {metric: value for metric, value in economy['totals'].items() if value}
+    economy['rarity'] = {rarity: items for rarity, items in economy['rarity'].items() if items}
+    return economy
+
+
+def test_counters_follow_characters_items_and_the_market(db, make_character):
+    seller = make_character(1)
+    buyer = make_character(2, money=1000)
+    sword = db.create_item(seller, "Sword", "Sword", 120, 25, 0, "right")
+    shield = db.create_item(seller, "Shield", "Shield", 80, 0, 12, "left")
+    db.create_item(buyer, "Stick", "Sword", 1, 1, 0, "right")
+
+    assert db.list_item_on_market(sword, 300, owner_id=seller, fee=10)
+    assert db.list_item_on_market(shield, 150, owner_id=seller)
+    db.execute("UPDATE market SET price = 175 WHERE item_id = ?", (shield,))
+    db.commit()
+    assert db.buy_market_item(sword, buyer) == {'price': 300, 'seller_id': seller}
+    assert db.withdraw_market_item(shield, seller)
+
+    # Reforging moves an item between rarities
+    db.execute("UPDATE inventory SET damage = 45, value = 500 WHERE id = ?", (sword,))
+    db.commit()
+    db.delete_item(shield)
+
+    economy = report(db)
+    assert economy['totals'] == scanned_totals(db)
+    assert economy['rarity'] == scanned_rarity(db)
+
+    # Deleting a character cascades to its items and takes its money out of circulation
+    db.delete_character(buyer)
+    economy = report(db)
+    assert economy['totals'] == scanned_totals(db)
+    assert economy['rarity'] == scanned_rarity(db)
+
+
+def test_money_flow_splits_created_and_destroyed(db, make_character):
+    make_character(1)  # Starts with 100
+    make_character(2)
+    db.increment(1, money=50)
+    db.increment(2, money=-30)
+    db.apply_rewards({1: {'money': 25}, 2: {'money': -10}})
+    db.delete_character(2)  # 100 - 30 - 10 = 60 destroyed
+
+    (flow,) = report(db)['money_flow']
+    assert (flow['created'], flow['destroyed']) == (100 + 100 + 50 + 25, 30 + 10 + 60)
+    assert flow['created'] - flow['destroyed'] == report(db)['totals']['money_supply']
+
+
+def test_unchanged_money_is_not_counted_as_flow(db, make_character):
+    make_character(1)
+    db.update_profile(1, money=100, xp=10)
+
+    (flow,) = report(db)['money_flow']
+    assert (flow['created'], flow['destroyed']) == (100, 0)
+
+
+def test_transactions_are_summed_per_subject(db, make_character):
+    make_character(1)
+    make_character(2)
+    db.log_transaction(1, 2, 40, "trade", {'note': 'first'})
+    db.log_transaction(2, 1, 60, "trade", {})
+    db.log_transaction(1, None, 5, "bet", {'won': False})
+
+    subjects = {row['subject']: (row['transactions'], row['amount']) for row in report(db)['subjects']}
+    assert subjects == {'trade': (2, 100), 'bet': (1, 5)}
+    assert report(db)['subjects'][0]['subject'] == 'trade'  # Busiest first
+
+
+def test_settled_battle_moves_money_without_creating_any(db, make_character):
+    make_character(1, money=500)
+    make_character(2, money=500)
+    before = report(db)['totals']['money_supply']
+
+    assert db.settle_battle(1, 2, winner=1, bet=200)
+    assert not db.settle_battle(1, 2, winner=1, bet=1000)  # The loser can't cover it
+
+    economy = report(db)
+    assert economy['totals']['money_supply'] == before
+    assert economy['totals'] == scanned_totals(db)
@@ -0,0 +1,101 @@
+"""Delta updates: increment() and the coalescing batch() around it"""
+import pytest
+
+from utils.database import level_for_xp
+
+
+def profile(db, user_id: int) -> dict:
+    return dict(db.fetchone("SELECT money, xp, level, kills FROM profile WHERE user_id = ?", (user_id,)))
+
+
+@pytest.fixture
+def updates(db):
+    """Executions of profile UPDATEs from here on (an executemany counts once)"""
+    stats = db.enable_instrumentation()
+
+    def count() -> int:
+        return sum(template.calls for name, template in stats.templates.items()
+                   if name.startswith("UPDATE profile"))
+    yield count
+    db.disable_instrumentation()
+
+
+def test_increment_adds_and_returns_the_new_values(db, make_character):
+    make_character(1)
+    assert db.increment(1, money=25, kills=2) == {'money': 125, 'kills': 2}
+    assert db.increment(1, money=-5) == {'money': 120}
+    assert profile(db, 1)['money'] == 120
+
+
+def test_increment_recomputes_the_level_the_trigger_wrote(db, make_character):
+    make_character(1)
+    for xp in (99, 1, 800, 5000, 10 ** 6):
+        updated = db.increment(1, xp=xp)
+        # RETURNING reports the row before the trigger ran; the Python mirror fills level in
+        assert updated['level'] == level_for_xp(updated['xp']) == profile(db, 1)['level']
+
+
+def test_increment_edge_cases(db, make_character):
+    make_character(1)
+    assert db.increment(2, money=5) is None  # No character
+    assert db.increment(1) is None
+    with pytest.raises(ValueError):
+        db.increment(1, level=5)
+    with pytest.raises(ValueError):
+        db.increment(1, name=1)
+
+
+def test_batch_coalesces_into_one_update_per_user(db, make_character, updates):
+    make_character(1)
+    make_character(2)
+    make_character(3)
+    before = updates()
+    with db.batch():
+        for _ in range(5):
+            assert db.increment(1, money=10, xp=20) is None
+        db.increment(2, money=7, xp=1)
+        db.increment(3, kills=1)
+        db.increment(3, kills=-1)  # Cancels out, nothing to write
+        # Reads inside the block don't see queued deltas
+        assert profile(db, 1)['money'] == 100
+        assert updates() == before
+
+    assert updates() == before + 1  # Users 1 and 2 share a column set and one executemany
+    assert profile(db, 1) == {'money': 150, 'xp': 100, 'level': 2, 'kills': 0}
+    assert profile(db, 2)['money'] == 107
+    assert profile(db, 3)['kills'] == 0
+
+
+def test_nested_batches_join_the_outer_one(db, make_character, updates):
+    make_character(1)
+    before = updates()
+    with db.batch():
+        db.increment(1, money=1)
+        with db.batch():
+            db.increment(1, money=2)
+        assert updates() == before  # Leaving the inner block writes nothing yet
+        db.increment(1, money=3)
+    assert updates() == before + 1
+    assert profile(db, 1)['money'] == 106
+
+
+def test_failed_batch_writes_nothing(db, make_character):
+    make_character(1)
+    make_character(2)
+    with pytest.raises(RuntimeError):
+        with db.batch():
+            db.increment(1, money=50, xp=500)
+            raise RuntimeError("reward loop failed halfway")
+    assert profile(db, 1) == {'money': 100, 'xp': 0, 'level': 1, 'kills': 0}
+
+    # The next batch starts clean
+    with db.batch():
+        db.increment(2, money=1)
+    assert (profile(db, 1)['money'], profile(db, 2)['money']) == (100, 101)
+
+
+def test_apply_rewards_rejects_unknown_columns_before_writing(db, make_character):
+    make_character(1)
+    with pytest.raises(ValueError):
+        db.apply_rewards({1: {'money': 5, 'name': 1}})
+    assert profile(db, 1)['money'] == 100
@@ -0,0 +1,111 @@
+"""Transaction ledger encoding: typed columns plus packed details round-trip the info dict"""
+import json
+import os
+import sqlite3
+
+import pytest
+
+from conftest import FIXTURES, SCHEMA_PATH
+from utils.ledger import pack_details, split_info, transaction_info, unpack_details
+from utils.migrations import migrate
+
+INT_WIDTHS = [
+    (0, 1), (127, 1), (-128, 1),
+    (128, 2), (-129, 2), (32767, 2), (-32768, 2),
+    (32768, 4), (-32769, 4), (2 ** 31 - 1, 4), (-2 ** 31, 4),
+    (2 ** 31, 8), (-2 ** 31 - 1, 8), (2 ** 63 - 1, 8), (-2 ** 63, 8),
+]
+
+
+@pytest.mark.parametrize("value, width", INT_WIDTHS)
+def test_ints_take_the_smallest_width(value, width):
+    blob = pack_details({'price': value})
+    assert len(blob) == 1 + 1 + width  # Key code, tag, value
+    assert unpack_details(blob) == {'price': value}
+
+
+def test_ints_past_64_bits_fall_back_to_json():
+    for value in (2 ** 63, -2 ** 63 - 1, 10 ** 30):
+        assert unpack_details(pack_details({'xp': value})) == {'xp': value}
+
+
+@pytest.mark.parametrize("value", [True, False, None, 0.1, -2.5, 1e300, "", "gold", "ünïcødé ⚔️"])
+def test_scalars_round_trip_with_their_type(value):
+    (result,) = unpack_details(pack_details({'result': value})).values()
+    assert result == value and type(result) is type(value)
+
+
+def test_unknown_keys_and_nested_values_round_trip():
+    details = {
+        'choice': 'heads', 'streak': 3, 'chance': 0.45,
+        'opponent': 'Bob', 'rolls': [1, 6, 3], 'loot': {'gold': 5, 'items': ['Sword', None]},
+        'ключ': True,
+    }
+    assert unpack_details(pack_details(details)) == details
+    assert list(unpack_details(pack_details(details))) == list(details)  # Order kept
+
+
+def test_empty_details_are_stored_as_null():
+    assert pack_details({}) is None
+    assert unpack_details(None) == {}
+
+
+def test_long_strings_and_json_are_stored():
+    note = "x" * 70000
+    loot = ["y" * 40000, "z" * 40000]
+    details = {'note': note, 'loot': loot, 'item': 'short'}
+    assert unpack_details(pack_details(details)) == details
+
+
+def test_keys_past_the_length_limit_are_rejected():
+    with pytest.raises(ValueError):
+        pack_details({"k" * 70000: 1})
+
+
+def test_split_info_and_transaction_info_are_inverses(db, make_character):
+    make_character(1)
+    info = {'item_id': 12, 'item': 'Sword', 'won': True, 'price': 300, 'note': 'x' * 70000}
+    item_id, item, won, details = split_info(info)
+    assert (item_id, item, won) == (12, 'Sword', 1)
+    assert unpack_details(details) == {'price': 300, 'note': 'x' * 70000}
+
+    assert db.log_transaction(1, None, 300, "shop", info)
+    (row,) = db.fetchall("SELECT * FROM transactions")
+    assert transaction_info(row) == info
+    assert transaction_info(dict(item_id=None, item=None, won=0, details=None)) == {'won': False}
+
+
+def test_archived_rows_keep_their_json_info():
+    row = dict(info=json.dumps({'price': 5, 'item': 'Old'}), item_id=None, item=None, won=None, details=None)
+    assert transaction_info(row) == {'price': 5, 'item': 'Old'}
+
+
+def test_migration_converts_json_info_rows():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    with open(os.path.join(FIXTURES, "schema_baseline.sql")) as f:
+        conn.executescript(f.read())
+    conn.execute("INSERT INTO profile (user_id, name) VALUES (1, 'Old')")
+    infos = [
+        {'item_id': 7, 'item': 'Sword', 'price': 50},
+        {'won': True, 'choice': 'heads', 'result': 'heads', 'chance': 0.5, 'streak': 2},
+        {'won': False, 'opponent': 'Bob', 'rolls': [1, 2], 'loot': {'gold': 3}},
+        {'given': 2 ** 40, 'received': -5, 'note': None},
+        {},
+    ]
+    raw = [json.dumps(info) for info in infos] + ["[1, 2]", "not json", None]
+    conn.executemany(
+        "INSERT INTO transactions (from_user, to_user, amount, subject, info) VALUES (1, NULL, 1, 'test', ?)",
+        [(info,) for info in raw]
+    )
+    conn.commit()
+
+    migrate(conn, SCHEMA_PATH)
+
+    rows = conn.execute("SELECT * FROM transactions ORDER BY id").fetchall()
+    assert len(rows) == len(raw)
+    assert [transaction_info(row) for row in rows[:len(infos)]] == infos
+    # Unreadable or non-object info is dropped, the rows stay
+    assert [transaction_info(row) for row in rows[len(infos):]] == [{}, {}, {}]
+    assert rows[1]['won'] == 1 and rows[2]['won'] == 0 and rows[0]['won'] is None
+
@@ -0,0 +1,114 @@
+"""Level progression: the profile triggers keep level in step with xp and queue level-ups"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.database import level_for_xp
+
+
+def level(db, user_id: int) -> int:
+    return db.fetchone("SELECT level FROM profile WHERE user_id = ?", (user_id,))['level']
+
+
+def drain(db):
+    db.clear_level_ups(db.get_level_ups()[-1]['id'])
+
+
+def queued(db) -> list:
+    return [(row['user_id'], row['old_level'], row['new_level']) for row in db.get_level_ups()]
+
+
+@pytest.mark.parametrize("xp", [0, 1, 99, 100, 399, 400, 2500, 8099, 8100, 240100, 10 ** 7, -50])
+def test_trigger_level_matches_level_for_xp(db, make_character, xp):
+    make_character(1, xp=xp)
+    assert level(db, 1) == level_for_xp(xp)
+
+
+def test_level_for_xp_thresholds():
+    assert [level_for_xp(xp) for xp in (0, 99, 100, 400, 900)] == [1, 1, 2, 3, 4]
+    assert level_for_xp(None) == 1
+    assert level_for_xp(10 ** 9) == 50  # Capped
+
+
+def test_increment_queues_a_level_up(db, make_character):
+    make_character(1)
+    assert db.increment(1, xp=450, money=5) == {'xp': 450, 'money': 105, 'level': 3}
+    assert level(db, 1) == 3
+    assert queued(db) == [(1, 1, 3)]
+
+    db.increment(1, xp=10)  # Still level 3
+    assert queued(db) == [(1, 1, 3)]
+
+
+def test_batched_and_rewarded_xp_queue_level_ups(db, make_character):
+    make_character(1)
+    make_character(2)
+    with db.batch():
+        db.increment(1, xp=60)
+        db.increment(1, xp=60)  # Only the coalesced total crosses level 2
+        db.increment(2, xp=50)
+    assert queued(db) == [(1, 1, 2)]
+
+    assert db.apply_rewards({2: {'xp': 400}})
+    assert queued(db) == [(1, 1, 2), (2, 1, 3)]
+
+
+def test_direct_level_writes_are_corrected_without_a_level_up(db, make_character):
+    make_character(1, xp=500)
+    drain(db)  # Giving the new character xp was itself a level-up
+    db.update_profile(1, level=40)
+    assert level(db, 1) == 3
+    db.update_profile(1, level=1)
+    assert level(db, 1) == 3
+    assert queued(db) == []
+
+
+def test_losing_xp_lowers_the_level_silently(db, make_character):
+    make_character(1, xp=900)
+    drain(db)
+    db.increment(1, xp=-800)
+    assert level(db, 1) == 2
+    assert queued(db) == []
+
+
+def test_level_ups_stay_queued_until_cleared(db, make_character):
+    make_character(1)
+    make_character(2)
+    db.increment(1, xp=100)
+    db.increment(2, xp=100)
+    db.increment(1, xp=300)
+
+    rows = db.get_level_ups()
+    assert [row['name'] for row in rows] == ["Player1", "Player2", "Player1"]
+    assert db.get_level_ups() == rows  # Reading does not drain the queue
+    assert len(db.get_level_ups(limit=2)) == 2
+
+    # Level-ups queued after the read survive the clear
+    db.increment(2, xp=300)
+    assert db.clear_level_ups(rows[-1]['id']) == 3
+    assert queued(db) == [(2, 2, 3)]
+
+
+def test_deleting_a_character_drops_its_level_ups(db, make_character):
+    make_character(1)
+    make_character(2)
+    db.increment(1, xp=100)
+    db.increment(2, xp=100)
+    db.delete_character(1)
+    assert queued(db) == [(2, 1, 2)]
+
+
+def test_completed_adventures_pay_out_once(db, make_character):
+    make_character(1)
+    start = datetime(2026, 1, 1)
+    db.start_adventures([(1, "Cave", 1, start, start + timedelta(minutes=5), 0)])
+    (adventure,) = db.get_finished_adventures(start + timedelta(hours=1))
+
+    rewards = [(adventure['id'], 1, {'xp': 150, 'money': 20, 'completed': 1}, [])]
+    assert db.complete_adventures(rewards) == {adventure['id']}
+    # A second settlement of the same adventure is skipped with its rewards
+    assert db.complete_adventures(rewards) == set()
+
+    profile = db.get_character(1)
+    assert (profile['xp'], profile['money'], profile['completed'], profile['level']) == (150, 120, 1, 2)
+    assert queued(db) == [(1, 1, 2)]
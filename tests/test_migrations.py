@@ -0,0 +1,120 @@
+"""Schema migrations: an unversioned baseline database upgrades to the schema.sql database"""
+import json
+import os
+import sqlite3
+
+import pytest
+
+from conftest import FIXTURES, SCHEMA_PATH
+from utils.ledger import unpack_details
+from utils.migrations import MIGRATIONS, SCHEMA_VERSION, get_version, migrate
+
+
+def connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def baseline() -> sqlite3.Connection:
+    """A database created by the original, unversioned schema.sql"""
+    conn = connect()
+    with open(os.path.join(FIXTURES, "schema_baseline.sql")) as f:
+        conn.executescript(f.read())
+    conn.commit()
+    return conn
+
+
+def schema_objects(conn: sqlite3.Connection) -> dict:
+    """name -> (type, column names) of every table, index and trigger"""
+    objects = {}
+    for row in conn.execute("SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"):
+        columns = ()
+        if row['type'] == 'table':
+            columns = frozenset(column[1] for column in conn.execute(f"PRAGMA table_info({row['name']})"))
+        objects[row['name']] = (row['type'], columns)
+    return objects
+
+
+def test_new_database_is_stamped_with_the_latest_version():
+    conn = connect()
+    assert migrate(conn, SCHEMA_PATH) == (0, SCHEMA_VERSION)
+    assert get_version(conn) == SCHEMA_VERSION
+    # A second start is a no-op
+    assert migrate(conn, SCHEMA_PATH) == (SCHEMA_VERSION, SCHEMA_VERSION)
+
+
+def test_migration_numbers_are_sequential():
+    assert [number for number, _, _ in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1))
+
+
+def test_baseline_upgrades_to_the_same_schema_as_a_new_database():
+    fresh = connect()
+    migrate(fresh, SCHEMA_PATH)
+    old = baseline()
+
+    assert migrate(old, SCHEMA_PATH) == (0, SCHEMA_VERSION)
+    assert get_version(old) == SCHEMA_VERSION
+    assert schema_objects(old) == schema_objects(fresh)
+
+
+def test_baseline_data_survives_the_upgrade():
+    conn = baseline()
+    conn.execute("INSERT INTO profile (user_id, name, xp, level, money) VALUES (1, 'Old', 2500, 1, 300)")
+    conn.execute(
+        "INSERT INTO transactions (from_user, to_user, amount, subject, info) VALUES (1, NULL, 50, 'shop', ?)",
+        (json.dumps({'item_id': 7, 'item': 'Sword', 'price': 50, 'note': 'sale'}),)
+    )
+    conn.execute("INSERT INTO transactions (from_user, to_user, amount, subject, info) VALUES (1, NULL, 5, 'bet', 'not json')")
+    conn.commit()
+
+    migrate(conn, SCHEMA_PATH)
+
+    profile = conn.execute("SELECT level, money, alignment, pending_penalty FROM profile WHERE user_id = 1").fetchone()
+    assert profile['level'] == 6  # Corrected from the stale level 1 for 2500 xp
+    assert profile['money'] == 300
+    assert (profile['alignment'], profile['pending_penalty']) == ('neutral', 0)
+    # Stale levels are corrected silently, not announced
+    assert conn.execute("SELECT COUNT(*) FROM level_ups").fetchone()[0] == 0
+
+    rows = conn.execute("SELECT * FROM transactions ORDER BY id").fetchall()
+    assert (rows[0]['item_id'], rows[0]['item'], rows[0]['won']) == (7, 'Sword', None)
+    assert unpack_details(rows[0]['details']) == {'price': 50, 'note': 'sale'}
+    assert rows[1]['details'] is None  # Unreadable info is dropped, the row is kept
+    assert 'info' not in rows[0].keys()
+
+
+def test_each_migration_runs_once_from_any_version():
+    conn = baseline()
+    conn.executescript(open(SCHEMA_PATH).read())
+    for number, _, migration in MIGRATIONS[:8]:
+        conn.execute("BEGIN")
+        migration(conn)
+        conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    conn.execute("DROP TRIGGER profile_level_update")
+    conn.execute("DROP TRIGGER profile_level_insert")
+    conn.execute("INSERT INTO profile (user_id, name, xp, level) VALUES (1, 'Stale', 10000, 3)")
+    conn.commit()
+
+    assert migrate(conn, SCHEMA_PATH) == (8, SCHEMA_VERSION)
+    assert conn.execute("SELECT level FROM profile WHERE user_id = 1").fetchone()[0] == 11
+    assert conn.execute("SELECT COUNT(*) FROM level_ups").fetchone()[0] == 0
+
+
+def test_failed_migration_leaves_the_version_untouched(monkeypatch):
+    conn = baseline()
+    conn.executescript(open(SCHEMA_PATH).read())
+    conn.execute("PRAGMA user_version = 8")
+    conn.commit()
+
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr("utils.migrations.MIGRATIONS", MIGRATIONS[:8] + [(9, "broken", broken)])
+    with pytest.raises(RuntimeError):
+        migrate(conn, SCHEMA_PATH)
+    assert get_version(conn) == 8
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
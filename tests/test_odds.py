@@ -0,0 +1,140 @@
+"""Battle odds: the closed forms agree with brute-force enumeration of every roll"""
+import itertools
+import random
+from bisect import bisect_left
+
+import pytest
+
+from classes.odds import (CRIT_CHANCE, CRIT_MULT, DUEL_VARIANCE, NOISE, TEAM_BUCKETS, battle_profile,
+                          bet_cap, duel, duel_odds, team_odds, team_power_distribution, uniform_win_chance)
+
+GRID = 1000
+
+
+def grid(low: float, high: float, steps: int = GRID) -> list:
+    """Midpoints of `steps` equal slices of [low, high]"""
+    width = (high - low) / steps
+    return [low + (i + 0.5) * width for i in range(steps)]
+
+
+def enumerated_win_chance(a_low, a_high, b_low, b_high, steps: int = GRID) -> float:
+    """P(X > Y) by counting, over a fine grid of both uniform rolls, how often X is higher"""
+    ys = grid(b_low, b_high, steps)
+    return sum(bisect_left(ys, x) for x in grid(a_low, a_high, steps)) / steps ** 2
+
+
+def enumerated_duel_odds(power1: float, power2: float) -> float:
+    low, high = DUEL_VARIANCE
+    outcomes = ((1.0, 1 - CRIT_CHANCE), (CRIT_MULT, CRIT_CHANCE))
+    chance = 0.0
+    for (mult1, weight1), (mult2, weight2) in itertools.product(outcomes, repeat=2):
+        a, b = power1 * mult1, power2 * mult2
+        chance += weight1 * weight2 * enumerated_win_chance(a * low, a * high, b * low, b * high)
+    return chance
+
+
+def exact_team_distribution(fighters) -> dict:
+    """Total power -> probability over every combination of the fighters' noise rolls"""
+    dist = {}
+    noise = range(-NOISE, NOISE + 1)
+    share = 1.0 / len(noise) ** len(fighters)
+    for rolls in itertools.product(noise, repeat=len(fighters)):
+        total = sum(int((base + n) * mult) for (base, mult), n in zip(fighters, rolls))
+        dist[total] = dist.get(total, 0.0) + share
+    return dist
+
+
+@pytest.mark.parametrize("a, b", [
+    ((0, 1), (0, 1)),
+    ((8, 12), (10, 15)),
+    ((10, 15), (8, 12)),
+    ((0, 1), (2, 3)),
+    ((2, 3), (0, 1)),
+    ((0, 10), (4, 5)),
+    ((4, 5), (0, 10)),
+])
+def test_uniform_win_chance_matches_enumeration(a, b):
+    assert uniform_win_chance(*a, *b) == pytest.approx(enumerated_win_chance(*a, *b), abs=2e-3)
+
+
+def test_uniform_win_chance_with_a_fixed_roll():
+    assert uniform_win_chance(5, 5, 0, 10) == pytest.approx(0.5)
+    assert uniform_win_chance(0, 10, 5, 5) == pytest.approx(0.5)
+    assert uniform_win_chance(5, 5, 4, 4) == 1.0
+    assert uniform_win_chance(4, 4, 5, 5) == 0.0
+
+
+@pytest.mark.parametrize("power1, power2", [(100, 100), (100, 120), (120, 100), (50, 200), (300, 80), (1, 1000)])
+def test_duel_odds_match_enumeration(power1, power2):
+    assert duel_odds(power1, power2) == pytest.approx(enumerated_duel_odds(power1, power2), abs=2e-3)
+
+
+def test_duel_odds_are_symmetric():
+    for power1, power2 in [(100, 100), (100, 150), (37, 410)]:
+        assert duel_odds(power1, power2) + duel_odds(power2, power1) == pytest.approx(1.0)
+
+
+def test_duel_odds_match_simulated_duels():
+    rng = random.Random(7)
+    trials = 40000
+    wins = sum(duel(100, 115, rng)[0] for _ in range(trials))
+    assert wins / trials == pytest.approx(duel_odds(100, 115), abs=0.01)
+
+
+@pytest.mark.parametrize("fighters", [
+    [(40, 1.0)],
+    [(40, 1.0), (75, 1.0)],
+    [(40, 1.25), (75, 1.0)],
+    [(60, 1.5), (30, 1.1)],
+])
+def test_team_power_distribution_matches_enumeration(fighters):
+    exact = exact_team_distribution(fighters)
+    grouped = team_power_distribution(fighters)
+
+    assert sum(p for _, p in grouped) == pytest.approx(1.0)
+    assert sum(total * p for total, p in grouped) == pytest.approx(sum(total * p for total, p in exact.items()))
+    # Each bucket holds at least its share of the probability and stays inside the exact range
+    assert len(grouped) <= TEAM_BUCKETS
+    assert all(p >= 1 / TEAM_BUCKETS - 1e-9 for _, p in grouped[:-1])
+    assert all(min(exact) - 1e-9 <= total <= max(exact) + 1e-9 for total, _ in grouped)
+
+
+def test_unbucketed_distribution_is_exact():
+    fighters = [(40, 1.0), (75, 1.2)]
+    exact = exact_team_distribution(fighters)
+    grouped = team_power_distribution(fighters, buckets=10 ** 6)
+    assert [total for total, _ in grouped] == pytest.approx(sorted(exact))
+    assert [p for _, p in grouped] == pytest.approx([exact[total] for total in sorted(exact)])
+
+
+@pytest.mark.parametrize("team_a, team_b", [
+    ([(40, 1.0), (75, 1.0)], [(50, 1.0), (60, 1.0)]),
+    ([(40, 1.0), (75, 1.2)], [(90, 1.0), (50, 1.0)]),
+    ([(120, 1.0)], [(30, 1.0), (30, 1.0)]),
+])
+def test_team_odds_match_enumeration(team_a, team_b):
+    variance = (0.85, 1.15)
+    low, high = variance
+    dist_a, dist_b = exact_team_distribution(team_a), exact_team_distribution(team_b)
+    exact = sum(
+        p_a * p_b * uniform_win_chance(total_a * low, total_a * high, total_b * low, total_b * high)
+        for total_a, p_a in dist_a.items() for total_b, p_b in dist_b.items()
+    )
+    # Bucketing the totals costs a little precision
+    assert team_odds(team_a, team_b, variance) == pytest.approx(exact, abs=0.01)
+
+
+def test_battle_profile():
+    stats = {'level': 12, 'damage_armor': 35, 'blessing_battle_mult': 1.3}
+    assert battle_profile(stats) == (155, 1.3)
+    assert battle_profile(stats, blessings=False) == (155, 1.0)
+    assert battle_profile({**stats, 'blessing_battle_mult': None}) == (155, 1.0)
+    assert battle_profile({**stats, 'blessing_battle_mult': 0.5}) == (155, 1.0)  # Never a penalty
+
+
+def test_bet_cap_shrinks_with_the_underdogs_chance():
+    assert bet_cap(0.5, 1000) == 1000
+    assert bet_cap(0.25, 1000) == 500
+    assert bet_cap(0.75, 1000) == 500
+    assert bet_cap(0.0, 1000) == 0
+    assert bet_cap(1.0, 1000) == 0
@@ -0,0 +1,144 @@
+"""Outbox: queued messages are coalesced into as few sends as Discord allows"""
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from utils.metrics import Metrics
+from utils.outbox import MAX_CONTENT, MAX_EMBEDS, Outbox, Priority, StubTransport
+
+CHANNEL = SimpleNamespace(id=1)
+OTHER_CHANNEL = SimpleNamespace(id=2)
+
+
+def run(queue_messages, **options):
+    """Queue messages from one loop tick, drain, and return (sent, futures, outbox)"""
+    transport = StubTransport()
+    outbox = Outbox(transport, rate=None, **options)
+
+    async def main():
+        futures = queue_messages(outbox)
+        await outbox.drain()
+        return futures
+
+    futures = asyncio.run(main())
+    return transport.sent, futures, outbox
+
+
+def embed(title: str) -> discord.Embed:
+    return discord.Embed(title=title)
+
+
+def test_text_lines_join_into_one_message():
+    sent, futures, _ = run(lambda outbox: [outbox.send(CHANNEL, f"line {i}") for i in range(3)])
+    assert sent == [(1, "line 0\nline 1\nline 2", [])]
+    # Every request resolves to the one message that carried it
+    messages = {id(future.result()) for future in futures}
+    assert len(messages) == 1 and futures[0].result().content == "line 0\nline 1\nline 2"
+
+
+def test_text_is_split_at_the_content_limit():
+    line = "x" * (MAX_CONTENT * 3 // 10)
+    sent, _, _ = run(lambda outbox: [outbox.send(CHANNEL, line) for _ in range(4)])
+    # Three lines and their newlines fit, the fourth would overflow
+    assert [content for _, content, _ in sent] == ["\n".join([line] * 3), line]
+
+
+def test_embeds_batch_up_to_ten_per_message():
+    sent, _, _ = run(lambda outbox: [outbox.send(CHANNEL, embed=embed(f"e{i}")) for i in range(MAX_EMBEDS + 3)])
+    assert [len(embeds) for _, _, embeds in sent] == [MAX_EMBEDS, 3]
+    titles = [e.title for _, _, embeds in sent for e in embeds]
+    assert titles == [f"e{i}" for i in range(MAX_EMBEDS + 3)]
+
+
+def test_text_never_follows_an_embed_in_the_same_message():
+    def queue(outbox):
+        return [outbox.send(CHANNEL, "intro", embed=embed("card")),
+                outbox.send(CHANNEL, "after")]
+    sent, _, _ = run(queue)
+    assert [(content, [e.title for e in embeds]) for _, content, embeds in sent] == [
+        ("intro", ["card"]), ("after", []),
+    ]
+
+
+def test_unmerged_messages_are_sent_alone():
+    def queue(outbox):
+        return [outbox.send(CHANNEL, "a"), outbox.send(CHANNEL, "editable", merge=False), outbox.send(CHANNEL, "b")]
+    sent, futures, _ = run(queue)
+    assert [content for _, content, _ in sent] == ["a", "editable", "b"]
+    assert futures[1].result().content == "editable"
+
+
+def test_higher_priority_goes_first_and_priorities_do_not_mix():
+    def queue(outbox):
+        return [outbox.send(CHANNEL, "chatter", priority=Priority.AMBIENT),
+                outbox.send(CHANNEL, "level up", priority=Priority.EVENT),
+                outbox.send(CHANNEL, "reply", priority=Priority.REPLY),
+                outbox.send(CHANNEL, "more chatter", priority=Priority.AMBIENT)]
+    sent, _, _ = run(queue)
+    assert [content for _, content, _ in sent] == ["reply", "level up", "chatter\nmore chatter"]
+
+
+def test_channels_are_queued_separately():
+    def queue(outbox):
+        return [outbox.send(CHANNEL, "one"), outbox.send(OTHER_CHANNEL, "two"), outbox.send(CHANNEL, "three")]
+    sent, _, _ = run(queue)
+    assert sorted(sent) == [(1, "one\nthree", []), (2, "two", [])]
+
+
+def test_backlog_sheds_the_oldest_ambient_messages():
+    metrics = Metrics()
+
+    def queue(outbox):
+        outbox.metrics = metrics
+        futures = [outbox.send(CHANNEL, f"ambient {i}") for i in range(5)]
+        futures.append(outbox.send(CHANNEL, "event", priority=Priority.EVENT))
+        return futures
+    sent, futures, _ = run(queue, max_backlog=3)
+
+    assert [future.result() for future in futures[:3]] == [None, None, None]
+    assert [content for _, content, _ in sent] == [
+        "event",
+        "*…3 quieter updates skipped to keep up*\nambient 3\nambient 4",
+    ]
+    assert metrics.outbound_dropped == 3
+    assert (metrics.outbound_messages, metrics.outbound_requests) == (2, 3)
+
+
+def test_events_are_never_shed():
+    def queue(outbox):
+        return [outbox.send(CHANNEL, f"event {i}", priority=Priority.EVENT) for i in range(4)]
+    sent, futures, _ = run(queue, max_backlog=2)
+    assert sent == [(1, "event 0\nevent 1\nevent 2\nevent 3", [])]
+    assert all(future.result() is not None for future in futures)
+
+
+def test_close_resolves_unsent_messages_with_none():
+    transport = StubTransport()
+    outbox = Outbox(transport, rate=None)
+
+    async def main():
+        futures = [outbox.send(CHANNEL, "never sent") for _ in range(2)]
+        outbox.close()
+        return futures
+
+    futures = asyncio.run(main())
+    assert [future.result() for future in futures] == [None, None]
+    assert transport.sent == [] and outbox.depth == 0
+
+
+def test_paced_channel_waits_for_tokens():
+    transport = StubTransport()
+    outbox = Outbox(transport, rate=2, per=0.2)
+
+    async def main():
+        for i in range(3):
+            outbox.send(CHANNEL, f"burst {i}", merge=False)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await outbox.drain()
+        return loop.time() - started
+
+    elapsed = asyncio.run(main())
+    assert len(transport.sent) == 3
+    assert elapsed >= 0.05  # The third send waited for a refill
@@ -0,0 +1,36 @@
+"""Chat and nick penalties: a running balance per player, consumed by adventures"""
+from datetime import datetime, timedelta
+
+from utils.database import MAX_PENALTY_PER_ADVENTURE
+
+
+def test_penalties_accumulate_in_the_profile_only(db, make_character):
+    make_character(1)
+    assert db.add_penalty(1, 40)
+    assert db.add_penalty(1, 25)
+    assert not db.add_penalty(2, 10)  # No character
+
+    assert db.get_pending_penalty(1) == 65
+    # The balance is the only state; nothing is appended per message
+    assert db.fetchone("SELECT COUNT(*) FROM penalties")[0] == 0
+
+
+def test_one_adventure_takes_at_most_the_cap(db, make_character):
+    make_character(1)
+    db.add_penalty(1, MAX_PENALTY_PER_ADVENTURE + 500)
+    assert db.get_pending_penalty(1) == MAX_PENALTY_PER_ADVENTURE
+
+    assert db.start_adventure(1, "Cave", 1, 600)
+    assert db.get_pending_penalty(1) == 500
+
+
+def test_auto_adventures_consume_the_applied_penalty(db, make_character):
+    make_character(1)
+    make_character(2)
+    db.add_penalty(1, 300)
+    start = datetime(2026, 1, 1)
+    db.start_adventures([
+        (1, "Cave", 1, start, start + timedelta(seconds=900), 300),
+        (2, "Forest", 1, start, start + timedelta(seconds=600), 0),
+    ])
+    assert (db.get_pending_penalty(1), db.get_pending_penalty(2)) == (0, 0)
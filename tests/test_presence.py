@@ -0,0 +1,147 @@
+"""Presence history: packed day intervals answer range and point queries like the raw sessions would"""
+import asyncio
+import random
+import time
+
+import pytest
+
+from utils.presence import (DAY, PresenceTracker, merge_intervals, pack_intervals, split_days,
+                            unpack_intervals)
+
+BASE = 20000 * DAY  # Midnight UTC, 2024-10-04
+GUILD, OTHER_GUILD = 10, 20
+
+
+def overlap(start, end, window_start, window_end) -> float:
+    return max(0.0, min(end, window_end) - max(start, window_start))
+
+
+def test_pack_roundtrip():
+    intervals = [(0, 60), (3600, 7200), (86000, DAY)]
+    blob = pack_intervals(intervals)
+    assert len(blob) == 4 * 2 * len(intervals)
+    assert unpack_intervals(blob) == intervals
+    assert unpack_intervals(pack_intervals([])) == []
+
+
+def test_merge_intervals_coalesces_overlapping_and_touching():
+    assert merge_intervals([(50, 60), (0, 10), (10, 20), (5, 8), (55, 70)]) == [(0, 20), (50, 70)]
+    assert merge_intervals([(0, 10), (11, 20)]) == [(0, 10), (11, 20)]
+
+
+def test_split_days_cuts_at_utc_midnight():
+    assert list(split_days(BASE + 100, BASE + 200)) == [(20000, 100, 200)]
+    assert list(split_days(BASE - 50, BASE + 2 * DAY + 10)) == [
+        (19999, DAY - 50, DAY), (20000, 0, DAY), (20001, 0, DAY), (20002, 0, 10),
+    ]
+    assert list(split_days(BASE, BASE)) == []
+
+
+def test_session_spans_every_guild_showing_the_user_online():
+    tracker = PresenceTracker()
+    assert tracker.update(1, GUILD, True, at=BASE) is None
+    assert tracker.update(1, OTHER_GUILD, True, at=BASE + 10) is None
+    assert tracker.update(1, GUILD, False, at=BASE + 20) is None  # Still online elsewhere
+    assert tracker.online_guilds(1) == {OTHER_GUILD}
+    assert tracker.update(1, OTHER_GUILD, False, at=BASE + 30) == (BASE, BASE + 30)
+    assert not tracker.is_online(1) and len(tracker) == 0
+    assert tracker.update(2, GUILD, False, at=BASE) is None  # Never seen online
+
+
+def visit(tracker: PresenceTracker, user_id: int, start: float, end: float):
+    """One online session, flushed the way the bot's presence handlers do"""
+    tracker.update(user_id, GUILD, True, at=start)
+    tracker.update(user_id, GUILD, False, at=end)
+    asyncio.run(tracker.flush_if_due())
+
+
+@pytest.mark.parametrize("flush_every", [1, 3, 10 ** 6])
+def test_online_totals_match_the_raw_sessions(repo, flush_every):
+    """Flushed, buffered or a mix: every window sums the same as the sessions themselves"""
+    rng = random.Random(flush_every)
+    tracker = PresenceTracker(repo, flush_every=flush_every, flush_interval=10 ** 9)
+    sessions = []
+    for user_id in (1, 2, 3):
+        at = BASE + rng.randrange(DAY)
+        for _ in range(6):
+            start = at + rng.randrange(1, 4 * 3600)
+            end = start + rng.randrange(60, DAY // 2)
+            visit(tracker, user_id, start, end)
+            sessions.append((user_id, start, end))
+            at = end
+
+    windows = [(BASE, BASE + DAY), (BASE + 3600, BASE + 5 * DAY + 7), (BASE - DAY, BASE + 10 * DAY),
+               (BASE + DAY + 1234, BASE + DAY + 5678)]
+    for window_start, window_end in windows:
+        expected = {}
+        for user_id, start, end in sessions:
+            seconds = overlap(start, end, window_start, window_end)
+            if seconds:
+                expected[user_id] = expected.get(user_id, 0) + seconds
+        assert asyncio.run(tracker.online_totals(window_start, window_end)) == pytest.approx(expected)
+        assert asyncio.run(tracker.online_totals(window_start, window_end, [2])) == pytest.approx(
+            {user_id: seconds for user_id, seconds in expected.items() if user_id == 2})
+
+
+def test_repeated_flushes_merge_into_one_row_per_day(db, repo):
+    tracker = PresenceTracker(repo, flush_every=1)
+    for start, end in [(100, 200), (150, 400), (1000, 1100)]:
+        visit(tracker, 1, BASE + start, BASE + end)
+
+    (row,) = db.get_presence_days(20000, 20000)
+    assert unpack_intervals(row['intervals']) == [(100, 400), (1000, 1100)]
+    assert row['online_seconds'] == 400
+    assert asyncio.run(tracker.online_seconds(1, BASE, BASE + DAY)) == 400
+
+
+def test_events_only_buffer_until_a_flush_is_due(db, repo):
+    tracker = PresenceTracker(repo, flush_every=2)
+    tracker.update(1, GUILD, True, at=BASE)
+    tracker.update(1, GUILD, False, at=BASE + 10)
+    assert not tracker.flush_due()
+    tracker.update(2, GUILD, True, at=BASE)
+    tracker.update(2, GUILD, False, at=BASE + 10)
+    assert tracker.flush_due() and db.get_presence_days(20000, 20000) == []
+
+    asyncio.run(tracker.flush_if_due())
+    assert len(db.get_presence_days(20000, 20000)) == 2 and not tracker.flush_due()
+
+
+def test_online_totals_include_open_sessions(repo):
+    tracker = PresenceTracker(repo)
+    now = time.time()
+    tracker.update(1, GUILD, True, at=now - 100)
+    tracker.update(2, GUILD, True, at=now - 5000)
+
+    totals = asyncio.run(tracker.online_totals(now - 1000, now + 1000))
+    assert totals[1] == pytest.approx(100, abs=2)
+    assert totals[2] == pytest.approx(1000, abs=2)
+    # Nothing is counted before the session started
+    assert asyncio.run(tracker.online_totals(now - 10000, now - 6000)) == {}
+
+
+def test_online_at(db, repo):
+    tracker = PresenceTracker(repo, flush_every=2)
+    visit(tracker, 1, BASE + 100, BASE + 200)
+    visit(tracker, 2, BASE + 150, BASE + DAY + 50)  # Flushed: crosses midnight
+    tracker.update(3, GUILD, True, at=BASE + 180)  # Still online
+
+    assert db.get_presence_days(20000, 20001)  # Some history was saved, some is buffered
+    assert asyncio.run(tracker.online_at(BASE + 99)) == set()
+    assert asyncio.run(tracker.online_at(BASE + 100)) == {1}
+    assert asyncio.run(tracker.online_at(BASE + 160)) == {1, 2}
+    assert asyncio.run(tracker.online_at(BASE + 190)) == {1, 2, 3}
+    assert asyncio.run(tracker.online_at(BASE + 200)) == {2, 3}  # Session ends are exclusive
+    assert asyncio.run(tracker.online_at(BASE + DAY + 10)) == {2, 3}
+    assert asyncio.run(tracker.online_at(BASE + DAY + 50)) == {3}
+
+
+def test_close_saves_open_sessions(db, repo):
+    tracker = PresenceTracker(repo)
+    tracker.update(1, GUILD, True, at=BASE + 10)
+    asyncio.run(tracker.close(at=BASE + 70))
+
+    assert len(tracker) == 0
+    (row,) = db.get_presence_days(20000, 20000)
+    assert (row['user_id'], row['online_seconds']) == (1, 60)
+    assert asyncio.run(PresenceTracker(repo).online_at(BASE + 30)) == {1}
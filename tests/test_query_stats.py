@@ -0,0 +1,66 @@
+"""Query statistics: cheap per-statement recording with sampled caller attribution"""
+import pytest
+
+from utils import query_stats
+from utils.query_stats import OTHER_TEMPLATE, QueryStats
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Counts stack walks, attributing every call to one caller"""
+    walked = []
+
+    def caller():
+        walked.append(1)
+        return "test.py:caller"
+    monkeypatch.setattr(QueryStats, "caller", staticmethod(caller))
+    return walked
+
+
+def test_callers_are_sampled_and_scaled(db, lookups):
+    stats = QueryStats(slow_ms=10 ** 6, caller_every=4)
+    for _ in range(10):
+        stats.record(db, "SELECT 1", (), 0.001, 1)
+
+    (entry,) = stats.templates.values()
+    assert entry.calls == 10
+    assert len(lookups) == 3  # Calls 1, 5 and 9
+    assert entry.callers == {"test.py:caller": 12}
+
+
+def test_slow_queries_always_name_their_caller(db, lookups):
+    stats = QueryStats(slow_ms=5, caller_every=100)
+    stats.record(db, "SELECT 1", (), 0.001, 1)
+    stats.record(db, "SELECT 1", (), 0.050, 1)
+
+    assert len(lookups) == 2
+    assert [entry['caller'] for entry in stats.slow_queries] == ["test.py:caller"]
+    # Only the sampled call is counted towards the attribution
+    assert stats.templates["SELECT 1"].callers == {"test.py:caller": 100}
+
+
+def test_caller_every_one_attributes_every_statement(db, lookups):
+    stats = QueryStats(slow_ms=10 ** 6, caller_every=1)
+    for _ in range(3):
+        stats.record(db, "SELECT 1", (), 0.001, 1)
+    assert len(lookups) == 3
+
+
+def test_real_caller_is_outside_the_database_layer(db):
+    stats = db.enable_instrumentation(caller_every=1)
+    db.fetchone("SELECT 1")
+    (entry,) = stats.templates.values()
+    assert list(entry.callers) == ["test_query_stats.py:test_real_caller_is_outside_the_database_layer"]
+
+
+def test_least_recent_templates_fold_into_other(db, monkeypatch):
+    monkeypatch.setattr(query_stats, "MAX_TEMPLATES", 3)
+    stats = QueryStats(slow_ms=10 ** 6)
+    for i in range(5):
+        stats.record(db, f"SELECT {i}", (), 0.001, 1)
+    stats.record(db, "SELECT 2", (), 0.001, 1)
+    stats.record(db, "SELECT 5", (), 0.001, 1)
+
+    assert list(stats.templates) == [OTHER_TEMPLATE, "SELECT 4", "SELECT 2", "SELECT 5"]
+    assert stats.templates[OTHER_TEMPLATE].calls == 3
+    assert stats.totals()['calls'] == 7
@@ -0,0 +1,93 @@
+"""Render cache: embeds are reused only while the user's version is unchanged"""
+from datetime import datetime, timedelta
+
+import discord
+
+from utils.database import Database
+from utils.render_cache import RenderCache
+
+
+def card(title: str) -> discord.Embed:
+    return discord.Embed(title=title)
+
+
+def test_hit_returns_a_copy():
+    cache = RenderCache()
+    cache.put("profile", 1, 3, card("Hero"))
+    embed = cache.get("profile", 1, 3)
+    assert embed.title == "Hero"
+    embed.title = "Changed"
+    assert cache.get("profile", 1, 3).title == "Hero"
+
+
+def test_new_version_misses_and_drops_the_entry():
+    cache = RenderCache()
+    cache.put("profile", 1, 3, card("Hero"))
+    assert cache.get("profile", 1, 4) is None
+    assert len(cache) == 0
+
+
+def test_untracked_versions_are_never_cached():
+    cache = RenderCache()
+    cache.put("profile", 1, None, card("Hero"))
+    assert len(cache) == 0
+    cache.put("profile", 1, 0, card("Hero"))
+    assert cache.get("profile", 1, None) is None
+
+
+def test_kinds_and_users_are_separate():
+    cache = RenderCache()
+    cache.put("profile", 1, 0, card("Profile 1"))
+    cache.put("inventory", 1, 0, card("Inventory 1"))
+    cache.put("profile", 2, 0, card("Profile 2"))
+    assert [cache.get(kind, user_id, 0).title for kind, user_id in [("profile", 1), ("inventory", 1), ("profile", 2)]] \
+        == ["Profile 1", "Inventory 1", "Profile 2"]
+
+
+def test_expired_entries_miss(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("utils.render_cache.time.monotonic", lambda: clock[0])
+    cache = RenderCache()
+    cache.put("cooldowns", 1, 0, card("Ready in 30s"), ttl=30)
+    clock[0] = 129.9
+    assert cache.get("cooldowns", 1, 0) is not None
+    clock[0] = 130.0
+    assert cache.get("cooldowns", 1, 0) is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = RenderCache(max_entries=2)
+    cache.put("profile", 1, 0, card("1"))
+    cache.put("profile", 2, 0, card("2"))
+    cache.get("profile", 1, 0)  # 2 is now the oldest
+    cache.put("profile", 3, 0, card("3"))
+    assert len(cache) == 2
+    assert cache.get("profile", 2, 0) is None
+    assert cache.get("profile", 1, 0) is not None
+
+
+def test_writes_to_a_users_rows_bump_only_their_version(db, make_character):
+    make_character(1)
+    make_character(2)
+    before = db.version(1), db.version(2)
+
+    db.increment(1, money=5)
+    assert db.version(1) > before[0] and db.version(2) == before[1]
+
+    bumped = db.version(1)
+    item_id = db.create_item(1, "Sword", "Sword", 10, 5, 0, "right")
+    assert db.version(1) > bumped
+    bumped = db.version(1)
+    db.add_blessing(1, "xp", 1.5, datetime.now() + timedelta(hours=1), "Blessing")
+    assert db.version(1) > bumped
+
+    # Moving an item changes both owners
+    bumped = db.version(1), db.version(2)
+    db.transfer_item(item_id, 2)
+    assert db.version(1) > bumped[0] and db.version(2) > bumped[1]
+
+
+def test_versions_are_untracked_before_init():
+    database = Database(":memory:")
+    assert database.version(1) is None
+    database.close()
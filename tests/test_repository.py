@@ -0,0 +1,221 @@
+"""Repository contract: the same scenarios on SQLite and on PostgreSQL
+
+The PostgreSQL runs use the server at DISCORDRPG_TEST_POSTGRES (default: a
+local discordrpg_test database) with a fresh schema per test, and skip when
+asyncpg isn't installed or nothing answers there.
+"""
+import asyncio
+import functools
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.database import Database, SQLiteRepository, level_for_xp
+from utils.postgres import ASYNCPG_AVAILABLE, PostgresRepository
+
+if ASYNCPG_AVAILABLE:
+    import asyncpg
+
+POSTGRES_DSN = os.getenv("DISCORDRPG_TEST_POSTGRES", "postgresql://postgres@127.0.0.1:5432/discordrpg_test")
+
+
+@functools.lru_cache(maxsize=None)
+def postgres_reachable() -> bool:
+    async def connect():
+        conn = await asyncpg.connect(POSTGRES_DSN, timeout=3)
+        await conn.close()
+    try:
+        asyncio.run(connect())
+        return True
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError):
+        return False
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def backend(request, tmp_path):
+    """Runs an async test body on a fresh Repository of each kind, returns its result"""
+    if request.param == "sqlite":
+        async def run(body):
+            # A file, so archive_history has somewhere to put the month files
+            db = Database(str(tmp_path / "discordrpg.db"))
+            db.init_database()
+            try:
+                return await body(SQLiteRepository(db))
+            finally:
+                db.close()
+    else:
+        if not ASYNCPG_AVAILABLE:
+            pytest.skip("asyncpg is not installed")
+        if not postgres_reachable():
+            pytest.skip(f"No PostgreSQL at {POSTGRES_DSN} (set DISCORDRPG_TEST_POSTGRES)")
+        schema = f"test_{uuid.uuid4().hex[:12]}"
+
+        async def run(body):
+            admin = await asyncpg.connect(POSTGRES_DSN)
+            await admin.execute(f"CREATE SCHEMA {schema}")
+            repo = PostgresRepository(POSTGRES_DSN, max_size=2, server_settings={'search_path': schema})
+            try:
+                await repo.init_database()
+                return await body(repo)
+            finally:
+                await repo.close()
+                await admin.execute(f"DROP SCHEMA {schema} CASCADE")
+                await admin.close()
+    return lambda body: asyncio.run(run(body))
+
+
+async def money(repo, *user_ids: int) -> list:
+    return [(await repo.get_character(user_id))['money'] for user_id in user_ids]
+
+
+def test_increment_and_batch(backend):
+    async def body(repo):
+        await repo.create_character(1, "Alice")
+        await repo.create_character(2, "Bob")
+        assert not await repo.create_character(1, "Again")
+
+        assert await repo.increment(1, money=25, kills=2) == {'money': 125, 'kills': 2}
+        assert await repo.increment(3, money=5) is None
+
+        async with repo.batch():
+            assert await repo.increment(1, money=10) is None  # Queued
+            await repo.increment(1, money=-5, xp=150)
+            await repo.increment(2, money=1)
+        assert await money(repo, 1, 2) == [130, 101]
+        alice = await repo.get_character(1)
+        assert alice['xp'] == 150 and alice['level'] == level_for_xp(150)
+
+        # A block that raises writes nothing
+        with pytest.raises(RuntimeError):
+            async with repo.batch():
+                await repo.increment(1, money=1000)
+                await repo.increment(2, money=1000)
+                raise RuntimeError("cancelled")
+        assert await money(repo, 1, 2) == [130, 101]
+        await repo.increment(1, money=1)
+        assert await money(repo, 1) == [131]
+    backend(body)
+
+
+def test_level_ups_are_queued_until_cleared(backend):
+    async def body(repo):
+        await repo.create_character(1, "Alice")
+        await repo.increment(1, xp=500)
+        rows = await repo.get_level_ups()
+        assert [(row['user_id'], row['name'], row['old_level'], row['new_level']) for row in rows] == [
+            (1, "Alice", 1, level_for_xp(500))
+        ]
+        assert await repo.clear_level_ups(rows[-1]['id']) == 1
+        assert await repo.get_level_ups() == []
+    backend(body)
+
+
+def test_market_listing_and_purchase(backend):
+    async def body(repo):
+        await repo.create_character(1, "Seller")
+        await repo.create_character(2, "Buyer")
+        item_id = await repo.create_item(1, "Sword", "Sword", 10, 5, 0, "right")
+
+        assert await repo.equip_item(item_id, 1)
+        assert not await repo.list_item_on_market(item_id, 50, 1)  # Equipped
+        assert await repo.unequip_item(item_id, 1)
+        assert not await repo.list_item_on_market(item_id, 50, 2)  # Not theirs
+        assert await repo.list_item_on_market(item_id, 50, 1, fee=5)
+        assert not await repo.list_item_on_market(item_id, 60, 1)  # Listed already
+        assert await money(repo, 1) == [95]
+
+        listing = await repo.get_market_listing(item_id)
+        assert (listing['price'], listing['name'], listing['owner']) == (50, "Sword", 1)
+        assert [row['id'] for row in await repo.list_market_listings()] == [item_id]
+
+        assert await repo.buy_market_item(item_id, 1) is None  # Own listing
+        assert await repo.buy_market_item(item_id, 2, max_price=40) is None
+        assert await repo.buy_market_item(item_id, 2) == {'price': 50, 'seller_id': 1}
+        assert await repo.buy_market_item(item_id, 2) is None  # Gone
+        assert await repo.get_market_listing(item_id) is None
+        assert (await repo.get_item_by_id(item_id))['owner'] == 2
+        assert await money(repo, 1, 2) == [145, 50]
+    backend(body)
+
+
+def test_settle_battle_is_all_or_nothing(backend):
+    async def body(repo):
+        await repo.create_character(1, "Alice")
+        await repo.create_character(2, "Bob")
+        assert await repo.settle_battle(1, 2, 1, bet=30)
+        assert not await repo.settle_battle(1, 2, 1, bet=500)  # Bob can't cover it
+        alice, bob = await repo.get_character(1), await repo.get_character(2)
+        assert (alice['money'], alice['pvpwins'], alice['pvplosses']) == (130, 1, 0)
+        assert (bob['money'], bob['pvpwins'], bob['pvplosses']) == (70, 0, 1)
+    backend(body)
+
+
+def test_transactions_survive_archiving(backend):
+    info = {'item_id': 12, 'item': 'Sword', 'won': True, 'price': 300, 'note': 'x' * 70000}
+
+    async def body(repo):
+        await repo.create_character(1, "Alice")
+        await repo.create_character(2, "Bob")
+        assert await repo.log_transaction(1, 2, 300, "trade", info)
+        assert await repo.log_transaction(2, None, 20, "shop", {})
+
+        def entries(rows):
+            return [(row['from_user'], row['to_user'], row['amount'], row['subject'], row['info']) for row in rows]
+        expected = [(1, 2, 300, "trade", info)]
+        assert entries(await repo.get_transactions(1)) == expected
+        assert entries(await repo.get_transactions(subject="trade")) == expected
+
+        # Everything is a few days old by then
+        moved = await repo.archive_history({'transactions': 1}, now=time.time() + 3 * 86400)
+        assert moved == {'transactions': 2}
+        assert await repo.archive_history({'transactions': 1}, now=time.time() + 3 * 86400) == {}
+
+        assert entries(await repo.get_transactions(1)) == expected
+        assert entries(await repo.get_transactions(subject="trade")) == expected
+        rollups = await repo.get_history_rollups("transactions")
+        assert sorted((row['kind'], row['entries'], row['amount']) for row in rollups) == [
+            ("shop", 1, 20), ("trade", 1, 300)
+        ]
+    backend(body)
+
+
+def test_adventure_history_reads_the_archive(backend):
+    async def body(repo):
+        await repo.create_character(1, "Alice")
+        long_ago = datetime.now() - timedelta(days=60)
+        await repo.start_adventures([(1, "Old Quest", 2, long_ago, long_ago + timedelta(hours=1), 0)])
+        adventure = await repo.get_active_adventure(1)
+        assert await repo.archive_history({'adventures': 30}) == {}  # Active ones stay
+
+        assert await repo.complete_adventure(adventure['id'], True)
+        assert await repo.archive_history({'adventures': 30}) == {'adventures': 1}
+        assert await repo.count_adventures("completed") == 1  # Counted through the rollups
+        history = await repo.get_adventure_history(1)
+        assert [(row['adventure_name'], row['status']) for row in history] == [("Old Quest", "completed")]
+    backend(body)
+
+
+def test_economy_report_follows_the_triggers(backend):
+    async def body(repo):
+        await repo.create_character(1, "Alice")
+        await repo.create_character(2, "Bob")
+        item_id = await repo.create_item(1, "Sword", "Sword", 40, 5, 0, "right")
+        await repo.list_item_on_market(item_id, 70, 1)
+        await repo.increment(2, money=-30)
+        await repo.log_transaction(2, None, 30, "shop", {})
+        await repo.log_transaction(1, 2, 5, "gift", {})
+        await repo.log_transaction(2, None, 10, "shop", {})
+
+        report = await repo.get_economy_report("2000-01-01")
+        assert {metric: value for metric, value in report['totals'].items() if value} == {
+            'money_supply': 170, 'characters': 2, 'items': 1, 'item_value': 40,
+            'market_listings': 1, 'market_value': 70,
+        }
+        assert [(row['subject'], row['transactions'], row['amount']) for row in report['subjects']] == [
+            ("shop", 2, 40), ("gift", 1, 5)
+        ]
+        assert sum(row['destroyed'] for row in report['money_flow']) == 30
+    backend(body)
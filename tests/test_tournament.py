@@ -0,0 +1,93 @@
+"""Tournament brackets: every format crowns one champion from a fixed field"""
+import itertools
+import math
+import random
+
+import pytest
+
+from classes.tournament import ROUND_ROBIN_MAX_ENTRANTS, Tournament, TournamentFormat
+
+
+def field(size: int) -> dict:
+    return {entrant: 100 + 10 * entrant for entrant in range(1, size + 1)}
+
+
+def played(tournament: Tournament) -> list:
+    return [(first, second) for matches in tournament.rounds for first, second, _ in matches if second is not None]
+
+
+def test_parse_accepts_aliases():
+    assert TournamentFormat.parse("KO") == TournamentFormat.SINGLE_ELIMINATION
+    assert TournamentFormat.parse("swiss") == TournamentFormat.SWISS
+    assert TournamentFormat.parse("rr") == TournamentFormat.ROUND_ROBIN
+    assert TournamentFormat.parse("ladder") is None
+
+
+@pytest.mark.parametrize("size", [2, 3, 5, 8, 13])
+def test_single_elimination_leaves_one_undefeated(size):
+    tournament = Tournament(field(size), TournamentFormat.SINGLE_ELIMINATION, random.Random(size))
+    champion = tournament.run()
+
+    assert len(tournament.rounds) == math.ceil(math.log2(size))
+    assert tournament.losses[champion] == 0
+    # Everyone else is knocked out exactly once
+    assert sorted(tournament.losses.values()) == [0] + [1] * (size - 1)
+    assert len(played(tournament)) == size - 1
+
+
+@pytest.mark.parametrize("size", [2, 7, 16])
+def test_swiss_plays_log2_rounds_without_early_rematches(size):
+    tournament = Tournament(field(size), TournamentFormat.SWISS, random.Random(size))
+    champion = tournament.run()
+
+    rounds = math.ceil(math.log2(size))
+    assert len(tournament.rounds) == rounds
+    # Every entrant plays or has a bye once per round
+    for matches in tournament.rounds:
+        seated = [entrant for first, second, _ in matches for entrant in (first, second) if entrant is not None]
+        assert sorted(seated) == sorted(tournament.seeds)
+    pairs = [frozenset(pair) for pair in played(tournament)]
+    assert len(pairs) == len(set(pairs))
+    assert champion == tournament.standings()[0]
+    assert tournament.wins[champion] == max(tournament.wins.values())
+
+
+@pytest.mark.parametrize("size", [2, 5, 6])
+def test_round_robin_plays_every_pairing_once(size):
+    tournament = Tournament(field(size), TournamentFormat.ROUND_ROBIN, random.Random(size))
+    champion = tournament.run()
+
+    pairs = sorted(tuple(sorted(pair)) for pair in played(tournament))
+    assert pairs == list(itertools.combinations(sorted(tournament.seeds), 2))
+    assert len(tournament.rounds) == size - 1 + size % 2
+    assert all(tournament.wins[entrant] + tournament.losses[entrant] == size - 1 for entrant in tournament.seeds)
+    assert tournament.wins[champion] == max(tournament.wins.values())
+
+
+def test_standings_break_ties_by_buchholz_then_seed():
+    tournament = Tournament(field(4), TournamentFormat.ROUND_ROBIN)
+    tournament.wins = {1: 2, 2: 2, 3: 1, 4: 1}
+    tournament.opponents = {1: [3], 2: [1], 3: [], 4: []}
+    assert tournament.standings() == [2, 1, 3, 4]
+
+
+def test_same_seed_replays_the_same_tournament():
+    results = []
+    for _ in range(2):
+        tournament = Tournament(field(9), TournamentFormat.SWISS, random.Random(42))
+        results.append((tournament.run(), tournament.rounds))
+    assert results[0] == results[1]
+
+
+def test_upsets_count_lower_powered_winners():
+    tournament = Tournament({1: 100, 2: 200, 3: 50}, TournamentFormat.SINGLE_ELIMINATION)
+    assert tournament.upsets([(1, 2, 1), (3, None, 3)]) == 1
+    assert tournament.upsets([(1, 2, 2)]) == 0
+
+
+def test_invalid_fields_are_rejected():
+    with pytest.raises(ValueError):
+        Tournament({1: 100}, TournamentFormat.SINGLE_ELIMINATION)
+    with pytest.raises(ValueError):
+        Tournament(field(ROUND_ROBIN_MAX_ENTRANTS + 1), TournamentFormat.ROUND_ROBIN)
+    Tournament(field(ROUND_ROBIN_MAX_ENTRANTS + 1), TournamentFormat.SWISS)
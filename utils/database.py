@@ -3,15 +3,117 @@ import sqlite3
 import asyncio
 import os
 import json
-from typing import Optional, List, Dict, Any, Union
-from datetime import datetime
+import time
+from urllib.request import pathname2url
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional, List, Dict, Any, Union, Iterable
+from datetime import datetime, timezone
+
+from utils.ledger import split_info, transaction_info
+from utils.migrations import migrate
+from utils.query_stats import CALLER_SAMPLE_EVERY, QueryStats
+from utils.repository import Repository, Row
+
+# Most penalty seconds added to a single adventure; the rest carries over
+MAX_PENALTY_PER_ADVENTURE = 6 * 3600
+
+# Numeric profile columns that can be changed with Database.increment()
+INCREMENT_COLUMNS = frozenset({
+    'money', 'xp', 'completed', 'pvpwins', 'pvplosses', 'deaths', 'kills', 'favor', 'luck',
+    'donations', 'raidstats', 'streak', 'reset_points', 'pending_penalty',
+    'crates_common', 'crates_uncommon', 'crates_rare', 'crates_magic',
+    'crates_legendary', 'crates_mystery'
+})
+
+# Tables whose rows feed a user's rendered profile/equipment, with the owning column
+VERSIONED_TABLES = (('profile', 'user_id'), ('inventory', 'owner'), ('divine_blessings', 'user_id'))
+
+# Append-only history moved to monthly archive files by archive_history():
+# table -> (timestamp column, rows that may move, rollup kind, rollup amount, user index columns)
+HISTORY_TABLES = {
+    'transactions': ('timestamp', "TRUE", 'subject', 'amount', 'from_user, to_user'),
+    'battle_logs': ('fought_at', "TRUE", 'battle_type', 'money_stolen', 'attacker, defender'),
+    'crate_history': ('opened_at', "TRUE", 'crate_type', 'item_stats', 'user_id'),
+    'penalties': ('applied_at', "TRUE", 'penalty_type', 'penalty_seconds', 'user_id'),
+    'event_participation': ('participated_at', "TRUE", 'event_type', '0', 'user_id'),
+    'adventures': ('started_at', "status != 'active'", 'status', 'difficulty', 'user_id'),
+    'epic_adventures': ('started_at', "status != 'active'", 'status', 'base_gold_reward', 'user_id'),
+}
+
+# A market listing: the listed item's inventory columns plus its price and listing time
+LISTING_QUERY = """SELECT m.price, m.listed_at, i.* FROM market m
+                   JOIN inventory i ON m.item_id = i.id"""
+
+# History rows moved per table in one archive transaction, keeping the write lock short
+ARCHIVE_CHUNK = 5000
+
+# Summed damage, armor and bonuses of the inventory rows aliased `i` (luck and crit scaled by 100)
+EQUIPMENT_POWER = """(COALESCE(SUM(i.damage + i.armor + COALESCE(i.health_bonus, 0)
+                                 + COALESCE(i.speed_bonus, 0) + COALESCE(i.magic_bonus, 0)), 0)
+                    + CAST(COALESCE(SUM(COALESCE(i.luck_bonus, 0.0)), 0.0) * 100 AS INTEGER)
+                    + CAST(COALESCE(SUM(COALESCE(i.crit_bonus, 0.0)), 0.0) * 100 AS INTEGER))"""
+
+def _utc(timestamp: float) -> str:
+    """UTC 'YYYY-MM-DD HH:MM:SS', the format CURRENT_TIMESTAMP defaults use"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def _among(column: str, user_ids: Optional[Iterable[int]]) -> tuple:
+    """SQL condition and params limiting column to user_ids (no limit when None)
+    
+    The IDs travel as one JSON array parameter, so any number fits in a single statement.
+    """
+    if user_ids is None:
+        return "1", ()
+    return f"{column} IN (SELECT value FROM json_each(?))", (json.dumps(list(user_ids)),)
+
+def _group_increments(pending: Dict[int, Dict[str, int]]) -> Dict[tuple, List[tuple]]:
+    """Per-user deltas grouped by column set: columns -> [(*deltas, user_id)], zero deltas dropped"""
+    groups: Dict[tuple, List[tuple]] = {}
+    for user_id, deltas in pending.items():
+        deltas = {column: delta for column, delta in deltas.items() if delta}
+        if not deltas:
+            continue
+        columns = tuple(sorted(deltas))
+        params = tuple(deltas[column] for column in columns)
+        groups.setdefault(columns, []).append((*params, user_id))
+    return groups
+
+def profile_character(data: Optional[Dict[str, Any]]):
+    """Character object for a get_character() dict (race system compatibility), None without one"""
+    from classes.character import Character
+    if not data:
+        return None
+    
+    # Create character object from database data
+    char = Character(data['user_id'], data.get('name', 'Unknown'))
+    char.level = data.get('level', 1)
+    char.xp = data.get('xp', 0)
+    char.money = data.get('money', 100)
+    char.race = data.get('race', 'Human')
+    
+    return char
+
+def level_for_xp(xp: int) -> int:
+    """Level for an XP total, as the level_thresholds table and its profile triggers compute it"""
+    return min(50, 1 + int((max(0, xp or 0) / 100) ** 0.5))
 
 class Database:
-    """SQLite database connection manager"""
+    """SQLite database connection manager
+    
+    Synchronous, for scripts, benchmarks and tests; the bot talks to it
+    through SQLiteRepository.
+    """
     
     def __init__(self, db_path: str = "./discordrpg.db"):
         self.db_path = db_path
         self._connection = None
+        # Monthly history archives live beside the database file (none for in-memory databases)
+        self.archive_dir = (None if db_path == ":memory:"
+                            else os.path.join(os.path.dirname(os.path.abspath(db_path)), "archive"))
+        self.query_stats: Optional[QueryStats] = None  # Set by enable_instrumentation()
+        self._pending_deltas: Optional[Dict[int, Dict[str, int]]] = None  # Set inside batch()
+        self._versions: Dict[int, int] = {}  # Per-user write counters, see version()
+        self._tracking = False  # True once the version triggers are installed
         
     def get_connection(self) -> sqlite3.Connection:
         """Get or create database connection"""
@@ -20,8 +122,28 @@ class Database:
             self._connection.row_factory = sqlite3.Row  # Enable dict-like access
             # Enable foreign keys
             self._connection.execute("PRAGMA foreign_keys = ON")
+            self._connection.create_function("rpg_touch", 1, self._touch)
+            if self._tracking:
+                self._install_version_triggers(self._connection)
         return self._connection
         
+    def enable_instrumentation(self, slow_ms: float = 100.0,
+                               caller_every: int = CALLER_SAMPLE_EVERY) -> QueryStats:
+        """Start recording per-statement statistics and slow queries
+        
+        The calling cog is attributed on one statement in caller_every (1 for all of them).
+        """
+        if self.query_stats is None:
+            self.query_stats = QueryStats(slow_ms=slow_ms, caller_every=caller_every)
+        else:
+            self.query_stats.slow_ms = slow_ms
+            self.query_stats.caller_every = max(1, caller_every)
+        return self.query_stats
+        
+    def disable_instrumentation(self):
+        """Stop recording statement statistics"""
+        self.query_stats = None
+        
     def close(self):
         """Close database connection"""
         if self._connection:
@@ -29,112 +151,109 @@ class Database:
             self._connection = None
             
     def init_database(self):
-        """Initialize database with schema"""
+        """Create or migrate the schema (a no-op when already current)"""
         schema_path = os.path.join(os.path.dirname(__file__), '..', 'schema.sql')
-        if os.path.exists(schema_path):
-            with open(schema_path, 'r') as f:
-                schema = f.read()
-            conn = self.get_connection()
-            conn.executescript(schema)
-            conn.commit()
-            
-            # Run migrations
-            self._run_migrations(conn)
-            
-            print("Database initialized successfully")
-        else:
+        if not os.path.exists(schema_path):
             print(f"Schema file not found at {schema_path}")
+            return
             
-    def _run_migrations(self, conn):
-        """Run database migrations"""
-        try:
-            # Check if alignment column exists, if not add it
-            cursor = conn.execute("PRAGMA table_info(profile)")
-            columns = [row[1] for row in cursor.fetchall()]
-            
-            if 'alignment' not in columns:
-                conn.execute("ALTER TABLE profile ADD COLUMN alignment TEXT DEFAULT 'neutral'")
-                conn.commit()
-                print("Added alignment column to profile table")
-
-            # Check for inventory bonus stats
-            cursor = conn.execute("PRAGMA table_info(inventory)")
-            inv_columns = [row[1] for row in cursor.fetchall()]
-            
-            inventory_updates = [
-                ('health_bonus', 'INTEGER DEFAULT 0'),
-                ('speed_bonus', 'INTEGER DEFAULT 0'),
-                ('luck_bonus', 'REAL DEFAULT 0.0'),
-                ('crit_bonus', 'REAL DEFAULT 0.0'),
-                ('magic_bonus', 'INTEGER DEFAULT 0'),
-                ('slot_type', 'TEXT')
-            ]
-            
-            for col_name, col_def in inventory_updates:
-                if col_name not in inv_columns:
-                    conn.execute(f"ALTER TABLE inventory ADD COLUMN {col_name} {col_def}")
-                    print(f"Added {col_name} column to inventory table")
-            
-            conn.commit()
-
-            # Create epic_adventures table if it doesn't exist
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS epic_adventures (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER REFERENCES profile(user_id) ON DELETE CASCADE,
-                    adventure_type TEXT,
-                    adventure_name TEXT,
-                    difficulty INTEGER,
-                    started_at TEXT,
-                    finish_at TEXT,
-                    base_xp_reward INTEGER,
-                    base_gold_reward INTEGER,
-                    item_quality_min INTEGER,
-                    item_quality_max INTEGER,
-                    status TEXT DEFAULT 'active'
-                )
-            """)
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_epic_adventures_user ON epic_adventures(user_id, status)")
-            conn.commit()
+        old_version, new_version = migrate(self.get_connection(), schema_path)
+        if old_version == new_version:
+            print(f"Database schema is current (version {new_version})")
+        else:
+            print(f"Database migrated from schema version {old_version} to {new_version}")
+        self._install_version_triggers(self.get_connection())
+        
+    def _install_version_triggers(self, conn: sqlite3.Connection):
+        """Bump the in-memory version of every user whose rows change
+        
+        TEMP triggers live only on this connection, so every write path
+        (typed methods, batches, raw SQL) is covered without touching the schema.
+        """
+        for table, column in VERSIONED_TABLES:
+            conn.execute(f"""CREATE TEMP TRIGGER IF NOT EXISTS version_{table}_insert
+                             AFTER INSERT ON main.{table}
+                             BEGIN SELECT rpg_touch(NEW.{column}); END""")
+            conn.execute(f"""CREATE TEMP TRIGGER IF NOT EXISTS version_{table}_update
+                             AFTER UPDATE ON main.{table}
+                             BEGIN SELECT rpg_touch(OLD.{column}), rpg_touch(NEW.{column}); END""")
+            conn.execute(f"""CREATE TEMP TRIGGER IF NOT EXISTS version_{table}_delete
+                             AFTER DELETE ON main.{table}
+                             BEGIN SELECT rpg_touch(OLD.{column}); END""")
+        self._tracking = True
+        
+    def _touch(self, user_id: Optional[int]):
+        if user_id is not None:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
             
-            # Fix NULL slot_type values - infer from item type
-            conn.execute("""
-                UPDATE inventory SET slot_type = 'weapon' 
-                WHERE slot_type IS NULL AND type IN 
-                ('Sword', 'Axe', 'Hammer', 'Mace', 'Dagger', 'Knife', 'Spear', 
-                 'Wand', 'Staff', 'Bow', 'Crossbow', 'Greatsword', 'Halberd', 'Katana', 'Scythe')
-            """)
-            conn.execute("UPDATE inventory SET slot_type = 'shield' WHERE slot_type IS NULL AND type = 'Shield'")
-            conn.execute("UPDATE inventory SET slot_type = 'head' WHERE slot_type IS NULL AND type = 'Helmet'")
-            conn.execute("UPDATE inventory SET slot_type = 'chest' WHERE slot_type IS NULL AND type = 'Chestplate'")
-            conn.execute("UPDATE inventory SET slot_type = 'legs' WHERE slot_type IS NULL AND type = 'Leggings'")
-            conn.execute("UPDATE inventory SET slot_type = 'hands' WHERE slot_type IS NULL AND type = 'Gauntlets'")
-            conn.execute("UPDATE inventory SET slot_type = 'feet' WHERE slot_type IS NULL AND type = 'Boots'")
-            conn.commit()
-                
-        except Exception as e:
-            print(f"Migration error: {e}")
+    def version(self, user_id: int) -> Optional[int]:
+        """Counter bumped by any write to the user's profile, items or blessings
+        
+        None until init_database() has installed the triggers, meaning
+        changes can't be tracked and nothing should be cached.
+        """
+        if not self._tracking:
+            return None
+        return self._versions.get(user_id, 0)
             
     def execute(self, query: str, params: tuple = ()) -> sqlite3.Cursor:
         """Execute a query"""
         conn = self.get_connection()
-        return conn.execute(query, params)
+        if self.query_stats is None:
+            return conn.execute(query, params)
+            
+        started = time.perf_counter()
+        cursor = conn.execute(query, params)
+        self.query_stats.record(self, query, params, time.perf_counter() - started, max(cursor.rowcount, 0))
+        return cursor
         
     def fetchone(self, query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
         """Fetch a single row"""
-        cursor = self.execute(query, params)
-        return cursor.fetchone()
+        if self.query_stats is None:
+            cursor = self.execute(query, params)
+            return cursor.fetchone()
+            
+        # Time the fetch too - SQLite does most of the work while stepping rows
+        started = time.perf_counter()
+        row = self.get_connection().execute(query, params).fetchone()
+        self.query_stats.record(self, query, params, time.perf_counter() - started, 1 if row else 0)
+        return row
         
     def fetchall(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
         """Fetch all rows"""
-        cursor = self.execute(query, params)
-        return cursor.fetchall()
+        if self.query_stats is None:
+            cursor = self.execute(query, params)
+            return cursor.fetchall()
+            
+        started = time.perf_counter()
+        rows = self.get_connection().execute(query, params).fetchall()
+        self.query_stats.record(self, query, params, time.perf_counter() - started, len(rows))
+        return rows
         
     def commit(self):
         """Commit current transaction"""
         conn = self.get_connection()
         conn.commit()
         
+    def _worker_connection(self) -> sqlite3.Connection:
+        """A separate connection for maintenance run off the event loop thread
+        
+        Waits up to 30s for the write lock, which the main connection only
+        holds for short transactions.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+        
+    def _begin_immediate(self):
+        """Start a short write transaction that takes the write lock up front"""
+        conn = self.get_connection()
+        if conn.in_transaction:
+            conn.commit()
+        self.execute("BEGIN IMMEDIATE")
+        return conn
+        
     def row_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
         """Convert sqlite3.Row to dictionary"""
         if row is None:
@@ -147,7 +266,7 @@ class Database:
         try:
             self.execute(
                 """INSERT INTO profile (user_id, name, money, xp, level, last_date) 
-                   VALUES (?, ?, 100, 0, 1, date('now'))""",
+                   VALUES (?, ?, 100, 0, 1, CURRENT_DATE)""",
                 (user_id, name)
             )
             self.commit()
@@ -155,6 +274,48 @@ class Database:
         except sqlite3.IntegrityError:
             return False
             
+    def get_profile_ids(self) -> set:
+        """IDs of every user with a profile"""
+        return {row[0] for row in self.get_connection().execute("SELECT user_id FROM profile")}
+        
+    def bulk_create_characters(self, members: List[tuple], created_at: datetime,
+                               starter_items: List[tuple] = ()) -> List[int]:
+        """Create characters for (user_id, name) pairs in one transaction
+        
+        Users that already have a profile are skipped (re-checked under the
+        write lock). starter_items are (name, type, value, damage, armor, hand)
+        tuples given to every new character, equipped. Returns the created IDs.
+        """
+        if not members:
+            return []
+            
+        conn = self._begin_immediate()
+        try:
+            placeholders = ",".join("?" * len(members))
+            existing = {row[0] for row in self.fetchall(
+                f"SELECT user_id FROM profile WHERE user_id IN ({placeholders})",
+                tuple(user_id for user_id, _ in members)
+            )}
+            created = [(user_id, name) for user_id, name in members if user_id not in existing]
+            
+            conn.executemany(
+                """INSERT INTO profile 
+                   (user_id, name, level, xp, money, race, class, health, speed, luck, created_at)
+                   VALUES (?, ?, 1, 0, 100, 'Human', 'Novice', 100, 10, 1, ?)
+                   ON CONFLICT DO NOTHING""",
+                [(user_id, name, created_at) for user_id, name in created]
+            )
+            conn.executemany(
+                """INSERT INTO inventory (owner, name, type, value, damage, armor, hand, equipped)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, 1)""",
+                [(user_id,) + item for user_id, _ in created for item in starter_items]
+            )
+            conn.commit()
+            return [user_id for user_id, _ in created]
+        except Exception:
+            conn.rollback()
+            raise
+            
     def get_character(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get character data"""
         row = self.fetchone(
@@ -163,21 +324,166 @@ class Database:
         )
         return self.row_to_dict(row) if row else None
         
+    def get_profile_snapshot(self, user_id: int, now: datetime) -> Optional[Dict[str, Any]]:
+        """Everything !profile and !equipment show, in one round trip
+        
+        The profile row plus guild_name, equipped-item totals (total_damage,
+        total_armor, total_health_bonus, ...), the equipped `items` and the
+        `blessings` active at `now` (soonest to expire first). The item
+        aggregate always yields one row, so characters without gear get zeros.
+        """
+        row = self.fetchone(
+            """SELECT p.*, g.name AS guild_name,
+                      COALESCE(e.damage, 0) AS total_damage, COALESCE(e.armor, 0) AS total_armor,
+                      COALESCE(e.health_bonus, 0) AS total_health_bonus,
+                      COALESCE(e.speed_bonus, 0) AS total_speed_bonus,
+                      COALESCE(e.luck_bonus, 0.0) AS total_luck_bonus,
+                      COALESCE(e.crit_bonus, 0.0) AS total_crit_bonus,
+                      COALESCE(e.magic_bonus, 0) AS total_magic_bonus,
+                      COALESCE(e.value, 0) AS total_value,
+                      COALESCE(e.items, '[]') AS items,
+                      (SELECT json_group_array(json_object('blessing_name', b.blessing_name,
+                                                           'effect', b.effect, 'value', b.value,
+                                                           'expires_at', b.expires_at))
+                       FROM (SELECT * FROM divine_blessings
+                             WHERE user_id = p.user_id AND expires_at > ?
+                             ORDER BY expires_at) b) AS blessings
+               FROM profile p
+               LEFT JOIN guild g ON g.id = p.guild
+               CROSS JOIN (SELECT SUM(damage) AS damage, SUM(armor) AS armor,
+                                 SUM(COALESCE(health_bonus, 0)) AS health_bonus,
+                                 SUM(COALESCE(speed_bonus, 0)) AS speed_bonus,
+                                 SUM(COALESCE(luck_bonus, 0.0)) AS luck_bonus,
+                                 SUM(COALESCE(crit_bonus, 0.0)) AS crit_bonus,
+                                 SUM(COALESCE(magic_bonus, 0)) AS magic_bonus,
+                                 SUM(value) AS value,
+                                 json_group_array(json_object('id', id, 'name', name, 'type', type,
+                                                              'damage', damage, 'armor', armor)) AS items
+                          FROM inventory WHERE owner = ? AND equipped = 1) e
+               WHERE p.user_id = ?""",
+            (now, user_id, user_id)
+        )
+        if not row:
+            return None
+        snapshot = self.row_to_dict(row)
+        snapshot['items'] = json.loads(snapshot['items'])
+        snapshot['blessings'] = json.loads(snapshot['blessings'])
+        return snapshot
+        
     def get_profile(self, user_id: int):
         """Get profile as character object for race system compatibility"""
-        from classes.character import Character
-        data = self.get_character(user_id)
-        if not data:
-            return None
+        return profile_character(self.get_character(user_id))
+        
+    def list_characters(self, min_level: int = 1,
+                        user_ids: Optional[Iterable[int]] = None) -> List[sqlite3.Row]:
+        """user_id, name and level of characters at or above min_level (among user_ids), highest level first"""
+        among, params = _among("user_id", user_ids)
+        return self.fetchall(
+            f"SELECT user_id, name, level FROM profile WHERE level >= ? AND {among} ORDER BY level DESC",
+            (min_level,) + params
+        )
+        
+    def list_idle_characters(self, user_ids: Optional[Iterable[int]] = None) -> List[sqlite3.Row]:
+        """Characters (among user_ids) without an active adventure, lowest level first
+        
+        Rows have user_id, name, level and pending_penalty.
+        """
+        among, params = _among("user_id", user_ids)
+        return self.fetchall(
+            f"""SELECT user_id, name, level, pending_penalty FROM profile 
+                WHERE {among}
+                AND user_id NOT IN (SELECT user_id FROM adventures WHERE status = 'active')
+                ORDER BY level""",
+            params
+        )
+        
+    def get_raid_roster(self, user_ids: Iterable[int]) -> List[sqlite3.Row]:
+        """Raid stats of the given characters, in one query
+
+        Rows have user_id, name, level, class, race, luck, raidstats and
+        equipment_power (see EQUIPMENT_POWER).
+        """
+        among, params = _among("p.user_id", user_ids)
+        return self.fetchall(
+            f"""SELECT p.user_id, p.name, p.level, p.class, p.race, p.luck, p.raidstats,
+                       {EQUIPMENT_POWER} AS equipment_power
+                FROM profile p
+                LEFT JOIN inventory i ON i.owner = p.user_id AND i.equipped = 1
+                WHERE {among}
+                GROUP BY p.user_id""",
+            params
+        )
+
+    def get_battle_stats(self, user_ids: Iterable[int], now: datetime) -> List[sqlite3.Row]:
+        """Battle power inputs of the given characters, in one query
+
+        Rows have user_id, name, level, luck, money, equipment_power (see
+        EQUIPMENT_POWER), damage_armor (equipped damage plus armor only),
+        blessing_luck (the summed luck blessings active at `now`) and
+        blessing_battle_mult (the best active battle_mult, NULL without one).
+        """
+        among, params = _among("p.user_id", user_ids)
+        among_items, item_params = _among("i.owner", user_ids)
+        return self.fetchall(
+            f"""SELECT p.user_id, p.name, p.level, p.luck, p.money,
+                       COALESCE(e.equipment_power, 0) AS equipment_power,
+                       COALESCE(e.damage_armor, 0) AS damage_armor,
+                       COALESCE(b.luck, 0.0) AS blessing_luck, b.battle_mult AS blessing_battle_mult
+                FROM profile p
+                LEFT JOIN (SELECT i.owner, {EQUIPMENT_POWER} AS equipment_power,
+                                  SUM(i.damage + i.armor) AS damage_armor
+                           FROM inventory i WHERE i.equipped = 1 AND {among_items}
+                           GROUP BY i.owner) e ON e.owner = p.user_id
+                LEFT JOIN (SELECT user_id,
+                                  SUM(CASE WHEN effect = 'luck' THEN value ELSE 0.0 END) AS luck,
+                                  MAX(CASE WHEN effect = 'battle_mult' THEN value END) AS battle_mult
+                           FROM divine_blessings WHERE expires_at > ?
+                           GROUP BY user_id) b ON b.user_id = p.user_id
+                WHERE {among}""",
+            item_params + (now,) + params
+        )
+
+    def count_characters(self) -> int:
+        return self.fetchone("SELECT COUNT(*) FROM profile")[0]
+        
+    def delete_character(self, user_id: int):
+        """Delete a character; items, adventures and the rest cascade
+        
+        Battle logs keep the fight but lose the reference to the deleted player.
+        """
+        conn = self._begin_immediate()
+        try:
+            conn.execute("UPDATE battle_logs SET attacker = NULL WHERE attacker = ?", (user_id,))
+            conn.execute("UPDATE battle_logs SET defender = NULL WHERE defender = ?", (user_id,))
+            conn.execute("DELETE FROM profile WHERE user_id = ?", (user_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
         
-        # Create character object from database data
-        char = Character(user_id, data.get('name', 'Unknown'))
-        char.level = data.get('level', 1)
-        char.xp = data.get('xp', 0)
-        char.money = data.get('money', 100)
-        char.race = data.get('race', 'Human')
+    def set_alignment(self, user_id: int, alignment: str) -> bool:
+        cursor = self.execute(
+            "UPDATE profile SET alignment = ? WHERE user_id = ?",
+            (alignment, user_id)
+        )
+        self.commit()
+        return cursor.rowcount > 0
         
-        return char
+    def claim_daily(self, user_id: int, day: str, streak: int, gold: int, xp: int) -> bool:
+        """Pay the daily reward unless it was already claimed on `day`"""
+        cursor = self.execute(
+            """UPDATE profile SET 
+               money = money + ?, 
+               xp = xp + ?, 
+               last_date = ?,
+               streak = ?
+               WHERE user_id = ? AND (last_date != ? OR last_date IS NULL)""",
+            (gold, xp, day, streak, user_id, day)
+        )
+        if cursor.rowcount == 0:
+            return False
+        self.commit()
+        return True
         
     def update_profile(self, user_id: int, **kwargs) -> bool:
         """Update profile fields (alias for update_character)"""
@@ -188,11 +494,6 @@ class Database:
         if not kwargs:
             return False
             
-        # If XP is being updated, recalculate level
-        if 'xp' in kwargs and 'level' not in kwargs:
-            new_level = min(50, 1 + int((kwargs['xp'] / 100) ** 0.5))
-            kwargs['level'] = new_level
-            
         set_clause = ", ".join([f"{k} = ?" for k in kwargs.keys()])
         query = f"UPDATE profile SET {set_clause} WHERE user_id = ?"
         
@@ -200,6 +501,102 @@ class Database:
         self.commit()
         return True
         
+    def increment(self, user_id: int, **deltas: int) -> Optional[Dict[str, Any]]:
+        """Atomically add deltas to numeric profile columns
+        
+        Emits SET col = col + ?, so no read is needed and concurrent writers
+        don't overwrite each other; the profile triggers keep level in step
+        with xp. Returns the updated columns (plus level when xp changed), or
+        None when queued inside batch() or the user has no profile.
+        """
+        invalid = set(deltas) - INCREMENT_COLUMNS
+        if invalid:
+            raise ValueError(f"Cannot increment profile columns: {', '.join(sorted(invalid))}")
+        if not deltas:
+            return None
+            
+        if self._pending_deltas is not None:
+            pending = self._pending_deltas.setdefault(user_id, {})
+            for column, delta in deltas.items():
+                if delta:
+                    pending[column] = pending.get(column, 0) + delta
+            return None
+            
+        columns = sorted(deltas)
+        row = self.fetchone(
+            f"""UPDATE profile SET {self._increment_clause(columns)}
+                WHERE user_id = ? RETURNING {', '.join(columns)}""",
+            (*(deltas[column] for column in columns), user_id)
+        )
+        self.commit()
+        updated = self.row_to_dict(row)
+        if updated and 'xp' in updated:
+            # RETURNING doesn't see the trigger's level update
+            updated['level'] = level_for_xp(updated['xp'])
+        return updated
+        
+    def _increment_clause(self, columns: List[str]) -> str:
+        """SET clause adding a parameter to each column"""
+        return ", ".join(f"{column} = {column} + ?" for column in columns)
+        
+    @contextmanager
+    def batch(self):
+        """Coalesce increment() calls into one UPDATE per user, written on exit
+        
+        Nested batches join the outermost one. Reads inside the block do not see
+        queued deltas. If the block raises, the queued deltas are discarded so a
+        half-finished reward loop writes nothing.
+        """
+        if self._pending_deltas is not None:
+            yield
+            return
+            
+        self._pending_deltas = {}
+        try:
+            yield
+        except BaseException:
+            self._pending_deltas = None
+            raise
+        pending, self._pending_deltas = self._pending_deltas, None
+        self.flush_increments(pending)
+            
+    def flush_increments(self, pending: Dict[int, Dict[str, int]]):
+        """Write coalesced deltas, one executemany per distinct column set"""
+        groups = _group_increments(pending)
+        if not groups:
+            return
+        conn = self.get_connection()
+        self._write_increments(conn, groups)
+        conn.commit()
+        
+    def _write_increments(self, conn: sqlite3.Connection, groups: Dict[tuple, List[tuple]]):
+        for columns, rows in groups.items():
+            query = f"UPDATE profile SET {self._increment_clause(list(columns))} WHERE user_id = ?"
+            started = time.perf_counter()
+            cursor = conn.executemany(query, rows)
+            if self.query_stats is not None:
+                self.query_stats.record(self, query, rows[0], time.perf_counter() - started, max(cursor.rowcount, 0))
+                
+    # Level progression
+    def get_level_ups(self, limit: int = 500) -> List[sqlite3.Row]:
+        """The oldest queued level-ups with the character's name, left in the queue
+        
+        Rows have id, user_id, name, old_level, new_level and reached_at;
+        the profile_level_update trigger queues one whenever xp crosses a level.
+        Call clear_level_ups() with the last id once they have been announced.
+        """
+        return self.fetchall(
+            """SELECT l.*, p.name FROM level_ups l JOIN profile p ON p.user_id = l.user_id
+               ORDER BY l.id LIMIT ?""",
+            (limit,)
+        )
+        
+    def clear_level_ups(self, last_id: int) -> int:
+        """Remove queued level-ups up to and including last_id, returns how many"""
+        cursor = self.execute("DELETE FROM level_ups WHERE id <= ?", (last_id,))
+        self.commit()
+        return cursor.rowcount
+        
     # Item operations
     def create_item(self, owner_id: int, name: str, item_type: str,
                    value: int, damage: int, armor: int, hand: str,
@@ -218,6 +615,88 @@ class Database:
         self.commit()
         return cursor.lastrowid
         
+    def open_crates(self, user_id: int, crate_type: str, rewards: List[tuple]) -> bool:
+        """Apply a batch of crate rewards in one transaction
+        
+        rewards are (reward_type, item, money) tuples from CrateSystem.open_crates.
+        Decrements the crate counter once (only if the user still has enough crates),
+        adds the summed gold, and bulk-inserts the items and crate history rows.
+        """
+        crate_field = f"crates_{crate_type}"
+        if crate_field not in INCREMENT_COLUMNS or not rewards:
+            return False
+            
+        # Our own transaction, so a failed check rolls back only this function's writes
+        conn = self._begin_immediate()
+        try:
+            cursor = conn.execute(
+                f"""UPDATE profile SET {crate_field} = {crate_field} - ?, money = money + ?
+                    WHERE user_id = ? AND {crate_field} >= ?""",
+                (len(rewards), sum(money or 0 for _, _, money in rewards), user_id, len(rewards))
+            )
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return False
+                
+            items = [item for _, item, _ in rewards if item is not None]
+            conn.executemany(
+                """INSERT INTO inventory (owner, name, value, type, damage, armor, hand,
+                                       health_bonus, speed_bonus, luck_bonus, crit_bonus, 
+                                       magic_bonus, slot_type)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(user_id, item.name, item.value, item.type.value, item.damage, item.armor, item.hand.value,
+                  item.health_bonus, item.speed_bonus, item.luck_bonus, item.crit_bonus,
+                  item.magic_bonus, item.slot_type) for item in items]
+            )
+            conn.executemany(
+                "INSERT INTO crate_history (user_id, crate_type, item_name, item_stats) VALUES (?, ?, ?, ?)",
+                [(user_id, crate_type, item.name if item else "Gold", item.stat_total if item else money)
+                 for _, item, money in rewards]
+            )
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+            
+    def apply_rewards(self, deltas: Dict[int, Dict[str, int]], items: List = ()) -> bool:
+        """Commit a resolved battle's profile deltas and item drops together
+
+        deltas maps user_id to increment() style column deltas; items are
+        generated Item objects inserted for their owner_id. Either everything
+        is written or nothing is.
+        """
+        invalid = {column for user_deltas in deltas.values() for column in user_deltas} - INCREMENT_COLUMNS
+        if invalid:
+            raise ValueError(f"Cannot increment profile columns: {', '.join(sorted(invalid))}")
+
+        groups = _group_increments(deltas)
+        if not groups and not items:
+            return False
+
+        conn = self._begin_immediate()
+        try:
+            self._write_increments(conn, groups)
+            self._insert_items(conn, items)
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _insert_items(self, conn: sqlite3.Connection, items: List):
+        """Insert generated Item objects for their owner_id (inside the caller's transaction)"""
+        if items:
+            conn.executemany(
+                """INSERT INTO inventory (owner, name, value, type, damage, armor, hand,
+                                       health_bonus, speed_bonus, luck_bonus, crit_bonus,
+                                       magic_bonus, slot_type)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(item.owner_id, item.name, item.value, item.type.value, item.damage, item.armor,
+                  item.hand.value, item.health_bonus, item.speed_bonus, item.luck_bonus,
+                  item.crit_bonus, item.magic_bonus, item.slot_type) for item in items]
+            )
+
     def get_user_items(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all items owned by a user"""
         rows = self.fetchall(
@@ -261,6 +740,35 @@ class Database:
         self.commit()
         return cursor.rowcount > 0
         
+    def rename_item(self, item_id: int, name: str) -> bool:
+        cursor = self.execute("UPDATE inventory SET name = ? WHERE id = ?", (name, item_id))
+        self.commit()
+        return cursor.rowcount > 0
+        
+    def transfer_item(self, item_id: int, to_user: int) -> bool:
+        """Give an item to another user"""
+        cursor = self.execute("UPDATE inventory SET owner = ? WHERE id = ?", (to_user, item_id))
+        self.commit()
+        return cursor.rowcount > 0
+        
+    def swap_items(self, item_a: int, owner_a: int, item_b: int, owner_b: int) -> bool:
+        """Trade item_a (owned by owner_a) for item_b (owned by owner_b) in one transaction"""
+        conn = self._begin_immediate()
+        try:
+            moved = self.execute(
+                "UPDATE inventory SET owner = ? WHERE id = ? AND owner = ?", (owner_b, item_a, owner_a)
+            ).rowcount + self.execute(
+                "UPDATE inventory SET owner = ? WHERE id = ? AND owner = ?", (owner_a, item_b, owner_b)
+            ).rowcount
+            if moved != 2:
+                conn.rollback()
+                return False
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+            
     def get_item_by_id(self, item_id: int) -> Optional[Dict[str, Any]]:
         """Get item by ID"""
         row = self.fetchone(
@@ -393,17 +901,50 @@ class Database:
         return [self.row_to_dict(row) for row in rows]
         
     # Market operations
-    def list_item_on_market(self, item_id: int, price: int) -> bool:
-        """List an item on the market"""
+    def list_item_on_market(self, item_id: int, price: int, owner_id: Optional[int] = None,
+                            fee: int = 0) -> bool:
+        """List an item on the market
+        
+        With owner_id the listing only goes through if that user still owns the
+        unequipped item, it isn't listed yet, and they can pay the listing fee.
+        """
+        conn = self._begin_immediate()
         try:
-            self.execute(
-                "INSERT INTO market (item_id, price) VALUES (?, ?)",
-                (item_id, price)
+            cursor = self.execute(
+                """INSERT INTO market (item_id, price)
+                   SELECT id, ? FROM inventory
+                   WHERE id = ? AND (? IS NULL OR (owner = ? AND equipped = 0))
+                     AND NOT EXISTS (SELECT 1 FROM market WHERE item_id = ?)""",
+                (price, item_id, owner_id, owner_id, item_id)
             )
-            self.commit()
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return False
+                
+            if fee:
+                cursor = self.execute(
+                    "UPDATE profile SET money = money - ? WHERE user_id = ? AND money >= ?",
+                    (fee, owner_id, fee)
+                )
+                if cursor.rowcount == 0:
+                    conn.rollback()
+                    return False
+                    
+            conn.commit()
             return True
-        except sqlite3.IntegrityError:
-            return False
+        except Exception:
+            conn.rollback()
+            raise
+            
+    def withdraw_market_item(self, item_id: int, owner_id: int) -> bool:
+        """Remove a listing if it belongs to owner_id"""
+        cursor = self.execute(
+            """DELETE FROM market WHERE item_id = ?
+               AND item_id IN (SELECT id FROM inventory WHERE id = ? AND owner = ?)""",
+            (item_id, item_id, owner_id)
+        )
+        self.commit()
+        return cursor.rowcount > 0
             
     def get_market_items(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
         """Get items from market"""
@@ -416,86 +957,92 @@ class Database:
         )
         return [self.row_to_dict(row) for row in rows]
         
-    def buy_market_item(self, item_id: int, buyer_id: int) -> bool:
-        """Buy an item from the market"""
+    def list_market_listings(self) -> List[Dict[str, Any]]:
+        """Every listing, oldest first: the item's inventory columns plus price and listed_at"""
+        rows = self.fetchall(LISTING_QUERY + " ORDER BY m.listed_at, m.id")
+        return [self.row_to_dict(row) for row in rows]
+        
+    def get_market_listing(self, item_id: int) -> Optional[Dict[str, Any]]:
+        """One listing in the list_market_listings() shape, None if the item isn't listed"""
+        return self.row_to_dict(self.fetchone(LISTING_QUERY + " WHERE m.item_id = ?", (item_id,)))
+        
+    def buy_market_item(self, item_id: int, buyer_id: int,
+                        max_price: Optional[int] = None) -> Optional[Dict[str, int]]:
+        """Buy an item from the market
+        
+        Every step is a conditional statement checked by rowcount inside one
+        BEGIN IMMEDIATE transaction, so two buyers racing for the same listing
+        can't both win. Returns {'price', 'seller_id'} or None if the listing is
+        gone, belongs to the buyer, costs more than max_price, or the buyer
+        can't afford it.
+        """
+        conn = self._begin_immediate()
         try:
-            # Start transaction
-            conn = self.get_connection()
-            
-            # Get item and market info
-            market_item = self.fetchone(
-                """SELECT m.price, i.owner FROM market m
-                   JOIN inventory i ON m.item_id = i.id
-                   WHERE m.item_id = ?""",
-                (item_id,)
-            )
-            if not market_item:
-                return False
-                
-            # Convert sqlite3.Row to dict to safely access values
-            market_dict = self.row_to_dict(market_item)
-            price = market_dict['price']
-            seller_id = market_dict['owner']
-            
-            # Check buyer has enough money
-            buyer_money_row = self.fetchone(
-                "SELECT money FROM profile WHERE user_id = ?",
-                (buyer_id,)
-            )
-            buyer_money = self.row_to_dict(buyer_money_row)['money']
+            # Claim the listing
+            sale = self.execute(
+                """DELETE FROM market WHERE item_id = ? AND (? IS NULL OR price <= ?)
+                   AND (SELECT owner FROM inventory WHERE id = market.item_id) != ?
+                   RETURNING price, (SELECT owner FROM inventory WHERE id = market.item_id) AS seller_id""",
+                (item_id, max_price, max_price, buyer_id)
+            ).fetchall()
+            if not sale:
+                conn.rollback()
+                return None
+            price, seller_id = sale[0]['price'], sale[0]['seller_id']
             
-            if buyer_money < price:
-                return False
-                
             # Transfer money
-            self.execute(
-                "UPDATE profile SET money = money - ? WHERE user_id = ?",
-                (price, buyer_id)
+            cursor = self.execute(
+                "UPDATE profile SET money = money - ? WHERE user_id = ? AND money >= ?",
+                (price, buyer_id, price)
             )
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return None
             self.execute(
                 "UPDATE profile SET money = money + ? WHERE user_id = ?",
                 (price, seller_id)
             )
             
             # Transfer item ownership
-            self.execute(
-                "UPDATE inventory SET owner = ?, equipped = 0 WHERE id = ?",
-                (buyer_id, item_id)
-            )
-            
-            # Remove from market
-            self.execute(
-                "DELETE FROM market WHERE item_id = ?",
-                (item_id,)
+            cursor = self.execute(
+                "UPDATE inventory SET owner = ?, equipped = 0 WHERE id = ? AND owner = ?",
+                (buyer_id, item_id, seller_id)
             )
-            
-            self.commit()
-            return True
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return None
+                
+            conn.commit()
+            return {'price': price, 'seller_id': seller_id}
         except Exception:
-            return False
+            conn.rollback()
+            raise
             
     # Adventure operations
     def start_adventure(self, user_id: int, adventure_name: str, 
                        difficulty: int, duration_seconds: int) -> bool:
         """Start an adventure"""
         try:
-            # Calculate finish time
-            finish_time = datetime.now().timestamp() + duration_seconds
+            # Calculate finish time, including any pending chat/nick penalties
+            penalty = self.get_pending_penalty(user_id)
+            finish_time = datetime.now().timestamp() + duration_seconds + penalty
             
             self.execute(
                 """INSERT INTO adventures (user_id, adventure_name, difficulty, finish_at)
-                   VALUES (?, ?, ?, datetime(?, 'unixepoch'))""",
-                (user_id, adventure_name, difficulty, finish_time)
+                   VALUES (?, ?, ?, ?)""",
+                (user_id, adventure_name, difficulty, _utc(finish_time))
             )
             
             self.execute(
-                "UPDATE profile SET last_adventure = datetime('now') WHERE user_id = ?",
-                (user_id,)
+                """UPDATE profile SET last_adventure = CURRENT_TIMESTAMP,
+                   pending_penalty = MAX(0, pending_penalty - ?) WHERE user_id = ?""",
+                (penalty, user_id)
             )
             
             self.commit()
             return True
         except Exception:
+            self.get_connection().rollback()
             return False
             
     def get_active_adventure(self, user_id: int) -> Optional[Dict[str, Any]]:
@@ -508,6 +1055,56 @@ class Database:
         )
         return self.row_to_dict(row) if row else None
         
+    def start_adventures(self, adventures: List[tuple]):
+        """Start auto adventures from (user_id, name, difficulty, started_at, finish_at, penalty) tuples
+        
+        The penalty seconds already folded into finish_at are deducted in the same transaction.
+        """
+        if not adventures:
+            return
+        conn = self._begin_immediate()
+        try:
+            conn.executemany(
+                """INSERT INTO adventures (user_id, adventure_name, difficulty, started_at, finish_at, status)
+                   VALUES (?, ?, ?, ?, ?, 'active')""",
+                [adventure[:5] for adventure in adventures]
+            )
+            self.consume_penalties([(adventure[0], adventure[5]) for adventure in adventures])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+            
+    def get_finished_adventures(self, now: datetime,
+                                user_ids: Optional[Iterable[int]] = None) -> List[sqlite3.Row]:
+        """Active adventures (of user_ids) past their finish time, with the adventurer's name, level and XP"""
+        among, params = _among("a.user_id", user_ids)
+        return self.fetchall(
+            f"""SELECT a.*, p.name, p.level, p.xp FROM adventures a
+                JOIN profile p ON a.user_id = p.user_id  
+                WHERE {among} AND a.status = 'active' AND a.finish_at <= ?""",
+            params + (now,)
+        )
+        
+    def get_adventure_history(self, user_id: int, limit: int = 10) -> List[sqlite3.Row]:
+        """Most recent finished adventures, continuing into the archive files when the hot table runs out"""
+        query = """SELECT * FROM adventures 
+                   WHERE user_id = ? AND status != 'active' 
+                   ORDER BY started_at DESC LIMIT ?"""
+        history = self.fetchall(query, (user_id, limit))
+        if len(history) < limit:
+            history += self._read_archives('adventures', query, (user_id,), limit - len(history))
+        return history
+        
+    def count_adventures(self, status: str) -> int:
+        """Adventures with a status, including archived ones"""
+        return self.fetchone(
+            """SELECT (SELECT COUNT(*) FROM adventures WHERE status = ?)
+                    + (SELECT COALESCE(SUM(entries), 0) FROM history_rollups
+                       WHERE table_name = 'adventures' AND kind = ?)""",
+            (status, status)
+        )[0]
+        
     def complete_adventure(self, adventure_id: int, success: bool) -> bool:
         """Mark adventure as completed"""
         status = 'completed' if success else 'failed'
@@ -518,6 +1115,159 @@ class Database:
         self.commit()
         return cursor.rowcount > 0
         
+    def complete_adventures(self, rewards: List[tuple]) -> set:
+        """Complete finished adventures and pay them out in one transaction
+        
+        rewards are (adventure_id, user_id, deltas, items) tuples: deltas are
+        increment() style columns for user_id, items generated Item objects.
+        An adventure that is no longer active (settled elsewhere in the
+        meantime) is skipped along with its rewards. Returns the ids completed.
+        """
+        invalid = {column for _, _, deltas, _ in rewards for column in deltas} - INCREMENT_COLUMNS
+        if invalid:
+            raise ValueError(f"Cannot increment profile columns: {', '.join(sorted(invalid))}")
+        if not rewards:
+            return set()
+            
+        conn = self._begin_immediate()
+        try:
+            completed = set()
+            pending: Dict[int, Dict[str, int]] = {}
+            items = []
+            for adventure_id, user_id, deltas, adventure_items in rewards:
+                cursor = conn.execute(
+                    "UPDATE adventures SET status = 'completed' WHERE id = ? AND status = 'active'",
+                    (adventure_id,)
+                )
+                if cursor.rowcount == 0:
+                    continue
+                completed.add(adventure_id)
+                user_pending = pending.setdefault(user_id, {})
+                for column, delta in deltas.items():
+                    user_pending[column] = user_pending.get(column, 0) + delta
+                items.extend(adventure_items)
+            self._write_increments(conn, _group_increments(pending))
+            self._insert_items(conn, items)
+            conn.commit()
+            return completed
+        except Exception:
+            conn.rollback()
+            raise
+            
+    # Epic adventure operations
+    def get_active_epic_adventure(self, user_id: int) -> Optional[sqlite3.Row]:
+        return self.fetchone(
+            "SELECT * FROM epic_adventures WHERE user_id = ? AND status = 'active'",
+            (user_id,)
+        )
+        
+    def count_recent_epic_adventures(self, user_id: int, days: int = 7) -> int:
+        """Epic adventures completed by the user that started within the last `days` days"""
+        return self.fetchone(
+            """SELECT COUNT(*) FROM epic_adventures
+               WHERE user_id = ? AND status = 'completed' AND started_at > ?""",
+            (user_id, _utc(time.time() - days * 86400))
+        )[0]
+        
+    def get_finished_epic_adventures(self, now: datetime) -> List[sqlite3.Row]:
+        return self.fetchall(
+            "SELECT * FROM epic_adventures WHERE status = 'active' AND finish_at <= ?",
+            (now,)
+        )
+        
+    def list_epic_candidates(self, min_level: int = 10,
+                             user_ids: Optional[Iterable[int]] = None) -> List[sqlite3.Row]:
+        """Characters (among user_ids) at or above min_level without an active epic adventure"""
+        among, params = _among("user_id", user_ids)
+        return self.fetchall(
+            f"""SELECT user_id, name, level FROM profile 
+                WHERE level >= ? AND {among}
+                AND user_id NOT IN (
+                    SELECT user_id FROM epic_adventures WHERE status = 'active'
+                )""",
+            (min_level,) + params
+        )
+        
+    def start_epic_adventure(self, user_id: int, adventure_type: str, adventure_name: str,
+                             difficulty: int, started_at: datetime, finish_at: datetime,
+                             xp_reward: int, gold_reward: int, quality_min: int, quality_max: int):
+        self.execute(
+            """INSERT INTO epic_adventures 
+               (user_id, adventure_type, adventure_name, difficulty, started_at, finish_at, 
+                base_xp_reward, base_gold_reward, item_quality_min, item_quality_max, status)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'active')""",
+            (user_id, adventure_type, adventure_name, difficulty, started_at, finish_at,
+             xp_reward, gold_reward, quality_min, quality_max)
+        )
+        self.commit()
+        
+    def complete_epic_adventure(self, adventure_id: int):
+        self.execute(
+            "UPDATE epic_adventures SET status = 'completed' WHERE id = ?",
+            (adventure_id,)
+        )
+        self.commit()
+        
+    # Divine blessing operations
+    def get_active_blessings(self, user_id: int, now: datetime) -> List[sqlite3.Row]:
+        return self.fetchall(
+            "SELECT * FROM divine_blessings WHERE user_id = ? AND expires_at > ?",
+            (user_id, now)
+        )
+        
+    def get_active_blessing(self, user_id: int, effect: str, now: datetime) -> Optional[sqlite3.Row]:
+        return self.fetchone(
+            "SELECT * FROM divine_blessings WHERE user_id = ? AND effect = ? AND expires_at > ?",
+            (user_id, effect, now)
+        )
+        
+    def add_blessing(self, user_id: int, effect: str, value: float, expires_at: datetime, name: str):
+        self.execute(
+            """INSERT INTO divine_blessings (user_id, effect, value, expires_at, blessing_name)
+               VALUES (?, ?, ?, ?, ?)""",
+            (user_id, effect, value, expires_at, name)
+        )
+        self.commit()
+        
+    def remove_blessing(self, user_id: int, effect: str):
+        """Use up a one-shot blessing"""
+        self.execute(
+            "DELETE FROM divine_blessings WHERE user_id = ? AND effect = ?",
+            (user_id, effect)
+        )
+        self.commit()
+        
+    def prune_blessings(self, now: datetime) -> int:
+        """Delete every expired blessing, returns how many"""
+        cursor = self.execute("DELETE FROM divine_blessings WHERE expires_at <= ?", (now,))
+        self.commit()
+        return cursor.rowcount
+        
+    # Penalty operations
+    def add_penalty(self, user_id: int, penalty_seconds: int) -> bool:
+        """Add to a user's pending penalty balance (one write per chat message or nick change)"""
+        cursor = self.execute(
+            "UPDATE profile SET pending_penalty = pending_penalty + ? WHERE user_id = ?",
+            (penalty_seconds, user_id)
+        )
+        self.commit()
+        return cursor.rowcount > 0
+        
+    def get_pending_penalty(self, user_id: int) -> int:
+        """Penalty seconds the user's next adventure will take on"""
+        row = self.fetchone(
+            "SELECT pending_penalty FROM profile WHERE user_id = ?",
+            (user_id,)
+        )
+        return min(row['pending_penalty'] or 0, MAX_PENALTY_PER_ADVENTURE) if row else 0
+        
+    def consume_penalties(self, applied: List[tuple]):
+        """Deduct applied penalty seconds, given (user_id, seconds) pairs (no commit)"""
+        self.get_connection().executemany(
+            "UPDATE profile SET pending_penalty = MAX(0, pending_penalty - ?) WHERE user_id = ?",
+            [(seconds, user_id) for user_id, seconds in applied if seconds]
+        )
+        
     # Cooldown operations
     def get_cooldowns(self, user_id: int) -> Dict[str, Optional[str]]:
         """Get all cooldowns for a user"""
@@ -530,7 +1280,7 @@ class Database:
         else:
             # Create cooldown entry if doesn't exist
             self.execute(
-                "INSERT OR IGNORE INTO cooldowns (user_id) VALUES (?)",
+                "INSERT INTO cooldowns (user_id) VALUES (?) ON CONFLICT DO NOTHING",
                 (user_id,)
             )
             self.commit()
@@ -548,11 +1298,11 @@ class Database:
             
         # Ensure cooldown entry exists
         self.execute(
-            "INSERT OR IGNORE INTO cooldowns (user_id) VALUES (?)",
+            "INSERT INTO cooldowns (user_id) VALUES (?) ON CONFLICT DO NOTHING",
             (user_id,)
         )
         
-        query = f"UPDATE cooldowns SET {cooldown_type} = datetime('now') WHERE user_id = ?"
+        query = f"UPDATE cooldowns SET {cooldown_type} = CURRENT_TIMESTAMP WHERE user_id = ?"
         self.execute(query, (user_id,))
         self.commit()
         return True
@@ -562,13 +1312,359 @@ class Database:
                        amount: int, subject: str, info: Dict[str, Any]) -> bool:
         """Log a transaction"""
         self.execute(
-            """INSERT INTO transactions (from_user, to_user, amount, subject, info)
-               VALUES (?, ?, ?, ?, ?)""",
-            (from_user, to_user, amount, subject, json.dumps(info))
+            """INSERT INTO transactions (from_user, to_user, amount, subject, item_id, item, won, details)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (from_user, to_user, amount, subject) + split_info(info)
         )
         self.commit()
         return True
         
+    def get_transactions(self, user_id: Optional[int] = None, subject: Optional[str] = None,
+                         limit: int = 10) -> List[Dict[str, Any]]:
+        """Newest ledger entries of a user and/or subject, continuing into the archive files
+        
+        Each entry is the row as a dict with its decoded info dict under 'info'.
+        """
+        if user_id is None:
+            query = """SELECT * FROM transactions WHERE subject = ?2
+                       ORDER BY timestamp DESC, id DESC LIMIT ?3"""
+        else:
+            # Each direction walks its own index newest first, then the two are merged
+            query = """SELECT * FROM (SELECT * FROM transactions
+                                      WHERE from_user = ?1 AND (?2 IS NULL OR subject = ?2)
+                                      ORDER BY timestamp DESC, id DESC LIMIT ?3)
+                       UNION ALL
+                       SELECT * FROM (SELECT * FROM transactions
+                                      WHERE to_user = ?1 AND from_user IS NOT ?1 AND (?2 IS NULL OR subject = ?2)
+                                      ORDER BY timestamp DESC, id DESC LIMIT ?3)
+                       ORDER BY timestamp DESC, id DESC LIMIT ?3"""
+        params = (user_id, subject)
+        rows = self.fetchall(query, params + (limit,))
+        if len(rows) < limit:
+            rows += self._read_archives('transactions', query, params, limit - len(rows))
+        entries = []
+        for row in rows:
+            entry = {key: row[key] for key in row.keys() if key not in ('info', 'details')}
+            entry['info'] = transaction_info(row)
+            entries.append(entry)
+        return entries
+        
+    def get_transaction_summary(self, user_id: int, since: str) -> List[sqlite3.Row]:
+        """(subject, received, spent, entries) of a user's hot ledger since a UTC timestamp, busiest first
+        
+        Both branches are answered from the covering per-user indexes alone.
+        """
+        return self.fetchall(
+            """SELECT subject, SUM(received) AS received, SUM(spent) AS spent, COUNT(*) AS entries FROM (
+                   SELECT subject, amount AS received, 0 AS spent FROM transactions
+                   WHERE to_user = ? AND timestamp >= ?
+                   UNION ALL
+                   SELECT subject, 0, amount FROM transactions
+                   WHERE from_user = ? AND timestamp >= ?
+               ) GROUP BY subject ORDER BY entries DESC""",
+            (user_id, since, user_id, since)
+        )
+        
+    def log_battle(self, attacker: int, defender: int, winner: int, battle_type: str, money_stolen: int = 0):
+        self.execute(
+            """INSERT INTO battle_logs (attacker, defender, winner, battle_type, money_stolen) 
+               VALUES (?, ?, ?, ?, ?)""",
+            (attacker, defender, winner, battle_type, money_stolen)
+        )
+        self.commit()
+
+    def settle_battle(self, attacker: int, defender: int, winner: int, bet: int = 0) -> bool:
+        """Pay out a PvP battle in one transaction
+
+        The loser is debited only if they still hold the bet, and the winner
+        is credited, both records updated and the battle logged only then.
+        Returns False (nothing written) when the loser can't cover the bet.
+        """
+        loser = defender if winner == attacker else attacker
+        conn = self._begin_immediate()
+        try:
+            cursor = conn.execute(
+                """UPDATE profile SET money = money - ?, pvplosses = pvplosses + 1
+                   WHERE user_id = ? AND money >= ?""",
+                (bet, loser, bet)
+            )
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return False
+            conn.execute(
+                "UPDATE profile SET money = money + ?, pvpwins = pvpwins + 1 WHERE user_id = ?",
+                (bet, winner)
+            )
+            conn.execute(
+                """INSERT INTO battle_logs (attacker, defender, winner, battle_type, money_stolen)
+                   VALUES (?, ?, ?, 'pvp', ?)""",
+                (attacker, defender, winner, bet)
+            )
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+
+    # Economy aggregates
+    def get_economy_report(self, since: str) -> Dict[str, Any]:
+        """The trigger-maintained economy counters (see schema.sql)
+        
+        totals maps metric to value, rarity maps rarity to item count,
+        money_flow has one row per UTC day from `since` (day, created,
+        destroyed) and subjects sums transactions_daily per subject over the
+        same days, busiest first. Only small aggregate tables are read.
+        """
+        return {
+            'totals': {row['metric']: row['value'] for row in self.fetchall("SELECT metric, value FROM economy_totals")},
+            'rarity': {row['rarity']: row['items'] for row in self.fetchall("SELECT rarity, items FROM economy_rarity")},
+            'money_flow': self.fetchall(
+                "SELECT day, created, destroyed FROM money_supply_daily WHERE day >= ? ORDER BY day", (since,)
+            ),
+            'subjects': self.fetchall(
+                """SELECT subject, SUM(transactions) AS transactions, SUM(amount) AS amount
+                   FROM transactions_daily WHERE day >= ?
+                   GROUP BY subject ORDER BY transactions DESC""",
+                (since,)
+            ),
+        }
+        
+    # Tournaments
+    def create_tournament(self, created_by: int, prize: int, participants: List[int]) -> Optional[int]:
+        """Take the prize from the host and open a tournament record, atomically
+        
+        Returns the tournament id, or None if the host can't cover the prize.
+        """
+        conn = self._begin_immediate()
+        try:
+            cursor = conn.execute(
+                "UPDATE profile SET money = money - ? WHERE user_id = ? AND money >= ?",
+                (prize, created_by, prize)
+            )
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return None
+            cursor = conn.execute(
+                """INSERT INTO tournaments (created_by, prize_money, participants, status)
+                   VALUES (?, ?, ?, 'active')""",
+                (created_by, prize, json.dumps(participants))
+            )
+            conn.commit()
+            return cursor.lastrowid
+        except Exception:
+            conn.rollback()
+            raise
+            
+    def finish_tournament(self, tournament_id: int, winner: int, prize: int):
+        """Pay the champion and close the tournament record in one transaction"""
+        conn = self._begin_immediate()
+        try:
+            conn.execute("UPDATE profile SET money = money + ? WHERE user_id = ?", (prize, winner))
+            conn.execute(
+                """UPDATE tournaments SET winner = ?, ended_at = CURRENT_TIMESTAMP, status = 'finished'
+                   WHERE id = ?""",
+                (winner, tournament_id)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+            
+    # Presence history
+    def get_presence_days(self, first_day: int, last_day: int,
+                          user_ids: Optional[Iterable[int]] = None) -> List[sqlite3.Row]:
+        """presence_days rows for days in [first_day, last_day] (among user_ids)"""
+        among, params = _among("user_id", user_ids)
+        return self.fetchall(
+            f"""SELECT user_id, day, intervals, online_seconds FROM presence_days
+                WHERE day BETWEEN ? AND ? AND {among}""",
+            (first_day, last_day) + params
+        )
+        
+    def save_presence_days(self, rows: List[tuple]):
+        """Upsert (user_id, day, intervals, online_seconds) rows in one transaction"""
+        if not rows:
+            return
+        conn = self._begin_immediate()
+        try:
+            conn.executemany(
+                """INSERT INTO presence_days (user_id, day, intervals, online_seconds) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (user_id, day) DO UPDATE SET
+                       intervals = excluded.intervals, online_seconds = excluded.online_seconds""",
+                rows
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+            
+    # History archive
+    def archive_path(self, month: str) -> str:
+        """Archive file holding the history rows of a 'YYYY-MM' month"""
+        stem = os.path.splitext(os.path.basename(self.db_path))[0]
+        return os.path.join(self.archive_dir, f"{stem}-{month}.db")
+        
+    def archive_history(self, ages: Dict[str, int], now: Optional[float] = None) -> Dict[str, int]:
+        """Move history rows older than ages[table] days into monthly archive files
+        
+        Runs on a connection of its own, so it can be called from a worker
+        thread (asyncio.to_thread) while the bot keeps using the main one.
+        Rows move in chunks of ARCHIVE_CHUNK per table, each chunk one short
+        transaction across the main database and the attached month file:
+        copied out, rolled up per kind into history_rollups and deleted.
+        Freed pages are then returned to the filesystem if the file uses
+        incremental vacuum (see enable_incremental_vacuum). Returns rows
+        moved per table.
+        """
+        if self.archive_dir is None:
+            return {}
+        now = time.time() if now is None else now
+        conn = self._worker_connection()
+        try:
+            # month -> [(table, cutoff)] for every table with rows past its hot window
+            due: Dict[str, List[tuple]] = {}
+            for table, days in ages.items():
+                column, movable, _, _, _ = HISTORY_TABLES[table]
+                cutoff = _utc(now - days * 86400)
+                for row in conn.execute(
+                    f"SELECT DISTINCT substr({column}, 1, 7) FROM {table} WHERE {movable} AND {column} < ?",
+                    (cutoff,)
+                ):
+                    due.setdefault(row[0], []).append((table, cutoff))
+            if not due:
+                return {}
+                
+            os.makedirs(self.archive_dir, exist_ok=True)
+            moved: Dict[str, int] = {}
+            for month, tables in sorted(due.items()):
+                conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path(month),))
+                try:
+                    for table, cutoff in tables:
+                        while True:
+                            conn.execute("BEGIN IMMEDIATE")
+                            try:
+                                count = self._archive_month(conn, table, month, cutoff)
+                                conn.commit()
+                            except Exception:
+                                conn.rollback()
+                                raise
+                            moved[table] = moved.get(table, 0) + count
+                            if count < ARCHIVE_CHUNK:
+                                break
+                finally:
+                    conn.execute("DETACH DATABASE archive")
+                    
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                # execute() would only step once, freeing a single page
+                conn.executescript("PRAGMA incremental_vacuum")
+            return moved
+        finally:
+            conn.close()
+            
+    def _archive_month(self, conn: sqlite3.Connection, table: str, month: str, cutoff: str) -> int:
+        """Move the next ARCHIVE_CHUNK rows of a month, returns how many moved"""
+        column, movable, kind, amount, indexed = HISTORY_TABLES[table]
+        columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+        conn.execute(f"CREATE TABLE IF NOT EXISTS archive.{table} AS SELECT * FROM main.{table} WHERE 0")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS archive.idx_{table}_users ON {table}({indexed})")
+        # Columns added to the hot table by later migrations
+        archived = {row[1] for row in conn.execute(f"PRAGMA archive.table_info({table})")}
+        for name in columns:
+            if name not in archived:
+                conn.execute(f"ALTER TABLE archive.{table} ADD COLUMN {name}")
+                
+        where = f"{movable} AND {column} < ? AND substr({column}, 1, 7) = ?"
+        last = conn.execute(
+            f"SELECT MAX(rowid) FROM (SELECT rowid FROM main.{table} WHERE {where} ORDER BY rowid LIMIT ?)",
+            (cutoff, month, ARCHIVE_CHUNK)
+        ).fetchone()[0]
+        if last is None:
+            return 0
+        where += " AND rowid <= ?"
+        params = (cutoff, month, last)
+        conn.execute(
+            f"""INSERT INTO history_rollups (table_name, month, kind, entries, amount)
+                SELECT ?, ?, COALESCE({kind}, ''), COUNT(*), COALESCE(SUM({amount}), 0)
+                FROM main.{table} WHERE {where} GROUP BY COALESCE({kind}, '')
+                ON CONFLICT(table_name, month, kind) DO UPDATE SET
+                    entries = entries + excluded.entries, amount = amount + excluded.amount""",
+            (table, month) + params
+        )
+        column_list = ", ".join(columns)
+        conn.execute(
+            f"INSERT INTO archive.{table} ({column_list}) SELECT {column_list} FROM main.{table} WHERE {where}",
+            params
+        )
+        return conn.execute(f"DELETE FROM main.{table} WHERE {where}", params).rowcount
+        
+    def enable_incremental_vacuum(self) -> bool:
+        """Switch an older database file to incremental auto-vacuum
+        
+        Files created before archiving was added can only change mode with a
+        full VACUUM, which rewrites the whole file and holds an exclusive lock
+        until it is done - an explicit admin step, never part of the daily
+        archive run. Uses its own connection, so it can run in a worker
+        thread. Returns False when the file already uses it.
+        """
+        conn = self._worker_connection()
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return True
+        finally:
+            conn.close()
+            
+    def incremental_vacuum_enabled(self) -> bool:
+        # The table-valued form reads the file header; a bare PRAGMA can return
+        # this connection's stale copy after another connection converted it
+        return self.fetchone("SELECT auto_vacuum FROM pragma_auto_vacuum")[0] == 2
+        
+    def get_history_rollups(self, table: Optional[str] = None) -> List[sqlite3.Row]:
+        """Archived row counts and amounts per table, month and kind, newest month first"""
+        return self.fetchall(
+            """SELECT * FROM history_rollups WHERE ? IS NULL OR table_name = ?
+               ORDER BY table_name, month DESC, entries DESC""",
+            (table, table)
+        )
+        
+    def _read_archives(self, table: str, query: str, params: tuple, limit: int) -> List[sqlite3.Row]:
+        """Up to `limit` rows of query (ending in LIMIT ?) run against the archive files, newest month first"""
+        rows: List[sqlite3.Row] = []
+        if self.archive_dir is None:
+            return rows
+        months = self.fetchall(
+            "SELECT DISTINCT month FROM history_rollups WHERE table_name = ? ORDER BY month DESC",
+            (table,)
+        )
+        for row in months:
+            if len(rows) >= limit:
+                break
+            path = self.archive_path(row['month'])
+            if not os.path.exists(path):
+                continue
+            archive = sqlite3.connect(f"file:{pathname2url(path)}?mode=ro", uri=True)
+            archive.row_factory = sqlite3.Row
+            try:
+                rows.extend(archive.execute(query, params + (limit - len(rows),)).fetchall())
+            finally:
+                archive.close()
+        return rows
+        
+    # Server settings
+    def get_prefix(self, guild_id: int) -> Optional[str]:
+        row = self.fetchone("SELECT prefix FROM server_settings WHERE guild_id = ?", (guild_id,))
+        return row['prefix'] if row else None
+        
+    def ensure_server_settings(self, guild_id: int, prefix: str):
+        """Create a guild's settings row if it doesn't exist"""
+        self.execute(
+            "INSERT INTO server_settings (guild_id, prefix) VALUES (?, ?) ON CONFLICT DO NOTHING",
+            (guild_id, prefix)
+        )
+        self.commit()
+        
     # Leaderboard operations
     def get_leaderboard(self, category: str = "level", limit: int = 10) -> List[Dict[str, Any]]:
         """Get leaderboard data"""
@@ -591,4 +1687,328 @@ class Database:
                 LIMIT ?""",
             (limit,)
         )
-        return [self.row_to_dict(row) for row in rows]
\ No newline at end of file
+        return [self.row_to_dict(row) for row in rows]
+
+class SQLiteRepository(Repository):
+    """The Repository on a Database, for the bot's event loop
+    
+    Statements run inline on the loop thread: each is a local SQLite call
+    that finishes in microseconds, cheaper than handing it to a thread.
+    The two maintenance jobs that can run for seconds (archiving and the
+    vacuum conversion) use their own connection in a worker thread.
+    """
+    
+    def __init__(self, db: Database):
+        self.db = db
+        
+    @property
+    def query_stats(self) -> Optional[QueryStats]:
+        return self.db.query_stats
+        
+    @property
+    def archive_dir(self) -> Optional[str]:
+        return self.db.archive_dir
+        
+    def enable_instrumentation(self, slow_ms: float = 100.0,
+                               caller_every: int = CALLER_SAMPLE_EVERY) -> QueryStats:
+        return self.db.enable_instrumentation(slow_ms, caller_every)
+        
+    def disable_instrumentation(self):
+        self.db.disable_instrumentation()
+        
+    # Connection lifecycle
+    async def init_database(self):
+        self.db.init_database()
+        
+    async def close(self):
+        self.db.close()
+        
+    # Characters
+    async def create_character(self, user_id: int, name: str) -> bool:
+        return self.db.create_character(user_id, name)
+        
+    async def get_profile_ids(self) -> set:
+        return self.db.get_profile_ids()
+        
+    async def bulk_create_characters(self, members: List[tuple], created_at: datetime,
+                                     starter_items: List[tuple] = ()) -> List[int]:
+        return self.db.bulk_create_characters(members, created_at, starter_items)
+        
+    async def get_character(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self.db.get_character(user_id)
+        
+    async def get_profile(self, user_id: int):
+        return self.db.get_profile(user_id)
+        
+    async def get_profile_snapshot(self, user_id: int, now: datetime) -> Optional[Dict[str, Any]]:
+        return self.db.get_profile_snapshot(user_id, now)
+        
+    def version(self, user_id: int) -> Optional[int]:
+        return self.db.version(user_id)
+        
+    async def list_characters(self, min_level: int = 1,
+                              user_ids: Optional[Iterable[int]] = None) -> List[Row]:
+        return self.db.list_characters(min_level, user_ids)
+        
+    async def list_idle_characters(self, user_ids: Optional[Iterable[int]] = None) -> List[Row]:
+        return self.db.list_idle_characters(user_ids)
+        
+    async def get_raid_roster(self, user_ids: Iterable[int]) -> List[Row]:
+        return self.db.get_raid_roster(user_ids)
+        
+    async def get_battle_stats(self, user_ids: Iterable[int], now: datetime) -> List[Row]:
+        return self.db.get_battle_stats(user_ids, now)
+        
+    async def count_characters(self) -> int:
+        return self.db.count_characters()
+        
+    async def delete_character(self, user_id: int):
+        return self.db.delete_character(user_id)
+        
+    async def set_alignment(self, user_id: int, alignment: str) -> bool:
+        return self.db.set_alignment(user_id, alignment)
+        
+    async def claim_daily(self, user_id: int, day: str, streak: int, gold: int, xp: int) -> bool:
+        return self.db.claim_daily(user_id, day, streak, gold, xp)
+        
+    async def update_profile(self, user_id: int, **kwargs) -> bool:
+        return self.db.update_profile(user_id, **kwargs)
+        
+    async def update_character(self, user_id: int, **kwargs) -> bool:
+        return self.db.update_character(user_id, **kwargs)
+        
+    async def increment(self, user_id: int, **deltas: int) -> Optional[Dict[str, Any]]:
+        return self.db.increment(user_id, **deltas)
+        
+    @asynccontextmanager
+    async def batch(self):
+        with self.db.batch():
+            yield
+        
+    async def apply_rewards(self, deltas: Dict[int, Dict[str, int]], items: List = ()) -> bool:
+        return self.db.apply_rewards(deltas, items)
+        
+    # Level progression
+    async def get_level_ups(self, limit: int = 500) -> List[Row]:
+        return self.db.get_level_ups(limit)
+        
+    async def clear_level_ups(self, last_id: int) -> int:
+        return self.db.clear_level_ups(last_id)
+        
+    # Items
+    async def create_item(self, owner_id: int, name: str, item_type: str,
+                          value: int, damage: int, armor: int, hand: str,
+                          health_bonus: int = 0, speed_bonus: int = 0,
+                          luck_bonus: float = 0.0, crit_bonus: float = 0.0,
+                          magic_bonus: int = 0, slot_type: str = None) -> int:
+        return self.db.create_item(owner_id, name, item_type, value, damage, armor, hand, health_bonus, speed_bonus, luck_bonus, crit_bonus, magic_bonus, slot_type)
+        
+    async def open_crates(self, user_id: int, crate_type: str, rewards: List[tuple]) -> bool:
+        return self.db.open_crates(user_id, crate_type, rewards)
+        
+    async def get_user_items(self, user_id: int) -> List[Dict[str, Any]]:
+        return self.db.get_user_items(user_id)
+        
+    async def get_equipped_items(self, user_id: int) -> List[Dict[str, Any]]:
+        return self.db.get_equipped_items(user_id)
+        
+    async def equip_item(self, item_id: int, user_id: int) -> bool:
+        return self.db.equip_item(item_id, user_id)
+        
+    async def unequip_item(self, item_id: int, user_id: int) -> bool:
+        return self.db.unequip_item(item_id, user_id)
+        
+    async def delete_item(self, item_id: int) -> bool:
+        return self.db.delete_item(item_id)
+        
+    async def rename_item(self, item_id: int, name: str) -> bool:
+        return self.db.rename_item(item_id, name)
+        
+    async def transfer_item(self, item_id: int, to_user: int) -> bool:
+        return self.db.transfer_item(item_id, to_user)
+        
+    async def swap_items(self, item_a: int, owner_a: int, item_b: int, owner_b: int) -> bool:
+        return self.db.swap_items(item_a, owner_a, item_b, owner_b)
+        
+    async def get_item_by_id(self, item_id: int) -> Optional[Dict[str, Any]]:
+        return self.db.get_item_by_id(item_id)
+        
+    async def get_equipped_slots(self, user_id: int) -> Dict[str, Dict[str, Any]]:
+        return self.db.get_equipped_slots(user_id)
+        
+    async def equip_item_to_slot(self, item_id: int, user_id: int, slot: str) -> bool:
+        return self.db.equip_item_to_slot(item_id, user_id, slot)
+        
+    async def unequip_item_from_slot(self, user_id: int, slot: str) -> bool:
+        return self.db.unequip_item_from_slot(user_id, slot)
+        
+    # Guilds
+    async def create_guild(self, name: str, owner_id: int) -> Optional[int]:
+        return self.db.create_guild(name, owner_id)
+        
+    async def get_guild(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        return self.db.get_guild(guild_id)
+        
+    async def get_guild_members(self, guild_id: int) -> List[Dict[str, Any]]:
+        return self.db.get_guild_members(guild_id)
+        
+    # Market
+    async def list_item_on_market(self, item_id: int, price: int, owner_id: Optional[int] = None,
+                                  fee: int = 0) -> bool:
+        return self.db.list_item_on_market(item_id, price, owner_id, fee)
+        
+    async def withdraw_market_item(self, item_id: int, owner_id: int) -> bool:
+        return self.db.withdraw_market_item(item_id, owner_id)
+        
+    async def get_market_items(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        return self.db.get_market_items(limit, offset)
+        
+    async def list_market_listings(self) -> List[Dict[str, Any]]:
+        return self.db.list_market_listings()
+        
+    async def get_market_listing(self, item_id: int) -> Optional[Dict[str, Any]]:
+        return self.db.get_market_listing(item_id)
+        
+    async def buy_market_item(self, item_id: int, buyer_id: int,
+                              max_price: Optional[int] = None) -> Optional[Dict[str, int]]:
+        return self.db.buy_market_item(item_id, buyer_id, max_price)
+        
+    # Adventures
+    async def start_adventure(self, user_id: int, adventure_name: str,
+                              difficulty: int, duration_seconds: int) -> bool:
+        return self.db.start_adventure(user_id, adventure_name, difficulty, duration_seconds)
+        
+    async def get_active_adventure(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self.db.get_active_adventure(user_id)
+        
+    async def start_adventures(self, adventures: List[tuple]):
+        return self.db.start_adventures(adventures)
+        
+    async def get_finished_adventures(self, now: datetime,
+                                      user_ids: Optional[Iterable[int]] = None) -> List[Row]:
+        return self.db.get_finished_adventures(now, user_ids)
+        
+    async def get_adventure_history(self, user_id: int, limit: int = 10) -> List[Row]:
+        return self.db.get_adventure_history(user_id, limit)
+        
+    async def count_adventures(self, status: str) -> int:
+        return self.db.count_adventures(status)
+        
+    async def complete_adventure(self, adventure_id: int, success: bool) -> bool:
+        return self.db.complete_adventure(adventure_id, success)
+        
+    async def complete_adventures(self, rewards: List[tuple]) -> set:
+        return self.db.complete_adventures(rewards)
+        
+    # Epic adventures
+    async def get_active_epic_adventure(self, user_id: int) -> Optional[Row]:
+        return self.db.get_active_epic_adventure(user_id)
+        
+    async def count_recent_epic_adventures(self, user_id: int, days: int = 7) -> int:
+        return self.db.count_recent_epic_adventures(user_id, days)
+        
+    async def get_finished_epic_adventures(self, now: datetime) -> List[Row]:
+        return self.db.get_finished_epic_adventures(now)
+        
+    async def list_epic_candidates(self, min_level: int = 10,
+                                   user_ids: Optional[Iterable[int]] = None) -> List[Row]:
+        return self.db.list_epic_candidates(min_level, user_ids)
+        
+    async def start_epic_adventure(self, user_id: int, adventure_type: str, adventure_name: str,
+                                   difficulty: int, started_at: datetime, finish_at: datetime,
+                                   xp_reward: int, gold_reward: int,
+                                   quality_min: int, quality_max: int):
+        return self.db.start_epic_adventure(user_id, adventure_type, adventure_name, difficulty, started_at, finish_at, xp_reward, gold_reward, quality_min, quality_max)
+        
+    async def complete_epic_adventure(self, adventure_id: int):
+        return self.db.complete_epic_adventure(adventure_id)
+        
+    # Blessings
+    async def get_active_blessings(self, user_id: int, now: datetime) -> List[Row]:
+        return self.db.get_active_blessings(user_id, now)
+        
+    async def get_active_blessing(self, user_id: int, effect: str, now: datetime) -> Optional[Row]:
+        return self.db.get_active_blessing(user_id, effect, now)
+        
+    async def add_blessing(self, user_id: int, effect: str, value: float, expires_at: datetime, name: str):
+        return self.db.add_blessing(user_id, effect, value, expires_at, name)
+        
+    async def remove_blessing(self, user_id: int, effect: str):
+        return self.db.remove_blessing(user_id, effect)
+        
+    async def prune_blessings(self, now: datetime) -> int:
+        return self.db.prune_blessings(now)
+        
+    # Penalties
+    async def add_penalty(self, user_id: int, penalty_seconds: int) -> bool:
+        return self.db.add_penalty(user_id, penalty_seconds)
+        
+    async def get_pending_penalty(self, user_id: int) -> int:
+        return self.db.get_pending_penalty(user_id)
+        
+    # Economy aggregates
+    async def get_economy_report(self, since: str) -> Dict[str, Any]:
+        return self.db.get_economy_report(since)
+        
+    # Tournaments
+    async def create_tournament(self, created_by: int, prize: int, participants: List[int]) -> Optional[int]:
+        return self.db.create_tournament(created_by, prize, participants)
+        
+    async def finish_tournament(self, tournament_id: int, winner: int, prize: int):
+        return self.db.finish_tournament(tournament_id, winner, prize)
+        
+    # Presence history
+    async def get_presence_days(self, first_day: int, last_day: int,
+                                user_ids: Optional[Iterable[int]] = None) -> List[Row]:
+        return self.db.get_presence_days(first_day, last_day, user_ids)
+        
+    async def save_presence_days(self, rows: List[tuple]):
+        return self.db.save_presence_days(rows)
+        
+    # History archive
+    async def archive_history(self, ages: Dict[str, int], now: Optional[float] = None) -> Dict[str, int]:
+        # Its own connection in a worker thread - the event loop keeps running
+        return await asyncio.to_thread(self.db.archive_history, ages, now)
+        
+    async def enable_incremental_vacuum(self) -> bool:
+        return await asyncio.to_thread(self.db.enable_incremental_vacuum)
+        
+    async def incremental_vacuum_enabled(self) -> bool:
+        return self.db.incremental_vacuum_enabled()
+        
+    async def get_history_rollups(self, table: Optional[str] = None) -> List[Row]:
+        return self.db.get_history_rollups(table)
+        
+    # Cooldowns, logs and settings
+    async def get_cooldowns(self, user_id: int) -> Dict[str, Optional[str]]:
+        return self.db.get_cooldowns(user_id)
+        
+    async def set_cooldown(self, user_id: int, cooldown_type: str) -> bool:
+        return self.db.set_cooldown(user_id, cooldown_type)
+        
+    async def log_transaction(self, from_user: Optional[int], to_user: Optional[int],
+                              amount: int, subject: str, info: Dict[str, Any]) -> bool:
+        return self.db.log_transaction(from_user, to_user, amount, subject, info)
+        
+    async def get_transactions(self, user_id: Optional[int] = None, subject: Optional[str] = None,
+                               limit: int = 10) -> List[Dict[str, Any]]:
+        return self.db.get_transactions(user_id, subject, limit)
+        
+    async def get_transaction_summary(self, user_id: int, since: str) -> List[Row]:
+        return self.db.get_transaction_summary(user_id, since)
+        
+    async def log_battle(self, attacker: int, defender: int, winner: int, battle_type: str,
+                         money_stolen: int = 0):
+        return self.db.log_battle(attacker, defender, winner, battle_type, money_stolen)
+        
+    async def settle_battle(self, attacker: int, defender: int, winner: int, bet: int = 0) -> bool:
+        return self.db.settle_battle(attacker, defender, winner, bet)
+        
+    async def get_prefix(self, guild_id: int) -> Optional[str]:
+        return self.db.get_prefix(guild_id)
+        
+    async def ensure_server_settings(self, guild_id: int, prefix: str):
+        return self.db.ensure_server_settings(guild_id, prefix)
+        
+    async def get_leaderboard(self, category: str = "level", limit: int = 10) -> List[Dict[str, Any]]:
+        return self.db.get_leaderboard(category, limit)
@@ -0,0 +1,132 @@
+"""Transaction ledger encoding - typed columns for common info fields, packed bytes for the rest"""
+import json
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+# info keys stored in their own transactions columns (queryable without decoding)
+TYPED_FIELDS = ('item_id', 'item', 'won')
+
+# Known detail keys, written as their one-byte index; others are spelled out after UNKNOWN_KEY
+KNOWN_KEYS = ('choice', 'result', 'chance', 'streak', 'xp', 'adventure', 'difficulty',
+              'price', 'given', 'received')
+UNKNOWN_KEY = 0xFF
+
+_KEY_CODES = {key: code for code, key in enumerate(KNOWN_KEYS)}
+
+# Values are a tag byte then their struct-packed form; text is a length then UTF-8.
+# Integers take the smallest signed width that fits: tag -> (struct format, exclusive magnitude limit)
+_INT_FORMATS = {tag: (f'<{tag}', 1 << (8 * struct.calcsize(tag) - 1)) for tag in 'bhiq'}
+
+# Text tags: lowercase carries a uint16 length, uppercase a uint32 one for anything longer
+_SHORT_TEXT = 0xFFFF
+_TEXT_LENGTHS = {'s': '<H', 'j': '<H', 'S': '<I', 'J': '<I'}
+
+
+def _pack_text(text: str) -> bytes:
+    data = text.encode('utf-8')
+    return struct.pack('<H', len(data)) + data
+
+
+def _pack_tagged_text(tag: str, text: str) -> bytes:
+    """Text value under its short tag, or the long one past 65535 bytes"""
+    data = text.encode('utf-8')
+    if len(data) > _SHORT_TEXT:
+        tag = tag.upper()
+    length_format = _TEXT_LENGTHS[tag]
+    return tag.encode() + struct.pack(length_format, len(data)) + data
+
+
+def _unpack_text(blob: bytes, offset: int, length_format: str = '<H') -> Tuple[str, int]:
+    (size,) = struct.unpack_from(length_format, blob, offset)
+    offset += struct.calcsize(length_format)
+    return blob[offset:offset + size].decode('utf-8'), offset + size
+
+
+def _pack_value(value: Any) -> bytes:
+    if value is None:
+        return b'n'
+    if isinstance(value, bool):
+        return b'T' if value else b'F'
+    if isinstance(value, int):
+        for tag, (fmt, limit) in _INT_FORMATS.items():
+            if -limit <= value < limit:
+                return tag.encode() + struct.pack(fmt, value)
+    if isinstance(value, float):
+        return b'd' + struct.pack('<d', value)
+    if isinstance(value, str):
+        return _pack_tagged_text('s', value)
+    # Lists, dicts and oversized ints keep their JSON form
+    return _pack_tagged_text('j', json.dumps(value))
+
+
+def _unpack_value(blob: bytes, offset: int) -> Tuple[Any, int]:
+    tag = chr(blob[offset])
+    offset += 1
+    if tag == 'n':
+        return None, offset
+    if tag in 'TF':
+        return tag == 'T', offset
+    if tag in _INT_FORMATS:
+        fmt = _INT_FORMATS[tag][0]
+        return struct.unpack_from(fmt, blob, offset)[0], offset + struct.calcsize(fmt)
+    if tag == 'd':
+        return struct.unpack_from('<d', blob, offset)[0], offset + 8
+    text, offset = _unpack_text(blob, offset, _TEXT_LENGTHS[tag])
+    return (json.loads(text) if tag in 'jJ' else text), offset
+
+
+def pack_details(details: Dict[str, Any]) -> Optional[bytes]:
+    """Key/value pairs as compact bytes, None when there are none
+    
+    Raises ValueError for a key longer than 65535 bytes; values of any size are stored.
+    """
+    if not details:
+        return None
+    parts = []
+    for key, value in details.items():
+        code = _KEY_CODES.get(key)
+        if code is not None:
+            parts.append(bytes((code,)))
+        elif len(key.encode('utf-8')) > _SHORT_TEXT:
+            raise ValueError(f"Transaction detail key too long ({len(key.encode('utf-8'))} bytes)")
+        else:
+            parts.append(bytes((UNKNOWN_KEY,)) + _pack_text(key))
+        parts.append(_pack_value(value))
+    return b''.join(parts)
+
+
+def unpack_details(blob: Optional[bytes]) -> Dict[str, Any]:
+    details: Dict[str, Any] = {}
+    offset = 0
+    while blob and offset < len(blob):
+        code = blob[offset]
+        offset += 1
+        if code == UNKNOWN_KEY:
+            key, offset = _unpack_text(blob, offset)
+        else:
+            key = KNOWN_KEYS[code]
+        details[key], offset = _unpack_value(blob, offset)
+    return details
+
+
+def split_info(info: Optional[Dict[str, Any]]) -> tuple:
+    """(item_id, item, won, details) column values for a transaction's info dict"""
+    info = dict(info or {})
+    item_id = info.pop('item_id', None)
+    item = info.pop('item', None)
+    won = info.pop('won', None)
+    return item_id, item, None if won is None else int(won), pack_details(info)
+
+
+def transaction_info(row) -> Dict[str, Any]:
+    """The info dict of a stored transaction row (rows archived before the split keep JSON in info)"""
+    keys = row.keys()
+    info: Dict[str, Any] = {}
+    if 'info' in keys and row['info']:
+        info.update(json.loads(row['info']))
+    for field in TYPED_FIELDS:
+        if field in keys and row[field] is not None:
+            info[field] = bool(row[field]) if field == 'won' else row[field]
+    if 'details' in keys:
+        info.update(unpack_details(row['details']))
+    return info
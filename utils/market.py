@@ -0,0 +1,156 @@
+"""In-memory market order book kept in step with the market table"""
+import bisect
+import heapq
+import itertools
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from classes.items import Item
+
+logger = logging.getLogger('DiscordRPG.Market')
+
+
+class Listing:
+    """One item for sale"""
+
+    __slots__ = ('item_id', 'price', 'seller_id', 'listed_at', 'seq', 'rarity', 'item')
+
+    def __init__(self, row: Dict, seq: int):
+        self.item_id = row['id']
+        self.price = row['price']
+        self.seller_id = row['owner']
+        self.listed_at = row['listed_at']
+        self.seq = seq
+        self.rarity = Item.from_row(row).rarity.value
+        self.item = row
+
+    @property
+    def key(self) -> Tuple[int, int, int]:
+        """Sort key inside a book: cheapest first, then oldest listing"""
+        return (self.price, self.seq, self.item_id)
+
+    @property
+    def book(self) -> Tuple[str, str]:
+        return (self.item['type'], self.rarity)
+
+    def as_dict(self) -> Dict:
+        """Row shape the market embeds expect (inventory columns plus item_id/price)"""
+        return dict(self.item, item_id=self.item_id, price=self.price)
+
+
+class MarketEngine:
+    """Order book per (item type, rarity), warmed from the repository
+
+    Browsing and cheapest-match lookups read only from memory, so they are
+    plain methods; await ensure_warm() before the first one. Offers,
+    withdrawals and purchases go through the repository's conditional
+    statements first and only touch the book once the write has committed,
+    so the book never shows a listing the database doesn't have after a
+    successful operation.
+    Listings that vanish behind our back (items sold or deleted elsewhere)
+    are dropped the next time a write on them fails.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.listings: Dict[int, Listing] = {}  # item_id -> listing, oldest first
+        self.books: Dict[Tuple[str, str], List[Tuple[int, int, int]]] = {}
+        self._seq = itertools.count()
+        self.warmed = False
+
+    async def warm(self) -> int:
+        """(Re)load every listing from the database"""
+        self.warmed = True
+        self.listings.clear()
+        self.books.clear()
+        for row in await self.db.list_market_listings():
+            self._add(row)
+        logger.info(f"Market order book warmed with {len(self.listings)} listings")
+        return len(self.listings)
+
+    def _add(self, row: Dict) -> Listing:
+        previous = self.listings.get(row['id'])
+        if previous is not None:
+            self._unbook(previous)
+        listing = Listing(row, previous.seq if previous else next(self._seq))
+        self.listings[listing.item_id] = listing  # Replacing keeps the browse position
+        bisect.insort(self.books.setdefault(listing.book, []), listing.key)
+        return listing
+
+    def _remove(self, item_id: int) -> Optional[Listing]:
+        listing = self.listings.pop(item_id, None)
+        if listing is not None:
+            self._unbook(listing)
+        return listing
+
+    def _unbook(self, listing: Listing):
+        book = self.books[listing.book]
+        index = bisect.bisect_left(book, listing.key)
+        if index < len(book) and book[index] == listing.key:
+            del book[index]
+        if not book:
+            del self.books[listing.book]
+
+    async def refresh(self, item_id: int) -> Optional[Listing]:
+        """Re-read one listing from the database"""
+        row = await self.db.get_market_listing(item_id)
+        if row is None:
+            self._remove(item_id)
+            return None
+        return self._add(row)
+
+    # Reads (callers await ensure_warm() first, in case startup hasn't warmed the book yet)
+
+    async def ensure_warm(self):
+        if not self.warmed:
+            await self.warm()
+
+    def __len__(self) -> int:
+        return len(self.listings)
+
+    def get(self, item_id: int) -> Optional[Listing]:
+        return self.listings.get(item_id)
+
+    def browse(self, limit: int = 10, offset: int = 0) -> List[Listing]:
+        """Newest listings first"""
+        return list(itertools.islice(reversed(self.listings.values()), offset, offset + limit))
+
+    def cheapest(self, item_type: Optional[str] = None, rarity: Optional[str] = None,
+                 limit: int = 10) -> List[Listing]:
+        """Cheapest listings matching a type and/or rarity (case-insensitive)"""
+        books: Iterable[List[Tuple[int, int, int]]] = [
+            book for (book_type, book_rarity), book in self.books.items()
+            if (item_type is None or book_type.lower() == item_type.lower())
+            and (rarity is None or book_rarity == rarity.lower())
+        ]
+        return [self.listings[item_id] for _, _, item_id in itertools.islice(heapq.merge(*books), limit)]
+
+    # Writes
+
+    async def offer(self, seller_id: int, item_id: int, price: int, fee: int = 0) -> Optional[Listing]:
+        """List an item, charging the fee in the same transaction"""
+        listed = await self.db.list_item_on_market(item_id, price, owner_id=seller_id, fee=fee)
+        listing = await self.refresh(item_id)
+        return listing if listed else None
+
+    async def withdraw(self, seller_id: int, item_id: int) -> Optional[Listing]:
+        """Take a listing off the market"""
+        listing = self.listings.get(item_id) or await self.refresh(item_id)
+        if not await self.db.withdraw_market_item(item_id, seller_id):
+            await self.refresh(item_id)
+            return None
+        self._remove(item_id)
+        return listing
+
+    async def buy(self, buyer_id: int, item_id: int, max_price: Optional[int] = None) -> Optional[Dict[str, int]]:
+        """Buy a listing, returns {'price', 'seller_id'} or None if it couldn't be bought"""
+        sale = await self.db.buy_market_item(item_id, buyer_id, max_price=max_price)
+        if sale is None:
+            await self.refresh(item_id)
+            return None
+        self._remove(item_id)
+        return sale
+
+    def discard(self, item_id: int):
+        """Forget a listing whose item was sold, traded or deleted elsewhere"""
+        self._remove(item_id)
@@ -0,0 +1,258 @@
+"""Runtime metrics: event-loop lag, command latency, background task durations and outbound messages"""
+import asyncio
+import functools
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('DiscordRPG.Metrics')
+
+# Upper bounds in seconds (Prometheus "le" buckets)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+SAMPLE_SIZE = 512
+
+
+class Histogram:
+    """Cumulative bucket histogram with a bounded sample for percentiles"""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max', 'samples')
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=SAMPLE_SIZE)
+
+    def observe(self, value: float):
+        """Record one value (seconds)"""
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+        if value > self.max:
+            self.max = value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    @property
+    def avg(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """Nearest-rank percentile over the recent sample"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def prometheus(self, name: str, labels: str = "") -> List[str]:
+        """Exposition lines for this histogram"""
+        prefix = f"{labels}," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class Metrics:
+    """Registry for the bot's runtime metrics"""
+
+    def __init__(self, lag_interval: float = 0.5):
+        self.lag_interval = lag_interval
+        self.started_at = time.time()
+        self.loop_lag = Histogram(LAG_BUCKETS)
+        self.commands: Dict[str, Histogram] = {}
+        self.command_errors: Dict[str, int] = {}
+        self.tasks: Dict[str, Histogram] = {}
+        self.task_errors: Dict[str, int] = {}
+        self._reset_outbound()
+        self._lag_task: Optional[asyncio.Task] = None
+
+    # Event loop lag
+
+    async def _probe_loop_lag(self):
+        """Sleep for a fixed interval and record how late we wake up"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - expected)
+            self.loop_lag.observe(lag)
+            if lag >= 1.0:
+                logger.warning(f"Event loop stalled for {lag:.2f}s")
+
+    def start_lag_probe(self):
+        """Start the loop-lag probe on the running event loop"""
+        if self._lag_task is None or self._lag_task.done():
+            self._lag_task = asyncio.get_running_loop().create_task(self._probe_loop_lag())
+
+    def stop_lag_probe(self):
+        """Stop the loop-lag probe"""
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+
+    # Commands
+
+    def observe_command(self, name: str, seconds: float, failed: bool = False):
+        """Record one command invocation"""
+        histogram = self.commands.get(name)
+        if histogram is None:
+            histogram = self.commands[name] = Histogram()
+        histogram.observe(seconds)
+        if failed:
+            self.command_errors[name] = self.command_errors.get(name, 0) + 1
+
+    # Background tasks
+
+    def observe_task(self, name: str, seconds: float, failed: bool = False):
+        """Record one tasks.loop iteration"""
+        histogram = self.tasks.get(name)
+        if histogram is None:
+            histogram = self.tasks[name] = Histogram()
+        histogram.observe(seconds)
+        if failed:
+            self.task_errors[name] = self.task_errors.get(name, 0) + 1
+
+    def instrument_loop(self, name: str, loop) -> bool:
+        """Wrap a tasks.Loop's coroutine so every iteration is timed"""
+        original = loop.coro
+        if getattr(original, '__metrics_wrapped__', False):
+            return False
+
+        metrics = self
+
+        @functools.wraps(original)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            failed = False
+            try:
+                return await original(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                metrics.observe_task(name, time.perf_counter() - started, failed)
+
+        timed.__metrics_wrapped__ = True
+        loop.coro = timed
+        return True
+
+    def instrument_cog(self, cog) -> int:
+        """Time every tasks.loop defined on a cog, returns how many were wrapped"""
+        from discord.ext import tasks
+
+        wrapped = 0
+        seen = set()
+        for klass in type(cog).__mro__:
+            for attr, value in vars(klass).items():
+                if attr in seen or not isinstance(value, tasks.Loop):
+                    continue
+                seen.add(attr)
+                # Instance access returns the cog's bound copy of the loop
+                if self.instrument_loop(f"{type(cog).__name__}.{attr}", getattr(cog, attr)):
+                    wrapped += 1
+        return wrapped
+
+    # Outbound messages (updated by utils/outbox.py)
+
+    def _reset_outbound(self):
+        self.outbound_latency = Histogram()  # Queued -> delivered, per request
+        self.outbound_depth = 0
+        self.outbound_requests = 0
+        self.outbound_messages = 0
+        self.outbound_dropped = 0
+
+    # Export
+
+    def prometheus(self, query_stats=None) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP discordrpg_uptime_seconds Seconds since metrics started",
+            "# TYPE discordrpg_uptime_seconds gauge",
+            f"discordrpg_uptime_seconds {time.time() - self.started_at:.0f}",
+            "# HELP discordrpg_event_loop_lag_seconds Delay between scheduled and actual wakeups",
+            "# TYPE discordrpg_event_loop_lag_seconds histogram",
+        ]
+        lines += self.loop_lag.prometheus("discordrpg_event_loop_lag_seconds")
+
+        lines += [
+            "# HELP discordrpg_command_duration_seconds Command latency",
+            "# TYPE discordrpg_command_duration_seconds histogram",
+        ]
+        for name, histogram in sorted(self.commands.items()):
+            lines += histogram.prometheus("discordrpg_command_duration_seconds", f'command="{name}"')
+        lines += ["# TYPE discordrpg_command_errors_total counter"]
+        for name, count in sorted(self.command_errors.items()):
+            lines.append(f'discordrpg_command_errors_total{{command="{name}"}} {count}')
+
+        lines += [
+            "# HELP discordrpg_task_duration_seconds Background loop iteration duration",
+            "# TYPE discordrpg_task_duration_seconds histogram",
+        ]
+        for name, histogram in sorted(self.tasks.items()):
+            lines += histogram.prometheus("discordrpg_task_duration_seconds", f'task="{name}"')
+        lines += ["# TYPE discordrpg_task_errors_total counter"]
+        for name, count in sorted(self.task_errors.items()):
+            lines.append(f'discordrpg_task_errors_total{{task="{name}"}} {count}')
+
+        lines += [
+            "# HELP discordrpg_outbound_queue_depth Messages waiting in the outbox",
+            "# TYPE discordrpg_outbound_queue_depth gauge",
+            f"discordrpg_outbound_queue_depth {self.outbound_depth}",
+            "# HELP discordrpg_outbound_send_latency_seconds Time from queueing to delivery",
+            "# TYPE discordrpg_outbound_send_latency_seconds histogram",
+        ]
+        lines += self.outbound_latency.prometheus("discordrpg_outbound_send_latency_seconds")
+        lines += [
+            "# TYPE discordrpg_outbound_requests_total counter",
+            f"discordrpg_outbound_requests_total {self.outbound_requests}",
+            "# TYPE discordrpg_outbound_messages_total counter",
+            f"discordrpg_outbound_messages_total {self.outbound_messages}",
+            "# TYPE discordrpg_outbound_dropped_total counter",
+            f"discordrpg_outbound_dropped_total {self.outbound_dropped}",
+        ]
+
+        if query_stats is not None:
+            lines += [
+                "# TYPE discordrpg_db_statements_total counter",
+                "# TYPE discordrpg_db_statement_seconds_total counter",
+            ]
+            for stats in query_stats.top('total_ms', limit=25):
+                template = stats.template[:120].replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'discordrpg_db_statements_total{{template="{template}"}} {stats.calls}')
+                lines.append(f'discordrpg_db_statement_seconds_total{{template="{template}"}} {stats.total_ms / 1000:.6f}')
+
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str, query_stats=None):
+        """Atomically write the exposition to a file (node_exporter textfile collector)"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(self.prometheus(query_stats))
+        os.replace(temp_path, path)
+
+    def reset(self):
+        """Clear command and task statistics"""
+        self.started_at = time.time()
+        self.loop_lag = Histogram(LAG_BUCKETS)
+        self.commands.clear()
+        self.command_errors.clear()
+        self.tasks.clear()
+        self.task_errors.clear()
+        depth = self.outbound_depth
+        self._reset_outbound()
+        self.outbound_depth = depth
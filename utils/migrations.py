@@ -0,0 +1,402 @@
+"""Versioned schema migrations tracked in PRAGMA user_version
+
+schema.sql always describes the latest schema. It is only applied in full
+to a database that has never been versioned (user_version 0); a brand new
+database is then stamped with SCHEMA_VERSION, while an older unversioned
+one runs every migration. After that each start only reads user_version
+and runs the migrations above it, each exactly once in its own transaction.
+
+To change the schema, edit schema.sql (for new databases) and append a
+migration here (for existing ones).
+"""
+import json
+import logging
+import sqlite3
+from typing import Callable, List, Optional, Tuple
+
+from utils.ledger import TYPED_FIELDS, pack_details
+
+logger = logging.getLogger('DiscordRPG.Database')
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_columns(conn: sqlite3.Connection, table: str, columns: List[Tuple[str, str]]):
+    existing = _columns(conn, table)
+    for name, definition in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            logger.info(f"Added {name} column to {table} table")
+
+
+def _profile_columns(conn: sqlite3.Connection):
+    # Running penalty balance - historic penalty rows were never applied, so start at 0
+    _add_columns(conn, "profile", [
+        ("alignment", "TEXT DEFAULT 'neutral'"),
+        ("pending_penalty", "INTEGER DEFAULT 0"),
+    ])
+
+
+def _inventory_bonus_columns(conn: sqlite3.Connection):
+    _add_columns(conn, "inventory", [
+        ("health_bonus", "INTEGER DEFAULT 0"),
+        ("speed_bonus", "INTEGER DEFAULT 0"),
+        ("luck_bonus", "REAL DEFAULT 0.0"),
+        ("crit_bonus", "REAL DEFAULT 0.0"),
+        ("magic_bonus", "INTEGER DEFAULT 0"),
+        ("slot_type", "TEXT"),
+    ])
+
+
+def _epic_adventures(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS epic_adventures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER REFERENCES profile(user_id) ON DELETE CASCADE,
+            adventure_type TEXT,
+            adventure_name TEXT,
+            difficulty INTEGER,
+            started_at TEXT,
+            finish_at TEXT,
+            base_xp_reward INTEGER,
+            base_gold_reward INTEGER,
+            item_quality_min INTEGER,
+            item_quality_max INTEGER,
+            status TEXT DEFAULT 'active'
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_epic_adventures_user ON epic_adventures(user_id, status)")
+
+
+def _backfill_slot_types(conn: sqlite3.Connection):
+    # Infer NULL slot_type values from the item type in a single pass
+    conn.execute("""
+        UPDATE inventory SET slot_type = CASE
+            WHEN type = 'Shield' THEN 'shield'
+            WHEN type = 'Helmet' THEN 'head'
+            WHEN type = 'Chestplate' THEN 'chest'
+            WHEN type = 'Leggings' THEN 'legs'
+            WHEN type = 'Gauntlets' THEN 'hands'
+            WHEN type = 'Boots' THEN 'feet'
+            ELSE 'weapon'
+        END
+        WHERE slot_type IS NULL
+    """)
+
+
+def _presence_days(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS presence_days (
+            user_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            intervals BLOB NOT NULL,
+            online_seconds INTEGER NOT NULL,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_presence_days_day ON presence_days(day)")
+
+
+def _economy_aggregates(conn: sqlite3.Connection):
+    _add_columns(conn, "inventory", [
+        ("stat_total", """INTEGER GENERATED ALWAYS AS (
+            COALESCE(damage, 0) + COALESCE(armor, 0) + COALESCE(health_bonus, 0) + COALESCE(speed_bonus, 0)
+            + CAST(COALESCE(luck_bonus, 0.0) * 100 AS INTEGER) + CAST(COALESCE(crit_bonus, 0.0) * 100 AS INTEGER)
+            + COALESCE(magic_bonus, 0)
+        ) VIRTUAL"""),
+        ("rarity", """TEXT GENERATED ALWAYS AS (
+            CASE WHEN stat_total >= 50 THEN 'divine' WHEN stat_total >= 45 THEN 'mythic'
+                 WHEN stat_total >= 40 THEN 'legendary' WHEN stat_total >= 30 THEN 'magic'
+                 WHEN stat_total >= 20 THEN 'rare' WHEN stat_total >= 10 THEN 'uncommon' ELSE 'common' END
+        ) VIRTUAL"""),
+    ])
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS economy_totals (
+            metric TEXT PRIMARY KEY,          -- money_supply, characters, items, item_value, market_listings, market_value
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS economy_rarity (
+            rarity TEXT PRIMARY KEY,          -- inventory.rarity
+            items INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS money_supply_daily (
+            day TEXT PRIMARY KEY,             -- UTC date
+            created INTEGER NOT NULL DEFAULT 0,
+            destroyed INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS transactions_daily (
+            day TEXT NOT NULL,                -- UTC date
+            subject TEXT NOT NULL,
+            transactions INTEGER NOT NULL DEFAULT 0,
+            amount INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, subject)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS economy_profile_insert AFTER INSERT ON profile
+        BEGIN
+            INSERT INTO economy_totals (metric, value) VALUES ('money_supply', COALESCE(NEW.money, 0)), ('characters', 1)
+                ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO money_supply_daily (day, created) VALUES (date('now'), COALESCE(NEW.money, 0))
+                ON CONFLICT(day) DO UPDATE SET created = created + excluded.created;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS economy_profile_money AFTER UPDATE OF money ON profile
+        WHEN NEW.money IS NOT OLD.money
+        BEGIN
+            INSERT INTO economy_totals (metric, value) VALUES ('money_supply', COALESCE(NEW.money, 0) - COALESCE(OLD.money, 0))
+                ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO money_supply_daily (day, created, destroyed)
+                VALUES (date('now'), MAX(COALESCE(NEW.money, 0) - COALESCE(OLD.money, 0), 0),
+                        MAX(COALESCE(OLD.money, 0) - COALESCE(NEW.money, 0), 0))
+                ON CONFLICT(day) DO UPDATE SET created = created + excluded.created,
+                                               destroyed = destroyed + excluded.destroyed;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS economy_profile_delete AFTER DELETE ON profile
+        BEGIN
+            INSERT INTO economy_totals (metric, value) VALUES ('money_supply', -COALESCE(OLD.money, 0)), ('characters', -1)
+                ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO money_supply_daily (day, destroyed) VALUES (date('now'), COALESCE(OLD.money, 0))
+                ON CONFLICT(day) DO UPDATE SET destroyed = destroyed + excluded.destroyed;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS economy_inventory_insert AFTER INSERT ON inventory
+        BEGIN
+            INSERT INTO economy_totals (metric, value) VALUES ('items', 1), ('item_value', COALESCE(NEW.value, 0))
+                ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO economy_rarity (rarity, items) VALUES (NEW.rarity, 1)
+                ON CONFLICT(rarity) DO UPDATE SET items = items + 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS economy_inventory_update
+        AFTER UPDATE OF damage, armor, health_bonus, speed_bonus, luck_bonus, crit_bonus, magic_bonus, value ON inventory
+        BEGIN
+            INSERT INTO economy_totals (metric, value) VALUES ('item_value', COALESCE(NEW.value, 0) - COALESCE(OLD.value, 0))
+                ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+            UPDATE economy_rarity SET items = items - 1 WHERE rarity = OLD.rarity;
+            INSERT INTO economy_rarity (rarity, items) VALUES (NEW.rarity, 1)
+                ON CONFLICT(rarity) DO UPDATE SET items = items + 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS economy_inventory_delete AFTER DELETE ON inventory
+        BEGIN
+            INSERT INTO economy_totals (metric, value) VALUES ('items', -1), ('item_value', -COALESCE(OLD.value, 0))
+                ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+            UPDATE economy_rarity SET items = items - 1 WHERE rarity = OLD.rarity;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS economy_market_insert AFTER INSERT ON market
+        BEGIN
+            INSERT INTO economy_totals (metric, value) VALUES ('market_listings', 1), ('market_value', NEW.price)
+                ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS economy_market_price AFTER UPDATE OF price ON market
+        BEGIN
+            INSERT INTO economy_totals (metric, value) VALUES ('market_value', NEW.price - OLD.price)
+                ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS economy_market_delete AFTER DELETE ON market
+        BEGIN
+            INSERT INTO economy_totals (metric, value) VALUES ('market_listings', -1), ('market_value', -OLD.price)
+                ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS economy_transactions_insert AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_daily (day, subject, transactions, amount)
+                VALUES (date(COALESCE(NEW.timestamp, 'now')), COALESCE(NEW.subject, ''), 1, COALESCE(NEW.amount, 0))
+                ON CONFLICT(day, subject) DO UPDATE SET transactions = transactions + 1,
+                                                        amount = amount + excluded.amount;
+        END
+    """)
+
+    # Start the counters from one full scan; the triggers keep them current from here
+    for table in ("economy_totals", "economy_rarity", "transactions_daily"):
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("""
+        INSERT INTO economy_totals (metric, value)
+        SELECT 'money_supply', COALESCE(SUM(money), 0) FROM profile
+        UNION ALL SELECT 'characters', COUNT(*) FROM profile
+        UNION ALL SELECT 'items', COUNT(*) FROM inventory
+        UNION ALL SELECT 'item_value', COALESCE(SUM(value), 0) FROM inventory
+        UNION ALL SELECT 'market_listings', COUNT(*) FROM market
+        UNION ALL SELECT 'market_value', COALESCE(SUM(price), 0) FROM market
+    """)
+    conn.execute("INSERT INTO economy_rarity (rarity, items) SELECT rarity, COUNT(*) FROM inventory GROUP BY rarity")
+    conn.execute("""
+        INSERT INTO transactions_daily (day, subject, transactions, amount)
+        SELECT date(timestamp), COALESCE(subject, ''), COUNT(*), COALESCE(SUM(amount), 0)
+        FROM transactions GROUP BY date(timestamp), COALESCE(subject, '')
+    """)
+
+
+def _history_rollups(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS history_rollups (
+            table_name TEXT NOT NULL,
+            month TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            entries INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            PRIMARY KEY (table_name, month, kind)
+        ) WITHOUT ROWID
+    """)
+
+
+def _pack_info(info: str) -> Optional[bytes]:
+    details = json.loads(info)
+    if not isinstance(details, dict):
+        return None
+    for field in TYPED_FIELDS:
+        details.pop(field, None)
+    return pack_details(details)
+
+
+def _transaction_columns(conn: sqlite3.Connection):
+    # Split the JSON info into typed columns and packed details, then drop it
+    _add_columns(conn, "transactions", [
+        ("item_id", "INTEGER"),
+        ("item", "TEXT"),
+        ("won", "INTEGER"),
+        ("details", "BLOB"),
+    ])
+    if "info" in _columns(conn, "transactions"):
+        conn.create_function("rpg_pack_info", 1, _pack_info, deterministic=True)
+        conn.execute("""
+            UPDATE transactions SET
+                item_id = json_extract(info, '$.item_id'),
+                item = json_extract(info, '$.item'),
+                won = json_extract(info, '$.won'),
+                details = rpg_pack_info(info)
+            WHERE info IS NOT NULL AND json_valid(info)
+        """)
+        conn.execute("ALTER TABLE transactions DROP COLUMN info")
+    conn.execute("DROP INDEX IF EXISTS idx_transactions_users")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_from ON transactions(from_user, timestamp, subject, amount)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_to ON transactions(to_user, timestamp, subject, amount)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_subject ON transactions(subject, timestamp)")
+
+
+# Level reached with NEW.xp, looked up in level_thresholds
+_LEVEL_FOR_NEW_XP = "(SELECT level FROM level_thresholds WHERE xp <= MAX(0, COALESCE(NEW.xp, 0)) ORDER BY xp DESC LIMIT 1)"
+
+
+def _level_pipeline(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS level_thresholds (
+            xp INTEGER PRIMARY KEY,
+            level INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        INSERT OR IGNORE INTO level_thresholds (xp, level)
+        WITH RECURSIVE levels(level) AS (SELECT 1 UNION ALL SELECT level + 1 FROM levels WHERE level < 50)
+        SELECT 100 * (level - 1) * (level - 1), level FROM levels
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS level_ups (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES profile(user_id) ON DELETE CASCADE,
+            old_level INTEGER NOT NULL,
+            new_level INTEGER NOT NULL,
+            reached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Correct stale levels once without the triggers, so the fixes aren't queued as level-ups
+    conn.execute("DROP TRIGGER IF EXISTS profile_level_insert")
+    conn.execute("DROP TRIGGER IF EXISTS profile_level_update")
+    level_for_xp = _LEVEL_FOR_NEW_XP.replace("NEW.xp", "profile.xp")
+    conn.execute(f"UPDATE profile SET level = {level_for_xp} WHERE level IS NOT {level_for_xp}")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS profile_level_insert AFTER INSERT ON profile
+        WHEN NEW.level IS NOT {_LEVEL_FOR_NEW_XP}
+        BEGIN
+            UPDATE profile SET level = {_LEVEL_FOR_NEW_XP} WHERE user_id = NEW.user_id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS profile_level_update AFTER UPDATE OF xp, level ON profile
+        WHEN NEW.level IS NOT {_LEVEL_FOR_NEW_XP}
+        BEGIN
+            UPDATE profile SET level = {_LEVEL_FOR_NEW_XP} WHERE user_id = NEW.user_id;
+            INSERT INTO level_ups (user_id, old_level, new_level)
+                SELECT user_id, OLD.level, level FROM profile WHERE user_id = NEW.user_id AND level > OLD.level;
+        END
+    """)
+
+
+# (version, description, migration) - append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "profile alignment and pending_penalty columns", _profile_columns),
+    (2, "inventory bonus stat and slot_type columns", _inventory_bonus_columns),
+    (3, "epic_adventures table", _epic_adventures),
+    (4, "backfill inventory slot_type", _backfill_slot_types),
+    (5, "presence_days table", _presence_days),
+    (6, "economy aggregate tables and triggers, inventory rarity column", _economy_aggregates),
+    (7, "history_rollups table for archived history", _history_rollups),
+    (8, "typed transaction columns and packed details instead of JSON info", _transaction_columns),
+    (9, "level_thresholds, level_ups queue and level triggers on profile", _level_pipeline),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, schema_path: str) -> Tuple[int, int]:
+    """Bring the database up to SCHEMA_VERSION, returns (old version, new version)"""
+    version = started = get_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version, version
+
+    if version == 0:
+        is_new = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'profile'"
+        ).fetchone() is None
+        with open(schema_path, 'r') as f:
+            conn.executescript(f.read())
+        if is_new:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+            logger.info(f"Created database schema version {SCHEMA_VERSION}")
+            return 0, SCHEMA_VERSION
+
+    if conn.in_transaction:
+        conn.commit()
+    for number, description, migration in MIGRATIONS:
+        if number <= version:
+            continue
+        conn.execute("BEGIN")
+        try:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Migration {number} ({description}) failed, database left at version {version}")
+            raise
+        logger.info(f"Applied migration {number}: {description}")
+        version = number
+    return started, version
@@ -0,0 +1,267 @@
+"""Per-channel outbound message queue - paced, prioritised and coalesced"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger('DiscordRPG.Outbox')
+
+# Discord limits for a single message
+MAX_CONTENT = 2000
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+
+class Priority(IntEnum):
+    """Lower values are sent first"""
+    REPLY = 0    # Output a user is waiting on after a command
+    EVENT = 1    # Results players care about (raid outcomes, level ups, completions)
+    AMBIENT = 2  # Autoplay chatter and battle narration
+
+
+class Outgoing:
+    """One queued message request"""
+
+    __slots__ = ('priority', 'seq', 'content', 'embed', 'merge', 'queued_at', 'future')
+
+    def __init__(self, priority: Priority, seq: int, content: Optional[str],
+                 embed: Optional[discord.Embed], merge: bool, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.content = content
+        self.embed = embed
+        self.merge = merge
+        self.queued_at = time.perf_counter()
+        self.future = future
+
+    def __lt__(self, other: "Outgoing") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class ChannelTransport:
+    """Delivers batches with discord.py"""
+
+    async def send(self, channel, content: Optional[str], embeds: List[discord.Embed]):
+        if embeds:
+            return await channel.send(content=content, embeds=embeds)
+        return await channel.send(content=content)
+
+
+class StubMessage:
+    """Message handed back by StubTransport"""
+
+    def __init__(self, transport: "StubTransport", channel, content, embeds):
+        self.transport = transport
+        self.channel = channel
+        self.content = content
+        self.embeds = embeds
+
+    async def edit(self, content: Optional[str] = None, embed: Optional[discord.Embed] = None, **kwargs):
+        self.transport.edits.append((self.channel.id, content, embed))
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embeds = [embed]
+        return self
+
+
+class StubTransport:
+    """Records what would have been sent instead of calling Discord (tests, benchmarks)"""
+
+    def __init__(self):
+        self.sent: List[Tuple[int, Optional[str], List[discord.Embed]]] = []
+        self.edits: List[Tuple[int, Optional[str], Optional[discord.Embed]]] = []
+
+    async def send(self, channel, content: Optional[str], embeds: List[discord.Embed]):
+        self.sent.append((channel.id, content, list(embeds)))
+        return StubMessage(self, channel, content, list(embeds))
+
+
+class ChannelQueue:
+    """Pending messages and send budget for one channel"""
+
+    def __init__(self, channel, rate: Optional[int], per: float):
+        self.channel = channel
+        self.heap: List[Outgoing] = []
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate or 0)
+        self.refilled_at = time.monotonic()
+        self.skipped = 0  # Ambient messages dropped since the last send
+        self.worker: Optional[asyncio.Task] = None
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.refilled_at) * self.rate / self.per)
+        self.refilled_at = now
+
+    def wait_time(self) -> float:
+        """Seconds until a message may be sent (0 when unpaced)"""
+        if not self.rate:
+            return 0.0
+        self.refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) * self.per / self.rate
+
+
+class Outbox:
+    """Queues every ambient message so bursts stay inside Discord's per-channel limits
+
+    Each channel gets a token bucket (`rate` messages per `per` seconds) and
+    a worker that sends the highest priority message first, folding the
+    messages queued behind it into the same send: consecutive text lines
+    join into one message and embeds ride along up to 10 per message.
+    Command replies go straight through discord.py, but reserve() takes
+    their token from the bucket so ambient output yields to them. When a
+    channel backs up past `max_backlog`, the oldest ambient messages are
+    dropped and the next message notes how many were skipped.
+    """
+
+    def __init__(self, transport=None, metrics=None, rate: Optional[int] = 5, per: float = 5.0,
+                 max_backlog: int = 25):
+        self.transport = transport or ChannelTransport()
+        self.metrics = metrics
+        self.rate = rate
+        self.per = per
+        self.max_backlog = max_backlog
+        self.channels: Dict[int, ChannelQueue] = {}
+        self._seq = itertools.count()
+
+    def _queue(self, channel) -> ChannelQueue:
+        queue = self.channels.get(channel.id)
+        if queue is None:
+            queue = self.channels[channel.id] = ChannelQueue(channel, self.rate, self.per)
+        return queue
+
+    def send(self, channel, content: Optional[str] = None, embed: Optional[discord.Embed] = None,
+             priority: Priority = Priority.AMBIENT, merge: bool = True) -> asyncio.Future:
+        """Queue a message, returns a future for the sent discord.Message (None if dropped or failed)
+
+        Pass merge=False for a message that will be edited later, so it is sent on its own.
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queue(channel)
+        heapq.heappush(queue.heap, Outgoing(priority, next(self._seq), content, embed, merge, future))
+        if len(queue.heap) > self.max_backlog:
+            self._shed(queue)
+        self._update_depth()
+        if queue.worker is None or queue.worker.done():
+            queue.worker = asyncio.create_task(self._run(queue))
+        return future
+
+    def reserve(self, channel_id: int):
+        """Charge a direct send (a command reply) to the channel's budget"""
+        queue = self.channels.get(channel_id)
+        if queue is not None and queue.rate:
+            queue.refill()
+            queue.tokens = max(-queue.rate, queue.tokens - 1)
+
+    def _shed(self, queue: ChannelQueue):
+        """Drop the oldest ambient messages until the backlog fits"""
+        excess = len(queue.heap) - self.max_backlog
+        ambient = sorted(item for item in queue.heap if item.priority == Priority.AMBIENT)[:excess]
+        if not ambient:
+            return
+        dropped = set(map(id, ambient))
+        queue.heap = [item for item in queue.heap if id(item) not in dropped]
+        heapq.heapify(queue.heap)
+        for item in ambient:
+            if not item.future.done():
+                item.future.set_result(None)
+        queue.skipped += len(ambient)
+        if self.metrics is not None:
+            self.metrics.outbound_dropped += len(ambient)
+
+    def _take_batch(self, queue: ChannelQueue) -> List[Outgoing]:
+        """Pop the next message plus whatever can share its send"""
+        first = heapq.heappop(queue.heap)
+        batch = [first]
+        if not first.merge:
+            return batch
+
+        content_length = len(first.content or "")
+        embeds = 1 if first.embed else 0
+        embed_chars = len(first.embed) if first.embed else 0
+        while queue.heap:
+            candidate = queue.heap[0]
+            if candidate.priority != first.priority or not candidate.merge:
+                break
+            if candidate.content:
+                # Text can't follow an embed without reordering what players read
+                if embeds or content_length + 1 + len(candidate.content) > MAX_CONTENT:
+                    break
+                content_length += (1 if content_length else 0) + len(candidate.content)
+            if candidate.embed:
+                if embeds >= MAX_EMBEDS or embed_chars + len(candidate.embed) > MAX_EMBED_CHARS:
+                    break
+                embeds += 1
+                embed_chars += len(candidate.embed)
+            batch.append(heapq.heappop(queue.heap))
+        return batch
+
+    async def _run(self, queue: ChannelQueue):
+        while queue.heap:
+            delay = queue.wait_time()
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+
+            batch = self._take_batch(queue)
+            self._update_depth()
+            content = "\n".join(item.content for item in batch if item.content) or None
+            embeds = [item.embed for item in batch if item.embed]
+            if queue.skipped and batch[0].priority == Priority.AMBIENT:
+                note = f"*…{queue.skipped} quieter update{'s' if queue.skipped != 1 else ''} skipped to keep up*"
+                if len(note) + 1 + len(content or "") <= MAX_CONTENT:
+                    content = f"{note}\n{content}" if content else note
+                    queue.skipped = 0
+
+            if queue.rate:
+                queue.tokens -= 1
+            message = None
+            try:
+                message = await self.transport.send(queue.channel, content, embeds)
+            except discord.HTTPException as e:
+                logger.warning(f"Send to channel {queue.channel.id} failed: {e}")
+            except Exception as e:
+                logger.error(f"Outbox error in channel {queue.channel.id}: {e}")
+
+            sent_at = time.perf_counter()
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_result(message)
+                if self.metrics is not None:
+                    self.metrics.outbound_latency.observe(sent_at - item.queued_at)
+            if self.metrics is not None:
+                self.metrics.outbound_messages += 1
+                self.metrics.outbound_requests += len(batch)
+
+    def _update_depth(self):
+        if self.metrics is not None:
+            self.metrics.outbound_depth = self.depth
+
+    @property
+    def depth(self) -> int:
+        """Messages waiting across all channels"""
+        return sum(len(queue.heap) for queue in self.channels.values())
+
+    async def drain(self):
+        """Wait until every channel's queue is empty"""
+        while any(queue.worker and not queue.worker.done() for queue in self.channels.values()):
+            await asyncio.gather(*(queue.worker for queue in self.channels.values() if queue.worker),
+                                 return_exceptions=True)
+
+    def close(self):
+        """Stop every worker, resolving anything unsent with None"""
+        for queue in self.channels.values():
+            if queue.worker:
+                queue.worker.cancel()
+            for item in queue.heap:
+                if not item.future.done():
+                    item.future.set_result(None)
+            queue.heap.clear()
+        self._update_depth()
@@ -0,0 +1,116 @@
+"""Narrative playback - battles resolve instantly, their story is streamed later"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+from utils.outbox import Outbox, Priority
+
+logger = logging.getLogger('DiscordRPG.Playback')
+
+
+class Script:
+    """Ordered narrative steps for one resolved event
+
+    Each step waits `delay` seconds, then either sends a new message or edits
+    the last message this script sent. Embeds are copied when a step is
+    added, so the caller can keep mutating one embed between steps.
+    """
+
+    def __init__(self, channel, priority: Priority = Priority.AMBIENT):
+        self.channel = channel
+        self.priority = priority
+        self.steps: List[Tuple[str, float, Optional[str], Optional[discord.Embed]]] = []
+        self.done: Optional[asyncio.Future] = None  # Set by PlaybackScheduler.play
+
+    def send(self, content: Optional[str] = None, embed: Optional[discord.Embed] = None,
+             delay: float = 0.0) -> "Script":
+        self.steps.append(('send', delay, content, embed.copy() if embed else None))
+        return self
+
+    def edit(self, embed: discord.Embed, delay: float = 0.0) -> "Script":
+        self.steps.append(('edit', delay, None, embed.copy()))
+        return self
+
+    @property
+    def duration(self) -> float:
+        return sum(delay for _, delay, _, _ in self.steps)
+
+
+class PlaybackScheduler:
+    """Plays scripts to their channels at presentation pace
+
+    Scripts for the same channel play one after another so narratives never
+    interleave; different channels play concurrently. Sends go through the
+    outbox at the script's priority. Game state is already committed when a
+    script is queued, so a failed or cancelled playback only loses messages.
+    """
+
+    def __init__(self, outbox: Outbox):
+        self.outbox = outbox
+        self._queues: Dict[int, List[Script]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+
+    def play(self, script: Script) -> asyncio.Future:
+        """Queue a script, returns a future that resolves once it has played"""
+        script.done = asyncio.get_running_loop().create_future()
+        if not script.steps:
+            script.done.set_result(None)
+            return script.done
+        channel_id = script.channel.id
+        self._queues.setdefault(channel_id, []).append(script)
+        if channel_id not in self._workers:
+            self._workers[channel_id] = asyncio.create_task(self._run(channel_id))
+        return script.done
+
+    @property
+    def pending(self) -> int:
+        """Scripts queued or playing"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def _run(self, channel_id: int):
+        queue = self._queues[channel_id]
+        try:
+            while queue:
+                script = queue[0]
+                try:
+                    await self._perform(script)
+                except discord.HTTPException as e:
+                    logger.warning(f"Playback to channel {channel_id} failed: {e}")
+                except Exception as e:
+                    logger.error(f"Playback error in channel {channel_id}: {e}")
+                finally:
+                    queue.pop(0)
+                    if not script.done.done():
+                        script.done.set_result(None)
+        finally:
+            for script in queue:
+                if not script.done.done():
+                    script.done.cancel()
+            del self._queues[channel_id]
+            del self._workers[channel_id]
+
+    async def _perform(self, script: Script):
+        message = None
+        steps = script.steps
+        for index, (kind, delay, content, embed) in enumerate(steps):
+            if delay:
+                await asyncio.sleep(delay)
+            if kind == 'send':
+                # A message that is edited later must not be merged with others
+                edited = index + 1 < len(steps) and steps[index + 1][0] == 'edit'
+                message = await self.outbox.send(script.channel, content, embed,
+                                                 priority=script.priority, merge=not edited)
+            elif message is not None:
+                await message.edit(embed=embed)
+
+    async def drain(self):
+        """Wait until every queued script has played"""
+        while self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+
+    def close(self):
+        """Stop playback, dropping anything still queued"""
+        for task in self._workers.values():
+            task.cancel()
@@ -0,0 +1,1184 @@
+"""PostgreSQL backend: the Repository on an asyncpg connection pool
+
+Used when DATABASE_URL is a postgres:// URL. schema_postgres.sql mirrors
+schema.sql table for table, so rows come back with the same columns, 0/1
+flags and UTC text timestamps as from SQLite, and the same triggers keep
+levels and the economy aggregates current. The SQL here is PostgreSQL's own;
+utils/database.py keeps the SQLite dialect.
+"""
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.database import (ARCHIVE_CHUNK, HISTORY_TABLES, INCREMENT_COLUMNS, LISTING_QUERY,
+                            MAX_PENALTY_PER_ADVENTURE, _group_increments, _utc, profile_character)
+from utils.ledger import split_info, transaction_info
+from utils.repository import Repository, Row
+
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+
+logger = logging.getLogger('DiscordRPG.Postgres')
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), '..', 'schema_postgres.sql')
+
+# Summed damage, armor and bonuses of the inventory rows aliased `i` (luck and crit scaled by 100)
+EQUIPMENT_POWER = """(COALESCE(SUM(i.damage + i.armor + COALESCE(i.health_bonus, 0)
+                                 + COALESCE(i.speed_bonus, 0) + COALESCE(i.magic_bonus, 0)), 0)::BIGINT
+                    + trunc(COALESCE(SUM(COALESCE(i.luck_bonus, 0.0)), 0.0) * 100)::BIGINT
+                    + trunc(COALESCE(SUM(COALESCE(i.crit_bonus, 0.0)), 0.0) * 100)::BIGINT)"""
+
+INSERT_ITEM = """INSERT INTO inventory (owner, name, value, type, damage, armor, hand,
+                                     health_bonus, speed_bonus, luck_bonus, crit_bonus,
+                                     magic_bonus, slot_type)
+                 VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)"""
+
+def _param(value):
+    """A parameter as the SQLite backend would store it: datetimes become ISO text"""
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def _rowcount(status: str) -> int:
+    """Rows affected, from a command status such as 'UPDATE 3' or 'INSERT 0 1'"""
+    count = status.rsplit(" ", 1)[-1]
+    return int(count) if count.isdigit() else 0
+
+def _among(column: str, user_ids: Optional[Iterable[int]], param: int) -> tuple:
+    """SQL condition and params limiting column to user_ids as parameter $param (no limit when None)"""
+    if user_ids is None:
+        return "TRUE", ()
+    return f"{column} = ANY(${param}::BIGINT[])", (list(user_ids),)
+
+def _increment_clause(columns: List[str]) -> str:
+    """SET clause adding parameters $1.. to the columns"""
+    return ", ".join(f"{column} = {column} + ${n}" for n, column in enumerate(columns, 1))
+
+class PostgresRepository(Repository):
+    """The Repository on PostgreSQL
+
+    Every statement is awaited on a pooled connection; the multi-statement
+    operations documented as atomic run in one transaction on one
+    connection, with row locks taking the place of SQLite's BEGIN IMMEDIATE.
+    """
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10, **pool_options):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool_options = pool_options  # Passed on to asyncpg.create_pool (server_settings, ...)
+        self._pool = None
+        # Set inside batch(); per task, so other tasks' increments aren't swept into a batch
+        self._pending_deltas: ContextVar = ContextVar(f"pending_deltas_{id(self)}", default=None)
+
+    # Connection lifecycle
+    async def init_database(self):
+        """Connect and apply schema_postgres.sql (every statement in it is idempotent)"""
+        if not ASYNCPG_AVAILABLE:
+            raise RuntimeError("DATABASE_URL points at PostgreSQL but asyncpg is not installed")
+        if self._pool is None:
+            self._pool = await asyncpg.create_pool(self.dsn, min_size=self.min_size,
+                                                   max_size=self.max_size, **self.pool_options)
+        with open(SCHEMA_PATH) as f:
+            schema = f.read()
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                # Two instances starting together would otherwise race on the CREATEs
+                await conn.execute("SELECT pg_advisory_xact_lock(hashtext('discordrpg schema'))")
+                await conn.execute("SET LOCAL client_min_messages = warning")
+                await conn.execute(schema)
+        logger.info("PostgreSQL schema is current")
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    def _record(self, query: str, args: tuple, started: float, rows: int):
+        # The Database argument is only for SQLite's EXPLAIN QUERY PLAN
+        self.query_stats.record(None, query, args, time.perf_counter() - started, rows)
+
+    async def _execute(self, query: str, *args, conn=None) -> int:
+        """Run a statement on conn (or any pooled connection), returns the rows it affected"""
+        args = tuple(_param(arg) for arg in args)
+        started = time.perf_counter()
+        count = _rowcount(await (conn or self._pool).execute(query, *args))
+        if self.query_stats is not None:
+            self._record(query, args, started, count)
+        return count
+
+    async def _executemany(self, query: str, rows: List[tuple], conn=None):
+        rows = [tuple(_param(arg) for arg in row) for row in rows]
+        if not rows:
+            return
+        started = time.perf_counter()
+        await (conn or self._pool).executemany(query, rows)
+        if self.query_stats is not None:
+            self._record(query, rows[0], started, len(rows))
+
+    async def _fetch(self, query: str, *args, conn=None) -> List[Row]:
+        args = tuple(_param(arg) for arg in args)
+        started = time.perf_counter()
+        rows = await (conn or self._pool).fetch(query, *args)
+        if self.query_stats is not None:
+            self._record(query, args, started, len(rows))
+        return rows
+
+    async def _fetchrow(self, query: str, *args, conn=None) -> Optional[Row]:
+        args = tuple(_param(arg) for arg in args)
+        started = time.perf_counter()
+        row = await (conn or self._pool).fetchrow(query, *args)
+        if self.query_stats is not None:
+            self._record(query, args, started, 1 if row else 0)
+        return row
+
+    async def _fetchval(self, query: str, *args, conn=None):
+        row = await self._fetchrow(query, *args, conn=conn)
+        return row[0] if row else None
+
+    # Characters
+    async def create_character(self, user_id: int, name: str) -> bool:
+        """Create a new character"""
+        try:
+            await self._execute(
+                """INSERT INTO profile (user_id, name, money, xp, level, last_date)
+                   VALUES ($1, $2, 100, 0, 1, left(rpg_utc_now(), 10))""",
+                user_id, name
+            )
+            return True
+        except asyncpg.IntegrityConstraintViolationError:
+            return False
+
+    async def get_profile_ids(self) -> set:
+        return {row[0] for row in await self._fetch("SELECT user_id FROM profile")}
+
+    async def bulk_create_characters(self, members: List[tuple], created_at: datetime,
+                                     starter_items: List[tuple] = ()) -> List[int]:
+        """Create characters for (user_id, name) pairs in one transaction, see Database.bulk_create_characters"""
+        if not members:
+            return []
+
+        async with self._pool.acquire() as conn:
+            tx = conn.transaction()
+            await tx.start()
+            try:
+                existing = {row[0] for row in await self._fetch(
+                    "SELECT user_id FROM profile WHERE user_id = ANY($1::BIGINT[])",
+                    [user_id for user_id, _ in members], conn=conn
+                )}
+                created = [(user_id, name) for user_id, name in members if user_id not in existing]
+
+                await self._executemany(
+                    """INSERT INTO profile
+                       (user_id, name, level, xp, money, race, class, health, speed, luck, created_at)
+                       VALUES ($1, $2, 1, 0, 100, 'Human', 'Novice', 100, 10, 1, $3)
+                       ON CONFLICT DO NOTHING""",
+                    [(user_id, name, created_at) for user_id, name in created], conn=conn
+                )
+                await self._executemany(
+                    """INSERT INTO inventory (owner, name, type, value, damage, armor, hand, equipped)
+                       VALUES ($1, $2, $3, $4, $5, $6, $7, 1)""",
+                    [(user_id,) + item for user_id, _ in created for item in starter_items], conn=conn
+                )
+                await tx.commit()
+                return [user_id for user_id, _ in created]
+            except Exception:
+                await tx.rollback()
+                raise
+
+    async def get_character(self, user_id: int) -> Optional[Dict[str, Any]]:
+        row = await self._fetchrow("SELECT * FROM profile WHERE user_id = $1", user_id)
+        return dict(row) if row else None
+
+    async def get_profile(self, user_id: int):
+        return profile_character(await self.get_character(user_id))
+
+    async def get_profile_snapshot(self, user_id: int, now: datetime) -> Optional[Dict[str, Any]]:
+        """Everything !profile and !equipment show, in one round trip (see Database.get_profile_snapshot)"""
+        row = await self._fetchrow(
+            """SELECT p.*, g.name AS guild_name,
+                      COALESCE(e.damage, 0) AS total_damage, COALESCE(e.armor, 0) AS total_armor,
+                      COALESCE(e.health_bonus, 0) AS total_health_bonus,
+                      COALESCE(e.speed_bonus, 0) AS total_speed_bonus,
+                      COALESCE(e.luck_bonus, 0.0) AS total_luck_bonus,
+                      COALESCE(e.crit_bonus, 0.0) AS total_crit_bonus,
+                      COALESCE(e.magic_bonus, 0) AS total_magic_bonus,
+                      COALESCE(e.value, 0) AS total_value,
+                      COALESCE(e.items, '[]') AS items,
+                      COALESCE((SELECT json_agg(json_build_object('blessing_name', b.blessing_name,
+                                                                  'effect', b.effect, 'value', b.value,
+                                                                  'expires_at', b.expires_at)
+                                                ORDER BY b.expires_at)::TEXT
+                                FROM divine_blessings b
+                                WHERE b.user_id = p.user_id AND b.expires_at > $1), '[]') AS blessings
+               FROM profile p
+               LEFT JOIN guild g ON g.id = p.guild
+               CROSS JOIN (SELECT SUM(damage)::BIGINT AS damage, SUM(armor)::BIGINT AS armor,
+                                 SUM(COALESCE(health_bonus, 0))::BIGINT AS health_bonus,
+                                 SUM(COALESCE(speed_bonus, 0))::BIGINT AS speed_bonus,
+                                 SUM(COALESCE(luck_bonus, 0.0)) AS luck_bonus,
+                                 SUM(COALESCE(crit_bonus, 0.0)) AS crit_bonus,
+                                 SUM(COALESCE(magic_bonus, 0))::BIGINT AS magic_bonus,
+                                 SUM(value)::BIGINT AS value,
+                                 json_agg(json_build_object('id', id, 'name', name, 'type', type,
+                                                            'damage', damage, 'armor', armor))::TEXT AS items
+                          FROM inventory WHERE owner = $2 AND equipped = 1) e
+               WHERE p.user_id = $2""",
+            now, user_id
+        )
+        if not row:
+            return None
+        snapshot = dict(row)
+        snapshot['items'] = json.loads(snapshot['items'])
+        snapshot['blessings'] = json.loads(snapshot['blessings'])
+        return snapshot
+
+    def version(self, user_id: int) -> Optional[int]:
+        # Other connections write too; nothing here would see their changes, so nothing is cached
+        return None
+
+    async def list_characters(self, min_level: int = 1,
+                              user_ids: Optional[Iterable[int]] = None) -> List[Row]:
+        among, params = _among("user_id", user_ids, 2)
+        return await self._fetch(
+            f"SELECT user_id, name, level FROM profile WHERE level >= $1 AND {among} ORDER BY level DESC",
+            min_level, *params
+        )
+
+    async def list_idle_characters(self, user_ids: Optional[Iterable[int]] = None) -> List[Row]:
+        among, params = _among("user_id", user_ids, 1)
+        return await self._fetch(
+            f"""SELECT user_id, name, level, pending_penalty FROM profile
+                WHERE {among}
+                AND user_id NOT IN (SELECT user_id FROM adventures WHERE status = 'active')
+                ORDER BY level""",
+            *params
+        )
+
+    async def get_raid_roster(self, user_ids: Iterable[int]) -> List[Row]:
+        return await self._fetch(
+            f"""SELECT p.user_id, p.name, p.level, p.class, p.race, p.luck, p.raidstats,
+                       {EQUIPMENT_POWER} AS equipment_power
+                FROM profile p
+                LEFT JOIN inventory i ON i.owner = p.user_id AND i.equipped = 1
+                WHERE p.user_id = ANY($1::BIGINT[])
+                GROUP BY p.user_id""",
+            list(user_ids)
+        )
+
+    async def get_battle_stats(self, user_ids: Iterable[int], now: datetime) -> List[Row]:
+        return await self._fetch(
+            f"""SELECT p.user_id, p.name, p.level, p.luck, p.money,
+                       COALESCE(e.equipment_power, 0) AS equipment_power,
+                       COALESCE(e.damage_armor, 0) AS damage_armor,
+                       COALESCE(b.luck, 0.0) AS blessing_luck, b.battle_mult AS blessing_battle_mult
+                FROM profile p
+                LEFT JOIN (SELECT i.owner, {EQUIPMENT_POWER} AS equipment_power,
+                                  SUM(i.damage + i.armor)::BIGINT AS damage_armor
+                           FROM inventory i WHERE i.equipped = 1 AND i.owner = ANY($1::BIGINT[])
+                           GROUP BY i.owner) e ON e.owner = p.user_id
+                LEFT JOIN (SELECT user_id,
+                                  SUM(CASE WHEN effect = 'luck' THEN value ELSE 0.0 END) AS luck,
+                                  MAX(CASE WHEN effect = 'battle_mult' THEN value END) AS battle_mult
+                           FROM divine_blessings WHERE expires_at > $2
+                           GROUP BY user_id) b ON b.user_id = p.user_id
+                WHERE p.user_id = ANY($1::BIGINT[])""",
+            list(user_ids), now
+        )
+
+    async def count_characters(self) -> int:
+        return await self._fetchval("SELECT COUNT(*) FROM profile")
+
+    async def delete_character(self, user_id: int):
+        """Delete a character; battle logs keep the fight but lose the reference"""
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await self._execute("UPDATE battle_logs SET attacker = NULL WHERE attacker = $1", user_id, conn=conn)
+                await self._execute("UPDATE battle_logs SET defender = NULL WHERE defender = $1", user_id, conn=conn)
+                await self._execute("DELETE FROM profile WHERE user_id = $1", user_id, conn=conn)
+
+    async def set_alignment(self, user_id: int, alignment: str) -> bool:
+        return await self._execute(
+            "UPDATE profile SET alignment = $1 WHERE user_id = $2", alignment, user_id
+        ) > 0
+
+    async def claim_daily(self, user_id: int, day: str, streak: int, gold: int, xp: int) -> bool:
+        """Pay the daily reward unless it was already claimed on `day`"""
+        return await self._execute(
+            """UPDATE profile SET
+               money = money + $1,
+               xp = xp + $2,
+               last_date = $3,
+               streak = $4
+               WHERE user_id = $5 AND last_date IS DISTINCT FROM $3""",
+            gold, xp, day, streak, user_id
+        ) > 0
+
+    async def update_profile(self, user_id: int, **kwargs) -> bool:
+        return await self.update_character(user_id, **kwargs)
+
+    async def update_character(self, user_id: int, **kwargs) -> bool:
+        if not kwargs:
+            return False
+        set_clause = ", ".join(f"{column} = ${n}" for n, column in enumerate(kwargs, 1))
+        await self._execute(
+            f"UPDATE profile SET {set_clause} WHERE user_id = ${len(kwargs) + 1}",
+            *kwargs.values(), user_id
+        )
+        return True
+
+    async def increment(self, user_id: int, **deltas: int) -> Optional[Dict[str, Any]]:
+        """Atomically add deltas to numeric profile columns, see Database.increment"""
+        invalid = set(deltas) - INCREMENT_COLUMNS
+        if invalid:
+            raise ValueError(f"Cannot increment profile columns: {', '.join(sorted(invalid))}")
+        if not deltas:
+            return None
+
+        pending = self._pending_deltas.get()
+        if pending is not None:
+            user_pending = pending.setdefault(user_id, {})
+            for column, delta in deltas.items():
+                if delta:
+                    user_pending[column] = user_pending.get(column, 0) + delta
+            return None
+
+        columns = sorted(deltas)
+        # The BEFORE trigger has set level by the time RETURNING reads the row
+        returning = columns + ['level'] if 'xp' in deltas else columns
+        row = await self._fetchrow(
+            f"""UPDATE profile SET {_increment_clause(columns)}
+                WHERE user_id = ${len(columns) + 1} RETURNING {', '.join(returning)}""",
+            *(deltas[column] for column in columns), user_id
+        )
+        return dict(row) if row else None
+
+    @asynccontextmanager
+    async def batch(self):
+        """Coalesce increment() calls into one UPDATE per user, written on exit
+
+        Nested batches join the outermost one. Reads inside the block do not
+        see queued deltas; if the block raises, they are discarded.
+        """
+        if self._pending_deltas.get() is not None:
+            yield
+            return
+
+        pending: Dict[int, Dict[str, int]] = {}
+        token = self._pending_deltas.set(pending)
+        try:
+            yield
+        finally:
+            self._pending_deltas.reset(token)
+        groups = _group_increments(pending)
+        if groups:
+            async with self._pool.acquire() as conn:
+                async with conn.transaction():
+                    await self._write_increments(conn, groups)
+
+    async def _write_increments(self, conn, groups: Dict[tuple, List[tuple]]):
+        """One executemany per distinct column set (inside the caller's transaction)"""
+        for columns, rows in groups.items():
+            await self._executemany(
+                f"UPDATE profile SET {_increment_clause(list(columns))} WHERE user_id = ${len(columns) + 1}",
+                rows, conn=conn
+            )
+
+    async def apply_rewards(self, deltas: Dict[int, Dict[str, int]], items: List = ()) -> bool:
+        """Commit a resolved battle's profile deltas and item drops together"""
+        invalid = {column for user_deltas in deltas.values() for column in user_deltas} - INCREMENT_COLUMNS
+        if invalid:
+            raise ValueError(f"Cannot increment profile columns: {', '.join(sorted(invalid))}")
+
+        groups = _group_increments(deltas)
+        if not groups and not items:
+            return False
+
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await self._write_increments(conn, groups)
+                await self._insert_items(conn, items)
+        return True
+
+    async def _insert_items(self, conn, items: List):
+        """Insert generated Item objects for their owner_id (inside the caller's transaction)"""
+        await self._executemany(
+            INSERT_ITEM,
+            [(item.owner_id, item.name, item.value, item.type.value, item.damage, item.armor,
+              item.hand.value, item.health_bonus, item.speed_bonus, item.luck_bonus,
+              item.crit_bonus, item.magic_bonus, item.slot_type) for item in items],
+            conn=conn
+        )
+
+    # Level progression
+    async def get_level_ups(self, limit: int = 500) -> List[Row]:
+        return await self._fetch(
+            """SELECT l.*, p.name FROM level_ups l JOIN profile p ON p.user_id = l.user_id
+               ORDER BY l.id LIMIT $1""",
+            limit
+        )
+
+    async def clear_level_ups(self, last_id: int) -> int:
+        return await self._execute("DELETE FROM level_ups WHERE id <= $1", last_id)
+
+    # Items
+    async def create_item(self, owner_id: int, name: str, item_type: str,
+                          value: int, damage: int, armor: int, hand: str,
+                          health_bonus: int = 0, speed_bonus: int = 0,
+                          luck_bonus: float = 0.0, crit_bonus: float = 0.0,
+                          magic_bonus: int = 0, slot_type: str = None) -> int:
+        return await self._fetchval(
+            INSERT_ITEM + " RETURNING id",
+            owner_id, name, value, item_type, damage, armor, hand,
+            health_bonus, speed_bonus, luck_bonus, crit_bonus, magic_bonus, slot_type
+        )
+
+    async def open_crates(self, user_id: int, crate_type: str, rewards: List[tuple]) -> bool:
+        """Apply a batch of crate rewards in one transaction, see Database.open_crates"""
+        crate_field = f"crates_{crate_type}"
+        if crate_field not in INCREMENT_COLUMNS or not rewards:
+            return False
+
+        async with self._pool.acquire() as conn:
+            tx = conn.transaction()
+            await tx.start()
+            try:
+                updated = await self._execute(
+                    f"""UPDATE profile SET {crate_field} = {crate_field} - $1, money = money + $2
+                        WHERE user_id = $3 AND {crate_field} >= $1""",
+                    len(rewards), sum(money or 0 for _, _, money in rewards), user_id, conn=conn
+                )
+                if updated == 0:
+                    await tx.rollback()
+                    return False
+
+                await self._executemany(
+                    INSERT_ITEM,
+                    [(user_id, item.name, item.value, item.type.value, item.damage, item.armor, item.hand.value,
+                      item.health_bonus, item.speed_bonus, item.luck_bonus, item.crit_bonus,
+                      item.magic_bonus, item.slot_type) for _, item, _ in rewards if item is not None],
+                    conn=conn
+                )
+                await self._executemany(
+                    "INSERT INTO crate_history (user_id, crate_type, item_name, item_stats) VALUES ($1, $2, $3, $4)",
+                    [(user_id, crate_type, item.name if item else "Gold", item.stat_total if item else money)
+                     for _, item, money in rewards],
+                    conn=conn
+                )
+                await tx.commit()
+                return True
+            except Exception:
+                await tx.rollback()
+                raise
+
+    async def get_user_items(self, user_id: int) -> List[Dict[str, Any]]:
+        rows = await self._fetch(
+            "SELECT * FROM inventory WHERE owner = $1 ORDER BY equipped DESC, (damage + armor) DESC",
+            user_id
+        )
+        return [dict(row) for row in rows]
+
+    async def get_equipped_items(self, user_id: int) -> List[Dict[str, Any]]:
+        rows = await self._fetch("SELECT * FROM inventory WHERE owner = $1 AND equipped = 1", user_id)
+        return [dict(row) for row in rows]
+
+    async def equip_item(self, item_id: int, user_id: int) -> bool:
+        return await self._execute(
+            "UPDATE inventory SET equipped = 1 WHERE id = $1 AND owner = $2", item_id, user_id
+        ) > 0
+
+    async def unequip_item(self, item_id: int, user_id: int) -> bool:
+        return await self._execute(
+            "UPDATE inventory SET equipped = 0 WHERE id = $1 AND owner = $2", item_id, user_id
+        ) > 0
+
+    async def delete_item(self, item_id: int) -> bool:
+        return await self._execute("DELETE FROM inventory WHERE id = $1", item_id) > 0
+
+    async def rename_item(self, item_id: int, name: str) -> bool:
+        return await self._execute("UPDATE inventory SET name = $1 WHERE id = $2", name, item_id) > 0
+
+    async def transfer_item(self, item_id: int, to_user: int) -> bool:
+        return await self._execute("UPDATE inventory SET owner = $1 WHERE id = $2", to_user, item_id) > 0
+
+    async def swap_items(self, item_a: int, owner_a: int, item_b: int, owner_b: int) -> bool:
+        """Trade item_a (owned by owner_a) for item_b (owned by owner_b) in one transaction"""
+        async with self._pool.acquire() as conn:
+            tx = conn.transaction()
+            await tx.start()
+            try:
+                moved = await self._execute(
+                    "UPDATE inventory SET owner = $1 WHERE id = $2 AND owner = $3", owner_b, item_a, owner_a, conn=conn
+                ) + await self._execute(
+                    "UPDATE inventory SET owner = $1 WHERE id = $2 AND owner = $3", owner_a, item_b, owner_b, conn=conn
+                )
+                if moved != 2:
+                    await tx.rollback()
+                    return False
+                await tx.commit()
+                return True
+            except Exception:
+                await tx.rollback()
+                raise
+
+    async def get_item_by_id(self, item_id: int) -> Optional[Dict[str, Any]]:
+        row = await self._fetchrow("SELECT * FROM inventory WHERE id = $1", item_id)
+        return dict(row) if row else None
+
+    async def get_equipped_slots(self, user_id: int) -> Dict[str, Dict[str, Any]]:
+        rows = await self._fetch(
+            """SELECT es.slot, i.* FROM equipped_slots es
+               JOIN inventory i ON es.item_id = i.id
+               WHERE es.user_id = $1""",
+            user_id
+        )
+        return {row['slot']: dict(row) for row in rows}
+
+    async def equip_item_to_slot(self, item_id: int, user_id: int, slot: str) -> bool:
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.transaction():
+                    await self._execute(
+                        "DELETE FROM equipped_slots WHERE user_id = $1 AND slot = $2", user_id, slot, conn=conn
+                    )
+                    await self._execute(
+                        "INSERT INTO equipped_slots (user_id, slot, item_id) VALUES ($1, $2, $3)",
+                        user_id, slot, item_id, conn=conn
+                    )
+                    await self._execute("UPDATE inventory SET equipped = 1 WHERE id = $1", item_id, conn=conn)
+            return True
+        except Exception:
+            return False
+
+    async def unequip_item_from_slot(self, user_id: int, slot: str) -> bool:
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.transaction():
+                    item_id = await self._fetchval(
+                        "DELETE FROM equipped_slots WHERE user_id = $1 AND slot = $2 RETURNING item_id",
+                        user_id, slot, conn=conn
+                    )
+                    if item_id is None:
+                        return False
+                    await self._execute("UPDATE inventory SET equipped = 0 WHERE id = $1", item_id, conn=conn)
+            return True
+        except Exception:
+            return False
+
+    # Guilds
+    async def create_guild(self, name: str, owner_id: int) -> Optional[int]:
+        """Create a guild with its owner as Leader, None if the name is taken"""
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.transaction():
+                    guild_id = await self._fetchval(
+                        "INSERT INTO guild (name, owner, balance) VALUES ($1, $2, 0) RETURNING id",
+                        name, owner_id, conn=conn
+                    )
+                    await self._execute(
+                        "INSERT INTO guild_members (guild_id, user_id, rank) VALUES ($1, $2, 'Leader')",
+                        guild_id, owner_id, conn=conn
+                    )
+                    await self._execute(
+                        "UPDATE profile SET guild = $1 WHERE user_id = $2", guild_id, owner_id, conn=conn
+                    )
+            return guild_id
+        except asyncpg.IntegrityConstraintViolationError:
+            return None
+
+    async def get_guild(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        row = await self._fetchrow("SELECT * FROM guild WHERE id = $1", guild_id)
+        return dict(row) if row else None
+
+    async def get_guild_members(self, guild_id: int) -> List[Dict[str, Any]]:
+        rows = await self._fetch(
+            """SELECT p.*, gm.rank FROM profile p
+               JOIN guild_members gm ON p.user_id = gm.user_id
+               WHERE gm.guild_id = $1""",
+            guild_id
+        )
+        return [dict(row) for row in rows]
+
+    # Market
+    async def list_item_on_market(self, item_id: int, price: int, owner_id: Optional[int] = None,
+                                  fee: int = 0) -> bool:
+        """List an item on the market, see Database.list_item_on_market"""
+        async with self._pool.acquire() as conn:
+            tx = conn.transaction()
+            await tx.start()
+            try:
+                # Locking the item makes a second listing of it wait, then see the first
+                await self._execute("SELECT 1 FROM inventory WHERE id = $1 FOR UPDATE", item_id, conn=conn)
+                listed = await self._execute(
+                    """INSERT INTO market (item_id, price)
+                       SELECT id, $1 FROM inventory
+                       WHERE id = $2 AND ($3::BIGINT IS NULL OR (owner = $3 AND equipped = 0))
+                         AND NOT EXISTS (SELECT 1 FROM market WHERE item_id = $2)""",
+                    price, item_id, owner_id, conn=conn
+                )
+                if listed == 0:
+                    await tx.rollback()
+                    return False
+
+                if fee:
+                    paid = await self._execute(
+                        "UPDATE profile SET money = money - $1 WHERE user_id = $2 AND money >= $1",
+                        fee, owner_id, conn=conn
+                    )
+                    if paid == 0:
+                        await tx.rollback()
+                        return False
+
+                await tx.commit()
+                return True
+            except Exception:
+                await tx.rollback()
+                raise
+
+    async def withdraw_market_item(self, item_id: int, owner_id: int) -> bool:
+        return await self._execute(
+            """DELETE FROM market WHERE item_id = $1
+               AND item_id IN (SELECT id FROM inventory WHERE id = $1 AND owner = $2)""",
+            item_id, owner_id
+        ) > 0
+
+    async def get_market_items(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        rows = await self._fetch(
+            """SELECT m.*, i.* FROM market m
+               JOIN inventory i ON m.item_id = i.id
+               ORDER BY m.listed_at DESC
+               LIMIT $1 OFFSET $2""",
+            limit, offset
+        )
+        return [dict(row) for row in rows]
+
+    async def list_market_listings(self) -> List[Dict[str, Any]]:
+        return [dict(row) for row in await self._fetch(LISTING_QUERY + " ORDER BY m.listed_at, m.id")]
+
+    async def get_market_listing(self, item_id: int) -> Optional[Dict[str, Any]]:
+        row = await self._fetchrow(LISTING_QUERY + " WHERE m.item_id = $1", item_id)
+        return dict(row) if row else None
+
+    async def buy_market_item(self, item_id: int, buyer_id: int,
+                              max_price: Optional[int] = None) -> Optional[Dict[str, int]]:
+        """Buy an item from the market, see Database.buy_market_item
+
+        Deleting the listing locks it, so a second buyer waits and then finds it gone.
+        """
+        async with self._pool.acquire() as conn:
+            tx = conn.transaction()
+            await tx.start()
+            try:
+                sale = await self._fetchrow(
+                    """DELETE FROM market WHERE item_id = $1 AND ($2::BIGINT IS NULL OR price <= $2)
+                       AND (SELECT owner FROM inventory WHERE id = market.item_id) != $3
+                       RETURNING price, (SELECT owner FROM inventory WHERE id = market.item_id) AS seller_id""",
+                    item_id, max_price, buyer_id, conn=conn
+                )
+                if not sale:
+                    await tx.rollback()
+                    return None
+                price, seller_id = sale['price'], sale['seller_id']
+
+                paid = await self._execute(
+                    "UPDATE profile SET money = money - $1 WHERE user_id = $2 AND money >= $1",
+                    price, buyer_id, conn=conn
+                )
+                if paid == 0:
+                    await tx.rollback()
+                    return None
+                await self._execute(
+                    "UPDATE profile SET money = money + $1 WHERE user_id = $2", price, seller_id, conn=conn
+                )
+
+                moved = await self._execute(
+                    "UPDATE inventory SET owner = $1, equipped = 0 WHERE id = $2 AND owner = $3",
+                    buyer_id, item_id, seller_id, conn=conn
+                )
+                if moved == 0:
+                    await tx.rollback()
+                    return None
+
+                await tx.commit()
+                return {'price': price, 'seller_id': seller_id}
+            except Exception:
+                await tx.rollback()
+                raise
+
+    # Adventures
+    async def start_adventure(self, user_id: int, adventure_name: str,
+                              difficulty: int, duration_seconds: int) -> bool:
+        """Start an adventure, taking on the pending chat/nick penalty"""
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.transaction():
+                    pending = await self._fetchval(
+                        "SELECT pending_penalty FROM profile WHERE user_id = $1 FOR UPDATE", user_id, conn=conn
+                    )
+                    penalty = min(pending or 0, MAX_PENALTY_PER_ADVENTURE)
+                    finish_time = datetime.now().timestamp() + duration_seconds + penalty
+                    await self._execute(
+                        """INSERT INTO adventures (user_id, adventure_name, difficulty, finish_at)
+                           VALUES ($1, $2, $3, $4)""",
+                        user_id, adventure_name, difficulty, _utc(finish_time), conn=conn
+                    )
+                    await self._execute(
+                        """UPDATE profile SET last_adventure = rpg_utc_now(),
+                           pending_penalty = GREATEST(0, pending_penalty - $1) WHERE user_id = $2""",
+                        penalty, user_id, conn=conn
+                    )
+            return True
+        except Exception:
+            return False
+
+    async def get_active_adventure(self, user_id: int) -> Optional[Dict[str, Any]]:
+        row = await self._fetchrow(
+            """SELECT * FROM adventures
+               WHERE user_id = $1 AND status = 'active'
+               ORDER BY started_at DESC LIMIT 1""",
+            user_id
+        )
+        return dict(row) if row else None
+
+    async def start_adventures(self, adventures: List[tuple]):
+        """Start auto adventures from (user_id, name, difficulty, started_at, finish_at, penalty) tuples"""
+        if not adventures:
+            return
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await self._executemany(
+                    """INSERT INTO adventures (user_id, adventure_name, difficulty, started_at, finish_at, status)
+                       VALUES ($1, $2, $3, $4, $5, 'active')""",
+                    [adventure[:5] for adventure in adventures], conn=conn
+                )
+                await self._executemany(
+                    "UPDATE profile SET pending_penalty = GREATEST(0, pending_penalty - $1) WHERE user_id = $2",
+                    [(adventure[5], adventure[0]) for adventure in adventures if adventure[5]], conn=conn
+                )
+
+    async def get_finished_adventures(self, now: datetime,
+                                      user_ids: Optional[Iterable[int]] = None) -> List[Row]:
+        among, params = _among("a.user_id", user_ids, 2)
+        return await self._fetch(
+            f"""SELECT a.*, p.name, p.level, p.xp FROM adventures a
+                JOIN profile p ON a.user_id = p.user_id
+                WHERE {among} AND a.status = 'active' AND a.finish_at <= $1""",
+            now, *params
+        )
+
+    async def get_adventure_history(self, user_id: int, limit: int = 10) -> List[Row]:
+        """Most recent finished adventures, continuing into adventures_archive when the hot table runs out"""
+        query = """SELECT * FROM {table}
+                   WHERE user_id = $1 AND status != 'active'
+                   ORDER BY started_at DESC LIMIT $2"""
+        history = await self._fetch(query.format(table='adventures'), user_id, limit)
+        if len(history) < limit:
+            history += await self._fetch(query.format(table='adventures_archive'), user_id, limit - len(history))
+        return history
+
+    async def count_adventures(self, status: str) -> int:
+        """Adventures with a status, including archived ones"""
+        return await self._fetchval(
+            """SELECT (SELECT COUNT(*) FROM adventures WHERE status = $1)
+                    + (SELECT COALESCE(SUM(entries), 0)::BIGINT FROM history_rollups
+                       WHERE table_name = 'adventures' AND kind = $1)""",
+            status
+        )
+
+    async def complete_adventure(self, adventure_id: int, success: bool) -> bool:
+        return await self._execute(
+            "UPDATE adventures SET status = $1 WHERE id = $2",
+            'completed' if success else 'failed', adventure_id
+        ) > 0
+
+    async def complete_adventures(self, rewards: List[tuple]) -> set:
+        """Complete finished adventures and pay them out in one transaction, see Database.complete_adventures"""
+        invalid = {column for _, _, deltas, _ in rewards for column in deltas} - INCREMENT_COLUMNS
+        if invalid:
+            raise ValueError(f"Cannot increment profile columns: {', '.join(sorted(invalid))}")
+        if not rewards:
+            return set()
+
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                completed = {row['id'] for row in await self._fetch(
+                    """UPDATE adventures SET status = 'completed'
+                       WHERE id = ANY($1::BIGINT[]) AND status = 'active' RETURNING id""",
+                    [adventure_id for adventure_id, _, _, _ in rewards], conn=conn
+                )}
+                pending: Dict[int, Dict[str, int]] = {}
+                items = []
+                for adventure_id, user_id, deltas, adventure_items in rewards:
+                    if adventure_id not in completed:
+                        continue
+                    user_pending = pending.setdefault(user_id, {})
+                    for column, delta in deltas.items():
+                        user_pending[column] = user_pending.get(column, 0) + delta
+                    items.extend(adventure_items)
+                await self._write_increments(conn, _group_increments(pending))
+                await self._insert_items(conn, items)
+        return completed
+
+    # Epic adventures
+    async def get_active_epic_adventure(self, user_id: int) -> Optional[Row]:
+        return await self._fetchrow(
+            "SELECT * FROM epic_adventures WHERE user_id = $1 AND status = 'active'", user_id
+        )
+
+    async def count_recent_epic_adventures(self, user_id: int, days: int = 7) -> int:
+        return await self._fetchval(
+            """SELECT COUNT(*) FROM epic_adventures
+               WHERE user_id = $1 AND status = 'completed' AND started_at > $2""",
+            user_id, _utc(time.time() - days * 86400)
+        )
+
+    async def get_finished_epic_adventures(self, now: datetime) -> List[Row]:
+        return await self._fetch(
+            "SELECT * FROM epic_adventures WHERE status = 'active' AND finish_at <= $1", now
+        )
+
+    async def list_epic_candidates(self, min_level: int = 10,
+                                   user_ids: Optional[Iterable[int]] = None) -> List[Row]:
+        among, params = _among("user_id", user_ids, 2)
+        return await self._fetch(
+            f"""SELECT user_id, name, level FROM profile
+                WHERE level >= $1 AND {among}
+                AND user_id NOT IN (
+                    SELECT user_id FROM epic_adventures WHERE status = 'active'
+                )""",
+            min_level, *params
+        )
+
+    async def start_epic_adventure(self, user_id: int, adventure_type: str, adventure_name: str,
+                                   difficulty: int, started_at: datetime, finish_at: datetime,
+                                   xp_reward: int, gold_reward: int,
+                                   quality_min: int, quality_max: int):
+        await self._execute(
+            """INSERT INTO epic_adventures
+               (user_id, adventure_type, adventure_name, difficulty, started_at, finish_at,
+                base_xp_reward, base_gold_reward, item_quality_min, item_quality_max, status)
+               VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, 'active')""",
+            user_id, adventure_type, adventure_name, difficulty, started_at, finish_at,
+            xp_reward, gold_reward, quality_min, quality_max
+        )
+
+    async def complete_epic_adventure(self, adventure_id: int):
+        await self._execute("UPDATE epic_adventures SET status = 'completed' WHERE id = $1", adventure_id)
+
+    # Blessings
+    async def get_active_blessings(self, user_id: int, now: datetime) -> List[Row]:
+        return await self._fetch(
+            "SELECT * FROM divine_blessings WHERE user_id = $1 AND expires_at > $2", user_id, now
+        )
+
+    async def get_active_blessing(self, user_id: int, effect: str, now: datetime) -> Optional[Row]:
+        return await self._fetchrow(
+            "SELECT * FROM divine_blessings WHERE user_id = $1 AND effect = $2 AND expires_at > $3",
+            user_id, effect, now
+        )
+
+    async def add_blessing(self, user_id: int, effect: str, value: float, expires_at: datetime, name: str):
+        await self._execute(
+            """INSERT INTO divine_blessings (user_id, effect, value, expires_at, blessing_name)
+               VALUES ($1, $2, $3, $4, $5)""",
+            user_id, effect, value, expires_at, name
+        )
+
+    async def remove_blessing(self, user_id: int, effect: str):
+        await self._execute("DELETE FROM divine_blessings WHERE user_id = $1 AND effect = $2", user_id, effect)
+
+    async def prune_blessings(self, now: datetime) -> int:
+        return await self._execute("DELETE FROM divine_blessings WHERE expires_at <= $1", now)
+
+    # Penalties
+    async def add_penalty(self, user_id: int, penalty_seconds: int) -> bool:
+        return await self._execute(
+            "UPDATE profile SET pending_penalty = pending_penalty + $1 WHERE user_id = $2",
+            penalty_seconds, user_id
+        ) > 0
+
+    async def get_pending_penalty(self, user_id: int) -> int:
+        pending = await self._fetchval("SELECT pending_penalty FROM profile WHERE user_id = $1", user_id)
+        return min(pending or 0, MAX_PENALTY_PER_ADVENTURE)
+
+    # Economy aggregates
+    async def get_economy_report(self, since: str) -> Dict[str, Any]:
+        """The trigger-maintained economy counters, see Database.get_economy_report"""
+        return {
+            'totals': {row['metric']: row['value']
+                       for row in await self._fetch("SELECT metric, value FROM economy_totals")},
+            'rarity': {row['rarity']: row['items']
+                       for row in await self._fetch("SELECT rarity, items FROM economy_rarity")},
+            'money_flow': await self._fetch(
+                "SELECT day, created, destroyed FROM money_supply_daily WHERE day >= $1 ORDER BY day", since
+            ),
+            'subjects': await self._fetch(
+                """SELECT subject, SUM(transactions)::BIGINT AS transactions, SUM(amount)::BIGINT AS amount
+                   FROM transactions_daily WHERE day >= $1
+                   GROUP BY subject ORDER BY transactions DESC""",
+                since
+            ),
+        }
+
+    # Tournaments
+    async def create_tournament(self, created_by: int, prize: int, participants: List[int]) -> Optional[int]:
+        async with self._pool.acquire() as conn:
+            tx = conn.transaction()
+            await tx.start()
+            try:
+                paid = await self._execute(
+                    "UPDATE profile SET money = money - $1 WHERE user_id = $2 AND money >= $1",
+                    prize, created_by, conn=conn
+                )
+                if paid == 0:
+                    await tx.rollback()
+                    return None
+                tournament_id = await self._fetchval(
+                    """INSERT INTO tournaments (created_by, prize_money, participants, status)
+                       VALUES ($1, $2, $3, 'active') RETURNING id""",
+                    created_by, prize, json.dumps(participants), conn=conn
+                )
+                await tx.commit()
+                return tournament_id
+            except Exception:
+                await tx.rollback()
+                raise
+
+    async def finish_tournament(self, tournament_id: int, winner: int, prize: int):
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await self._execute(
+                    "UPDATE profile SET money = money + $1 WHERE user_id = $2", prize, winner, conn=conn
+                )
+                await self._execute(
+                    """UPDATE tournaments SET winner = $1, ended_at = rpg_utc_now(), status = 'finished'
+                       WHERE id = $2""",
+                    winner, tournament_id, conn=conn
+                )
+
+    # Presence history
+    async def get_presence_days(self, first_day: int, last_day: int,
+                                user_ids: Optional[Iterable[int]] = None) -> List[Row]:
+        among, params = _among("user_id", user_ids, 3)
+        return await self._fetch(
+            f"""SELECT user_id, day, intervals, online_seconds FROM presence_days
+                WHERE day BETWEEN $1 AND $2 AND {among}""",
+            first_day, last_day, *params
+        )
+
+    async def save_presence_days(self, rows: List[tuple]):
+        """Upsert (user_id, day, intervals, online_seconds) rows in one transaction"""
+        if not rows:
+            return
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await self._executemany(
+                    """INSERT INTO presence_days (user_id, day, intervals, online_seconds) VALUES ($1, $2, $3, $4)
+                       ON CONFLICT (user_id, day) DO UPDATE SET
+                           intervals = excluded.intervals, online_seconds = excluded.online_seconds""",
+                    rows, conn=conn
+                )
+
+    # History archive
+    async def archive_history(self, ages: Dict[str, int], now: Optional[float] = None) -> Dict[str, int]:
+        """Move history rows older than ages[table] days into the *_archive tables
+
+        Each chunk of ARCHIVE_CHUNK rows is one statement, so one transaction:
+        deleted from the hot table, copied to its archive and rolled up per
+        month and kind into history_rollups. Autovacuum reuses the freed
+        space. Returns rows moved per table.
+        """
+        now = time.time() if now is None else now
+        moved: Dict[str, int] = {}
+        for table, days in ages.items():
+            column, movable, kind, amount, _ = HISTORY_TABLES[table]
+            while True:
+                count = await self._fetchval(
+                    f"""WITH moved AS (
+                            DELETE FROM {table} WHERE id IN (
+                                SELECT id FROM {table} WHERE {movable} AND {column} < $1 ORDER BY id LIMIT $2
+                            ) RETURNING *
+                        ), archived AS (
+                            INSERT INTO {table}_archive SELECT * FROM moved
+                        ), rolled AS (
+                            INSERT INTO history_rollups (table_name, month, kind, entries, amount)
+                            SELECT $3, substr({column}, 1, 7), COALESCE({kind}, ''), COUNT(*), COALESCE(SUM({amount}), 0)
+                            FROM moved GROUP BY 2, 3
+                            ON CONFLICT (table_name, month, kind) DO UPDATE SET
+                                entries = history_rollups.entries + excluded.entries,
+                                amount = history_rollups.amount + excluded.amount
+                        )
+                        SELECT COUNT(*) FROM moved""",
+                    _utc(now - days * 86400), ARCHIVE_CHUNK, table
+                )
+                if count:
+                    moved[table] = moved.get(table, 0) + count
+                if count < ARCHIVE_CHUNK:
+                    break
+        return moved
+
+    async def enable_incremental_vacuum(self) -> bool:
+        # Autovacuum already makes freed pages reusable; there is no file mode to switch
+        return False
+
+    async def incremental_vacuum_enabled(self) -> bool:
+        return True
+
+    async def get_history_rollups(self, table: Optional[str] = None) -> List[Row]:
+        return await self._fetch(
+            """SELECT * FROM history_rollups WHERE $1::TEXT IS NULL OR table_name = $1
+               ORDER BY table_name, month DESC, entries DESC""",
+            table
+        )
+
+    # Cooldowns, logs and settings
+    async def get_cooldowns(self, user_id: int) -> Dict[str, Optional[str]]:
+        row = await self._fetchrow("SELECT * FROM cooldowns WHERE user_id = $1", user_id)
+        if row:
+            return dict(row)
+        await self._execute("INSERT INTO cooldowns (user_id) VALUES ($1) ON CONFLICT DO NOTHING", user_id)
+        return {}
+
+    async def set_cooldown(self, user_id: int, cooldown_type: str) -> bool:
+        # Validate cooldown_type to prevent SQL injection
+        valid_cooldown_types = {
+            'daily', 'adventure', 'battle', 'prayer', 'sacrifice',
+            'blessing', 'raid', 'gambling', 'shop'
+        }
+        if cooldown_type not in valid_cooldown_types:
+            return False
+        await self._execute(
+            f"""INSERT INTO cooldowns (user_id, {cooldown_type}) VALUES ($1, rpg_utc_now())
+                ON CONFLICT (user_id) DO UPDATE SET {cooldown_type} = excluded.{cooldown_type}""",
+            user_id
+        )
+        return True
+
+    async def log_transaction(self, from_user: Optional[int], to_user: Optional[int],
+                              amount: int, subject: str, info: Dict[str, Any]) -> bool:
+        await self._execute(
+            """INSERT INTO transactions (from_user, to_user, amount, subject, item_id, item, won, details)
+               VALUES ($1, $2, $3, $4, $5, $6, $7, $8)""",
+            from_user, to_user, amount, subject, *split_info(info)
+        )
+        return True
+
+    async def get_transactions(self, user_id: Optional[int] = None, subject: Optional[str] = None,
+                               limit: int = 10) -> List[Dict[str, Any]]:
+        """Newest ledger entries of a user and/or subject, continuing into transactions_archive
+
+        Each entry is the row as a dict with its decoded info dict under 'info'.
+        """
+        if user_id is None:
+            query = """SELECT * FROM {table} WHERE subject = $1
+                       ORDER BY timestamp DESC, id DESC LIMIT $2"""
+            params = (subject,)
+        else:
+            # Each direction walks its own index newest first, then the two are merged
+            query = """(SELECT * FROM {table}
+                        WHERE from_user = $1 AND ($2::TEXT IS NULL OR subject = $2)
+                        ORDER BY timestamp DESC, id DESC LIMIT $3)
+                       UNION ALL
+                       (SELECT * FROM {table}
+                        WHERE to_user = $1 AND from_user IS DISTINCT FROM $1 AND ($2::TEXT IS NULL OR subject = $2)
+                        ORDER BY timestamp DESC, id DESC LIMIT $3)
+                       ORDER BY timestamp DESC, id DESC LIMIT $3"""
+            params = (user_id, subject)
+        rows = await self._fetch(query.format(table='transactions'), *params, limit)
+        if len(rows) < limit:
+            rows += await self._fetch(query.format(table='transactions_archive'), *params, limit - len(rows))
+        entries = []
+        for row in rows:
+            row = dict(row)  # Record.keys() is a one-shot iterator
+            entry = {key: row[key] for key in row if key not in ('info', 'details')}
+            entry['info'] = transaction_info(row)
+            entries.append(entry)
+        return entries
+
+    async def get_transaction_summary(self, user_id: int, since: str) -> List[Row]:
+        """(subject, received, spent, entries) of a user's hot ledger since a UTC timestamp, busiest first"""
+        return await self._fetch(
+            """SELECT subject, SUM(received)::BIGINT AS received, SUM(spent)::BIGINT AS spent,
+                      COUNT(*) AS entries FROM (
+                   SELECT subject, amount AS received, 0 AS spent FROM transactions
+                   WHERE to_user = $1 AND timestamp >= $2
+                   UNION ALL
+                   SELECT subject, 0, amount FROM transactions
+                   WHERE from_user = $1 AND timestamp >= $2
+               ) ledger GROUP BY subject ORDER BY entries DESC""",
+            user_id, since
+        )
+
+    async def log_battle(self, attacker: int, defender: int, winner: int, battle_type: str,
+                         money_stolen: int = 0):
+        await self._execute(
+            """INSERT INTO battle_logs (attacker, defender, winner, battle_type, money_stolen)
+               VALUES ($1, $2, $3, $4, $5)""",
+            attacker, defender, winner, battle_type, money_stolen
+        )
+
+    async def settle_battle(self, attacker: int, defender: int, winner: int, bet: int = 0) -> bool:
+        """Pay out a PvP battle in one transaction, see Database.settle_battle"""
+        loser = defender if winner == attacker else attacker
+        async with self._pool.acquire() as conn:
+            tx = conn.transaction()
+            await tx.start()
+            try:
+                paid = await self._execute(
+                    """UPDATE profile SET money = money - $1, pvplosses = pvplosses + 1
+                       WHERE user_id = $2 AND money >= $1""",
+                    bet, loser, conn=conn
+                )
+                if paid == 0:
+                    await tx.rollback()
+                    return False
+                await self._execute(
+                    "UPDATE profile SET money = money + $1, pvpwins = pvpwins + 1 WHERE user_id = $2",
+                    bet, winner, conn=conn
+                )
+                await self._execute(
+                    """INSERT INTO battle_logs (attacker, defender, winner, battle_type, money_stolen)
+                       VALUES ($1, $2, $3, 'pvp', $4)""",
+                    attacker, defender, winner, bet, conn=conn
+                )
+                await tx.commit()
+                return True
+            except Exception:
+                await tx.rollback()
+                raise
+
+    async def get_prefix(self, guild_id: int) -> Optional[str]:
+        return await self._fetchval("SELECT prefix FROM server_settings WHERE guild_id = $1", guild_id)
+
+    async def ensure_server_settings(self, guild_id: int, prefix: str):
+        await self._execute(
+            "INSERT INTO server_settings (guild_id, prefix) VALUES ($1, $2) ON CONFLICT DO NOTHING",
+            guild_id, prefix
+        )
+
+    async def get_leaderboard(self, category: str = "level", limit: int = 10) -> List[Dict[str, Any]]:
+        valid_categories = {
+            "level": "level DESC, xp DESC",
+            "money": "money DESC",
+            "pvp": "pvpwins DESC",
+            "completed": "completed DESC"
+        }
+        order_by = valid_categories.get(category, valid_categories["level"])
+        rows = await self._fetch(
+            f"""SELECT user_id, name, level, xp, money, pvpwins, pvplosses, completed
+                FROM profile
+                ORDER BY {order_by}
+                LIMIT $1""",
+            limit
+        )
+        return [dict(row) for row in rows]
@@ -0,0 +1,250 @@
+"""Online-session tracking and history - who can progress right now, and who was online when"""
+import asyncio
+import logging
+import struct
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import discord
+
+logger = logging.getLogger('DiscordRPG.Presence')
+
+DAY = 86400
+
+Interval = Tuple[int, int]  # (start, end) seconds into a UTC day
+
+
+def pack_intervals(intervals: List[Interval]) -> bytes:
+    """Sorted, merged intervals as little-endian uint32 start/end pairs"""
+    flat = [bound for interval in intervals for bound in interval]
+    return struct.pack(f"<{len(flat)}I", *flat)
+
+
+def unpack_intervals(blob: bytes) -> List[Interval]:
+    flat = struct.unpack(f"<{len(blob) // 4}I", blob)
+    return list(zip(flat[::2], flat[1::2]))
+
+
+def merge_intervals(intervals: List[Interval]) -> List[Interval]:
+    """Sort and coalesce overlapping or touching intervals"""
+    merged: List[List[int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def split_days(start: float, end: float):
+    """Yield (day, start offset, end offset) for each UTC day a session covers"""
+    start, end = int(start), int(end)
+    while start < end:
+        day = start // DAY
+        stop = min(end, (day + 1) * DAY)
+        yield day, start - day * DAY, stop - day * DAY
+        start = stop
+
+
+def _clipped(intervals: List[Interval], day: int, start: float, end: float) -> float:
+    """Seconds of a day's intervals that fall inside [start, end)"""
+    base = day * DAY
+    return sum(max(0.0, min(end, base + e) - max(start, base + s)) for s, e in intervals)
+
+
+class PresenceTracker:
+    """Open online sessions per user, updated from presence events, plus their history
+
+    A user is online (and progresses) while any guild shows them as
+    discord.Status.online; idle, dnd and offline don't count. update() opens
+    a session when the first guild reports them online and closes it when
+    the last one stops, so game loops read online_ids() instead of checking
+    the presence of every registered character on every tick.
+
+    With a database, closed sessions are split per UTC day and buffered,
+    then flush() merges them into presence_days: one row per user per day
+    holding the packed intervals and their total. The event handlers stay
+    synchronous; callers await flush_if_due() after them. Range queries
+    combine the stored days (whole days use the total), the buffer and open
+    sessions.
+    """
+
+    def __init__(self, db=None, flush_every: int = 256, flush_interval: float = 60.0):
+        self.db = db
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.sessions: Dict[int, float] = {}  # user_id -> unix time the session started
+        self._online_in: Dict[int, Set[int]] = {}  # user_id -> guild ids showing them online
+        self._pending: Dict[Tuple[int, int], List[Interval]] = {}  # (user_id, day) -> unsaved intervals
+        self._saving: Dict[Tuple[int, int], List[Interval]] = {}  # Taken by the flush in progress
+        self._flush_lock = asyncio.Lock()  # Flushes read-merge-write the same rows, one at a time
+        self._flushed_at = time.monotonic()
+
+    def update(self, user_id: int, guild_id: int, online: bool,
+               at: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        """Record a user's status in one guild, returns (start, end) if a session just closed"""
+        at = time.time() if at is None else at
+        guilds = self._online_in.get(user_id)
+        if online:
+            if guilds is None:
+                guilds = self._online_in[user_id] = set()
+            guilds.add(guild_id)
+            self.sessions.setdefault(user_id, at)
+            return None
+        if guilds is None:
+            return None
+        guilds.discard(guild_id)
+        if guilds:
+            return None
+        del self._online_in[user_id]
+        started = self.sessions.pop(user_id, at)
+        self._record(user_id, started, at)
+        return started, at
+
+    def member_update(self, member: discord.Member, at: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        return self.update(member.id, member.guild.id, member.status == discord.Status.online, at)
+
+    def seed(self, guilds: Iterable[discord.Guild], at: Optional[float] = None):
+        """Rebuild from the member cache (on ready and after reconnects)
+
+        Sessions of users who are still online keep their start time; the rest are closed.
+        """
+        at = time.time() if at is None else at
+        online_in: Dict[int, Set[int]] = {}
+        for guild in guilds:
+            for member in guild.members:
+                if not member.bot and member.status == discord.Status.online:
+                    online_in.setdefault(member.id, set()).add(guild.id)
+        for user_id in self.sessions.keys() - online_in.keys():
+            self._record(user_id, self.sessions.pop(user_id), at)
+        for user_id in online_in:
+            self.sessions.setdefault(user_id, at)
+        self._online_in = online_in
+        logger.info(f"Tracking {len(self.sessions)} online users")
+
+    def is_online(self, user_id: int) -> bool:
+        return user_id in self.sessions
+
+    def online_ids(self) -> Set[int]:
+        return set(self.sessions)
+
+    def online_guilds(self, user_id: int) -> Set[int]:
+        """IDs of the guilds showing the user online"""
+        return set(self._online_in.get(user_id, ()))
+
+    def online_since(self, user_id: int) -> Optional[float]:
+        return self.sessions.get(user_id)
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    # History
+    def _record(self, user_id: int, start: float, end: float):
+        if self.db is None:
+            return
+        for day, day_start, day_end in split_days(start, end):
+            self._pending.setdefault((user_id, day), []).append((day_start, day_end))
+
+    def flush_due(self) -> bool:
+        return bool(self._pending) and (len(self._pending) >= self.flush_every
+                                        or time.monotonic() - self._flushed_at >= self.flush_interval)
+
+    async def flush_if_due(self):
+        if self.flush_due():
+            await self.flush()
+
+    def _buffered(self) -> Dict[Tuple[int, int], List[Interval]]:
+        """Unsaved intervals, including those of a flush still being written"""
+        if not self._saving:
+            return self._pending
+        buffered = {key: list(intervals) for key, intervals in self._saving.items()}
+        for key, intervals in self._pending.items():
+            buffered.setdefault(key, []).extend(intervals)
+        return buffered
+
+    async def flush(self):
+        """Merge buffered intervals into presence_days in one transaction"""
+        async with self._flush_lock:
+            await self._flush()
+
+    async def _flush(self):
+        self._flushed_at = time.monotonic()
+        if not self._pending or self.db is None:
+            return
+        pending = self._saving = self._pending
+        self._pending = {}
+        users_by_day: Dict[int, Set[int]] = defaultdict(set)
+        for user_id, day in pending:
+            users_by_day[day].add(user_id)
+        try:
+            stored: Dict[Tuple[int, int], List[Interval]] = {}
+            for day, user_ids in users_by_day.items():
+                for row in await self.db.get_presence_days(day, day, user_ids):
+                    stored[(row['user_id'], day)] = unpack_intervals(row['intervals'])
+            rows = []
+            for (user_id, day), intervals in pending.items():
+                merged = merge_intervals(stored.get((user_id, day), []) + intervals)
+                rows.append((user_id, day, pack_intervals(merged), sum(end - start for start, end in merged)))
+            await self.db.save_presence_days(rows)
+        except Exception as e:
+            logger.error(f"Failed to save presence history: {e}")
+            for key, intervals in pending.items():
+                self._pending.setdefault(key, []).extend(intervals)
+        finally:
+            self._saving = {}
+
+    async def close(self, at: Optional[float] = None):
+        """Close every open session and save the history (on shutdown)"""
+        at = time.time() if at is None else at
+        for user_id, started in self.sessions.items():
+            self._record(user_id, started, at)
+        self.sessions.clear()
+        self._online_in.clear()
+        await self.flush()
+
+    async def online_totals(self, start: float, end: float,
+                      user_ids: Optional[Iterable[int]] = None) -> Dict[int, float]:
+        """Seconds each user was online within [start, end)"""
+        wanted = set(user_ids) if user_ids is not None else None
+        first_day, last_day = int(start) // DAY, int(end) // DAY
+        totals: Dict[int, float] = defaultdict(float)
+        seen = set()
+        rows = [] if self.db is None else await self.db.get_presence_days(first_day, last_day, wanted)
+        buffered = self._buffered()
+        for row in rows:
+            key = (row['user_id'], row['day'])
+            seen.add(key)
+            base = row['day'] * DAY
+            if key not in buffered and start <= base and base + DAY <= end:
+                totals[row['user_id']] += row['online_seconds']  # Whole day: the rollup is enough
+            else:
+                intervals = unpack_intervals(row['intervals']) + buffered.get(key, [])
+                totals[row['user_id']] += _clipped(merge_intervals(intervals), row['day'], start, end)
+        for (user_id, day), intervals in buffered.items():
+            if (user_id, day) not in seen and first_day <= day <= last_day and (wanted is None or user_id in wanted):
+                totals[user_id] += _clipped(merge_intervals(intervals), day, start, end)
+        now = time.time()
+        for user_id, started in self.sessions.items():
+            if wanted is None or user_id in wanted:
+                totals[user_id] += max(0.0, min(end, now) - max(start, started))
+        return {user_id: seconds for user_id, seconds in totals.items() if seconds > 0}
+
+    async def online_seconds(self, user_id: int, start: float, end: float) -> float:
+        return (await self.online_totals(start, end, [user_id])).get(user_id, 0.0)
+
+    async def online_at(self, at: float) -> Set[int]:
+        """Users who were online at unix time `at`"""
+        day, offset = int(at) // DAY, int(at) % DAY
+        days: Dict[int, List[Interval]] = {}
+        if self.db is not None:
+            for row in await self.db.get_presence_days(day, day):
+                days[row['user_id']] = unpack_intervals(row['intervals'])
+        online = {user_id for user_id, started in self.sessions.items() if started <= at}
+        for (user_id, pending_day), intervals in self._buffered().items():
+            if pending_day == day:
+                days[user_id] = days.get(user_id, []) + intervals
+        for user_id, intervals in days.items():
+            if any(start <= offset < end for start, end in intervals):
+                online.add(user_id)
+        return online
@@ -0,0 +1,196 @@
+"""Per-statement query statistics and slow-query log for the Database layer"""
+import logging
+import os
+import sys
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Any, Deque, Dict, List
+
+logger = logging.getLogger('DiscordRPG.Database')
+
+# Bounded per-template timing sample used for percentiles
+SAMPLE_SIZE = 512
+
+# Templates tracked individually; the least recently run beyond this are folded into OTHER_TEMPLATE
+MAX_TEMPLATES = 500
+OTHER_TEMPLATE = "(other statements)"
+
+# Calling cog is looked up on one statement in this many (and on every slow one);
+# walking the stack for each statement would cost more than timing it
+CALLER_SAMPLE_EVERY = 64
+
+_DATABASE_FILES = (os.path.join('utils', 'database.py'), os.path.join('utils', 'postgres.py'),
+                   os.path.join('utils', 'query_stats.py'))
+
+
+class QueryTemplateStats:
+    """Aggregated statistics for one SQL statement template"""
+
+    __slots__ = ('template', 'calls', 'total_ms', 'max_ms', 'rows', 'samples', 'callers')
+
+    def __init__(self, template: str):
+        self.template = template
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.samples: Deque[float] = deque(maxlen=SAMPLE_SIZE)
+        self.callers: Counter = Counter()
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    @property
+    def p99_ms(self) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+    def merge(self, other: "QueryTemplateStats"):
+        """Add another template's counters to this one"""
+        self.calls += other.calls
+        self.total_ms += other.total_ms
+        self.rows += other.rows
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.samples.extend(other.samples)
+        self.callers.update(other.callers)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'template': self.template,
+            'calls': self.calls,
+            'total_ms': round(self.total_ms, 3),
+            'avg_ms': round(self.avg_ms, 3),
+            'p99_ms': round(self.p99_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+            'callers': dict(self.callers.most_common(5)),
+        }
+
+
+class QueryStats:
+    """Collects per-template statement statistics and a slow-query log"""
+
+    def __init__(self, slow_ms: float = 100.0, slow_log_size: int = 50,
+                 caller_every: int = CALLER_SAMPLE_EVERY):
+        self.slow_ms = slow_ms
+        self.caller_every = max(1, caller_every)
+        self.started_at = time.time()
+        # Least recently run first; bounded by MAX_TEMPLATES plus the OTHER_TEMPLATE bucket
+        self.templates: "OrderedDict[str, QueryTemplateStats]" = OrderedDict()
+        self.slow_queries: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        self._normalized: Dict[str, str] = {}
+        self._plans: Dict[str, List[str]] = {}
+
+    def normalize(self, query: str) -> str:
+        """Collapse whitespace so the same statement maps to one template"""
+        template = self._normalized.get(query)
+        if template is None:
+            template = " ".join(query.split())
+            if len(self._normalized) < 10000:
+                self._normalized[query] = template
+        return template
+
+    @staticmethod
+    def caller() -> str:
+        """First frame outside the database layer, as file:function"""
+        frame = sys._getframe(2)
+        while frame and frame.f_code.co_filename.endswith(_DATABASE_FILES):
+            frame = frame.f_back
+        if frame is None:
+            return 'unknown'
+        code = frame.f_code
+        name = getattr(code, 'co_qualname', code.co_name)
+        return f"{os.path.basename(code.co_filename)}:{name}"
+
+    def record(self, db, query: str, params: tuple, elapsed: float, rows: int):
+        """Record one statement execution (elapsed in seconds)"""
+        template = self.normalize(query)
+        stats = self.templates.get(template)
+        if stats is None:
+            stats = self.templates[template] = QueryTemplateStats(template)
+            self._evict()
+        else:
+            self.templates.move_to_end(template)
+
+        elapsed_ms = elapsed * 1000
+        caller = None
+        if stats.calls % self.caller_every == 0:
+            # Each sampled call stands for the caller_every calls around it
+            caller = self.caller()
+            stats.callers[caller] += self.caller_every
+        stats.calls += 1
+        stats.total_ms += elapsed_ms
+        stats.rows += rows
+        stats.samples.append(elapsed_ms)
+        if elapsed_ms > stats.max_ms:
+            stats.max_ms = elapsed_ms
+
+        if elapsed_ms >= self.slow_ms:
+            caller = caller or self.caller()
+            plan = self.explain(db, template, params)
+            self.slow_queries.append({
+                'template': template,
+                'params': repr(params)[:200],
+                'ms': round(elapsed_ms, 3),
+                'caller': caller,
+                'at': time.time(),
+                'plan': plan,
+            })
+            logger.warning(f"Slow query ({elapsed_ms:.1f}ms) from {caller}: {template[:200]} | plan: {'; '.join(plan)}")
+
+    def _evict(self):
+        """Fold the least recently run templates into OTHER_TEMPLATE once past MAX_TEMPLATES
+
+        Dynamically built SQL (IN lists, generated column sets) would
+        otherwise add templates for as long as the bot runs.
+        """
+        while len(self.templates) - (OTHER_TEMPLATE in self.templates) > MAX_TEMPLATES:
+            template = next(name for name in self.templates if name != OTHER_TEMPLATE)
+            evicted = self.templates.pop(template)
+            self._plans.pop(template, None)
+            other = self.templates.get(OTHER_TEMPLATE)
+            if other is None:
+                other = self.templates[OTHER_TEMPLATE] = QueryTemplateStats(OTHER_TEMPLATE)
+                self.templates.move_to_end(OTHER_TEMPLATE, last=False)
+            other.merge(evicted)
+
+    def explain(self, db, template: str, params: tuple) -> List[str]:
+        """EXPLAIN QUERY PLAN snapshot, captured once per template
+
+        Empty for backends that pass no SQLite Database (their plans need an await).
+        """
+        if db is None:
+            return []
+        if template in self._plans:
+            return self._plans[template]
+        try:
+            rows = db.get_connection().execute(f"EXPLAIN QUERY PLAN {template}", params).fetchall()
+            plan = [row[3] for row in rows]
+        except Exception as e:
+            plan = [f"unavailable: {e}"]
+        self._plans[template] = plan
+        return plan
+
+    def top(self, key: str = 'total_ms', limit: int = 10) -> List[QueryTemplateStats]:
+        """Templates sorted by total_ms, avg_ms, p99_ms, calls or rows"""
+        return sorted(self.templates.values(), key=lambda s: getattr(s, key), reverse=True)[:limit]
+
+    def totals(self) -> Dict[str, Any]:
+        """Overall counters since the stats were (re)started"""
+        return {
+            'templates': len(self.templates),
+            'calls': sum(s.calls for s in self.templates.values()),
+            'total_ms': sum(s.total_ms for s in self.templates.values()),
+            'slow_queries': len(self.slow_queries),
+            'uptime_seconds': time.time() - self.started_at,
+        }
+
+    def reset(self):
+        """Clear all collected statistics"""
+        self.started_at = time.time()
+        self.templates.clear()
+        self.slow_queries.clear()
+        self._plans.clear()
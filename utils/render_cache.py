@@ -0,0 +1,52 @@
+"""Cache of built embeds, invalidated by per-user write versions"""
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import discord
+
+
+class RenderCache:
+    """Embeds keyed by (kind, user_id), valid while the user's version is unchanged
+
+    Versions come from Database.version(), which any write to the user's
+    profile, items or blessings bumps. Entries that show a countdown also
+    carry an expiry so the text doesn't go stale. The least recently used
+    entries are evicted past `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[int, Optional[float], discord.Embed]]" = OrderedDict()
+
+    def get(self, kind: str, user_id: int, version: Optional[int]) -> Optional[discord.Embed]:
+        """A copy of the cached embed, or None if missing, outdated or expired"""
+        if version is None:
+            return None
+        key = (kind, user_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        cached_version, expires_at, embed = entry
+        if cached_version != version or (expires_at is not None and time.monotonic() >= expires_at):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return embed.copy()
+
+    def put(self, kind: str, user_id: int, version: Optional[int], embed: discord.Embed,
+            ttl: Optional[float] = None):
+        """Store a copy of `embed` for this version (None means changes aren't tracked, so skip)"""
+        if version is None:
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[(kind, user_id)] = (version, expires_at, embed.copy())
+        self._entries.move_to_end((kind, user_id))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,351 @@
+"""Storage interface the cogs are written against
+
+Cogs never build SQL themselves; they await these typed methods on bot.db.
+utils.database.SQLiteRepository runs them on the bot's SQLite Database and
+utils.postgres.PostgresRepository on an asyncpg pool. A backend subclasses
+Repository, keeps the same transactional guarantees (the methods documented
+as atomic must stay atomic) and returns rows that support row['column']
+access, with timestamps as the UTC text the SQLite schema stores.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from utils.query_stats import CALLER_SAMPLE_EVERY, QueryStats
+
+Row = Mapping[str, Any]
+
+
+class Repository(ABC):
+    """Typed game storage operations, grouped by domain"""
+
+    # Per-statement statistics while instrumentation is on (see !perf db)
+    query_stats: Optional[QueryStats] = None
+
+    # Directory of the history archive files, None where archived rows stay in the database
+    archive_dir: Optional[str] = None
+
+    # Connection lifecycle
+    @abstractmethod
+    async def init_database(self):
+        """Create or migrate the schema (a no-op when already current)"""
+
+    @abstractmethod
+    async def close(self): ...
+
+    def enable_instrumentation(self, slow_ms: float = 100.0,
+                               caller_every: int = CALLER_SAMPLE_EVERY) -> QueryStats:
+        """Start recording per-statement statistics and slow queries"""
+        if self.query_stats is None:
+            self.query_stats = QueryStats(slow_ms=slow_ms, caller_every=caller_every)
+        else:
+            self.query_stats.slow_ms = slow_ms
+            self.query_stats.caller_every = max(1, caller_every)
+        return self.query_stats
+
+    def disable_instrumentation(self):
+        """Stop recording statement statistics"""
+        self.query_stats = None
+
+    # Characters
+    @abstractmethod
+    async def create_character(self, user_id: int, name: str) -> bool: ...
+
+    @abstractmethod
+    async def get_profile_ids(self) -> set: ...
+
+    @abstractmethod
+    async def bulk_create_characters(self, members: List[tuple], created_at: datetime,
+                                     starter_items: List[tuple] = ()) -> List[int]: ...
+
+    @abstractmethod
+    async def get_character(self, user_id: int) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_profile(self, user_id: int): ...
+
+    @abstractmethod
+    async def get_profile_snapshot(self, user_id: int, now: datetime) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def version(self, user_id: int) -> Optional[int]:
+        """Counter bumped by any write to the user's profile, items or blessings (None if untracked)
+
+        Kept in memory and read on every render, so it is not a coroutine.
+        """
+
+    @abstractmethod
+    async def list_characters(self, min_level: int = 1,
+                              user_ids: Optional[Iterable[int]] = None) -> List[Row]: ...
+
+    @abstractmethod
+    async def list_idle_characters(self, user_ids: Optional[Iterable[int]] = None) -> List[Row]: ...
+
+    @abstractmethod
+    async def get_raid_roster(self, user_ids: Iterable[int]) -> List[Row]: ...
+
+    @abstractmethod
+    async def get_battle_stats(self, user_ids: Iterable[int], now: datetime) -> List[Row]: ...
+
+    @abstractmethod
+    async def count_characters(self) -> int: ...
+
+    @abstractmethod
+    async def delete_character(self, user_id: int): ...
+
+    @abstractmethod
+    async def set_alignment(self, user_id: int, alignment: str) -> bool: ...
+
+    @abstractmethod
+    async def claim_daily(self, user_id: int, day: str, streak: int, gold: int, xp: int) -> bool: ...
+
+    @abstractmethod
+    async def update_profile(self, user_id: int, **kwargs) -> bool: ...
+
+    @abstractmethod
+    async def update_character(self, user_id: int, **kwargs) -> bool: ...
+
+    @abstractmethod
+    async def increment(self, user_id: int, **deltas: int) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def batch(self):
+        """Async context manager that buffers increment() calls and writes them on exit"""
+
+    @abstractmethod
+    async def apply_rewards(self, deltas: Dict[int, Dict[str, int]], items: List = ()) -> bool: ...
+
+    # Level progression
+    @abstractmethod
+    async def get_level_ups(self, limit: int = 500) -> List[Row]:
+        """Oldest queued level-ups first; reading does not remove them"""
+
+    @abstractmethod
+    async def clear_level_ups(self, last_id: int) -> int: ...
+
+    # Items
+    @abstractmethod
+    async def create_item(self, owner_id: int, name: str, item_type: str,
+                          value: int, damage: int, armor: int, hand: str,
+                          health_bonus: int = 0, speed_bonus: int = 0,
+                          luck_bonus: float = 0.0, crit_bonus: float = 0.0,
+                          magic_bonus: int = 0, slot_type: str = None) -> int: ...
+
+    @abstractmethod
+    async def open_crates(self, user_id: int, crate_type: str, rewards: List[tuple]) -> bool: ...
+
+    @abstractmethod
+    async def get_user_items(self, user_id: int) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_equipped_items(self, user_id: int) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def equip_item(self, item_id: int, user_id: int) -> bool: ...
+
+    @abstractmethod
+    async def unequip_item(self, item_id: int, user_id: int) -> bool: ...
+
+    @abstractmethod
+    async def delete_item(self, item_id: int) -> bool: ...
+
+    @abstractmethod
+    async def rename_item(self, item_id: int, name: str) -> bool: ...
+
+    @abstractmethod
+    async def transfer_item(self, item_id: int, to_user: int) -> bool: ...
+
+    @abstractmethod
+    async def swap_items(self, item_a: int, owner_a: int, item_b: int, owner_b: int) -> bool: ...
+
+    @abstractmethod
+    async def get_item_by_id(self, item_id: int) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_equipped_slots(self, user_id: int) -> Dict[str, Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def equip_item_to_slot(self, item_id: int, user_id: int, slot: str) -> bool: ...
+
+    @abstractmethod
+    async def unequip_item_from_slot(self, user_id: int, slot: str) -> bool: ...
+
+    # Guilds
+    @abstractmethod
+    async def create_guild(self, name: str, owner_id: int) -> Optional[int]: ...
+
+    @abstractmethod
+    async def get_guild(self, guild_id: int) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_guild_members(self, guild_id: int) -> List[Dict[str, Any]]: ...
+
+    # Market
+    @abstractmethod
+    async def list_item_on_market(self, item_id: int, price: int, owner_id: Optional[int] = None,
+                                  fee: int = 0) -> bool: ...
+
+    @abstractmethod
+    async def withdraw_market_item(self, item_id: int, owner_id: int) -> bool: ...
+
+    @abstractmethod
+    async def get_market_items(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def list_market_listings(self) -> List[Dict[str, Any]]:
+        """Every listing oldest first, as the item's inventory columns plus price and listed_at"""
+
+    @abstractmethod
+    async def get_market_listing(self, item_id: int) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def buy_market_item(self, item_id: int, buyer_id: int,
+                              max_price: Optional[int] = None) -> Optional[Dict[str, int]]: ...
+
+    # Adventures
+    @abstractmethod
+    async def start_adventure(self, user_id: int, adventure_name: str,
+                              difficulty: int, duration_seconds: int) -> bool: ...
+
+    @abstractmethod
+    async def get_active_adventure(self, user_id: int) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def start_adventures(self, adventures: List[tuple]): ...
+
+    @abstractmethod
+    async def get_finished_adventures(self, now: datetime,
+                                      user_ids: Optional[Iterable[int]] = None) -> List[Row]: ...
+
+    @abstractmethod
+    async def get_adventure_history(self, user_id: int, limit: int = 10) -> List[Row]: ...
+
+    @abstractmethod
+    async def count_adventures(self, status: str) -> int: ...
+
+    @abstractmethod
+    async def complete_adventure(self, adventure_id: int, success: bool) -> bool: ...
+
+    @abstractmethod
+    async def complete_adventures(self, rewards: List[tuple]) -> set:
+        """Atomic: every still-active adventure is completed and paid out together"""
+
+    # Epic adventures
+    @abstractmethod
+    async def get_active_epic_adventure(self, user_id: int) -> Optional[Row]: ...
+
+    @abstractmethod
+    async def count_recent_epic_adventures(self, user_id: int, days: int = 7) -> int: ...
+
+    @abstractmethod
+    async def get_finished_epic_adventures(self, now: datetime) -> List[Row]: ...
+
+    @abstractmethod
+    async def list_epic_candidates(self, min_level: int = 10,
+                                   user_ids: Optional[Iterable[int]] = None) -> List[Row]: ...
+
+    @abstractmethod
+    async def start_epic_adventure(self, user_id: int, adventure_type: str, adventure_name: str,
+                                   difficulty: int, started_at: datetime, finish_at: datetime,
+                                   xp_reward: int, gold_reward: int,
+                                   quality_min: int, quality_max: int): ...
+
+    @abstractmethod
+    async def complete_epic_adventure(self, adventure_id: int): ...
+
+    # Blessings
+    @abstractmethod
+    async def get_active_blessings(self, user_id: int, now: datetime) -> List[Row]: ...
+
+    @abstractmethod
+    async def get_active_blessing(self, user_id: int, effect: str, now: datetime) -> Optional[Row]: ...
+
+    @abstractmethod
+    async def add_blessing(self, user_id: int, effect: str, value: float, expires_at: datetime, name: str): ...
+
+    @abstractmethod
+    async def remove_blessing(self, user_id: int, effect: str): ...
+
+    @abstractmethod
+    async def prune_blessings(self, now: datetime) -> int: ...
+
+    # Penalties
+    @abstractmethod
+    async def add_penalty(self, user_id: int, penalty_seconds: int) -> bool: ...
+
+    @abstractmethod
+    async def get_pending_penalty(self, user_id: int) -> int: ...
+
+    # Economy aggregates
+    @abstractmethod
+    async def get_economy_report(self, since: str) -> Dict[str, Any]: ...
+
+    # Tournaments
+    @abstractmethod
+    async def create_tournament(self, created_by: int, prize: int, participants: List[int]) -> Optional[int]:
+        """Atomic: the host pays the prize and the record opens, or neither happens"""
+
+    @abstractmethod
+    async def finish_tournament(self, tournament_id: int, winner: int, prize: int):
+        """Atomic: the champion is paid and the record closed together"""
+
+    # Presence history
+    @abstractmethod
+    async def get_presence_days(self, first_day: int, last_day: int,
+                                user_ids: Optional[Iterable[int]] = None) -> List[Row]: ...
+
+    @abstractmethod
+    async def save_presence_days(self, rows: List[tuple]): ...
+
+    # History archive
+    @abstractmethod
+    async def archive_history(self, ages: Dict[str, int], now: Optional[float] = None) -> Dict[str, int]:
+        """Atomic per chunk: rows are copied to the archive, rolled up and deleted together
+
+        Must not hold up the event loop while it runs.
+        """
+
+    @abstractmethod
+    async def enable_incremental_vacuum(self) -> bool:
+        """One-off full rewrite so archived space can be returned; False if already enabled"""
+
+    @abstractmethod
+    async def incremental_vacuum_enabled(self) -> bool: ...
+
+    @abstractmethod
+    async def get_history_rollups(self, table: Optional[str] = None) -> List[Row]: ...
+
+    # Cooldowns, logs and settings
+    @abstractmethod
+    async def get_cooldowns(self, user_id: int) -> Dict[str, Optional[str]]: ...
+
+    @abstractmethod
+    async def set_cooldown(self, user_id: int, cooldown_type: str) -> bool: ...
+
+    @abstractmethod
+    async def log_transaction(self, from_user: Optional[int], to_user: Optional[int],
+                              amount: int, subject: str, info: Dict[str, Any]) -> bool: ...
+
+    @abstractmethod
+    async def get_transactions(self, user_id: Optional[int] = None, subject: Optional[str] = None,
+                               limit: int = 10) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_transaction_summary(self, user_id: int, since: str) -> List[Row]: ...
+
+    @abstractmethod
+    async def log_battle(self, attacker: int, defender: int, winner: int, battle_type: str,
+                         money_stolen: int = 0): ...
+
+    @abstractmethod
+    async def settle_battle(self, attacker: int, defender: int, winner: int, bet: int = 0) -> bool:
+        """Atomic: the bet moves, both records update and the battle is logged, or nothing happens"""
+
+    @abstractmethod
+    async def get_prefix(self, guild_id: int) -> Optional[str]: ...
+
+    @abstractmethod
+    async def ensure_server_settings(self, guild_id: int, prefix: str): ...
+
+    @abstractmethod
+    async def get_leaderboard(self, category: str = "level", limit: int = 10) -> List[Dict[str, Any]]: ...
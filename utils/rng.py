@@ -0,0 +1,55 @@
+"""Independent random streams per subsystem, seeded per day and per guild"""
+import hashlib
+import logging
+import os
+import random
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger('DiscordRPG.RNG')
+
+
+class RNGService:
+    """Hands out random.Random streams keyed by subsystem, UTC day and guild
+
+    Streams never share state with each other or with the global random
+    module, so one subsystem can't disturb another's sequence. With a fixed
+    seed (RNG_SEED) every stream replays identically, which makes
+    simulations reproducible.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.reproducible = seed is not None
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(8), 'big')
+        self._streams: Dict[Tuple[str, Optional[int]], Tuple[str, random.Random]] = {}
+        logger.info(f"RNG base seed {self.seed}" + ("" if self.reproducible else " (random)"))
+
+    @staticmethod
+    def today() -> str:
+        return datetime.now(timezone.utc).strftime('%Y%m%d')
+
+    def derive_seed(self, subsystem: str, day: str, guild_id: Optional[int] = None,
+                    base: Optional[int] = None) -> int:
+        """Stable 64-bit seed for one (subsystem, day, guild)"""
+        material = f"{self.seed if base is None else base}:{subsystem}:{day}:{guild_id or 0}"
+        return int.from_bytes(hashlib.sha256(material.encode()).digest()[:8], 'big')
+
+    def stream(self, subsystem: str, guild_id: Optional[int] = None) -> random.Random:
+        """Long-lived stream for today, reseeded when the UTC day rolls over"""
+        day = self.today()
+        key = (subsystem, guild_id)
+        cached = self._streams.get(key)
+        if cached is None or cached[0] != day:
+            cached = (day, random.Random(self.derive_seed(subsystem, day, guild_id)))
+            self._streams[key] = cached
+        return cached[1]
+
+    def daily(self, subsystem: str, day: Optional[str] = None,
+              guild_id: Optional[int] = None) -> random.Random:
+        """Fresh stream that starts from the same state all day
+
+        Without RNG_SEED this is keyed on the date alone, so a restart doesn't
+        reshuffle anything players have already seen (the daily shop).
+        """
+        base = self.seed if self.reproducible else 0
+        return random.Random(self.derive_seed(subsystem, day or self.today(), guild_id, base=base))